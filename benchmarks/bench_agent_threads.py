@@ -0,0 +1,118 @@
+"""
+Measure the footprint of the in-process agent while serving concurrent streams.
+
+An agent is started inside this process exactly like profiler_agent does, an
+application thread spins on a hot loop, then N watch streams are opened against
+N distinct functions. Reported numbers:
+
+  * threads: live threads in the process while all streams are open
+  * app_ops/s: iterations the application thread completes per second, compared
+    with the same loop running without any stream (a proxy of the GIL share the
+    agent takes away from the application)
+
+usage: python benchmarks/bench_agent_threads.py [--streams 1,8,32] [--seconds 3]
+"""
+import argparse
+import asyncio
+import socket
+import sys
+import threading
+import time
+from typing import List
+
+from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+MAX_STREAMS = 64
+EVENT_EVERY = 200
+
+for _i in range(MAX_STREAMS):
+    exec(f"def hot_{_i}(x):\n    return x + 1\n")
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _start_agent(port: int) -> None:
+    def run_app():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(FlightProfilerServer("localhost", port).run())
+
+    threading.Thread(target=run_app, name="flight-profiler-agent", daemon=True).start()
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            client = FlightClient("localhost", port)
+        except Exception:
+            time.sleep(0.05)
+            continue
+        client.request({"target": "status", "is_plugin_calling": False})
+        client.close()
+        return
+    raise RuntimeError("agent not started")
+
+
+def _app_throughput(seconds: float, active_streams: int) -> float:
+    funcs = [getattr(sys.modules[__name__], f"hot_{i}") for i in range(MAX_STREAMS)]
+    count = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        # the watched functions fire at a modest rate, the rest is app work
+        if count % EVENT_EVERY == 0:
+            funcs[(count // EVENT_EVERY) % max(active_streams, 1)](count)
+        count += 1
+    return count / seconds
+
+
+def _consume(client: FlightClient, body) -> None:
+    try:
+        for _ in client.request_stream(body):
+            pass
+    except Exception:
+        pass
+
+
+def run(stream_counts: List[int], seconds: float) -> None:
+    port = _free_port()
+    _start_agent(port)
+    baseline = _app_throughput(seconds, 0)
+    print(f"{'streams':>8} {'threads':>8} {'app_ops/s':>12} {'vs idle':>8}")
+    print(f"{0:>8} {threading.active_count():>8} {baseline:>12.0f} {1.0:>8.2f}")
+    for n in stream_counts:
+        consumers = []
+        for i in range(n):
+            client = FlightClient("localhost", port)
+            body = {
+                "target": "watch",
+                "param": f"on {__name__} hot_{i} -n 100000000",
+            }
+            t = threading.Thread(target=_consume, args=(client, body), daemon=True)
+            t.start()
+            consumers.append(client)
+        time.sleep(0.5)
+        ops = _app_throughput(seconds, n)
+        threads = threading.active_count()
+        for i in range(n):
+            off = FlightClient("localhost", port)
+            for _ in off.request_stream(
+                {"target": "watch", "param": f"off {__name__} hot_{i}"}
+            ):
+                pass
+            off.close()
+        for client in consumers:
+            client.close()
+        # consumer threads are part of the benchmark harness, not the agent
+        print(f"{n:>8} {threads - n:>8} {ops:>12.0f} {ops / baseline:>8.2f}")
+        time.sleep(0.5)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--streams", default="1,8,32")
+    parser.add_argument("--seconds", type=float, default=3)
+    args = parser.parse_args()
+    run([min(int(s), MAX_STREAMS) for s in args.streams.split(",")], args.seconds)
@@ -0,0 +1,106 @@
+"""
+Measure activation latency of the bytecode transformer, the step of watch,
+trace, tt and torch that builds the wrapped code of the target method.
+
+The target is a method with a big closure. The watch wrapper is applied by the
+instruction level transformer with an empty template cache (first activation of
+a wrapper kind) and with the cached template, and, for reference, by the former
+transformer which matched LOAD_DEREF bytes with a regex on every activation.
+Numbers are microseconds per activation.
+
+usage: python benchmarks/bench_bytecode_transform.py [--freevars 200] [--repeat 2000]
+"""
+import argparse
+import opcode
+import re
+import sys
+import time
+import types
+
+from flight_profiler.common import bytecode_transformer
+from flight_profiler.common.bytecode_transformer import (
+    _execute_bytecode_transform_intern,
+)
+from flight_profiler.plugins.watch.watch_agent import wrapper_generator
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+
+def regex_transform(fn, wrapper_generator, wrapper_arg):
+    """
+    the transformer before instructions were decoded, LOAD_DEREF part only
+    """
+    wrap_function = wrapper_generator(wrapper_arg)(fn)
+    wrap_code = wrap_function.__code__
+    const_var_len = len(wrap_code.co_consts)
+    alt_wrapper_arg = bytes([opcode.opmap["LOAD_CONST"], const_var_len])
+    alt_func = bytes([opcode.opmap["LOAD_CONST"], const_var_len + 1])
+    closure_shift = len(wrap_code.co_varnames) if sys.version_info >= (3, 11) else 0
+    deref_wrapper_arg = bytes([opcode.opmap["LOAD_DEREF"], closure_shift + 1])
+    deref_func = bytes([opcode.opmap["LOAD_DEREF"], closure_shift])
+    deref_pattern = bytes([opcode.opmap["LOAD_DEREF"]]) + r"[\s\S]".encode()
+    code = wrap_code.co_code
+    for match in re.finditer(deref_pattern, wrap_code.co_code):
+        if match.start() % 2 != 0:
+            continue
+        alt = alt_wrapper_arg if match.group() == deref_wrapper_arg else alt_func
+        code = code[: match.start()] + alt + code[match.start() + 2 :]
+    if sys.version_info >= (3, 11):
+        code = bytes([opcode.opmap["NOP"], 0]) + code[2:]
+    copy_fn = types.FunctionType(
+        fn.__code__, fn.__globals__, fn.__name__, fn.__defaults__, fn.__closure__
+    )
+    return wrap_code.replace(
+        co_code=code,
+        co_consts=wrap_code.co_consts + (wrapper_arg, copy_fn),
+        co_freevars=fn.__code__.co_freevars,
+    )
+
+
+def _big_closure(freevars: int):
+    names = [f"c{i}" for i in range(freevars)]
+    source = (
+        "def outer():\n"
+        + "".join(f"    {n} = {i}\n" for i, n in enumerate(names))
+        + "    def target(x):\n"
+        + f"        return x + {' + '.join(names)}\n"
+        + "    return target\n"
+    )
+    namespace = {}
+    exec(source, namespace)
+    return namespace["outer"]()
+
+
+def _us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(freevars: int, repeat: int) -> None:
+    target = _big_closure(freevars)
+    setting = WatchArgumentParser().parse_watch_setting(f"{__name__} target")
+
+    def activate():
+        return _execute_bytecode_transform_intern(target, wrapper_generator, setting, ["time"])
+
+    def cold():
+        bytecode_transformer._wrapper_templates.clear()
+        activate()
+
+    print(f"target closure: {len(target.__code__.co_freevars)} free variables")
+    print(f"{'activation':>28} {'us':>10}")
+    print(f"{'instructions, cold template':>28} {_us(cold, repeat):>10.1f}")
+    print(f"{'instructions, cached':>28} {_us(activate, repeat):>10.1f}")
+    former = lambda: regex_transform(target, wrapper_generator, setting)
+    print(f"{'former regex':>28} {_us(former, repeat):>10.1f}")
+    target.__code__ = activate()
+    assert target(1) == 1 + sum(range(freevars))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--freevars", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.freevars, args.repeat)
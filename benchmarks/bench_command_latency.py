@@ -0,0 +1,87 @@
+"""
+Measure latency of short commands sent one after another, like a script driving
+many commands, with one connection per command versus one multiplexed session.
+
+A target process runs the agent, this process issues --commands requests of the
+status call and of a short plugin command (module), reporting the mean latency
+per command and the number of tcp connections the agent had to accept.
+
+usage: python benchmarks/bench_command_latency.py [--commands 500]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from flight_profiler.communication.flight_client import FlightClient, FlightSession
+
+STATUS = {"target": "status", "is_plugin_calling": False}
+MODULE = {"target": "module", "param": "json"}
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _target_main(port: int) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(FlightProfilerServer("localhost", port).run())
+
+
+def _wait_agent(port: int) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            FlightClient("localhost", port).close()
+            return
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError("agent not started")
+
+
+def per_command(port: int, body, commands: int) -> float:
+    start = time.perf_counter()
+    for _ in range(commands):
+        client = FlightClient("localhost", port)
+        for _ in client.request_stream(body):
+            pass
+        client.close()
+    return (time.perf_counter() - start) / commands
+
+
+def in_session(port: int, body, commands: int) -> float:
+    session = FlightSession("localhost", port)
+    start = time.perf_counter()
+    for _ in range(commands):
+        channel = session.open_channel()
+        for _ in channel.request_stream(body):
+            pass
+        channel.close()
+    cost = (time.perf_counter() - start) / commands
+    session.close()
+    return cost
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--commands", type=int, default=500)
+    commands = parser.parse_args().commands
+    port = _free_port()
+    target = multiprocessing.Process(target=_target_main, args=(port,), daemon=True)
+    target.start()
+    try:
+        _wait_agent(port)
+        print(f"{'command':>8} {'mode':>12} {'ms/command':>12} {'connections':>12}")
+        for name, body in (("status", STATUS), ("module", MODULE)):
+            cost = per_command(port, body, commands)
+            print(f"{name:>8} {'per-command':>12} {cost * 1000:>12.3f} {commands:>12}")
+            cost = in_session(port, body, commands)
+            print(f"{name:>8} {'session':>12} {cost * 1000:>12.3f} {1:>12}")
+    finally:
+        target.terminate()
@@ -0,0 +1,115 @@
+"""
+Measure bytes on the wire and end-to-end latency of large replies per stream codec.
+
+A target process runs the agent with an extra special call returning a stack dump
+like text of the requested size, this process requests it once per codec and
+size as one stream frame. Reported numbers are the bytes of the received frame,
+the compression ratio, the measured latency on loopback (compression included)
+and the latency estimated for a link of --mbps, e.g. a forwarded container port.
+
+usage: python benchmarks/bench_compression.py [--sizes 1,10,50] [--mbps 100]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from flight_profiler.communication.base import (
+    STREAM_FRAME_VERSION,
+    decode_stream_frame,
+    get_supported_compressions,
+)
+from flight_profiler.communication.flight_client import FlightClient
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _stack_text(size: int) -> str:
+    lines = []
+    total = 0
+    i = 0
+    while total < size:
+        line = (
+            f'  File "/usr/lib/python3.11/site-packages/app/module_{i % 37}.py", '
+            f"line {i * 7 % 1000}, in handler_{i % 53}\n"
+        )
+        lines.append(line)
+        total += len(line)
+        i += 1
+    return "".join(lines)[:size]
+
+
+def _target_main(port: int) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    server = FlightProfilerServer("localhost", port)
+    server.special_method_dispatcher["bench_blob"] = lambda size: _stack_text(
+        int(size)
+    )
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.run())
+
+
+def _wait_agent(port: int) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            FlightClient("localhost", port).close()
+            return
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError("agent not started")
+
+
+def receive(port: int, size: int, codec: str):
+    body = {
+        "target": "bench_blob",
+        "param": str(size),
+        "is_plugin_calling": False,
+        "frame_version": STREAM_FRAME_VERSION,
+    }
+    if codec != "raw":
+        body["compression"] = codec
+    client = FlightClient("localhost", port)
+    start = time.perf_counter()
+    frame = client.request(body)
+    _, _, events = decode_stream_frame(memoryview(frame))
+    cost = time.perf_counter() - start
+    client.close()
+    # json escaped string
+    assert len(events[0]) > size, len(events[0])
+    # length header of the message
+    return len(frame) + 4, cost
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,10,50", help="message sizes in MB")
+    parser.add_argument("--mbps", type=float, default=100, help="link Mbit/s")
+    args = parser.parse_args()
+    port = _free_port()
+    target = multiprocessing.Process(target=_target_main, args=(port,), daemon=True)
+    target.start()
+    try:
+        _wait_agent(port)
+        print(
+            f"{'codec':>6} {'size_mb':>8} {'wire_bytes':>12} {'ratio':>7} "
+            f"{'local_s':>9} {'link_s':>9}"
+        )
+        for size_mb in [int(s) for s in args.sizes.split(",")]:
+            size = size_mb * 1024 * 1024
+            for codec in ["raw"] + get_supported_compressions():
+                wire, cost = receive(port, size, codec)
+                link = cost + wire * 8 / (args.mbps * 1000 * 1000)
+                print(
+                    f"{codec:>6} {size_mb:>8} {wire:>12} {size / wire:>7.1f} "
+                    f"{cost:>9.3f} {link:>9.3f}"
+                )
+    finally:
+        target.terminate()
@@ -0,0 +1,85 @@
+"""
+Measure encode_obj_to_transfer, the text encoder of watch, tt, getglobal and
+vmtool results, on large and deep objects.
+
+Cases are a list of 1M ints, a dict of 100k keys and the same dict with keys of
+mixed types at the default depth, a tree of dataclasses and a linked list of
+300 dataclasses at a depth covering them. Each is encoded with the first and
+last 10 items shown and with -v (verbose), which shows everything up to the
+PYFLIGHT_ENCODE_MAX_NODES budget. Numbers are milliseconds per encoding.
+
+usage: python benchmarks/bench_encode_obj.py [--repeat 5]
+"""
+import argparse
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from flight_profiler.common.dumps import encode_obj_to_transfer
+
+
+@dataclass
+class Node:
+    name: str
+    weight: float
+    tags: List[str] = field(default_factory=list)
+    children: List["Node"] = field(default_factory=list)
+
+
+@dataclass
+class Link:
+    value: int
+    next: Optional["Link"] = None
+
+
+def _tree(depth: int, width: int) -> Node:
+    node = Node(f"node-{depth}", depth * 0.5, [f"t{i}" for i in range(3)])
+    if depth > 0:
+        node.children = [_tree(depth - 1, width) for _ in range(width)]
+    return node
+
+
+def _chain(length: int) -> Link:
+    head = None
+    for i in range(length):
+        head = Link(i, head)
+    return head
+
+
+def _cases():
+    wide = {f"key-{i}": i for i in range(100000)}
+    mixed = dict(wide)
+    mixed.update({i: str(i) for i in range(1000)})
+    return [
+        ("list 1M", list(range(1000000)), 3),
+        ("dict 100k", wide, 3),
+        ("mixed keys", mixed, 3),
+        ("dataclasses", _tree(4, 6), 12),
+        ("chain 300", _chain(300), 300),
+    ]
+
+
+def _ms(obj: Any, max_depth: int, verbose: bool, repeat: int) -> str:
+    try:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            encode_obj_to_transfer(obj, max_depth=max_depth, verbose=verbose)
+        return f"{(time.perf_counter() - start) / repeat * 1000:.2f}"
+    except Exception as e:
+        return type(e).__name__
+
+
+def main(repeat: int) -> None:
+    print(f"{'case':>12} {'ms':>16} {'verbose ms':>16}")
+    for name, obj, max_depth in _cases():
+        print(
+            f"{name:>12} {_ms(obj, max_depth, False, repeat):>16} "
+            f"{_ms(obj, max_depth, True, repeat):>16}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.repeat)
@@ -0,0 +1,107 @@
+"""
+Measure latency of the first command after attach, with and without plugin preload.
+
+For every command a fresh target process starts the agent, this process sends
+the status handshake like the cli does right after attach (optionally asking
+the agent to preload the plugin), waits --think seconds as a user would, then
+times the first request of the command and a second one for reference.
+
+usage: python benchmarks/bench_first_command.py [--think 1]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+from flight_profiler.communication.flight_client import FlightClient
+
+COMMANDS = [
+    ("trace", "off __main__ hot"),
+    ("watch", "off __main__ hot"),
+    ("tt", "-l"),
+    ("stack", ""),
+    ("getglobal", "__main__ COMMANDS"),
+    ("module", "__main__"),
+]
+
+
+def hot(x):
+    return x + 1
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _target_main(port: int) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(FlightProfilerServer("localhost", port).run())
+
+
+def _status(port: int, offer) -> dict:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            client = FlightClient("localhost", port)
+        except Exception:
+            time.sleep(0.05)
+            continue
+        body = {"target": "status", "is_plugin_calling": False}
+        if offer:
+            body["param"] = json.dumps(offer)
+        resp = json.loads(client.request(body))
+        client.close()
+        return resp
+    raise RuntimeError("agent not started")
+
+
+def _timed_request(port: int, cmd: str, param: str) -> float:
+    client = FlightClient("localhost", port)
+    start = time.perf_counter()
+    for _ in client.request_stream({"target": cmd, "param": param}):
+        pass
+    cost = time.perf_counter() - start
+    client.close()
+    return cost
+
+
+def measure(context, cmd: str, param: str, preload: bool, think: float):
+    port = _free_port()
+    target = context.Process(target=_target_main, args=(port,), daemon=True)
+    target.start()
+    try:
+        _status(port, {"preload": [cmd]} if preload else None)
+        time.sleep(think)
+        first = _timed_request(port, cmd, param)
+        second = _timed_request(port, cmd, param)
+        timings = _status(port, None).get("preload", {})
+        return first, second, timings.get(cmd)
+    finally:
+        target.terminate()
+        target.join()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--think", type=float, default=1)
+    args = parser.parse_args()
+    # a fresh interpreter per target, nothing of the plugins is imported yet
+    context = multiprocessing.get_context("spawn")
+    print(
+        f"{'command':>10} {'cold_ms':>9} {'preload_ms':>11} "
+        f"{'steady_ms':>10} {'preload_cost_ms':>16}"
+    )
+    for cmd, param in COMMANDS:
+        cold, steady, _ = measure(context, cmd, param, False, args.think)
+        warm, _, preload_cost = measure(context, cmd, param, True, args.think)
+        print(
+            f"{cmd:>10} {cold * 1000:>9.1f} {warm * 1000:>11.1f} "
+            f"{steady * 1000:>10.1f} {preload_cost:>16}"
+        )
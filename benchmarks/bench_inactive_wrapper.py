@@ -0,0 +1,84 @@
+"""
+Measure per-call overhead of a watch wrapper that no longer records invocations.
+
+A wrapper stays reachable after its command ends when the caller captured it,
+e.g. `from module import func` on a wrapped builtin or a callback registry. The
+wrapper is called after the `-n` limit is exhausted and after the watch is
+turned off, and, for reference, with the former enter() which walked the frames
+and checked the caller filename before the limit on every call. Reported numbers
+are nanoseconds per call.
+
+usage: python benchmarks/bench_inactive_wrapper.py [--calls 1000000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.watch.watch_agent import wrapper_generator
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+
+def hot(x):
+    return x + 1
+
+
+class LegacyEnterSetting:
+    """
+    enter() before exhausted commands were short-circuited
+    """
+
+    def __init__(self, setting, count: int):
+        self.setting = setting
+        self.count = count
+        self.active = True
+
+    def __getattr__(self, item):
+        return getattr(self.setting, item)
+
+    def enter(self) -> bool:
+        try:
+            filename = sys._getframe().f_back.f_back.f_code.co_filename
+            if "flight_profiler" in filename and "test" not in filename:
+                return False
+        except ValueError:
+            return False
+        if self.count < self.setting.limit:
+            self.count += 1
+            return True
+        return False
+
+
+def _per_call_ns(func, calls: int) -> float:
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def main(calls: int) -> None:
+    loop = asyncio.new_event_loop()
+    setting = WatchArgumentParser().parse_watch_setting(f"{__name__} hot -n 10")
+    setting.out_q = ServerQueue(asyncio.Queue(), loop)
+    wrapped = wrapper_generator(setting)(hot)
+
+    print(f"{'mode':>26} {'ns/call':>10}")
+    print(f"{'not wrapped':>26} {_per_call_ns(hot, calls):>10.0f}")
+    # consume the limit, origin code is not installed so nothing is restored
+    for i in range(setting.limit):
+        wrapped(i)
+    print(f"{'exhausted':>26} {_per_call_ns(wrapped, calls):>10.0f}")
+    setting.disable()
+    print(f"{'disabled':>26} {_per_call_ns(wrapped, calls):>10.0f}")
+
+    legacy = LegacyEnterSetting(setting, setting.limit)
+    legacy_wrapped = wrapper_generator(legacy)(hot)
+    print(f"{'exhausted, former enter':>26} {_per_call_ns(legacy_wrapped, calls):>10.0f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000000)
+    main(parser.parse_args().calls)
@@ -0,0 +1,74 @@
+"""
+Measure how long a single large agent reply takes to arrive, for 1 MB - 100 MB.
+
+A target process runs the agent with an extra special call returning a payload of
+the requested size, this process requests it once per size through FlightClient
+and reports seconds and MB/s until the whole message is received and unpacked.
+
+usage: python benchmarks/bench_large_messages.py [--sizes 1,10,100]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import time
+
+from flight_profiler.communication.flight_client import FlightClient
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _target_main(port: int) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    server = FlightProfilerServer("localhost", port)
+    server.special_method_dispatcher["bench_blob"] = lambda size: "x" * int(size)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.run())
+
+
+def _wait_agent(port: int) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            FlightClient("localhost", port).close()
+            return
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError("agent not started")
+
+
+def receive(port: int, size: int) -> float:
+    body = {"target": "bench_blob", "param": str(size), "is_plugin_calling": False}
+    client = FlightClient("localhost", port)
+    start = time.perf_counter()
+    received = 0
+    for event in client.request_stream(body):
+        received += len(event)
+    cost = time.perf_counter() - start
+    client.close()
+    # json string quotes
+    assert received == size + 2, received
+    return cost
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1,10,100", help="message sizes in MB")
+    args = parser.parse_args()
+    port = _free_port()
+    target = multiprocessing.Process(target=_target_main, args=(port,), daemon=True)
+    target.start()
+    try:
+        _wait_agent(port)
+        print(f"{'size_mb':>8} {'seconds':>10} {'MB/s':>10}")
+        for size_mb in [int(s) for s in args.sizes.split(",")]:
+            cost = receive(port, size_mb * 1024 * 1024)
+            print(f"{size_mb:>8} {cost:>10.3f} {size_mb / cost:>10.1f}")
+    finally:
+        target.terminate()
@@ -0,0 +1,83 @@
+"""
+Measure target method lookup used when adding and clearing a wrapper.
+
+A class and a module with many attributes are built and one method is looked up
+by the former inspect.getmembers scan and by the __dict__/MRO lookup. The cost
+of patching a C function by trampoline, which scans the heap for references, is
+reported too. Numbers are microseconds per lookup.
+
+usage: python benchmarks/bench_method_lookup.py [--attrs 5000] [--repeat 20]
+"""
+import argparse
+import gc
+import inspect
+import math
+import time
+import types
+
+from flight_profiler.common import aop_decorator
+
+
+def getmembers_class_function(cls, method_name):
+    for name, m in inspect.getmembers(cls):
+        if inspect.isfunction(m) and name == method_name:
+            return name, m, False
+        elif inspect.ismethod(m) and name == method_name:
+            return name, m, True
+    return None, None, False
+
+
+def getmembers_module_function(module, method_name):
+    for name, m in inspect.getmembers(
+        module, lambda x: inspect.isfunction(x) or inspect.ismethod(x)
+    ):
+        if name == method_name:
+            return m, False
+    return None, False
+
+
+def _build(attrs: int):
+    namespace = {f"attr_{i}": i for i in range(attrs)}
+    for i in range(attrs // 10):
+        namespace[f"method_{i}"] = lambda self: None
+    base = type("Base", (), namespace)
+    cls = type("Large", (base,), {"target": lambda self: None})
+    module = types.ModuleType("large_module")
+    module.__dict__.update(namespace)
+    module.target = lambda: None
+    return cls, module
+
+
+def _us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(attrs: int, repeat: int) -> None:
+    cls, module = _build(attrs)
+    print(f"{attrs} attributes, {len(gc.get_objects())} gc objects")
+    print(f"{'lookup':>28} {'us':>12}")
+    rows = [
+        ("class getmembers", lambda: getmembers_class_function(cls, "target")),
+        ("class __dict__/MRO", lambda: aop_decorator.find_class_function(cls, "target")),
+        ("module getmembers", lambda: getmembers_module_function(module, "target")),
+        ("module __dict__", lambda: aop_decorator.find_module_function(module, "target")),
+    ]
+    for name, fn in rows:
+        print(f"{name:>28} {_us(fn, repeat):>12.1f}")
+
+    def trampoline():
+        result = aop_decorator.install_trampoline(math.hypot, lambda *a: None)
+        aop_decorator.remove_trampoline(result)
+
+    print(f"{'C function trampoline':>28} {_us(trampoline, repeat):>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--attrs", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    main(args.attrs, args.repeat)
@@ -0,0 +1,94 @@
+"""
+Compare the bytecode and sys.monitoring backends of watch, needs python 3.12+.
+
+Per-call overhead is measured on a watched function with a filter that never
+matches, so only the interception, enter/exit and the filter run. Toggle cost is
+the interception of one function turned on and off again, code generation and
+swapping for the bytecode backend, enabling and disabling events for
+sys.monitoring, the watch command around it is not included.
+
+usage: python benchmarks/bench_monitoring_backend.py [--calls 200000] [--toggles 2000]
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from flight_profiler.common import aop_decorator
+from flight_profiler.common.monitoring_backend import (
+    BACKEND_MONITORING,
+    BACKENDS,
+    MONITORING_AVAILABLE,
+)
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.watch.watch_agent import (
+    global_watch_agent,
+    wrapper_generator,
+)
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+
+def hot(x):
+    return x + 1
+
+
+def _per_call_ns(calls: int) -> float:
+    func = globals()["hot"]
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def _param(backend: str, calls: int) -> str:
+    return f"{__name__} hot -n {calls * 10} -f 'args[0] < 0' --backend {backend}"
+
+
+def _watch(param: str, loop):
+    setting = WatchArgumentParser().parse_watch_setting(param)
+    setting.out_q = ServerQueue(asyncio.Queue(), loop)
+    global_watch_agent.add_watch(setting)
+
+
+def _unwatch(param: str) -> None:
+    global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(param))
+
+
+def _toggle_us(setting, toggles: int) -> float:
+    module = sys.modules[__name__]
+    start = time.perf_counter()
+    for _ in range(toggles):
+        if setting.backend == BACKEND_MONITORING:
+            result = aop_decorator.add_func_monitor(module, None, "hot", setting)
+        else:
+            result = aop_decorator.add_func_wrapper(
+                module, None, "hot", wrapper_generator, setting,
+                ["time", "traceback", "logging", "inspect", "types"],
+            )
+        aop_decorator.clear_func_wrapper(module, None, "hot", result.value)
+    return (time.perf_counter() - start) / toggles * 1e6
+
+
+def main(calls: int, toggles: int) -> None:
+    if not MONITORING_AVAILABLE:
+        sys.exit("sys.monitoring needs python 3.12+")
+    loop = asyncio.new_event_loop()
+    print(f"{'backend':>12} {'ns/call':>10} {'us/toggle':>10}")
+    print(f"{'not watched':>12} {_per_call_ns(calls):>10.0f} {'-':>10}")
+    for backend in BACKENDS:
+        param = _param(backend, calls)
+        _watch(param, loop)
+        per_call = _per_call_ns(calls)
+        _unwatch(param)
+
+        per_toggle = _toggle_us(WatchArgumentParser().parse_watch_setting(param), toggles)
+        print(f"{backend:>12} {per_call:>10.0f} {per_toggle:>10.1f}")
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    parser.add_argument("--toggles", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.calls, args.toggles)
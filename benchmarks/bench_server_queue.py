@@ -0,0 +1,72 @@
+"""
+Measure the latency ServerQueue adds to an instrumented call.
+
+An event loop thread consumes out_q like the agent does while the main thread
+emits messages, the per message cost of ServerQueue.output_msg_nowait is
+compared with scheduling a coroutine through asyncio.run_coroutine_threadsafe,
+which is how messages used to be handed to the agent loop.
+
+usage: python benchmarks/bench_server_queue.py [--messages 200000]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from flight_profiler.plugins.server_plugin import Message, ServerQueue
+
+
+def _start_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+
+def _consumer(loop: asyncio.AbstractEventLoop, out_q: asyncio.Queue, total: int):
+    async def consume():
+        for _ in range(total):
+            await out_q.get()
+
+    return asyncio.run_coroutine_threadsafe(consume(), loop)
+
+
+def _new_queue(loop: asyncio.AbstractEventLoop) -> asyncio.Queue:
+    async def create():
+        return asyncio.Queue(maxsize=200)
+
+    return asyncio.run_coroutine_threadsafe(create(), loop).result()
+
+
+def bench_coroutine(loop, messages: int) -> float:
+    out_q = _new_queue(loop)
+    done = _consumer(loop, out_q, messages)
+    msg = Message(False, b"x" * 64)
+    start = time.perf_counter_ns()
+    for _ in range(messages):
+        asyncio.run_coroutine_threadsafe(out_q.put(msg), loop)
+    cost = time.perf_counter_ns() - start
+    done.result()
+    return cost / messages
+
+
+def bench_server_queue(loop, messages: int) -> float:
+    out_q = _new_queue(loop)
+    server_queue = ServerQueue(out_q, loop, capacity=messages)
+    done = _consumer(loop, out_q, messages)
+    msg = Message(False, b"x" * 64)
+    start = time.perf_counter_ns()
+    for _ in range(messages):
+        server_queue.output_msg_nowait(msg)
+    cost = time.perf_counter_ns() - start
+    done.result()
+    return cost / messages
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=200000)
+    messages = parser.parse_args().messages
+    loop = _start_loop()
+    print(f"{'emitter':>24} {'ns/message':>12}")
+    print(f"{'run_coroutine_threadsafe':>24} {bench_coroutine(loop, messages):>12.0f}")
+    print(f"{'ServerQueue':>24} {bench_server_queue(loop, messages):>12.0f}")
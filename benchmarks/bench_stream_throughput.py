@@ -0,0 +1,148 @@
+"""
+Measure sustained watch event throughput of one stream.
+
+A target process runs the agent and calls a watched function in a tight loop,
+this process consumes the watch stream for a fixed time, once with one message
+per event (legacy requests) and once with batched stream frames. Reported
+numbers are events received per second and the cpu seconds the agent threads
+(flight-profiler-*) spent per 10k events, read from /proc on linux.
+
+usage: python benchmarks/bench_stream_throughput.py [--seconds 5]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Dict, List, Optional
+
+from flight_profiler.communication.flight_client import FlightClient
+
+
+def hot(x):
+    return x + 1
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _target_main(port: int, tids_q) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    def run_app():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(FlightProfilerServer("localhost", port).run())
+
+    threading.Thread(target=run_app, name="flight-profiler-agent", daemon=True).start()
+
+    def report_tids():
+        while True:
+            tids_q.put(
+                [
+                    t.native_id
+                    for t in threading.enumerate()
+                    if t.name.startswith("flight-profiler")
+                ]
+            )
+            time.sleep(0.5)
+
+    threading.Thread(target=report_tids, daemon=True).start()
+    x = 0
+    while True:
+        x = hot(x)
+
+
+def _wait_agent(port: int) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            client = FlightClient("localhost", port)
+        except Exception:
+            time.sleep(0.05)
+            continue
+        client.request({"target": "status", "is_plugin_calling": False})
+        client.close()
+        return
+    raise RuntimeError("agent not started")
+
+
+def _thread_cpu(pid: int, tids: List[int]) -> Optional[float]:
+    total = 0
+    try:
+        for tid in tids:
+            with open(f"/proc/{pid}/task/{tid}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+    except OSError:
+        return None
+    return total / os.sysconf("SC_CLK_TCK")
+
+
+def _latest_tids(tids_q) -> List[int]:
+    tids: List[int] = []
+    while not tids_q.empty():
+        tids = tids_q.get()
+    return tids
+
+
+def run_mode(port: int, pid: int, tids_q, framed: bool, seconds: float) -> Dict:
+    body = {"target": "watch", "param": "on __main__ hot -n 1000000000"}
+    off_body = {"target": "watch", "param": "off __main__ hot"}
+    client = FlightClient("localhost", port)
+    events = 0
+    stream = client.request_stream(
+        body if framed else json.dumps(body).encode("utf-8")
+    )
+    # first event is the watch hint, skip the warm-up
+    next(stream)
+    tids = _latest_tids(tids_q)
+    cpu_start = _thread_cpu(pid, tids)
+    start = time.perf_counter()
+    for _ in stream:
+        events += 1
+        if time.perf_counter() - start >= seconds:
+            break
+    elapsed = time.perf_counter() - start
+    cpu_end = _thread_cpu(pid, _latest_tids(tids_q) or tids)
+    off = FlightClient("localhost", port)
+    for _ in off.request_stream(off_body):
+        pass
+    off.close()
+    client.close()
+    cpu = None
+    if cpu_start is not None and cpu_end is not None and events > 0:
+        cpu = (cpu_end - cpu_start) / events * 10000
+    return {"events/s": events / elapsed, "agent_cpu_s/10k": cpu}
+
+
+def main(seconds: float) -> None:
+    port = _free_port()
+    # fork keeps the watched function importable as __main__.hot in the target
+    context = multiprocessing.get_context("fork")
+    tids_q = context.Queue()
+    target = context.Process(target=_target_main, args=(port, tids_q), daemon=True)
+    target.start()
+    try:
+        _wait_agent(port)
+        print(f"{'mode':>8} {'events/s':>12} {'agent_cpu_s/10k':>16}")
+        for name, framed in (("legacy", False), ("framed", True)):
+            result = run_mode(port, target.pid, tids_q, framed, seconds)
+            cpu = result["agent_cpu_s/10k"]
+            cpu_text = "n/a" if cpu is None else f"{cpu:.3f}"
+            print(f"{name:>8} {result['events/s']:>12.0f} {cpu_text:>16}")
+            time.sleep(0.5)
+    finally:
+        target.terminate()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=float, default=5)
+    main(parser.parse_args().seconds)
@@ -0,0 +1,101 @@
+"""
+Measure symbol and base address resolution used by attach, stack and gilstat.
+
+Symbols _Py_DumpTracebackThreads, take_gil and drop_gil are resolved from the
+python binary (the executable, or libpython if the executable does not define
+them) by nm as shell/resolve_symbol.sh does, and by the in process ELF reader:
+cold, from the on disk cache (a new process) and from the memory cache. The base
+address of the python executable is located by py_bin_base_addr_locate.sh and by
+reading /proc/<pid>/maps in process. Linux only.
+
+usage: python benchmarks/bench_symbol_resolve.py [--binary path] [--repeat 5]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from flight_profiler.client import locate_py_bin_base_addr_on_linux
+from flight_profiler.utils import elf_util
+from flight_profiler.utils.elf_util import resolve_elf_symbols
+
+SYMBOLS = ["_Py_DumpTracebackThreads", "take_gil", "drop_gil"]
+SHELL_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(elf_util.__file__)), "..", "shell"
+)
+
+
+def _python_binary() -> str:
+    exe = os.readlink("/proc/self/exe")
+    if resolve_elf_symbols(exe, SYMBOLS[:1], tempfile.mkdtemp())[SYMBOLS[0]]:
+        return exe
+    with open("/proc/self/maps") as f:
+        for line in f:
+            path = line.split(None, 5)[-1].strip()
+            if "libpython" in path:
+                return path
+    return exe
+
+
+def _best(fn, repeat: int) -> float:
+    costs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        costs.append(time.perf_counter() - start)
+    return min(costs)
+
+
+def by_nm(binary: str) -> None:
+    for symbol in SYMBOLS:
+        subprocess.run(
+            f"nm {binary} | grep {symbol} | head -n 1",
+            shell=True,
+            check=True,
+            capture_output=True,
+        )
+
+
+def main(binary: str, repeat: int) -> None:
+    cache_dir = tempfile.mkdtemp()
+
+    def cold():
+        elf_util._symbol_cache.clear()
+        for name in os.listdir(cache_dir):
+            os.remove(os.path.join(cache_dir, name))
+        resolve_elf_symbols(binary, SYMBOLS, cache_dir)
+
+    def disk():
+        elf_util._symbol_cache.clear()
+        resolve_elf_symbols(binary, SYMBOLS, cache_dir)
+
+    def memory():
+        resolve_elf_symbols(binary, SYMBOLS, cache_dir)
+
+    base_shell = os.path.join(SHELL_DIR, "linux", "py_bin_base_addr_locate.sh")
+    pid = str(os.getpid())
+
+    def base_by_shell():
+        subprocess.run(
+            ["bash", base_shell, pid, sys.executable], check=True, capture_output=True
+        )
+
+    print(f"binary: {binary} ({os.path.getsize(binary) / 1024 / 1024:.1f} MB)")
+    print(f"{'resolution':>28} {'ms':>10}")
+    print(f"{'3 symbols by nm':>28} {_best(lambda: by_nm(binary), repeat) * 1000:>10.3f}")
+    print(f"{'3 symbols elf cold':>28} {_best(cold, repeat) * 1000:>10.3f}")
+    print(f"{'3 symbols elf disk cache':>28} {_best(disk, repeat) * 1000:>10.3f}")
+    print(f"{'3 symbols elf memory cache':>28} {_best(memory, repeat) * 1000:>10.3f}")
+    print(f"{'base addr by shell':>28} {_best(base_by_shell, repeat) * 1000:>10.3f}")
+    base_by_maps = lambda: locate_py_bin_base_addr_on_linux(pid)
+    print(f"{'base addr by maps':>28} {_best(base_by_maps, repeat) * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--binary", default=None)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.binary or _python_binary(), args.repeat)
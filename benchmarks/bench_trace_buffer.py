@@ -0,0 +1,82 @@
+"""
+Measure what the native trace profiler costs per traced call and what the
+kept frames cost to ship and decode.
+
+The traced function makes --calls calls to a small python function which calls
+a builtin, so half of the frames are C frames. Reported are the traced time per
+call, the peak memory allocated while tracing (tracemalloc), the size of the
+pickled message and the client side time to decode it and build the frame tree.
+
+usage: python benchmarks/bench_trace_buffer.py [--calls 100000] [--repeat 5]
+"""
+import argparse
+import pickle
+import statistics
+import time
+import tracemalloc
+
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.plugins.trace.trace_frame import (
+    WrapTraceFrame,
+    build_frame_stack,
+    deserialize_string_frames,
+)
+
+
+def leaf(i):
+    return abs(i)
+
+
+def workload(calls: int):
+    for i in range(calls):
+        leaf(i)
+
+
+def _traced(calls: int):
+    payloads = []
+    profiler = set_trace_profile(
+        lambda out_q, *payload: payloads.append(payload), None, 0, False, 0
+    )
+    workload(calls)
+    remove_trace_profile(profiler)
+    return payloads[0]
+
+
+def main(calls: int, repeat: int) -> None:
+    start = time.perf_counter_ns()
+    workload(calls)
+    plain_ns = time.perf_counter_ns() - start
+
+    traced = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        payload = _traced(calls)
+        traced.append(time.perf_counter_ns() - start)
+    tracemalloc.start()
+    _traced(calls)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    message = pickle.dumps(WrapTraceFrame(*payload))
+    decode = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        wrap = deserialize_string_frames(pickle.loads(message))
+        build_frame_stack(wrap.frames)
+        decode.append(time.perf_counter_ns() - start)
+
+    kept = sum(frame is not None for frame in wrap.frames)
+    print(f"{'frames kept':>22} {kept:>12}")
+    print(f"{'ns per call, plain':>22} {plain_ns / calls:>12.1f}")
+    print(f"{'ns per call, traced':>22} {statistics.median(traced) / calls:>12.1f}")
+    print(f"{'peak traced MiB':>22} {peak / 1024 / 1024:>12.2f}")
+    print(f"{'message KiB':>22} {len(message) / 1024:>12.1f}")
+    print(f"{'client decode ms':>22} {statistics.median(decode) / 1e6:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    main(args.calls, args.repeat)
@@ -0,0 +1,83 @@
+"""
+Compare the clocks of the native trace profiler: monotonic, coarse and tsc.
+
+For each clock it reports the time per traced call of a small function calling
+a builtin (two frames, four clock reads per call), the resolution of the clock
+(the smallest step seen between consecutive reads) and its error over a busy
+wait of --span-ms measured against time.perf_counter_ns.
+
+usage: python benchmarks/bench_trace_clock.py [--calls 100000] [--span-ms 2]
+"""
+import argparse
+import statistics
+import time
+
+from flight_profiler.ext.trace_profile_C import (
+    remove_trace_profile,
+    set_trace_clock,
+    set_trace_profile,
+    trace_clock_ns,
+)
+
+
+def leaf(i):
+    return abs(i)
+
+
+def workload(calls: int):
+    for i in range(calls):
+        leaf(i)
+
+
+def _traced_ns_per_call(calls: int) -> float:
+    profiler = set_trace_profile(lambda out_q, *payload: None, None, 0, False, 0)
+    start = time.perf_counter_ns()
+    workload(calls)
+    elapsed = time.perf_counter_ns() - start
+    remove_trace_profile(profiler)
+    return elapsed / calls
+
+
+def _resolution_ns(reads: int = 200000) -> int:
+    steps = []
+    last = trace_clock_ns()
+    for _ in range(reads):
+        now = trace_clock_ns()
+        if now != last:
+            steps.append(now - last)
+            last = now
+    return min(steps) if steps else 0
+
+
+def _span_error_us(span_ns: int, repeat: int = 20) -> float:
+    errors = []
+    for _ in range(repeat):
+        clock_start, start = trace_clock_ns(), time.perf_counter_ns()
+        while time.perf_counter_ns() - start < span_ns:
+            pass
+        clock_span, span = trace_clock_ns() - clock_start, time.perf_counter_ns() - start
+        errors.append(abs(clock_span - span) / 1000)
+    return statistics.median(errors)
+
+
+def main(calls: int, span_ms: float) -> None:
+    print(
+        f"{'clock':>10} {'in use':>10} {'traced ns/call':>15} "
+        f"{'resolution ns':>14} {'span error us':>14}"
+    )
+    for name in ("monotonic", "coarse", "tsc"):
+        used = set_trace_clock(name)
+        traced = statistics.median(_traced_ns_per_call(calls) for _ in range(5))
+        print(
+            f"{name:>10} {used:>10} {traced:>15.1f} {_resolution_ns():>14} "
+            f"{_span_error_us(int(span_ms * 1_000_000)):>14.1f}"
+        )
+    set_trace_clock("monotonic")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--span-ms", type=float, default=2)
+    args = parser.parse_args()
+    main(args.calls, args.span_ms)
@@ -0,0 +1,115 @@
+"""
+Measure the client side merge of many traces and their export.
+
+Fifty traces of --frames frames each, calls through random chains of 32
+functions, are recorded by the native profiler and merged --traces times in
+turn, as the client does for each trace received with -o. Reported are the
+merge time per trace against decoding and building the frame tree shown for
+each trace without -o, the peak memory while merging (tracemalloc), and the
+time and size of each export format.
+
+usage: python benchmarks/bench_trace_export.py [--traces 10000] [--frames 1000]
+"""
+import argparse
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import List
+
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.plugins.trace.trace_export import EXPORT_FORMATS, TraceExporter
+from flight_profiler.plugins.trace.trace_frame import (
+    WrapTraceFrame,
+    build_frame_stack,
+    deserialize_string_frames,
+)
+
+
+def leaf(i):
+    return abs(i)
+
+
+# functions calling each other along different paths, the traces cover tens of
+# thousands of distinct call paths
+FUNCS = []
+for _k in range(32):
+    exec(
+        f"def func_{_k}(path, depth):\n"
+        f"    if depth == 0:\n"
+        f"        return leaf(path)\n"
+        f"    return FUNCS[path % 32](path // 32, depth - 1)\n"
+    )
+    FUNCS.append(globals()[f"func_{_k}"])
+
+
+def workload(seed: int, frames: int):
+    rng = random.Random(seed)
+    # four python frames and a builtin per call
+    for _ in range(frames // 5):
+        FUNCS[rng.randrange(32)](rng.randrange(1 << 10), 2)
+
+
+def _messages(frames: int, count: int) -> List[bytes]:
+    messages = []
+    for seed in range(count):
+        payloads = []
+        profiler = set_trace_profile(
+            lambda out_q, *payload: payloads.append(payload), None, 0, False, 0
+        )
+        workload(seed, frames)
+        remove_trace_profile(profiler)
+        messages.append(pickle.dumps(WrapTraceFrame(*payloads[0])))
+    return messages
+
+
+def main(traces: int, frames: int) -> None:
+    messages = _messages(frames, 50)
+
+    shown = min(traces, 200)
+    start = time.perf_counter_ns()
+    for i in range(shown):
+        build_frame_stack(deserialize_string_frames(pickle.loads(messages[i % 50])).frames)
+    build_ns = (time.perf_counter_ns() - start) / shown
+
+    with tempfile.TemporaryDirectory() as tmp:
+        exporter = TraceExporter(os.path.join(tmp, "trace.folded"))
+        start = time.perf_counter_ns()
+        for i in range(traces):
+            exporter.add(pickle.loads(messages[i % 50]))
+        merge_ns = (time.perf_counter_ns() - start) / traces
+
+        # the merged tree does not grow with traces of the same paths, a few
+        # hundred show the peak and tracemalloc slows merging down a lot
+        tracemalloc.start()
+        measured = TraceExporter(os.path.join(tmp, "trace.folded"))
+        for i in range(shown):
+            measured.add(pickle.loads(messages[i % 50]))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        print(f"{traces} traces of {frames} frames, {exporter.aggregator.nodes} call paths")
+        print(f"{'tree per trace ms':>24} {build_ns / 1e6:>10.3f}")
+        print(f"{'merge per trace ms':>24} {merge_ns / 1e6:>10.3f}")
+        print(f"{'merge total s':>24} {merge_ns * traces / 1e9:>10.2f}")
+        print(f"{'peak merge MiB':>24} {peak / 1024 / 1024:>10.2f}")
+        for export_format in EXPORT_FORMATS:
+            exporter.filepath = os.path.join(tmp, f"trace.{export_format}")
+            exporter.export_format = export_format
+            start = time.perf_counter_ns()
+            exporter.close()
+            elapsed = time.perf_counter_ns() - start
+            size = os.path.getsize(exporter.filepath)
+            print(
+                f"{export_format + ' ms / KiB':>24} {elapsed / 1e6:>10.1f} {size / 1024:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--traces", type=int, default=10000)
+    parser.add_argument("--frames", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.traces, args.frames)
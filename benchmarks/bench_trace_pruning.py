@@ -0,0 +1,105 @@
+"""
+Measure what frames pruned by -i and -d cost the native trace profiler.
+
+The traced function makes --calls calls to a small function calling a builtin,
+each far below the interval, then sleeps past it. Sync and async variants are
+traced with -i 1ms, and the sync one with -d 1 as well. Reported are the
+traced time per call, the peak memory allocated while tracing (tracemalloc)
+and the frame records sent, which are only the frames kept.
+
+Async frames are pruned when they finish, not when they are entered: a
+coroutine may be resumed after every await, so its cost is unknown until it
+returns. Each async frame still takes a FrameNode, reused from a freelist,
+while it runs, but its enter and suspend times are plain fields of the node
+rather than int objects. The async peak memory therefore stays above the sync
+one.
+
+usage: python benchmarks/bench_trace_pruning.py [--calls 1000000] [--interval-ms 1]
+"""
+import argparse
+import asyncio
+import time
+import tracemalloc
+
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.plugins.trace.trace_frame import FRAME_RECORD
+
+
+def leaf(i):
+    return abs(i)
+
+
+def workload(calls: int):
+    for i in range(calls):
+        leaf(i)
+    time.sleep(0.005)
+
+
+async def async_leaf(i):
+    return abs(i)
+
+
+async def async_workload(calls: int):
+    for i in range(calls):
+        await async_leaf(i)
+        leaf(i)
+    await asyncio.sleep(0.005)
+
+
+def _traced(calls: int, interval_ns: int, is_async: bool, depth: int):
+    payloads = []
+
+    def target(out_q, *payload):
+        payloads.append(payload)
+
+    async def run_async():
+        profiler = set_trace_profile(target, None, interval_ns, True, depth)
+        await async_workload(calls)
+        remove_trace_profile(profiler)
+
+    start = time.perf_counter_ns()
+    if is_async:
+        asyncio.run(run_async())
+    else:
+        profiler = set_trace_profile(target, None, interval_ns, False, depth)
+        workload(calls)
+        remove_trace_profile(profiler)
+    return time.perf_counter_ns() - start, payloads[0]
+
+
+def main(calls: int, interval_ms: float) -> None:
+    interval_ns = int(interval_ms * 1_000_000)
+    print(
+        f"{'mode':>14} {'plain ns/call':>14} {'traced ns/call':>15} "
+        f"{'peak KiB':>10} {'records':>8}"
+    )
+    for mode, is_async, interval, depth in (
+        (f"sync -i {interval_ms}ms", False, interval_ns, 0),
+        (f"async -i {interval_ms}ms", True, interval_ns, 0),
+        ("sync -d 1", False, 0, 1),
+    ):
+        start = time.perf_counter_ns()
+        if is_async:
+            asyncio.run(async_workload(calls))
+        else:
+            workload(calls)
+        plain = time.perf_counter_ns() - start
+
+        elapsed, _ = _traced(calls, interval, is_async, depth)
+        tracemalloc.start()
+        _, payload = _traced(calls, interval, is_async, depth)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        records = len(payload[0]) // FRAME_RECORD.size if isinstance(payload[0], bytes) else len(payload[0])
+        print(
+            f"{mode:>14} {plain / calls:>14.1f} {elapsed / calls:>15.1f} "
+            f"{peak / 1024:>10.1f} {records:>8}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=1000000)
+    parser.add_argument("--interval-ms", type=float, default=1)
+    args = parser.parse_args()
+    main(args.calls, args.interval_ms)
@@ -0,0 +1,81 @@
+"""
+Compare full tracing of a hot method with sampling mode.
+
+The traced method calls a small python function --width times and is invoked
+--calls times. Full tracing sends one pickled tree per invocation, sampling
+traces 1 in --sample invocations (or --reservoir per period) and merges them
+on the background encoder. Reported are the time per invocation and the bytes
+sent to the client.
+
+usage: python benchmarks/bench_trace_sampling.py [--calls 20000] [--width 20] [--sample 100] [--reservoir 50]
+"""
+import argparse
+import asyncio
+import time
+
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.trace.trace_agent import global_trace_agent
+from flight_profiler.plugins.trace.trace_parser import TraceArgumentParser
+
+
+def leaf(i):
+    return abs(i)
+
+
+def hot(width):
+    for i in range(width):
+        leaf(i)
+
+
+def _run(calls: int, width: int, options: str):
+    loop = asyncio.new_event_loop()
+    out_q = asyncio.Queue(maxsize=1 << 20)
+    point = TraceArgumentParser().parse_trace_point(
+        f"__main__ hot -i 0 -n {calls} {options}"
+    )
+    point.out_q = ServerQueue(out_q, loop)
+    global_trace_agent.set_point(point)
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        hot(width)
+    elapsed = time.perf_counter_ns() - start
+    global_trace_agent.clear_point(point)
+
+    async def drain():
+        sent = 0
+        while True:
+            msg = await asyncio.wait_for(out_q.get(), 30)
+            if msg.is_end:
+                return sent
+            sent += len(msg.msg) if msg.msg else 0
+
+    sent = loop.run_until_complete(drain())
+    loop.close()
+    return elapsed / calls, sent
+
+
+def main(calls: int, width: int, sample: int, reservoir: int) -> None:
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        hot(width)
+    plain = (time.perf_counter_ns() - start) / calls
+
+    print(f"{'mode':>16} {'us per call':>12} {'KiB sent':>10}")
+    print(f"{'untraced':>16} {plain / 1000:>12.2f} {0:>10}")
+    for mode, options in (
+        ("full", ""),
+        (f"sample {sample}", f"--sample {sample}"),
+        (f"reservoir {reservoir}", f"--reservoir {reservoir}"),
+    ):
+        per_call, sent = _run(calls, width, options)
+        print(f"{mode:>16} {per_call / 1000:>12.2f} {sent / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--width", type=int, default=20)
+    parser.add_argument("--sample", type=int, default=100)
+    parser.add_argument("--reservoir", type=int, default=50)
+    args = parser.parse_args()
+    main(args.calls, args.width, args.sample, args.reservoir)
@@ -0,0 +1,95 @@
+"""
+Compare agent transports: tcp loopback versus the unix socket of the agent.
+
+A target process runs the agent listening on both transports, with an extra
+special call returning a payload of the requested size. Reported numbers:
+
+  * discovery: time to find the injected agent through the unix socket (one
+    stat) versus scanning the default port range
+  * throughput: MB/s of --count replies of --size bytes read over one session
+
+usage: python benchmarks/bench_transport.py [--size 1048576] [--count 200]
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+
+from flight_profiler.client import (
+    check_server_injected,
+    check_server_listening_unix,
+    find_port_available,
+)
+from flight_profiler.communication.base import get_agent_socket_path
+from flight_profiler.communication.flight_client import FlightClient, FlightSession
+
+START_PORT = 16000
+END_PORT = 16500
+
+
+def _target_main(port: int) -> None:
+    from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+    server = FlightProfilerServer("localhost", port, get_agent_socket_path(os.getpid()))
+    server.special_method_dispatcher["bench_blob"] = lambda size: "x" * int(size)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    loop.run_until_complete(server.run())
+
+
+def _wait_agent(port: int) -> None:
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        try:
+            FlightClient("localhost", port).close()
+            return
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError("agent not started")
+
+
+def throughput(port: int, unix_path, size: int, count: int) -> float:
+    session = FlightSession("localhost", port, unix_path)
+    body = {"target": "bench_blob", "param": str(size), "is_plugin_calling": False}
+    received = 0
+    start = time.perf_counter()
+    for _ in range(count):
+        channel = session.open_channel()
+        for event in channel.request_stream(body):
+            received += len(event)
+        channel.close()
+    cost = time.perf_counter() - start
+    session.close()
+    return received / cost / 1024 / 1024
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=1024 * 1024)
+    parser.add_argument("--count", type=int, default=200)
+    args = parser.parse_args()
+    # place agent at the tail of the range, the worst case of a port scan
+    port = find_port_available(END_PORT - 20, END_PORT)
+    target = multiprocessing.Process(target=_target_main, args=(port,), daemon=True)
+    target.start()
+    pid = str(target.pid)
+    unix_path = get_agent_socket_path(pid)
+    try:
+        _wait_agent(port)
+        start = time.perf_counter()
+        found = check_server_listening_unix(pid)
+        unix_cost = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = check_server_injected(pid, START_PORT, END_PORT, 5)
+        scan_cost = time.perf_counter() - start
+        print(f"discovery unix socket: {unix_cost * 1000:.2f} ms (port {found})")
+        print(f"discovery port scan:   {scan_cost * 1000:.2f} ms (port {scanned})")
+        print(f"{'transport':>10} {'MB/s':>10}")
+        print(f"{'tcp':>10} {throughput(port, None, args.size, args.count):>10.1f}")
+        if unix_path is not None:
+            print(f"{'unix':>10} {throughput(port, unix_path, args.size, args.count):>10.1f}")
+    finally:
+        target.terminate()
+        if unix_path is not None and os.path.exists(unix_path):
+            os.unlink(unix_path)
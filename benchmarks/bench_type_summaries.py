@@ -0,0 +1,78 @@
+"""
+Measure the summaries encode_obj_to_transfer writes for numpy arrays, pandas
+frames and series, torch tensors, pydantic models and dataclasses.
+
+Each object is encoded as a watch argument would be, microseconds per encoding
+and characters of the text are reported next to repr(), which raw output (-r)
+uses and which the encoder fell back to for arrays. Packages which are not
+installed are skipped.
+
+usage: python benchmarks/bench_type_summaries.py [--repeat 200]
+"""
+import argparse
+import importlib.util
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, List, Tuple
+
+from flight_profiler.common.dumps import encode_obj_to_transfer
+
+
+@dataclass
+class Request:
+    __slots__ = ("user", "prompt", "features")
+    user: str
+    prompt: str
+    features: List[float]
+
+
+def _cases() -> List[Tuple[str, Callable[[], Any]]]:
+    cases = [("dataclass", lambda: Request("u", "p" * 1000, [0.5] * 512))]
+    if importlib.util.find_spec("numpy") is not None:
+        import numpy
+
+        cases.append(("ndarray 10M", lambda: numpy.random.rand(1000, 10000).astype(numpy.float32)))
+    if importlib.util.find_spec("pandas") is not None:
+        import pandas
+
+        cases.append(("dataframe 1Mx8", lambda: pandas.DataFrame(
+            {f"c{i}": range(1000000) for i in range(8)}
+        )))
+        cases.append(("series 1M", lambda: pandas.Series(range(1000000), name="s")))
+    if importlib.util.find_spec("torch") is not None:
+        import torch
+
+        cases.append(("tensor 10M", lambda: torch.rand(1000, 10000)))
+    if importlib.util.find_spec("pydantic") is not None:
+        import pydantic
+
+        class Prompt(pydantic.BaseModel):
+            user: str
+            tokens: List[int]
+
+        cases.append(("pydantic", lambda: Prompt(user="u", tokens=list(range(4096)))))
+    return cases
+
+
+def _measure(func: Callable[[], str], repeat: int) -> Tuple[float, int]:
+    text = func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6, len(text)
+
+
+def main(repeat: int) -> None:
+    print(f"{'case':>16} {'encode us':>10} {'chars':>8} {'repr us':>10} {'chars':>8}")
+    for name, build in _cases():
+        obj = build()
+        encode_us, encode_chars = _measure(lambda: encode_obj_to_transfer(obj), repeat)
+        repr_us, repr_chars = _measure(lambda: repr(obj), max(1, repeat // 20))
+        print(f"{name:>16} {encode_us:>10.1f} {encode_chars:>8} {repr_us:>10.1f} {repr_chars:>8}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.repeat)
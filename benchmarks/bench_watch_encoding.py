@@ -0,0 +1,65 @@
+"""
+Measure the latency watch adds to the watched call when its result is encoded
+on the background encoder (default) and when it is encoded on the calling
+thread (--snapshot).
+
+The watched function takes a big dict of lists and is watched with
+`--expr args -x 4`, so every recorded call serializes the whole argument. The
+encoder is drained between calls, numbers are the latency of single calls in
+microseconds, the queued encoding is not part of them.
+
+usage: python benchmarks/bench_watch_encoding.py [--keys 2000] [--calls 300]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from flight_profiler.common.background_encoder import global_background_encoder
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.watch.watch_agent import global_watch_agent
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+
+def handle(payload):
+    return len(payload)
+
+
+def _latencies_us(payload, calls: int):
+    func = globals()["handle"]
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter_ns()
+        func(payload)
+        latencies.append((time.perf_counter_ns() - start) / 1000)
+        while global_background_encoder.pending() > 0:
+            time.sleep(0.0005)
+    return latencies
+
+
+def main(keys: int, calls: int) -> None:
+    payload = {f"key-{i}": [i, str(i), {"nested": i}] for i in range(keys)}
+    loop = asyncio.new_event_loop()
+    print(f"{'mode':>12} {'median us':>10} {'mean us':>10}")
+    for mode, flag in (("not watched", None), ("deferred", ""), ("--snapshot", "--snapshot")):
+        param = f"{__name__} handle --expr args -x 4 -n {calls * 10} {flag or ''}"
+        if flag is not None:
+            setting = WatchArgumentParser().parse_watch_setting(param)
+            setting.out_q = ServerQueue(asyncio.Queue(), loop)
+            global_watch_agent.add_watch(setting)
+        latencies = _latencies_us(payload, calls)
+        if flag is not None:
+            global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(param))
+        print(
+            f"{mode:>12} {statistics.median(latencies):>10.1f} "
+            f"{statistics.mean(latencies):>10.1f}"
+        )
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--keys", type=int, default=2000)
+    parser.add_argument("--calls", type=int, default=300)
+    args = parser.parse_args()
+    main(args.keys, args.calls)
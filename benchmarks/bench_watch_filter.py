@@ -0,0 +1,88 @@
+"""
+Measure per-call overhead of a watched method, with and without a -f filter.
+
+A function is watched in process without a filter, where every call is encoded,
+and with a filter that never matches, so only the wrapper and the filter run.
+The filter is evaluated by the compiled resolver and, for reference, by the
+former resolver that exec-ed the expression source on every call. Reported numbers are
+nanoseconds per call of the watched function.
+
+usage: python benchmarks/bench_watch_filter.py [--calls 200000]
+"""
+import argparse
+import asyncio
+import time
+from typing import Any
+
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.watch.watch_agent import global_watch_agent
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+FILTER = "args[0] < 0 and cost > 10"
+
+
+def hot(x):
+    return x + 1
+
+
+class ExecPerCallFilter:
+    """
+    the filter resolver before expressions were compiled once
+    """
+
+    def __init__(self, expr: str):
+        self.code = f"def expr_func(target, return_obj, cost, *args, **kwargs): return {expr}"
+
+    def eval_filter(self, target_obj: Any, return_obj: Any, cost: float, *args, **kwargs):
+        namespace = {}
+        exec(self.code, globals(), namespace)
+        return bool(namespace["expr_func"](target_obj, return_obj, cost, *args, **kwargs))
+
+
+def _per_call_ns(calls: int) -> float:
+    func = globals()["hot"]
+    start = time.perf_counter_ns()
+    for i in range(calls):
+        func(i)
+    return (time.perf_counter_ns() - start) / calls
+
+
+def _watch(param: str, loop):
+    setting = WatchArgumentParser().parse_watch_setting(param)
+    setting.out_q = ServerQueue(asyncio.Queue(), loop)
+    global_watch_agent.add_watch(setting)
+    return setting
+
+
+def _unwatch(param: str) -> None:
+    global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(param))
+
+
+def main(calls: int) -> None:
+    loop = asyncio.new_event_loop()
+    param = f"{__name__} hot -n {calls * 10} -f '{FILTER}'"
+    print(f"{'mode':>26} {'ns/call':>10}")
+    print(f"{'not watched':>26} {_per_call_ns(calls):>10.0f}")
+
+    # every call is encoded and queued, the ring drops beyond its capacity
+    no_filter = f"{__name__} hot -n {calls * 10}"
+    _watch(no_filter, loop)
+    print(f"{'no filter':>26} {_per_call_ns(calls // 10):>10.0f}")
+    _unwatch(no_filter)
+
+    _watch(param, loop)
+    print(f"{'filter compiled once':>26} {_per_call_ns(calls):>10.0f}")
+    _unwatch(param)
+
+    setting = _watch(param, loop)
+    setting.watch_filter = ExecPerCallFilter(FILTER)
+    # the source is compiled per call, keep the run short
+    print(f"{'filter exec per call':>26} {_per_call_ns(calls // 20):>10.0f}")
+    _unwatch(param)
+    loop.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200000)
+    main(parser.parse_args().calls)
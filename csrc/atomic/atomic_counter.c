@@ -0,0 +1,97 @@
+#include <Python.h>
+#include <structmember.h>
+
+///////////////////
+// AtomicCounter //
+///////////////////
+
+// A counter incremented without the GIL being required for correctness, so
+// hit limits of instrumented methods stay exact on free-threaded builds.
+typedef struct {
+  PyObject_HEAD long long value;
+} AtomicCounter;
+
+static int AtomicCounter_init(AtomicCounter *self, PyObject *args,
+                              PyObject *kwds) {
+  long long initial = 0;
+  static char *kwlist[] = {"initial", NULL};
+  if (!PyArg_ParseTupleAndKeywords(args, kwds, "|L", kwlist, &initial)) {
+    return -1;
+  }
+  __atomic_store_n(&self->value, initial, __ATOMIC_SEQ_CST);
+  return 0;
+}
+
+static PyObject *AtomicCounter_increment(AtomicCounter *self,
+                                         PyObject *Py_UNUSED(ignored)) {
+  return PyLong_FromLongLong(
+      __atomic_add_fetch(&self->value, 1, __ATOMIC_SEQ_CST));
+}
+
+static PyObject *AtomicCounter_add(AtomicCounter *self, PyObject *arg) {
+  long long delta = PyLong_AsLongLong(arg);
+  if (delta == -1 && PyErr_Occurred()) {
+    return NULL;
+  }
+  return PyLong_FromLongLong(
+      __atomic_add_fetch(&self->value, delta, __ATOMIC_SEQ_CST));
+}
+
+static PyObject *AtomicCounter_get_value(AtomicCounter *self,
+                                         void *Py_UNUSED(closure)) {
+  return PyLong_FromLongLong(__atomic_load_n(&self->value, __ATOMIC_SEQ_CST));
+}
+
+static PyMethodDef AtomicCounter_methods[] = {
+    {"increment", (PyCFunction)AtomicCounter_increment, METH_NOARGS,
+     "Add one and return the new value."},
+    {"add", (PyCFunction)AtomicCounter_add, METH_O,
+     "Add delta and return the new value."},
+    {NULL} /* Sentinel */
+};
+
+static PyGetSetDef AtomicCounter_getset[] = {
+    {"value", (getter)AtomicCounter_get_value, NULL, "current value", NULL},
+    {NULL} /* Sentinel */
+};
+
+static PyTypeObject AtomicCounterType = {
+    PyVarObject_HEAD_INIT(NULL, 0).tp_name = "atomic_C.AtomicCounter",
+    .tp_doc = "Lock free integer counter",
+    .tp_basicsize = sizeof(AtomicCounter),
+    .tp_itemsize = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_new = PyType_GenericNew,
+    .tp_init = (initproc)AtomicCounter_init,
+    .tp_methods = AtomicCounter_methods,
+    .tp_getset = AtomicCounter_getset,
+};
+
+////////////
+// Module //
+////////////
+
+static struct PyModuleDef atomic_module = {
+    PyModuleDef_HEAD_INIT, "atomic_C", "Atomic counters for hit limits.", -1,
+    NULL};
+
+PyMODINIT_FUNC PyInit_atomic_C(void) {
+  if (PyType_Ready(&AtomicCounterType) < 0) {
+    return NULL;
+  }
+  PyObject *m = PyModule_Create(&atomic_module);
+  if (m == NULL) {
+    return NULL;
+  }
+#ifdef Py_GIL_DISABLED
+  PyUnstable_Module_SetGIL(m, Py_MOD_GIL_NOT_USED);
+#endif
+  Py_INCREF(&AtomicCounterType);
+  if (PyModule_AddObject(m, "AtomicCounter", (PyObject *)&AtomicCounterType) <
+      0) {
+    Py_DECREF(&AtomicCounterType);
+    Py_DECREF(m);
+    return NULL;
+  }
+  return m;
+}
@@ -2,7 +2,9 @@
 #include <assert.h>
 #include <float.h>
 #include <frameobject.h>
+#include <stdint.h>
 #include <stdio.h>
+#include <string.h>
 #include <structmember.h>
 #include <sys/time.h>
 
@@ -12,12 +14,83 @@
 
 static long long NSEC_PER_SEC = 1e9;
 
-static long long _get_time_ns(void) {
+#if defined(__x86_64__) && (defined(__GNUC__) || defined(__clang__))
+#include <cpuid.h>
+#include <x86intrin.h>
+#define TRACE_HAS_TSC 1
+#endif
+
+// clocks timing frames, all are monotonic, set_trace_clock selects one
+enum { CLOCK_KIND_MONOTONIC = 0, CLOCK_KIND_COARSE = 1, CLOCK_KIND_TSC = 2 };
+static const char *CLOCK_NAMES[] = {"monotonic", "coarse", "tsc"};
+static int clock_kind = CLOCK_KIND_MONOTONIC;
+
+static long long _clock_ns(clockid_t clock_id) {
   struct timespec ts;
-  clock_gettime(CLOCK_REALTIME, &ts);
+  clock_gettime(clock_id, &ts);
   return (long long)ts.tv_sec * NSEC_PER_SEC + ts.tv_nsec;
 }
 
+#ifdef TRACE_HAS_TSC
+// ns = tsc_base_ns + ((tsc - tsc_base) * tsc_mult) >> 32
+static unsigned long long tsc_base = 0;
+static long long tsc_base_ns = 0;
+static unsigned long long tsc_mult = 0;
+
+/**
+ * measures the tsc frequency against CLOCK_MONOTONIC, returns 0 when the
+ * cpu has no invariant tsc, its rate would change with the cpu frequency
+ */
+static int _calibrate_tsc(void) {
+  unsigned int eax, ebx, ecx, edx;
+  if (!__get_cpuid(0x80000007, &eax, &ebx, &ecx, &edx) ||
+      !(edx & (1u << 8))) {
+    return 0;
+  }
+  long long start_ns = _clock_ns(CLOCK_MONOTONIC);
+  unsigned long long start = __rdtsc();
+  long long end_ns;
+  do {
+    end_ns = _clock_ns(CLOCK_MONOTONIC);
+  } while (end_ns - start_ns < 10000000);
+  unsigned long long end = __rdtsc();
+  if (end <= start) {
+    return 0;
+  }
+  tsc_mult =
+      (unsigned long long)(((unsigned __int128)(end_ns - start_ns) << 32) /
+                           (end - start));
+  tsc_base = end;
+  tsc_base_ns = end_ns;
+  return tsc_mult > 0;
+}
+#endif
+
+static long long _get_time_ns(void) {
+  switch (clock_kind) {
+#ifdef CLOCK_MONOTONIC_COARSE
+  case CLOCK_KIND_COARSE:
+    return _clock_ns(CLOCK_MONOTONIC_COARSE);
+#endif
+#ifdef TRACE_HAS_TSC
+  case CLOCK_KIND_TSC:
+    return tsc_base_ns +
+           (long long)(((unsigned __int128)(__rdtsc() - tsc_base) * tsc_mult) >>
+                       32);
+#endif
+  default:
+    return _clock_ns(CLOCK_MONOTONIC);
+  }
+}
+
+// wall clock at time 0 of the selected trace clock, taken at module init and
+// whenever set_trace_clock selects a clock, not on every traced invocation
+static long long wall_offset_ns = 0;
+
+static void _sync_wall_offset(void) {
+  wall_offset_ns = _clock_ns(CLOCK_REALTIME) - _get_time_ns();
+}
+
 static PyCodeObject *_code_from_frame(PyFrameObject *frame) {
 #if PY_VERSION_HEX >= 0x03090000
   return PyFrame_GetCode(frame);
@@ -28,112 +101,150 @@ static PyCodeObject *_code_from_frame(PyFrameObject *frame) {
 #endif
 }
 
-static PyObject *_get_frame_info(PyFrameObject *frame, Py_ssize_t start_ns,
-                                 Py_ssize_t cost_ns, Py_ssize_t pid,
-                                 PyObject *arg, int c_frame) {
-  if (c_frame) {
-    PyObject *qualname = PyObject_GetAttrString(arg, "__qualname__");
-    if (!qualname) {
-      qualname = PyObject_GetAttrString(arg, "__name__");
-    }
-    PyObject *result = PyUnicode_FromFormat("%U%c%s%c%i%c%lld%c%lld%c%lld",
-                                            qualname, 0, "<built-in>", 0, 0, 1,
-                                            start_ns, 1, cost_ns, 1, pid);
-    Py_XDECREF(qualname);
-    return result;
-  } else {
-    PyCodeObject *code = _code_from_frame(frame);
-    PyObject *result = PyUnicode_FromFormat(
-        "%U%c%U%c%i%c%lld%c%lld%c%lld", code->co_name, 0, code->co_filename, 0,
-        code->co_firstlineno, 1, start_ns, 1, cost_ns, 1, pid);
-    Py_XDECREF(code);
-    return result;
+/**
+ * "name\0file\0lineno" of a python code object, or of a C callable when code
+ * is NULL, frames refer to it by index, see FRAME_RECORD in trace_frame.py
+ */
+static PyObject *_describe(PyCodeObject *code, PyObject *arg) {
+  if (code != NULL) {
+    return PyUnicode_FromFormat("%U%c%U%c%i", code->co_name, 0,
+                                code->co_filename, 0, code->co_firstlineno);
   }
-}
-
-static PyObject *_get_header(PyFrameObject *frame, int c_frame, PyObject *arg) {
-  if (c_frame) {
-    PyObject *qualname = PyObject_GetAttrString(arg, "__qualname__");
-    if (!qualname) {
-      qualname = PyObject_GetAttrString(arg, "__name__");
-    }
-    PyObject *result =
+  PyObject *qualname = PyObject_GetAttrString(arg, "__qualname__");
+  if (!qualname) {
+    PyErr_Clear();
+    qualname = PyObject_GetAttrString(arg, "__name__");
+  }
+  PyObject *result;
+  if (qualname && PyUnicode_Check(qualname)) {
+    result =
         PyUnicode_FromFormat("%U%c%s%c%i", qualname, 0, "<built-in>", 0, 0);
-    Py_XDECREF(qualname);
-    return result;
   } else {
-    PyCodeObject *code = _code_from_frame(frame);
-    PyObject *result =
-        PyUnicode_FromFormat("%U%c%U%c%i", code->co_name, 0, code->co_filename,
-                             0, code->co_firstlineno);
-    Py_XDECREF(code);
-    return result;
+    PyErr_Clear();
+    result = PyUnicode_FromFormat("%s%c%s%c%i", Py_TYPE(arg)->tp_name, 0,
+                                  "<built-in>", 0, 0);
   }
-}
-
-static PyObject *build_context_switch_frame(Py_ssize_t start_ns,
-                                            Py_ssize_t cost_ns,
-                                            Py_ssize_t pid) {
-  PyObject *result =
-      PyUnicode_FromFormat("%s%c%c%i%c%lld%c%lld%c%lld", "[await]", 0, 0, 0, 1,
-                           start_ns, 1, cost_ns, 1, pid);
+  Py_XDECREF(qualname);
   return result;
 }
 
-static PyObject *build_last_async_frame(PyObject *frame_desp,
-                                        Py_ssize_t start_ns, Py_ssize_t cost_ns,
-                                        Py_ssize_t pid) {
-  PyObject *result = PyUnicode_FromFormat("%U%c%lld%c%lld%c%lld", frame_desp, 1,
-                                          start_ns, 1, cost_ns, 1, pid);
-  return result;
+static PyObject *_await_description(void) {
+  return PyUnicode_FromFormat("%s%c%c%i", "[await]", 0, 0, 0);
 }
 
 ///////////////////
 // TraceProfiler //
 ///////////////////
+
+// a kept frame, sent to the client as raw bytes of consecutive records
+typedef struct {
+  long long start_ns;
+  long long cost_ns;
+  int32_t desc;   // index in descriptions, -1 marks an empty slot
+  int32_t parent; // offset of the parent frame, -1 for the root frame
+} FrameRecord;
+
+// FRAME_RECORD in trace_frame.py decodes records, keep both in sync
+typedef char FrameRecord_size_check[sizeof(FrameRecord) == 24 ? 1 : -1];
+
+// description index of a code object or a C function
+typedef struct {
+  void *key;       // code object, PyMethodDef of a C function, or the callable
+  PyObject *owner; // type a C method is bound to, NULL otherwise
+  PyObject *held;  // reference keeping key alive, NULL for a PyMethodDef
+  Py_ssize_t desc; // -1 marks an empty slot
+} DescSlot;
+
+// entered frame of a sync function
+typedef struct {
+  long long start_ns;
+  Py_ssize_t offset; // target frame offset in records
+} CallEntry;
+
+static const Py_ssize_t AWAIT_DESC = 0;
+
 typedef struct {
   PyObject_HEAD PyObject *prev; // LinkedList FrameNode
   PyObject *succ;
   Py_ssize_t start_ns;
   Py_ssize_t offset; // target frameNode in sending frame offset
 
-  PyObject *frame_desp;
+  Py_ssize_t desc;
   PyObject *frame_id;
-  PyObject *enter_timestamp;
+  // enter time followed by the suspend times of an async frame, only the
+  // first and the last are read and the last may be taken back, so they are
+  // kept as plain values instead of a list of ints
+  Py_ssize_t timestamps;
+  long long first_ns;
+  long long last_ns;
+  long long kept_ns; // the one before last_ns
 } FrameNode;
 
 typedef struct trace_profiler {
   PyObject_HEAD PyObject *target; // output message to client callable target
-  PyObject *on_sending_frame;     // frames that ready to be sent
   PyObject *out_queue;            // sending queue
-  FrameNode *top;                 // frame stack top
+  FrameNode *top;                 // frame stack top of async functions
   Py_ssize_t sf_sz;               // sending frame size
   Py_ssize_t is_async;            // async function
   long long interval;             // interval
   Py_ssize_t current_depth;       // current top depth
   Py_ssize_t depth_limit;         // depth limit
+  long long wall_offset_ns;       // wall clock at time 0 of the trace clock
+
+  FrameRecord *records; // frames that ready to be sent, by offset
+  Py_ssize_t records_len;
+  Py_ssize_t records_cap;
+  CallEntry *calls; // frame stack of sync functions, calls[0] is the root
+  Py_ssize_t calls_len;
+  Py_ssize_t calls_cap;
+  Py_ssize_t lost_calls;  // entered frames the stack could not grow for
+  Py_ssize_t pruned_calls; // entered frames beyond depth_limit, not stacked
+  PyObject *descriptions; // interned descriptions, records refer by index
+  DescSlot *desc_slots;   // open addressing table over descriptions
+  Py_ssize_t desc_len;
+  Py_ssize_t desc_cap;
 } TraceProfiler;
 
 static void TraceProfiler_Dealloc(TraceProfiler *self) {
-  if (!self->is_async) {
-    FrameNode *top_frame = (FrameNode *)self->top;
-    self->top = (FrameNode *)top_frame->prev;
-    Py_DECREF(top_frame);
-  }
   Py_XDECREF(self->top);
   self->top = NULL;
-  Py_DECREF(self->on_sending_frame);
-  Py_DECREF(self->target);
-  Py_DECREF(self->out_queue);
+  PyMem_Free(self->records);
+  PyMem_Free(self->calls);
+  if (self->desc_slots != NULL) {
+    Py_ssize_t i;
+    for (i = 0; i < self->desc_cap; i++) {
+      if (self->desc_slots[i].desc >= 0) {
+        Py_XDECREF(self->desc_slots[i].owner);
+        Py_XDECREF(self->desc_slots[i].held);
+      }
+    }
+    PyMem_Free(self->desc_slots);
+  }
+  Py_XDECREF(self->descriptions);
+  Py_XDECREF(self->target);
+  Py_XDECREF(self->out_queue);
   Py_TYPE(self)->tp_free(self);
 }
 
+// freed FrameNodes are kept for reuse, async traces push and pop a node for
+// every frame and most of them are pruned right after. The list is shared by
+// all profilers and guarded by the GIL only, free-threaded builds go without.
+#ifndef Py_GIL_DISABLED
+#define FRAME_NODE_FREELIST_SIZE 256
+static FrameNode *frame_node_freelist[FRAME_NODE_FREELIST_SIZE];
+static int frame_node_free = 0;
+#endif
+
 static void FrameNode_Dealloc(FrameNode *self) {
   self->prev = NULL;
-  Py_XDECREF(self->succ);
-  Py_XDECREF(self->enter_timestamp);
-  Py_XDECREF(self->frame_id);
-  Py_XDECREF(self->frame_desp);
+  Py_CLEAR(self->succ);
+  Py_CLEAR(self->frame_id);
+#ifndef Py_GIL_DISABLED
+  if (frame_node_free < FRAME_NODE_FREELIST_SIZE) {
+    frame_node_freelist[frame_node_free++] = self;
+    return;
+  }
+#endif
   Py_TYPE(self)->tp_free(self);
 }
 
@@ -219,6 +330,180 @@ static PyTypeObject TraceProfiler_Type = {
     PyObject_Del,                             /* tp_free */
 };
 
+static DescSlot *_new_desc_slots(Py_ssize_t cap) {
+  DescSlot *slots = PyMem_Malloc(cap * sizeof(DescSlot));
+  if (slots != NULL) {
+    Py_ssize_t i;
+    for (i = 0; i < cap; i++) {
+      slots[i].desc = -1;
+    }
+  }
+  return slots;
+}
+
+static DescSlot *_find_desc_slot(DescSlot *slots, Py_ssize_t cap, void *key,
+                                 PyObject *owner) {
+  uintptr_t hash = ((uintptr_t)key >> 4) ^ ((uintptr_t)owner >> 3);
+  hash *= (uintptr_t)0x9E3779B97F4A7C15ULL;
+  hash ^= hash >> 29;
+  Py_ssize_t mask = cap - 1;
+  Py_ssize_t i = (Py_ssize_t)(hash & (uintptr_t)mask);
+  while (slots[i].desc >= 0 &&
+         (slots[i].key != key || slots[i].owner != owner)) {
+    i = (i + 1) & mask;
+  }
+  return &slots[i];
+}
+
+static int TraceProfiler_GrowDescSlots(TraceProfiler *self) {
+  Py_ssize_t cap = self->desc_cap * 2;
+  DescSlot *slots = _new_desc_slots(cap);
+  if (slots == NULL) {
+    return -1;
+  }
+  Py_ssize_t i;
+  for (i = 0; i < self->desc_cap; i++) {
+    DescSlot *slot = &self->desc_slots[i];
+    if (slot->desc >= 0) {
+      *_find_desc_slot(slots, cap, slot->key, slot->owner) = *slot;
+    }
+  }
+  PyMem_Free(self->desc_slots);
+  self->desc_slots = slots;
+  self->desc_cap = cap;
+  return 0;
+}
+
+/**
+ * index of the description of a returning python frame, or of the C function
+ * arg, descriptions are built once per code object or C function.
+ * returns -1 when it could not be built, the frame is not recorded then.
+ */
+static Py_ssize_t TraceProfiler_Describe(TraceProfiler *self,
+                                         PyFrameObject *frame, PyObject *arg,
+                                         int c_frame) {
+  void *key;
+  PyObject *owner = NULL;
+  PyObject *held = NULL;
+  PyCodeObject *code = NULL;
+  if (!c_frame) {
+    code = _code_from_frame(frame);
+    key = code;
+    held = (PyObject *)code;
+  } else if (PyCFunction_Check(arg)) {
+    // bound builtin methods are created per access, their PyMethodDef is not
+    key = ((PyCFunctionObject *)arg)->m_ml;
+    PyObject *bound = PyCFunction_GET_SELF(arg);
+    if (bound != NULL && !PyModule_Check(bound)) {
+      owner = PyType_Check(bound) ? bound : (PyObject *)Py_TYPE(bound);
+    }
+  } else {
+    key = arg;
+    held = arg;
+  }
+
+  DescSlot *slot =
+      _find_desc_slot(self->desc_slots, self->desc_cap, key, owner);
+  Py_ssize_t desc = slot->desc;
+  if (desc < 0) {
+    PyObject *description = _describe(code, arg);
+    if (description != NULL &&
+        PyList_Append(self->descriptions, description) == 0) {
+      desc = PyList_GET_SIZE(self->descriptions) - 1;
+      if ((self->desc_len + 1) * 2 > self->desc_cap &&
+          TraceProfiler_GrowDescSlots(self) == 0) {
+        slot = _find_desc_slot(self->desc_slots, self->desc_cap, key, owner);
+      }
+      if ((self->desc_len + 1) < self->desc_cap) {
+        Py_XINCREF(owner);
+        Py_XINCREF(held);
+        slot->key = key;
+        slot->owner = owner;
+        slot->held = held;
+        slot->desc = desc;
+        self->desc_len += 1;
+      }
+    } else {
+      PyErr_Clear();
+    }
+    Py_XDECREF(description);
+  }
+  Py_XDECREF(code);
+  return desc;
+}
+
+/**
+ * keeps a frame for the client at offset, offsets between the kept frames
+ * are frames not finished yet or dropped, they stay empty
+ */
+static void TraceProfiler_SetRecord(TraceProfiler *self, Py_ssize_t offset,
+                                    long long start_ns, long long cost_ns,
+                                    Py_ssize_t desc, Py_ssize_t parent) {
+  if (offset < 0 || desc < 0) {
+    return;
+  }
+  if (offset >= self->records_cap) {
+    Py_ssize_t cap = self->records_cap > 0 ? self->records_cap : 1024;
+    while (cap <= offset) {
+      cap *= 2;
+    }
+    FrameRecord *records =
+        PyMem_Realloc(self->records, cap * sizeof(FrameRecord));
+    if (records == NULL) {
+      // out of memory, the frame is lost but tracing goes on
+      return;
+    }
+    self->records = records;
+    self->records_cap = cap;
+  }
+  Py_ssize_t idx;
+  for (idx = self->records_len; idx < offset; idx++) {
+    self->records[idx].desc = -1;
+  }
+  if (offset >= self->records_len) {
+    self->records_len = offset + 1;
+  }
+  FrameRecord *record = &self->records[offset];
+  record->start_ns = start_ns;
+  record->cost_ns = cost_ns;
+  record->desc = (int32_t)desc;
+  record->parent = (int32_t)parent;
+}
+
+static void TraceProfiler_PushCall(TraceProfiler *self, long long start_ns) {
+  if (self->calls_len == self->calls_cap) {
+    CallEntry *calls =
+        PyMem_Realloc(self->calls, self->calls_cap * 2 * sizeof(CallEntry));
+    if (calls == NULL) {
+      self->lost_calls += 1;
+      return;
+    }
+    self->calls = calls;
+    self->calls_cap *= 2;
+  }
+  CallEntry *call = &self->calls[self->calls_len];
+  call->start_ns = start_ns;
+  call->offset = self->sf_sz;
+  self->calls_len += 1;
+  self->sf_sz += 1;
+}
+
+/**
+ * pops the entered frame of a returning one, NULL for frames entered before
+ * tracing started or lost
+ */
+static CallEntry *TraceProfiler_PopCall(TraceProfiler *self) {
+  if (self->lost_calls > 0) {
+    self->lost_calls -= 1;
+    return NULL;
+  }
+  if (self->calls_len <= 1) {
+    return NULL;
+  }
+  self->calls_len -= 1;
+  return &self->calls[self->calls_len];
+}
+
 static FrameNode *pop_last_element(PyObject *list, Py_ssize_t size) {
 
   PyObject *last_element = PyList_GetItem(list, size - 1);
@@ -232,18 +517,80 @@ static FrameNode *pop_last_element(PyObject *list, Py_ssize_t size) {
   return (FrameNode *)last_element;
 }
 
+/**
+ * succ is only needed by async frames, it is created when the first async
+ * child is added
+ */
 static FrameNode *FrameNode_New() {
-  FrameNode *node = PyObject_New(FrameNode, &FrameNode_Type);
+  FrameNode *node;
+#ifndef Py_GIL_DISABLED
+  if (frame_node_free > 0) {
+    node = frame_node_freelist[--frame_node_free];
+    PyObject_Init((PyObject *)node, &FrameNode_Type);
+  } else {
+    node = PyObject_New(FrameNode, &FrameNode_Type);
+  }
+#else
+  node = PyObject_New(FrameNode, &FrameNode_Type);
+#endif
   node->prev = NULL;
-  node->succ = PyList_New(0);
-  node->frame_desp = NULL;
-  node->enter_timestamp = PyList_New(0);
+  node->succ = NULL;
+  node->desc = -1;
+  node->timestamps = 0;
   node->frame_id = NULL;
   return node;
 }
 
-static void TraceProfiler_PushFrame(TraceProfiler *self, Py_ssize_t start_ns) {
+static Py_ssize_t _succ_len(FrameNode *node) {
+  return node->succ == NULL ? 0 : PyList_GET_SIZE(node->succ);
+}
+
+static void _append_succ(FrameNode *node, FrameNode *child) {
+  if (node->succ == NULL) {
+    node->succ = PyList_New(0);
+  }
+  if (node->succ == NULL || PyList_Append(node->succ, (PyObject *)child) < 0) {
+    PyErr_Clear();
+  }
+}
+
+static void _append_timestamp(FrameNode *node, long long timestamp_ns) {
+  if (node->timestamps == 0) {
+    node->first_ns = node->last_ns = timestamp_ns;
+  }
+  node->kept_ns = node->last_ns;
+  node->last_ns = timestamp_ns;
+  node->timestamps += 1;
+}
+
+/**
+ * takes back the last suspend time, it is always the one appended right
+ * before, so the one kept before it becomes the last
+ */
+static void _pop_timestamp(FrameNode *node) {
+  if (node->timestamps <= 1) {
+    return;
+  }
+  node->timestamps -= 1;
+  node->last_ns = node->timestamps == 1 ? node->first_ns : node->kept_ns;
+  node->kept_ns = node->first_ns;
+}
+
+/**
+ * gives the offsets from offset on back when no frame at or after it is kept,
+ * a pruned async frame leaves no empty records between the kept ones
+ */
+static void TraceProfiler_ReleaseOffsets(TraceProfiler *self,
+                                         Py_ssize_t offset) {
+  if (offset >= self->records_len && offset < self->sf_sz) {
+    self->sf_sz = offset;
+  }
+}
+
+static void TraceProfiler_PushFrame(TraceProfiler *self, Py_ssize_t start_ns,
+                                    Py_ssize_t desc) {
   FrameNode *node = FrameNode_New();
+  node->desc = desc;
   node->prev = (PyObject *)self->top;
   node->start_ns = start_ns;
   node->offset = self->sf_sz;
@@ -253,8 +600,10 @@ static void TraceProfiler_PushFrame(TraceProfiler *self, Py_ssize_t start_ns) {
 }
 
 static void TraceProfiler_PushFrameWithDepth(TraceProfiler *self,
-                                             Py_ssize_t start_ns) {
+                                             Py_ssize_t start_ns,
+                                             Py_ssize_t desc) {
   FrameNode *node = FrameNode_New();
+  node->desc = desc;
   node->prev = (PyObject *)self->top;
   node->start_ns = start_ns;
   node->offset = self->sf_sz;
@@ -265,42 +614,40 @@ static void TraceProfiler_PushFrameWithDepth(TraceProfiler *self,
 
 static void TraceProfiler_InnerPushAsyncFrame(TraceProfiler *self,
                                               Py_ssize_t start_ns,
-                                              PyObject *frame_desp,
+                                              Py_ssize_t desc,
                                               PyObject *frame_id) {
   FrameNode *node = FrameNode_New();
-  PyObject *temp_start_ns = PyLong_FromLong(start_ns);
-  PyList_Append(node->enter_timestamp, temp_start_ns);
-  Py_DECREF(temp_start_ns);
+  _append_timestamp(node, start_ns);
+  Py_INCREF(frame_id);
   node->frame_id = frame_id;
 
-  PyList_Append(self->top->succ, (PyObject *)node);
+  _append_succ(self->top, node);
   node->prev = (PyObject *)self->top;
   node->start_ns = start_ns;
   node->offset = self->sf_sz;
 
   self->sf_sz += 1;
-  node->frame_desp = frame_desp;
+  node->desc = desc;
   self->top = node;
   Py_DECREF(node);
 }
 
 static void TraceProfiler_InnerPushAsyncFrameWithDepth(TraceProfiler *self,
                                                        Py_ssize_t start_ns,
-                                                       PyObject *frame_desp,
+                                                       Py_ssize_t desc,
                                                        PyObject *frame_id) {
   FrameNode *node = FrameNode_New();
-  PyObject *temp_start_ns = PyLong_FromLong(start_ns);
-  PyList_Append(node->enter_timestamp, temp_start_ns);
-  Py_DECREF(temp_start_ns);
+  _append_timestamp(node, start_ns);
+  Py_INCREF(frame_id);
   node->frame_id = frame_id;
 
-  PyList_Append(self->top->succ, (PyObject *)node);
+  _append_succ(self->top, node);
   node->prev = (PyObject *)self->top;
   node->start_ns = start_ns;
   node->offset = self->sf_sz;
 
   self->sf_sz += 1;
-  node->frame_desp = frame_desp;
+  node->desc = desc;
   self->current_depth += 1;
   self->top = node;
   Py_DECREF(node);
@@ -308,38 +655,26 @@ static void TraceProfiler_InnerPushAsyncFrameWithDepth(TraceProfiler *self,
 
 static void TraceProfiler_FinishUnclosedAsyncFrame(TraceProfiler *self) {
   FrameNode *current_top = self->top;
-  Py_ssize_t children_len = PyList_Size(current_top->succ);
+  Py_ssize_t children_len = _succ_len(current_top);
   while (children_len > 0) {
     FrameNode *last_async_node =
         pop_last_element(current_top->succ, children_len);
-    Py_ssize_t size = PyList_Size(last_async_node->enter_timestamp);
-    PyObject *last_element =
-        PyList_GetItem(last_async_node->enter_timestamp, size - 1);
-    long long last_leave_ns = PyLong_AsLongLong(last_element);
-
-    PyObject *first_element =
-        PyList_GetItem(last_async_node->enter_timestamp, 0);
-    long long last_async_start_ns = PyLong_AsLongLong(first_element);
+    long long last_leave_ns = last_async_node->last_ns;
+    long long last_async_start_ns = last_async_node->first_ns;
     long long cost_ns = last_leave_ns - last_async_start_ns;
 
     if (cost_ns >= self->interval) {
       Py_ssize_t pid = current_top->offset;
-      PyObject *frame_desp = build_last_async_frame(
-          last_async_node->frame_desp, last_async_start_ns, cost_ns, pid);
-      Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-      long long distance = last_async_node->offset + 1 - real_sf_sz;
-      long long idx;
-      for (idx = 0; idx < distance; idx++) {
-        PyList_Append(self->on_sending_frame, Py_None);
-      }
-      PyList_SetItem(self->on_sending_frame, last_async_node->offset,
-                     frame_desp);
+      TraceProfiler_SetRecord(self, last_async_node->offset,
+                              last_async_start_ns, cost_ns,
+                              last_async_node->desc, pid);
       if (current_top != self->top) {
         Py_DECREF(current_top);
       }
       current_top = last_async_node;
-      children_len = PyList_Size(current_top->succ);
+      children_len = _succ_len(current_top);
     } else {
+      TraceProfiler_ReleaseOffsets(self, last_async_node->offset);
       Py_DECREF(last_async_node);
       break;
     }
@@ -352,38 +687,26 @@ static void TraceProfiler_FinishUnclosedAsyncFrame(TraceProfiler *self) {
 static void
 TraceProfiler_FinishUnclosedAsyncFrameWithDepth(TraceProfiler *self) {
   FrameNode *current_top = self->top;
-  Py_ssize_t children_len = PyList_Size(current_top->succ);
+  Py_ssize_t children_len = _succ_len(current_top);
   while (children_len > 0) {
     FrameNode *last_async_node =
         pop_last_element(current_top->succ, children_len);
-    Py_ssize_t size = PyList_Size(last_async_node->enter_timestamp);
-    PyObject *last_element =
-        PyList_GetItem(last_async_node->enter_timestamp, size - 1);
-    long long last_leave_ns = PyLong_AsLongLong(last_element);
-
-    PyObject *first_element =
-        PyList_GetItem(last_async_node->enter_timestamp, 0);
-    long long last_async_start_ns = PyLong_AsLongLong(first_element);
+    long long last_leave_ns = last_async_node->last_ns;
+    long long last_async_start_ns = last_async_node->first_ns;
     long long cost_ns = last_leave_ns - last_async_start_ns;
 
     if (self->current_depth < self->depth_limit) {
       Py_ssize_t pid = current_top->offset;
-      PyObject *frame_desp = build_last_async_frame(
-          last_async_node->frame_desp, last_async_start_ns, cost_ns, pid);
-      Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-      long long distance = last_async_node->offset + 1 - real_sf_sz;
-      long long idx;
-      for (idx = 0; idx < distance; idx++) {
-        PyList_Append(self->on_sending_frame, Py_None);
-      }
-      PyList_SetItem(self->on_sending_frame, last_async_node->offset,
-                     frame_desp);
+      TraceProfiler_SetRecord(self, last_async_node->offset,
+                              last_async_start_ns, cost_ns,
+                              last_async_node->desc, pid);
       if (current_top != self->top) {
         Py_DECREF(current_top);
       }
       current_top = last_async_node;
-      children_len = PyList_Size(current_top->succ);
+      children_len = _succ_len(current_top);
     } else {
+      TraceProfiler_ReleaseOffsets(self, last_async_node->offset);
       Py_DECREF(last_async_node);
       break;
     }
@@ -394,7 +717,7 @@ TraceProfiler_FinishUnclosedAsyncFrameWithDepth(TraceProfiler *self) {
 }
 
 static void TraceProfiler_PushAsyncFrame(TraceProfiler *self,
-                                         Py_ssize_t start_ns, PyObject *f_desp,
+                                         Py_ssize_t start_ns, Py_ssize_t desc,
                                          int is_async_frame,
                                          PyObject *frame_id) {
   if (!is_async_frame) {
@@ -402,10 +725,10 @@ static void TraceProfiler_PushAsyncFrame(TraceProfiler *self,
       return;
     }
     TraceProfiler_FinishUnclosedAsyncFrame(self);
-    TraceProfiler_PushFrame(self, start_ns);
+    TraceProfiler_PushFrame(self, start_ns, desc);
   } else {
     if (self->top->offset == -1) {
-      Py_ssize_t children_len = PyList_Size(self->top->succ);
+      Py_ssize_t children_len = _succ_len(self->top);
       if (children_len > 0) {
         FrameNode *last_element =
             (FrameNode *)PyList_GetItem(self->top->succ, children_len - 1);
@@ -416,49 +739,40 @@ static void TraceProfiler_PushAsyncFrame(TraceProfiler *self,
           return;
         }
       } else {
-        TraceProfiler_InnerPushAsyncFrame(self, start_ns, f_desp, frame_id);
+        TraceProfiler_InnerPushAsyncFrame(self, start_ns, desc, frame_id);
         return;
       }
     }
-    if (PyObject_RichCompareBool(self->top->frame_id, frame_id, Py_EQ) == 1) {
-      Py_ssize_t succ_len = PyList_Size(self->top->succ);
+    if (self->top->frame_id != NULL &&
+        PyObject_RichCompareBool(self->top->frame_id, frame_id, Py_EQ) == 1) {
+      Py_ssize_t succ_len = _succ_len(self->top);
       if (succ_len == 0) {
-        Py_ssize_t e_size = PyList_Size(self->top->enter_timestamp);
-        PyObject *t_last_element =
-            PyList_GetItem(self->top->enter_timestamp, e_size - 1);
-        long long t_last_leave_ns = PyLong_AsLongLong(t_last_element);
+        long long t_last_leave_ns = self->top->last_ns;
         long long cost_ns = start_ns - t_last_leave_ns;
 
         if (cost_ns >= self->interval) {
           Py_ssize_t pid = self->top->offset;
-          PyObject *frame_desp =
-              build_context_switch_frame(t_last_leave_ns, cost_ns, pid);
-          Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-          long long distance = self->sf_sz + 1 - real_sf_sz;
-          long long idx;
-          for (idx = 0; idx < distance; idx++) {
-            PyList_Append(self->on_sending_frame, Py_None);
-          }
-          PyList_SetItem(self->on_sending_frame, self->sf_sz, frame_desp);
+          TraceProfiler_SetRecord(self, self->sf_sz, t_last_leave_ns, cost_ns,
+                                  AWAIT_DESC, pid);
           self->sf_sz += 1;
-          Py_DECREF(pop_last_element(self->top->enter_timestamp, e_size));
+          _pop_timestamp(self->top);
         }
       } else {
-        Py_ssize_t succ_size = PyList_Size(self->top->succ);
+        Py_ssize_t succ_size = _succ_len(self->top);
         FrameNode *top_succ =
             (FrameNode *)PyList_GetItem(self->top->succ, succ_size - 1);
         self->top = top_succ;
       }
     } else {
       TraceProfiler_FinishUnclosedAsyncFrame(self);
-      TraceProfiler_InnerPushAsyncFrame(self, start_ns, f_desp, frame_id);
+      TraceProfiler_InnerPushAsyncFrame(self, start_ns, desc, frame_id);
     }
   }
 }
 
 static void TraceProfiler_PushAsyncFrameWithDepth(TraceProfiler *self,
                                                   Py_ssize_t start_ns,
-                                                  PyObject *f_desp,
+                                                  Py_ssize_t desc,
                                                   int is_async_frame,
                                                   PyObject *frame_id) {
   if (!is_async_frame) {
@@ -466,10 +780,10 @@ static void TraceProfiler_PushAsyncFrameWithDepth(TraceProfiler *self,
       return;
     }
     TraceProfiler_FinishUnclosedAsyncFrameWithDepth(self);
-    TraceProfiler_PushFrameWithDepth(self, start_ns);
+    TraceProfiler_PushFrameWithDepth(self, start_ns, desc);
   } else {
     if (self->top->offset == -1) {
-      Py_ssize_t children_len = PyList_Size(self->top->succ);
+      Py_ssize_t children_len = _succ_len(self->top);
       if (children_len > 0) {
         FrameNode *last_element =
             (FrameNode *)PyList_GetItem(self->top->succ, children_len - 1);
@@ -481,36 +795,27 @@ static void TraceProfiler_PushAsyncFrameWithDepth(TraceProfiler *self,
           return;
         }
       } else {
-        TraceProfiler_InnerPushAsyncFrameWithDepth(self, start_ns, f_desp,
+        TraceProfiler_InnerPushAsyncFrameWithDepth(self, start_ns, desc,
                                                    frame_id);
         return;
       }
     }
-    if (PyObject_RichCompareBool(self->top->frame_id, frame_id, Py_EQ) == 1) {
-      Py_ssize_t succ_len = PyList_Size(self->top->succ);
+    if (self->top->frame_id != NULL &&
+        PyObject_RichCompareBool(self->top->frame_id, frame_id, Py_EQ) == 1) {
+      Py_ssize_t succ_len = _succ_len(self->top);
       if (succ_len == 0) {
-        Py_ssize_t e_size = PyList_Size(self->top->enter_timestamp);
-        PyObject *t_last_element =
-            PyList_GetItem(self->top->enter_timestamp, e_size - 1);
-        long long t_last_leave_ns = PyLong_AsLongLong(t_last_element);
+        long long t_last_leave_ns = self->top->last_ns;
         long long cost_ns = start_ns - t_last_leave_ns;
 
         if (self->current_depth < self->depth_limit) {
           Py_ssize_t pid = self->top->offset;
-          PyObject *frame_desp =
-              build_context_switch_frame(t_last_leave_ns, cost_ns, pid);
-          Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-          long long distance = self->sf_sz + 1 - real_sf_sz;
-          long long idx;
-          for (idx = 0; idx < distance; idx++) {
-            PyList_Append(self->on_sending_frame, Py_None);
-          }
-          PyList_SetItem(self->on_sending_frame, self->sf_sz, frame_desp);
+          TraceProfiler_SetRecord(self, self->sf_sz, t_last_leave_ns, cost_ns,
+                                  AWAIT_DESC, pid);
           self->sf_sz += 1;
-          Py_DECREF(pop_last_element(self->top->enter_timestamp, e_size));
+          _pop_timestamp(self->top);
         }
       } else {
-        Py_ssize_t succ_size = PyList_Size(self->top->succ);
+        Py_ssize_t succ_size = _succ_len(self->top);
         FrameNode *top_succ =
             (FrameNode *)PyList_GetItem(self->top->succ, succ_size - 1);
         self->top = top_succ;
@@ -518,29 +823,12 @@ static void TraceProfiler_PushAsyncFrameWithDepth(TraceProfiler *self,
       }
     } else {
       TraceProfiler_FinishUnclosedAsyncFrameWithDepth(self);
-      TraceProfiler_InnerPushAsyncFrameWithDepth(self, start_ns, f_desp,
+      TraceProfiler_InnerPushAsyncFrameWithDepth(self, start_ns, desc,
                                                  frame_id);
     }
   }
 }
 
-static FrameNode *TraceProfiler_PopFrame(TraceProfiler *self) {
-  FrameNode *top_frame = (FrameNode *)self->top;
-  self->top = (FrameNode *)top_frame->prev;
-  top_frame->prev = NULL;
-
-  return top_frame;
-}
-
-static FrameNode *TraceProfiler_PopFrameWithDepth(TraceProfiler *self) {
-  FrameNode *top_frame = (FrameNode *)self->top;
-  self->top = (FrameNode *)top_frame->prev;
-  top_frame->prev = NULL;
-
-  self->current_depth -= 1;
-  return top_frame;
-}
-
 static FrameNode *TraceProfiler_PopFrameAsync(TraceProfiler *self,
                                               int is_async_frame,
                                               long long end_time) {
@@ -554,10 +842,7 @@ static FrameNode *TraceProfiler_PopFrameAsync(TraceProfiler *self,
 
     return top_frame;
   } else {
-    PyObject *e_time_obj = PyLong_FromLong(end_time);
-    PyList_Append(self->top->enter_timestamp,
-                  e_time_obj); // PyList_Append Increment obj's reference
-    Py_DECREF(e_time_obj);
+    _append_timestamp(self->top, end_time);
 
     self->top = (FrameNode *)self->top->prev;
     return NULL;
@@ -578,10 +863,7 @@ static FrameNode *TraceProfiler_PopFrameAsyncWithDepth(TraceProfiler *self,
     self->current_depth -= 1;
     return top_frame;
   } else {
-    PyObject *e_time_obj = PyLong_FromLong(end_time);
-    PyList_Append(self->top->enter_timestamp,
-                  e_time_obj); // PyList_Append Increment obj's reference
-    Py_DECREF(e_time_obj);
+    _append_timestamp(self->top, end_time);
 
     self->current_depth -= 1;
     self->top = (FrameNode *)self->top->prev;
@@ -592,7 +874,7 @@ static FrameNode *TraceProfiler_PopFrameAsyncWithDepth(TraceProfiler *self,
 static void TraceProfiler_FulfillAsyncUnfinishedRequests(TraceProfiler *self) {
   while (self->top != NULL) {
     if (self->top->offset == -1) {
-      Py_ssize_t succ_len = PyList_Size(self->top->succ);
+      Py_ssize_t succ_len = _succ_len(self->top);
       if (succ_len > 0) {
         FrameNode *cur_top = self->top;
         self->top = pop_last_element(self->top->succ, succ_len);
@@ -602,30 +884,17 @@ static void TraceProfiler_FulfillAsyncUnfinishedRequests(TraceProfiler *self) {
       }
     } else {
       FrameNode *last_async_node = self->top;
-      Py_ssize_t size = PyList_Size(last_async_node->enter_timestamp);
-      PyObject *last_element =
-          PyList_GetItem(last_async_node->enter_timestamp, size - 1);
-      long long last_leave_ns = PyLong_AsLongLong(last_element);
-
-      PyObject *first_element =
-          PyList_GetItem(last_async_node->enter_timestamp, 0);
-      long long last_async_start_ns = PyLong_AsLongLong(first_element);
+      long long last_leave_ns = last_async_node->last_ns;
+      long long last_async_start_ns = last_async_node->first_ns;
       long long cost_ns = last_leave_ns - last_async_start_ns;
 
       if (cost_ns >= self->interval) {
         FrameNode *prev_node = (FrameNode *)self->top->prev;
         Py_ssize_t pid = prev_node->offset;
-        PyObject *frame_desp = build_last_async_frame(
-            last_async_node->frame_desp, last_async_start_ns, cost_ns, pid);
-        Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-        long long distance = last_async_node->offset + 1 - real_sf_sz;
-        long long idx;
-        for (idx = 0; idx < distance; idx++) {
-          PyList_Append(self->on_sending_frame, Py_None);
-        }
-        PyList_SetItem(self->on_sending_frame, last_async_node->offset,
-                       frame_desp);
-        Py_ssize_t succ_len_2 = PyList_Size(self->top->succ);
+        TraceProfiler_SetRecord(self, last_async_node->offset,
+                                last_async_start_ns, cost_ns,
+                                last_async_node->desc, pid);
+        Py_ssize_t succ_len_2 = _succ_len(self->top);
         if (succ_len_2 > 0) {
           FrameNode *cur_top_2 = self->top;
           self->top = pop_last_element(self->top->succ, succ_len_2);
@@ -644,7 +913,7 @@ static void
 TraceProfiler_FulfillAsyncUnfinishedRequestsWithDepth(TraceProfiler *self) {
   while (self->top != NULL) {
     if (self->top->offset == -1) {
-      Py_ssize_t succ_len = PyList_Size(self->top->succ);
+      Py_ssize_t succ_len = _succ_len(self->top);
       if (succ_len > 0) {
         FrameNode *cur_top = self->top;
         self->top = pop_last_element(self->top->succ, succ_len);
@@ -655,30 +924,17 @@ TraceProfiler_FulfillAsyncUnfinishedRequestsWithDepth(TraceProfiler *self) {
       }
     } else {
       FrameNode *last_async_node = self->top;
-      Py_ssize_t size = PyList_Size(last_async_node->enter_timestamp);
-      PyObject *last_element =
-          PyList_GetItem(last_async_node->enter_timestamp, size - 1);
-      long long last_leave_ns = PyLong_AsLongLong(last_element);
-
-      PyObject *first_element =
-          PyList_GetItem(last_async_node->enter_timestamp, 0);
-      long long last_async_start_ns = PyLong_AsLongLong(first_element);
+      long long last_leave_ns = last_async_node->last_ns;
+      long long last_async_start_ns = last_async_node->first_ns;
       long long cost_ns = last_leave_ns - last_async_start_ns;
 
       if (self->current_depth <= self->depth_limit) {
         FrameNode *prev_node = (FrameNode *)self->top->prev;
         Py_ssize_t pid = prev_node->offset;
-        PyObject *frame_desp = build_last_async_frame(
-            last_async_node->frame_desp, last_async_start_ns, cost_ns, pid);
-        Py_ssize_t real_sf_sz = PyList_Size(self->on_sending_frame);
-        long long distance = last_async_node->offset + 1 - real_sf_sz;
-        long long idx;
-        for (idx = 0; idx < distance; idx++) {
-          PyList_Append(self->on_sending_frame, Py_None);
-        }
-        PyList_SetItem(self->on_sending_frame, last_async_node->offset,
-                       frame_desp);
-        Py_ssize_t succ_len_2 = PyList_Size(self->top->succ);
+        TraceProfiler_SetRecord(self, last_async_node->offset,
+                                last_async_start_ns, cost_ns,
+                                last_async_node->desc, pid);
+        Py_ssize_t succ_len_2 = _succ_len(self->top);
         if (succ_len_2 > 0) {
           FrameNode *cur_top_2 = self->top;
           self->top = pop_last_element(self->top->succ, succ_len_2);
@@ -698,18 +954,56 @@ static TraceProfiler *TraceProfiler_New(long long interval, Py_ssize_t is_async,
                                         Py_ssize_t depth_limit) {
   TraceProfiler *trace_profiler =
       PyObject_New(TraceProfiler, &TraceProfiler_Type);
+  if (trace_profiler == NULL) {
+    return NULL;
+  }
   trace_profiler->target = NULL;
+  trace_profiler->out_queue = NULL;
   trace_profiler->interval = interval;
   trace_profiler->is_async = is_async;
-  FrameNode *node = FrameNode_New();
-  node->offset = -1;
-  trace_profiler->top = (FrameNode *)node;
+  trace_profiler->top = NULL;
   trace_profiler->sf_sz = 0;
   trace_profiler->current_depth = 0;
   trace_profiler->depth_limit = depth_limit;
-
-  trace_profiler->on_sending_frame = PyList_New(0);
-  trace_profiler->out_queue = NULL;
+  // frames are timed by a monotonic clock, their start is shifted to wall
+  // clock time with the offset of the clock in use
+  trace_profiler->wall_offset_ns = wall_offset_ns;
+
+  trace_profiler->records = NULL;
+  trace_profiler->records_len = 0;
+  trace_profiler->records_cap = 0;
+  trace_profiler->lost_calls = 0;
+  trace_profiler->pruned_calls = 0;
+  trace_profiler->calls_cap = 64;
+  trace_profiler->calls =
+      PyMem_Malloc(trace_profiler->calls_cap * sizeof(CallEntry));
+  trace_profiler->desc_len = 0;
+  trace_profiler->desc_cap = 256;
+  trace_profiler->desc_slots = _new_desc_slots(trace_profiler->desc_cap);
+  // descriptions[AWAIT_DESC] stands for the time an async frame awaited
+  PyObject *await_description = _await_description();
+  trace_profiler->descriptions =
+      await_description == NULL ? NULL : PyList_New(1);
+  if (trace_profiler->descriptions != NULL) {
+    PyList_SET_ITEM(trace_profiler->descriptions, AWAIT_DESC,
+                    await_description);
+  } else {
+    Py_XDECREF(await_description);
+  }
+  if (trace_profiler->calls == NULL || trace_profiler->desc_slots == NULL ||
+      trace_profiler->descriptions == NULL) {
+    Py_DECREF(trace_profiler);
+    return (TraceProfiler *)PyErr_NoMemory();
+  }
+  // bottom of the call stack, the parent of frames entered at top level
+  trace_profiler->calls[0].start_ns = 0;
+  trace_profiler->calls[0].offset = -1;
+  trace_profiler->calls_len = 1;
+  if (is_async) {
+    FrameNode *node = FrameNode_New();
+    node->offset = -1;
+    trace_profiler->top = (FrameNode *)node;
+  }
   return trace_profiler;
 }
 
@@ -722,17 +1016,29 @@ static void TraceProfiler_SendTraceFrames(TraceProfiler *self) {
     }
   }
 
+  Py_ssize_t idx;
+  for (idx = 0; idx < self->records_len; idx++) {
+    self->records[idx].start_ns += self->wall_offset_ns;
+  }
+  // records are sent as one bytes object, the client decodes them
+  PyObject *records = PyBytes_FromStringAndSize(
+      (const char *)self->records, self->records_len * sizeof(FrameRecord));
+  if (records == NULL) {
+    PyErr_Clear();
+    return;
+  }
 #if PY_VERSION_HEX >= 0x03090000
   // vectorcall implementation could be faster, is available in Python 3.9
-  PyObject *callargs[3] = {NULL, (PyObject *)self->out_queue,
-                           (PyObject *)self->on_sending_frame};
+  PyObject *callargs[4] = {NULL, (PyObject *)self->out_queue, records,
+                           self->descriptions};
   PyObject *result = PyObject_Vectorcall(
-      self->target, callargs + 1, 2 | PY_VECTORCALL_ARGUMENTS_OFFSET, NULL);
+      self->target, callargs + 1, 3 | PY_VECTORCALL_ARGUMENTS_OFFSET, NULL);
 #else
-  PyObject *result = PyObject_CallFunctionObjArgs(self->target, self->out_queue,
-                                                  self->on_sending_frame, NULL);
+  PyObject *result = PyObject_CallFunctionObjArgs(
+      self->target, self->out_queue, records, self->descriptions, NULL);
 #endif
   Py_XDECREF(result);
+  Py_DECREF(records);
 }
 
 //////////////////////
@@ -745,35 +1051,27 @@ static void TraceProfiler_SendTraceFrames(TraceProfiler *self) {
 static int profile(PyObject *op, PyFrameObject *frame, int what,
                    PyObject *arg) {
   TraceProfiler *tp = (TraceProfiler *)op;
-  PyObject *result;
 
   long long current_time = _get_time_ns();
   // what:        0         1           3        4           5             6
   // return:      call   exception    return    c_call    c_exception   c_return
   if (what == 0 || what == 4) {
     // call/c_call
-    TraceProfiler_PushFrame(tp, current_time);
+    TraceProfiler_PushCall(tp, current_time);
   } else if (what == 3 || what == 6 || what == 5) {
     // return/c_exception/c_return
-    FrameNode *node = TraceProfiler_PopFrame(tp);
-    long long cost_ns = current_time - node->start_ns;
+    CallEntry *call = TraceProfiler_PopCall(tp);
+    if (call == NULL) {
+      return 0;
+    }
+    long long cost_ns = current_time - call->start_ns;
     if (cost_ns < tp->interval) {
       tp->sf_sz -= 1;
     } else {
-      int c_frame = (what == 3) ? 0 : 1;
-      FrameNode *parent_node = (FrameNode *)tp->top;
-      PyObject *frame_desp = _get_frame_info(frame, node->start_ns, cost_ns,
-                                             parent_node->offset, arg, c_frame);
-
-      Py_ssize_t real_sf_sz = PyList_Size(tp->on_sending_frame);
-      long long distance = node->offset + 1 - real_sf_sz;
-      long long idx;
-      for (idx = 0; idx < distance; idx++) {
-        PyList_Append(tp->on_sending_frame, Py_None);
-      }
-      PyList_SetItem(tp->on_sending_frame, node->offset, frame_desp);
+      TraceProfiler_SetRecord(tp, call->offset, call->start_ns, cost_ns,
+                              TraceProfiler_Describe(tp, frame, arg, what != 3),
+                              tp->calls[tp->calls_len - 1].offset);
     }
-    Py_DECREF(node);
   }
   return 0;
 }
@@ -781,35 +1079,31 @@ static int profile(PyObject *op, PyFrameObject *frame, int what,
 static int profile_with_depth(PyObject *op, PyFrameObject *frame, int what,
                               PyObject *arg) {
   TraceProfiler *tp = (TraceProfiler *)op;
-  PyObject *result;
 
-  long long current_time = _get_time_ns();
   // what:        0         1           3        4           5             6
   // return:      call   exception    return    c_call    c_exception   c_return
   if (what == 0 || what == 4) {
-    // call/c_call
-    TraceProfiler_PushFrameWithDepth(tp, current_time);
+    // call/c_call, frames below depth_limit are only counted, neither timed
+    // nor given an offset, everything they call is below it as well
+    if (tp->pruned_calls > 0 || tp->calls_len - 1 >= tp->depth_limit) {
+      tp->pruned_calls += 1;
+      return 0;
+    }
+    TraceProfiler_PushCall(tp, _get_time_ns());
   } else if (what == 3 || what == 6 || what == 5) {
     // return/c_exception/c_return
-    FrameNode *node = TraceProfiler_PopFrameWithDepth(tp);
-    long long cost_ns = current_time - node->start_ns;
-    if (tp->current_depth >= tp->depth_limit) {
-      tp->sf_sz -= 1;
-    } else {
-      int c_frame = (what == 3) ? 0 : 1;
-      FrameNode *parent_node = (FrameNode *)tp->top;
-      PyObject *frame_desp = _get_frame_info(frame, node->start_ns, cost_ns,
-                                             parent_node->offset, arg, c_frame);
-
-      Py_ssize_t real_sf_sz = PyList_Size(tp->on_sending_frame);
-      long long distance = node->offset + 1 - real_sf_sz;
-      long long idx;
-      for (idx = 0; idx < distance; idx++) {
-        PyList_Append(tp->on_sending_frame, Py_None);
-      }
-      PyList_SetItem(tp->on_sending_frame, node->offset, frame_desp);
+    if (tp->pruned_calls > 0) {
+      tp->pruned_calls -= 1;
+      return 0;
+    }
+    CallEntry *call = TraceProfiler_PopCall(tp);
+    if (call == NULL) {
+      return 0;
     }
-    Py_DECREF(node);
+    long long cost_ns = _get_time_ns() - call->start_ns;
+    TraceProfiler_SetRecord(tp, call->offset, call->start_ns, cost_ns,
+                            TraceProfiler_Describe(tp, frame, arg, what != 3),
+                            tp->calls[tp->calls_len - 1].offset);
   }
   return 0;
 }
@@ -817,7 +1111,6 @@ static int profile_with_depth(PyObject *op, PyFrameObject *frame, int what,
 static int async_profile(PyObject *op, PyFrameObject *frame, int what,
                          PyObject *arg) {
   TraceProfiler *tp = (TraceProfiler *)op;
-  PyObject *result;
 
   long long current_time = _get_time_ns();
   // what:        0         1           3        4           5             6
@@ -827,10 +1120,16 @@ static int async_profile(PyObject *op, PyFrameObject *frame, int what,
   Py_DECREF(code_obj);
   if (what == 0 || what == 4) {
     // call/c_call
-    int c_frame = (what == 4) ? 1 : 0;
-    TraceProfiler_PushAsyncFrame(
-        tp, current_time, _get_header(frame, c_frame, arg), is_async_frame,
-        PyLong_FromVoidPtr((void *)frame));
+    // a sync frame is described when it returns and is kept
+    Py_ssize_t desc = -1;
+    PyObject *frame_id = NULL;
+    if (is_async_frame) {
+      desc = TraceProfiler_Describe(tp, frame, arg, 0);
+      frame_id = PyLong_FromVoidPtr((void *)frame);
+    }
+    TraceProfiler_PushAsyncFrame(tp, current_time, desc, is_async_frame,
+                                 frame_id);
+    Py_XDECREF(frame_id);
   } else if (what == 3 || what == 6 || what == 5) {
     // return/c_exception/c_return
     FrameNode *node =
@@ -838,20 +1137,12 @@ static int async_profile(PyObject *op, PyFrameObject *frame, int what,
     if (!is_async_frame && node != NULL) {
       long long cost_ns = current_time - node->start_ns;
       if (cost_ns < tp->interval) {
-        tp->sf_sz -= 1;
+        TraceProfiler_ReleaseOffsets(tp, node->offset);
       } else {
-        int c_frame = (what == 3) ? 0 : 1;
         FrameNode *parent_node = (FrameNode *)tp->top;
-        PyObject *frame_desp = _get_frame_info(
-            frame, node->start_ns, cost_ns, parent_node->offset, arg, c_frame);
-
-        Py_ssize_t real_sf_sz = PyList_Size(tp->on_sending_frame);
-        long long distance = node->offset + 1 - real_sf_sz;
-        long long idx;
-        for (idx = 0; idx < distance; idx++) {
-          PyList_Append(tp->on_sending_frame, Py_None);
-        }
-        PyList_SetItem(tp->on_sending_frame, node->offset, frame_desp);
+        TraceProfiler_SetRecord(tp, node->offset, node->start_ns, cost_ns,
+                                TraceProfiler_Describe(tp, frame, arg, what != 3),
+                                parent_node->offset);
       }
     }
     Py_XDECREF(node);
@@ -862,7 +1153,6 @@ static int async_profile(PyObject *op, PyFrameObject *frame, int what,
 static int async_profile_with_depth(PyObject *op, PyFrameObject *frame,
                                     int what, PyObject *arg) {
   TraceProfiler *tp = (TraceProfiler *)op;
-  PyObject *result;
 
   long long current_time = _get_time_ns();
   // what:        0         1           3        4           5             6
@@ -872,10 +1162,16 @@ static int async_profile_with_depth(PyObject *op, PyFrameObject *frame,
   Py_DECREF(code_obj);
   if (what == 0 || what == 4) {
     // call/c_call
-    int c_frame = (what == 4) ? 1 : 0;
-    TraceProfiler_PushAsyncFrameWithDepth(
-        tp, current_time, _get_header(frame, c_frame, arg), is_async_frame,
-        PyLong_FromVoidPtr((void *)frame));
+    // a sync frame is described when it returns and is kept
+    Py_ssize_t desc = -1;
+    PyObject *frame_id = NULL;
+    if (is_async_frame) {
+      desc = TraceProfiler_Describe(tp, frame, arg, 0);
+      frame_id = PyLong_FromVoidPtr((void *)frame);
+    }
+    TraceProfiler_PushAsyncFrameWithDepth(tp, current_time, desc,
+                                          is_async_frame, frame_id);
+    Py_XDECREF(frame_id);
   } else if (what == 3 || what == 6 || what == 5) {
     // return/c_exception/c_return
     FrameNode *node =
@@ -883,20 +1179,12 @@ static int async_profile_with_depth(PyObject *op, PyFrameObject *frame,
     if (!is_async_frame && node != NULL) {
       long long cost_ns = current_time - node->start_ns;
       if (tp->current_depth >= tp->depth_limit) {
-        tp->sf_sz -= 1;
+        TraceProfiler_ReleaseOffsets(tp, node->offset);
       } else {
-        int c_frame = (what == 3) ? 0 : 1;
         FrameNode *parent_node = (FrameNode *)tp->top;
-        PyObject *frame_desp = _get_frame_info(
-            frame, node->start_ns, cost_ns, parent_node->offset, arg, c_frame);
-
-        Py_ssize_t real_sf_sz = PyList_Size(tp->on_sending_frame);
-        long long distance = node->offset + 1 - real_sf_sz;
-        long long idx;
-        for (idx = 0; idx < distance; idx++) {
-          PyList_Append(tp->on_sending_frame, Py_None);
-        }
-        PyList_SetItem(tp->on_sending_frame, node->offset, frame_desp);
+        TraceProfiler_SetRecord(tp, node->offset, node->start_ns, cost_ns,
+                                TraceProfiler_Describe(tp, frame, arg, what != 3),
+                                parent_node->offset);
       }
     }
     Py_XDECREF(node);
@@ -923,6 +1211,9 @@ static PyObject *set_trace_profile(PyObject *m, PyObject *args,
   }
 
   profiler = TraceProfiler_New(interval, async_func, depth_limit);
+  if (profiler == NULL) {
+    return NULL;
+  }
   Py_XINCREF(out_q);
   profiler->out_queue = out_q;
   Py_XINCREF(target);
@@ -943,6 +1234,49 @@ static PyObject *set_trace_profile(PyObject *m, PyObject *args,
   return (PyObject *)profiler;
 }
 
+/**
+ * selects the clock timing frames by name, returns the name of the clock in
+ * use, tsc falls back to monotonic when the cpu has no invariant tsc
+ */
+static PyObject *set_trace_clock(PyObject *m, PyObject *args) {
+  const char *name;
+  if (!PyArg_ParseTuple(args, "s", &name)) {
+    return NULL;
+  }
+  int kind;
+  for (kind = 0; kind < 3; kind++) {
+    if (strcmp(name, CLOCK_NAMES[kind]) == 0) {
+      break;
+    }
+  }
+  if (kind == 3) {
+    return PyErr_Format(PyExc_ValueError,
+                        "unknown clock %s, expected monotonic, coarse or tsc",
+                        name);
+  }
+#ifndef CLOCK_MONOTONIC_COARSE
+  if (kind == CLOCK_KIND_COARSE) {
+    kind = CLOCK_KIND_MONOTONIC;
+  }
+#endif
+  if (kind == CLOCK_KIND_TSC) {
+#ifdef TRACE_HAS_TSC
+    if (tsc_mult == 0 && !_calibrate_tsc()) {
+      kind = CLOCK_KIND_MONOTONIC;
+    }
+#else
+    kind = CLOCK_KIND_MONOTONIC;
+#endif
+  }
+  clock_kind = kind;
+  _sync_wall_offset();
+  return PyUnicode_FromString(CLOCK_NAMES[kind]);
+}
+
+static PyObject *trace_clock_ns(PyObject *m, PyObject *args) {
+  return PyLong_FromLongLong(_get_time_ns());
+}
+
 static PyObject *remove_trace_profile(PyObject *m, PyObject *args,
                                       PyObject *kwds) {
   PyEval_SetProfile(NULL, NULL);
@@ -968,6 +1302,10 @@ static PyMethodDef module_methods[] = {
      METH_VARARGS | METH_KEYWORDS, "set_trace_profile implementation."},
     {"remove_trace_profile", (PyCFunction)remove_trace_profile,
      METH_VARARGS | METH_KEYWORDS, "remove by setting sys.setprofile(None)"},
+    {"set_trace_clock", (PyCFunction)set_trace_clock, METH_VARARGS,
+     "select the clock timing frames: monotonic, coarse or tsc"},
+    {"trace_clock_ns", (PyCFunction)trace_clock_ns, METH_NOARGS,
+     "current time of the clock timing frames"},
     {NULL} /* Sentinel */
 };
 
@@ -975,5 +1313,6 @@ PyMODINIT_FUNC PyInit_trace_profile_C(void) {
   static struct PyModuleDef moduledef = {
       PyModuleDef_HEAD_INIT, "trace_profile_C", "PyFlight trace supports.", -1,
       module_methods};
+  _sync_wall_offset();
   return PyModule_Create(&moduledef);
 }
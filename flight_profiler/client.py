@@ -13,21 +13,35 @@ import traceback
 from importlib.metadata import version
 from pathlib import Path
 from subprocess import PIPE, Popen
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 from flight_profiler.common.global_store import (
     FORBIDDEN_COMMANDS_IN_PY314,
+    get_flight_session,
+    set_flight_session,
     set_history_file_path,
     set_inject_server_pid,
+    set_stream_compression,
 )
 from flight_profiler.common.system_logger import logger
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.base import (
+    TargetProcessExitError,
+    get_agent_socket_path,
+)
+from flight_profiler.communication.flight_client import (
+    FlightClient,
+    FlightSession,
+    SessionUnsupportedError,
+    get_compression_offer,
+    new_flight_client,
+)
 from flight_profiler.plugins.help.help_agent import HELP_COMMANDS_NAMES
 from flight_profiler.utils.cli_util import (
     show_error_info,
     show_normal_info,
     verify_exit_code,
 )
+from flight_profiler.utils.elf_util import locate_base_addr
 from flight_profiler.utils.env_util import is_linux, is_mac, py_higher_than_314
 from flight_profiler.utils.render_util import (
     COLOR_END,
@@ -51,9 +65,13 @@ except ImportError:
 class ProfilerCli(object):
 
     def __init__(self, port: int,
-                 target_executable: str):
+                 target_executable: str,
+                 unix_path: Optional[str] = None):
         self.port = port
+        self.unix_path = unix_path
         self.server_pid = None
+        # preload timings of the status reply at attach
+        self.preload_timings: Dict[str, Any] = dict()
         self.target_executable = target_executable
         home = str(Path.home())
         output_dir = os.path.join(home, "pyFlightProfiler")
@@ -151,6 +169,20 @@ class ProfilerCli(object):
             except Exception:
                 show_error_info(traceback.format_exc())
 
+    def open_session(self) -> None:
+        """
+        keep one multiplexed connection to agent for all commands of this cli
+        """
+        unix_path = self.unix_path
+        if unix_path is not None and not os.path.exists(unix_path):
+            unix_path = None
+        try:
+            set_flight_session(FlightSession("localhost", self.port, unix_path))
+        except SessionUnsupportedError:
+            logger.debug("agent does not support session, connect per command")
+        except TargetProcessExitError:
+            pass
+
     def check_status(self, timeout=None):
         s = time.time()
 
@@ -159,18 +191,31 @@ class ProfilerCli(object):
             timeout = 5
         while time.time() - s < timeout:
             try:
-                client = FlightClient("localhost", self.port)
+                if get_flight_session() is None:
+                    self.open_session()
+                client = new_flight_client("localhost", self.port)
             except:
                 time.sleep(0.5)
                 continue
             try:
-                server_resp: Dict[str, Any] = json.loads(
-                    client.request({"target": "status", "is_plugin_calling": False})
-                )
+                request = {"target": "status", "is_plugin_calling": False}
+                offer = dict()
+                if len(get_compression_offer()) > 0:
+                    offer["compression"] = get_compression_offer()
+                # plugins the agent warms up in background right after attach
+                preload = os.getenv("PYFLIGHT_PRELOAD_PLUGINS", "")
+                if preload:
+                    offer["preload"] = preload.split(",")
+                if len(offer) > 0:
+                    request["param"] = json.dumps(offer)
+                server_resp: Dict[str, Any] = json.loads(client.request(request))
                 if server_resp["app_type"] != "py_flight_profiler":
                     continue
                 self.server_pid = server_resp["pid"]
                 set_inject_server_pid(self.server_pid)
+                # agents without compression support leave it out
+                set_stream_compression(server_resp.get("compression", None))
+                self.preload_timings = server_resp.get("preload", {})
                 check_preload = True
                 client.close()
                 break
@@ -180,6 +225,39 @@ class ProfilerCli(object):
         return check_preload
 
 
+def check_server_listening_unix(pid: str) -> int:
+    """
+    find injected agent by the unix socket derived from pid, costs one stat()
+    instead of scanning ports
+
+    :param pid: target pid
+    :return flight_agent tcp port, -1 if no agent listens on the unix socket
+    """
+    unix_path = get_agent_socket_path(pid)
+    if unix_path is None:
+        return -1
+    try:
+        os.stat(unix_path)
+        client = FlightClient("localhost", -1, unix_path)
+    except:
+        return -1
+    try:
+        server_resp: Dict[str, Any] = json.loads(
+            client.request({"target": "status", "is_plugin_calling": False})
+        )
+        if (
+            server_resp["app_type"] == "py_flight_profiler"
+            and str(server_resp["pid"]) == pid
+        ):
+            return int(server_resp["port"])
+    except:
+        # socket left by a dead process, fall back to port scan
+        pass
+    finally:
+        client.close()
+    return -1
+
+
 def check_server_injected(
     pid: str, start_port: int, end_port: int, timeout: int
 ) -> int:
@@ -283,13 +361,34 @@ def check_directory_write_permission(directory: str) -> bool:
         return False
 
 
+def locate_py_bin_base_addr_on_linux(server_pid: str) -> Optional[str]:
+    """
+    same as shell/linux/py_bin_base_addr_locate.sh without forking any process,
+    returns base addr in hex, an error message, or None if target runs another python
+    """
+    py_bin_path = os.path.realpath(sys.executable)
+    try:
+        if os.stat(f"/proc/{server_pid}").st_uid == 0 and os.geteuid() != 0:
+            return f"Target process is owned by root, try flight profiler by sudo flight_profiler {server_pid}"
+        server_bin_path = os.readlink(f"/proc/{server_pid}/exe")
+    except OSError:
+        return f"Target process_pid {server_pid} not exists!"
+    if py_bin_path != server_bin_path:
+        return None
+    base_addr = locate_base_addr(int(server_pid), py_bin_path)
+    return None if base_addr is None else format(base_addr, "x")
+
+
 def get_base_addr(current_directory: str, server_pid: str, platform: str) -> int:
-    base_addr_locate_shell_path = os.path.join(
-        current_directory, f"shell/{platform}/py_bin_base_addr_locate.sh"
-    )
-    base_addr = execute_shell(
-        base_addr_locate_shell_path, ["bash", base_addr_locate_shell_path, server_pid, str(sys.executable)]
-    )
+    if platform == "linux":
+        base_addr = locate_py_bin_base_addr_on_linux(server_pid)
+    else:
+        base_addr_locate_shell_path = os.path.join(
+            current_directory, f"shell/{platform}/py_bin_base_addr_locate.sh"
+        )
+        base_addr = execute_shell(
+            base_addr_locate_shell_path, ["bash", base_addr_locate_shell_path, server_pid, str(sys.executable)]
+        )
     if base_addr is None or len(base_addr) == 0:
         show_error_info(
             f"[Error] can't locate python bin base addr, please make sure target python process and flight_profiler is in the same python environment."
@@ -513,9 +612,11 @@ def run():
             print(msg)
         print()  # Empty line before welcome box
 
-    connect_port: int = check_server_injected(
-        server_pid, inject_start_port, inject_end_port, inject_timeout
-    )
+    connect_port: int = check_server_listening_unix(server_pid)
+    if connect_port < 0:
+        connect_port = check_server_injected(
+            server_pid, inject_start_port, inject_end_port, inject_timeout
+        )
     if connect_port < 0:
         free_port: int = find_port_available(inject_start_port, inject_end_port)
         if free_port < 0:
@@ -552,7 +653,11 @@ def run():
     if READLINE_AVAILABLE:
         readline.set_completer(completer)
         readline.parse_and_bind("tab: complete")
-    cli = ProfilerCli(port=connect_port, target_executable=get_py_bin_path(server_pid))
+    cli = ProfilerCli(
+        port=connect_port,
+        target_executable=get_py_bin_path(server_pid),
+        unix_path=get_agent_socket_path(server_pid),
+    )
     check_preload = cli.check_status(timeout=5)
     if not check_preload:
         # Print diagnostic info on failure (skip if already printed in debug mode)
@@ -561,6 +666,12 @@ def run():
                 print(msg)
         # here the injection routine is done successfully, but server has no chance to respond
         verify_exit_code(16, server_pid)
+    if args.debug:
+        from flight_profiler.plugins.status.cli_plugin_status import (
+            format_preload_timings,
+        )
+
+        print(f"preload:\n{format_preload_timings(cli.preload_timings)}\n")
 
     # load history cmd
     if os.path.exists(cli.history_file) and READLINE_AVAILABLE:
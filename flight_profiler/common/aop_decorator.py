@@ -1,6 +1,7 @@
+import gc
 import importlib
 import inspect
-from types import CodeType, FunctionType, ModuleType
+from types import CellType, CodeType, FrameType, FunctionType, ModuleType
 from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from flight_profiler.common.bytecode_transformer import (
@@ -9,29 +10,51 @@ from flight_profiler.common.bytecode_transformer import (
 )
 from flight_profiler.common.code_wrapper_entity import (
     CodeWrapperResult,
+    MonitoredCodeResult,
     NestedCodeWrapperResult,
+    TrampolineWrapperResult,
+)
+from flight_profiler.common.monitoring_backend import (
+    BACKEND_BYTECODE,
+    global_monitoring_backend,
 )
 from flight_profiler.common.system_logger import logger
 from flight_profiler.utils.render_util import COLOR_END, COLOR_ORANGE, COLOR_RED
 
 BUILT_IN_METHOD_TYPE = type(len)
+# C implemented functions of extension modules besides builtin_function_or_method
+C_FUNCTION_TYPE_NAMES = ("cython_function_or_method", "fused_cython_function")
+_MISSING = object()
 
 
-def find_class_function(cls, method_name):
-    for name, m in inspect.getmembers(
-        cls
-    ):
-        if inspect.isfunction(m):
-            if name == method_name:
-                return name, m, False
-        elif inspect.ismethod(m):
-            if name == method_name:
-                return name, m, True
+def is_c_callable(m: Any) -> bool:
+    """
+    callables without a __code__ to swap, they are patched by trampoline
+    """
+    return type(m) is BUILT_IN_METHOD_TYPE or type(m).__name__ in C_FUNCTION_TYPE_NAMES
+
 
+def lookup_class_attr(cls, name: str) -> Any:
+    """
+    raw attribute through the MRO, descriptors are not resolved
+    """
+    for klass in getattr(cls, "__mro__", (cls,)):
+        attrs = getattr(klass, "__dict__", {})
+        if name in attrs:
+            return attrs[name]
+    return _MISSING
+
+
+def find_class_function(cls, method_name):
+    if lookup_class_attr(cls, method_name) is _MISSING:
+        return None, None, False
     m = getattr(cls, method_name, None)
-    if m is not None:
-        if type(m) is BUILT_IN_METHOD_TYPE:
-            return method_name, m, False
+    if inspect.isfunction(m):
+        return method_name, m, False
+    elif inspect.ismethod(m):
+        return method_name, m, True
+    elif m is not None and is_c_callable(m):
+        return method_name, m, False
     return None, None, False
 
 def find_local_method_in_frame(method: CodeType, nested_method: str) -> Tuple[Optional[CodeType], int]:
@@ -50,19 +73,140 @@ def find_module_function(module: ModuleType, method_name: str) -> Tuple[Optional
     """
     return target_method, is_built_in_method
     """
-    for name, m in inspect.getmembers(
-        module, lambda x: inspect.isfunction(x) or inspect.ismethod(x)
-    ):
-        if name == method_name:
-            return m, False
-
-    m = getattr(module, method_name, None)
-    if m is not None:
-        if type(m) is BUILT_IN_METHOD_TYPE:
-            return m, True
+    m = vars(module).get(method_name, None)
+    if m is None:
+        # module level __getattr__
+        m = getattr(module, method_name, None)
+    if inspect.isfunction(m) or inspect.ismethod(m):
+        return m, False
+    if m is not None and is_c_callable(m):
+        return m, True
     return None, False
 
 
+def _is_profiler_object(obj: Any) -> bool:
+    """
+    namespaces of flight_profiler itself keep the origin callable
+    """
+    if isinstance(obj, dict):
+        name = obj.get("__name__")
+    elif isinstance(obj, (ModuleType, type)):
+        name = obj.__name__ if isinstance(obj, ModuleType) else obj.__module__
+    else:
+        name = type(obj).__module__
+    return (
+        isinstance(name, str)
+        and name.startswith("flight_profiler")
+        and ".test" not in name
+    )
+
+
+def _dict_owners(dicts: List[dict]) -> Dict[int, Any]:
+    """
+    object owning each dict, modules and classes win over functions whose
+    globals the dict is
+    """
+    dict_ids = {id(d) for d in dicts}
+    owners: Dict[int, Any] = dict()
+    for owner in gc.get_referrers(*dicts):
+        if isinstance(owner, (dict, list, tuple, FrameType)):
+            continue
+        for referent in gc.get_referents(owner):
+            if type(referent) is not dict or id(referent) not in dict_ids:
+                continue
+            current = owners.get(id(referent))
+            if current is None or (
+                not isinstance(current, (ModuleType, type))
+                and isinstance(owner, (ModuleType, type))
+            ):
+                owners[id(referent)] = owner
+    return owners
+
+
+def install_trampoline(origin_func: Any, wrapper_func: FunctionType) -> TrampolineWrapperResult:
+    """
+    C callables have no __code__ to swap, so every reference to origin_func in
+    module, class and instance namespaces, plain dicts and closure cells is
+    pointed at wrapper_func, including references taken before patching like
+    `from x import f` or callbacks stored in dicts.
+    """
+    result = TrampolineWrapperResult(origin_func, wrapper_func)
+    # the wrapper calls origin_func through its own closure
+    own_cells = {id(cell) for cell in wrapper_func.__closure__ or ()}
+    referrers = gc.get_referrers(origin_func)
+    dicts = [r for r in referrers if type(r) is dict]
+    owners = _dict_owners(dicts) if dicts else dict()
+    for referrer in referrers:
+        if type(referrer) is CellType:
+            if id(referrer) not in own_cells and referrer.cell_contents is origin_func:
+                referrer.cell_contents = wrapper_func
+                result.aliases.append((referrer, None))
+            continue
+        if type(referrer) is dict:
+            owner = owners.get(id(referrer))
+            if owner is None or isinstance(owner, ModuleType):
+                namespace = referrer
+            elif isinstance(owner, FunctionType):
+                # function attributes, e.g. __wrapped__ of the wrapper, are kept
+                if owner.__globals__ is not referrer:
+                    continue
+                namespace = referrer
+            else:
+                namespace = owner
+        elif isinstance(referrer, (list, tuple, FrameType, FunctionType, ModuleType, type)):
+            continue
+        else:
+            # instance attributes stored inline, without a dict object
+            namespace = referrer
+        if _is_profiler_object(namespace):
+            continue
+        try:
+            items = list(namespace.items() if type(namespace) is dict else vars(namespace).items())
+        except TypeError:
+            continue
+        for key, value in items:
+            if value is not origin_func or not isinstance(key, str) or key == "__wrapped__":
+                continue
+            if type(namespace) is dict:
+                namespace[key] = wrapper_func
+            else:
+                try:
+                    # builtins stored in a class are not bound, keep it so
+                    setattr(
+                        namespace,
+                        key,
+                        staticmethod(wrapper_func) if isinstance(namespace, type) else wrapper_func,
+                    )
+                except (AttributeError, TypeError):
+                    continue
+            result.aliases.append((namespace, key))
+    return result
+
+
+def remove_trampoline(result: TrampolineWrapperResult) -> None:
+    """
+    points aliases still referring the wrapper back at the origin callable
+    """
+    origin_func, wrapper_func = result.origin_func, result.wrapper_func
+    for namespace, key in result.aliases:
+        try:
+            if type(namespace) is CellType:
+                if namespace.cell_contents is wrapper_func:
+                    namespace.cell_contents = origin_func
+            elif type(namespace) is dict:
+                if namespace.get(key) is wrapper_func:
+                    namespace[key] = origin_func
+            else:
+                current = vars(namespace).get(key)
+                if isinstance(current, staticmethod):
+                    current = current.__func__
+                if current is wrapper_func:
+                    setattr(namespace, key, origin_func)
+        except (AttributeError, TypeError, ValueError):
+            logger.warning(f"restore alias {key} of {origin_func} failed")
+    result.aliases = []
+
+
 def find_method_by_mod_cls(module_name: str, cls_name: Optional[str], method_name: str) -> Tuple[
     Optional[FunctionType], bool, Optional[ModuleType]]:
     """ Find target method in module or class
@@ -110,6 +254,13 @@ def add_cls_func_wrapper(
                 None, True,  f"No method named {COLOR_ORANGE}{func_name}{COLOR_END}{COLOR_RED}"
                                               f" is found in class {class_name}!"
                     )
+        elif is_c_callable(m):
+            return CodeWrapperResult(
+                None,
+                True,
+                f"Builtin method {COLOR_ORANGE}{func_name}{COLOR_END}{COLOR_RED} of class {class_name}"
+                f" is not supported, watch it in its module instead!"
+            )
         else:
             if nested_method is not None:
                 nested_code_obj, nested_idx = find_local_method_in_frame(m.__code__, nested_method)
@@ -203,14 +354,16 @@ def add_module_func_wrapper(
                 )
                 return CodeWrapperResult(old_code_obj)
             else:
-                # builtin method only change in
+                # builtin method has no code object, patch it by trampoline
                 wrapper_func = wrapper_generator(wrapper_arg)(m)
-                setattr(module, func_name, wrapper_func)
+                trampoline = install_trampoline(m, wrapper_func)
+                if vars(module).get(func_name) is not wrapper_func:
+                    setattr(module, func_name, wrapper_func)
                 logger.info(
                     f"module {module.__name__} builtin function {func_name} "
-                    f"add wrapper successfully"
+                    f"add wrapper successfully, {len(trampoline.aliases)} references patched"
                 )
-                return CodeWrapperResult(m)
+                return CodeWrapperResult(trampoline)
         elif is_builtin:
             return CodeWrapperResult(
                 None,
@@ -276,6 +429,78 @@ def add_func_wrapper(
             nested_method=nested_method
         )
 
+def find_target_code(
+    module: ModuleType,
+    class_name: Optional[str],
+    func_name: str,
+    nested_method: str = None,
+    module_name: str = None,
+) -> Tuple[Optional[CodeType], Optional[str]]:
+    """
+    code object of the target method, returns (code, failed_reason)
+    """
+    if class_name is not None:
+        cls = getattr(module, class_name, None)
+        if cls is None:
+            return None, (
+                f"No class named {COLOR_ORANGE}{class_name}{COLOR_END}{COLOR_RED}"
+                f" is found in module {module_name}!"
+            )
+        _, m, is_class_method = find_class_function(cls, func_name)
+        if m is None:
+            return None, (
+                f"No method named {COLOR_ORANGE}{func_name}{COLOR_END}{COLOR_RED}"
+                f" is found in class {class_name}!"
+            )
+    else:
+        m, _ = find_module_function(module, func_name)
+        if m is None:
+            return None, (
+                f"No method named {COLOR_ORANGE}{func_name}{COLOR_END}{COLOR_RED}"
+                f" is found in module {module_name}!"
+            )
+    if inspect.ismethod(m):
+        m = m.__func__
+    if not inspect.isfunction(m):
+        return None, (
+            f"Builtin method {COLOR_ORANGE}{func_name}{COLOR_END}{COLOR_RED} has no python code,"
+            f" use --backend {BACKEND_BYTECODE} instead!"
+        )
+    code = m.__code__
+    if nested_method is not None:
+        code, _ = find_local_method_in_frame(code, nested_method)
+        if code is None:
+            return None, (
+                f"Nested method {COLOR_ORANGE}{nested_method}{COLOR_END}{COLOR_RED} is not found"
+                f" in module: {module_name} method: {func_name}!"
+            )
+    return code, None
+
+
+def add_func_monitor(
+    module: ModuleType,
+    class_name: Optional[str],
+    func_name: str,
+    command: Any,
+    nested_method: str = None,
+    module_name: str = None,
+) -> CodeWrapperResult:
+    """
+    records invocations of the target by sys.monitoring events instead of
+    swapping its code, see monitoring_backend
+    """
+    code, failed_reason = find_target_code(
+        module, class_name, func_name, nested_method, module_name
+    )
+    if code is None:
+        return CodeWrapperResult(None, True, failed_reason)
+    failed_reason = global_monitoring_backend.attach(code, command)
+    if failed_reason is not None:
+        return CodeWrapperResult(None, True, failed_reason)
+    logger.info(f"module {module.__name__} function {func_name} add monitor successfully")
+    return CodeWrapperResult(MonitoredCodeResult(code, command))
+
+
 def clear_cls_func_wrapper(module, class_name, func_name, origin_func):
     cls = getattr(module, class_name, None)
     if cls is not None:
@@ -309,7 +534,9 @@ def clear_cls_func_wrapper(module, class_name, func_name, origin_func):
 
 
 def clear_module_func_wrapper(
-    module, func_name, origin_func: Union[CodeType, FunctionType, NestedCodeWrapperResult]
+    module,
+    func_name,
+    origin_func: Union[CodeType, FunctionType, NestedCodeWrapperResult, TrampolineWrapperResult],
 ):
     # if builtin method is wrapped, current must be a non-builtin method, so can't use is_builtin to recover
     m, is_builtin = find_module_function(module, func_name)
@@ -332,6 +559,15 @@ def clear_module_func_wrapper(
                 origin_func.escaped_func.__code__ = origin_func.escaped_func_origin_code
             if origin_func.outer_func is not None:
                 origin_func.outer_func.__code__ = origin_func.outer_func_origin_code
+        elif type(origin_func) is TrampolineWrapperResult:
+            remove_trampoline(origin_func)
+            if vars(module).get(func_name) is origin_func.wrapper_func:
+                setattr(module, func_name, origin_func.origin_func)
+            logger.info(
+                f"module {module.__name__} builtin function {func_name} "
+                f"clear wrapper successfully"
+            )
+            return m
         else:
             setattr(module, func_name, origin_func)
             logger.info(
@@ -342,6 +578,9 @@ def clear_module_func_wrapper(
 
 
 def clear_func_wrapper(module: ModuleType, class_name: str, func_name: str, origin_func: Union[CodeType, NestedCodeWrapperResult]):
+    if type(origin_func) is MonitoredCodeResult:
+        global_monitoring_backend.detach(origin_func.code, origin_func.command)
+        return None
     if class_name is not None:
         return clear_cls_func_wrapper(module, class_name, func_name, origin_func)
     else:
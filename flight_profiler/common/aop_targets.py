@@ -0,0 +1,211 @@
+import fnmatch
+import importlib
+import os
+import re
+import sys
+from types import FunctionType, ModuleType
+from typing import (
+    TYPE_CHECKING,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Pattern,
+    Tuple,
+)
+
+from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
+
+if TYPE_CHECKING:
+    from flight_profiler.common.enter_exit_command import EnterExitCommand
+
+# prefix of a regular expression name, otherwise names with * or ? are globs
+REGEX_PREFIX = "re:"
+# a pattern command refuses to instrument more methods than this
+MAX_AOP_TARGETS = max(1, int(os.getenv("PYFLIGHT_MAX_AOP_TARGETS", 256)))
+
+
+class AopTarget(NamedTuple):
+    module_name: str
+    class_name: Optional[str]
+    method_name: str
+
+
+def is_name_pattern(name: Optional[str]) -> bool:
+    return name is not None and (
+        name.startswith(REGEX_PREFIX) or "*" in name or "?" in name
+    )
+
+
+def is_target_pattern(
+    module_name: str, class_name: Optional[str], method_name: str
+) -> bool:
+    return (
+        is_name_pattern(module_name)
+        or is_name_pattern(class_name)
+        or is_name_pattern(method_name)
+    )
+
+
+def compile_name_pattern(name: str) -> Pattern:
+    """
+    `re:<regex>` is a regular expression, otherwise a glob, both match whole name
+    """
+    if name.startswith(REGEX_PREFIX):
+        return re.compile(f"(?:{name[len(REGEX_PREFIX):]})\\Z")
+    return re.compile(fnmatch.translate(name))
+
+
+def _is_method(value) -> bool:
+    # static methods are skipped, class wrappers take args[0] as the target
+    if isinstance(value, classmethod):
+        value = value.__func__
+    return type(value) is FunctionType
+
+
+class ModuleIndex:
+    """
+    Index of instrumentable methods over sys.modules. Module names are rescanned
+    when sys.modules grows or shrinks, methods of a module when its namespace
+    changes size, so repeated pattern commands do not walk every module again.
+    """
+
+    def __init__(self):
+        self.__modules_count = -1
+        self.__module_names: List[str] = []
+        self.__targets: Dict[str, Tuple[Tuple[int, int], List[AopTarget]]] = dict()
+
+    def module_names(self) -> List[str]:
+        if len(sys.modules) != self.__modules_count:
+            modules = list(sys.modules.items())
+            self.__module_names = sorted(
+                name
+                for name, module in modules
+                if isinstance(module, ModuleType)
+                # never instrument the profiler itself
+                and not name.startswith("flight_profiler")
+            )
+            self.__modules_count = len(modules)
+            for name in list(self.__targets.keys()):
+                if name not in sys.modules:
+                    self.__targets.pop(name, None)
+        return self.__module_names
+
+    def module_targets(self, module_name: str) -> List[AopTarget]:
+        """
+        functions and class methods defined in the module, re-exported names
+        are indexed by the module defining them
+        """
+        module = sys.modules.get(module_name)
+        if not isinstance(module, ModuleType):
+            return []
+        namespace = module.__dict__
+        signature = (id(module), len(namespace))
+        cached = self.__targets.get(module_name)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+
+        targets: List[AopTarget] = []
+        for name, value in list(namespace.items()):
+            if getattr(value, "__module__", None) != module_name:
+                continue
+            if type(value) is FunctionType:
+                targets.append(AopTarget(module_name, None, name))
+            elif isinstance(value, type):
+                try:
+                    members = list(vars(value).items())
+                except TypeError:
+                    continue
+                for method_name, member in members:
+                    if _is_method(member):
+                        targets.append(AopTarget(module_name, name, method_name))
+        self.__targets[module_name] = (signature, targets)
+        return targets
+
+    def resolve(
+        self, module_name: str, class_name: Optional[str], method_name: str
+    ) -> List[AopTarget]:
+        """
+        methods matching the names, each name is either exact or a pattern,
+        module functions only when class_name is None
+        """
+        if is_name_pattern(module_name):
+            module_pattern = compile_name_pattern(module_name)
+            module_names = [
+                name for name in self.module_names() if module_pattern.match(name)
+            ]
+        else:
+            # import it like a single target command does
+            importlib.import_module(module_name)
+            module_names = [module_name]
+
+        class_pattern = (
+            compile_name_pattern(class_name) if is_name_pattern(class_name) else None
+        )
+        method_pattern = (
+            compile_name_pattern(method_name) if is_name_pattern(method_name) else None
+        )
+        matched: List[AopTarget] = []
+        for name in module_names:
+            for target in self.module_targets(name):
+                if class_name is None:
+                    if target.class_name is not None:
+                        continue
+                elif target.class_name is None or not (
+                    class_pattern.match(target.class_name)
+                    if class_pattern is not None
+                    else target.class_name == class_name
+                ):
+                    continue
+                if method_pattern is not None:
+                    if not method_pattern.match(target.method_name):
+                        continue
+                elif target.method_name != method_name:
+                    continue
+                matched.append(target)
+        return matched
+
+
+global_module_index = ModuleIndex()
+
+
+def resolve_aop_targets(
+    module_name: str, class_name: Optional[str], method_name: str
+) -> List[AopTarget]:
+    """
+    resolve a pattern command to its targets, raises ValueError when nothing
+    matches or too many methods match
+    """
+    targets = global_module_index.resolve(module_name, class_name, method_name)
+    location = " ".join(n for n in (module_name, class_name, method_name) if n)
+    if len(targets) == 0:
+        raise ValueError(f"No method matches {location}!")
+    if len(targets) > MAX_AOP_TARGETS:
+        raise ValueError(
+            f"{len(targets)} methods match {location}, more than {MAX_AOP_TARGETS}"
+            f" (PYFLIGHT_MAX_AOP_TARGETS), narrow the pattern!"
+        )
+    return targets
+
+
+def apply_to_targets(
+    command: "EnterExitCommand",
+    for_target: Callable[[AopTarget], "EnterExitCommand"],
+    wrap: Callable[["EnterExitCommand"], CodeWrapperResult],
+) -> Optional[str]:
+    """
+    wraps every method matched by the command's names with a member command
+    built by for_target, all or none, returns the failed reason if any
+    """
+    if getattr(command, "nested_method", None) is not None:
+        return "Nested method is not supported when names are patterns!"
+    try:
+        targets = resolve_aop_targets(
+            command.module_name, command.class_name, command.method_name
+        )
+    except re.error as e:
+        return f"Invalid name pattern: {e}!"
+    except Exception as e:
+        return str(e)
+    return command.apply_members([for_target(t) for t in targets], wrap)
@@ -0,0 +1,40 @@
+import threading
+
+try:
+    from flight_profiler.ext.atomic_C import AtomicCounter
+except ImportError:
+    AtomicCounter = None
+
+
+class _LockCounter:
+    """
+    fallback without the extension, the lock belongs to the counter and reading
+    the value takes no lock
+    """
+
+    def __init__(self, initial: int = 0):
+        self.__lock = threading.Lock()
+        self.__value = initial
+
+    def increment(self) -> int:
+        with self.__lock:
+            self.__value += 1
+            return self.__value
+
+    def add(self, delta: int) -> int:
+        with self.__lock:
+            self.__value += delta
+            return self.__value
+
+    @property
+    def value(self) -> int:
+        return self.__value
+
+
+def new_counter(initial: int = 0):
+    """
+    counter whose increment() returns a unique value to each caller
+    """
+    if AtomicCounter is not None:
+        return AtomicCounter(initial)
+    return _LockCounter(initial)
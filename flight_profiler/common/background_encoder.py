@@ -0,0 +1,87 @@
+import copy
+import os
+import queue
+import threading
+from typing import Any, Callable
+
+from flight_profiler.common.system_logger import logger
+
+# bound of encode tasks waiting for the encoder thread, beyond it records are dropped
+ENCODER_QUEUE_CAPACITY = max(1, int(os.getenv("PYFLIGHT_ENCODER_QUEUE_CAPACITY", 1024)))
+
+_SNAPSHOT_TYPES = (list, dict, set, bytearray)
+
+
+def shallow_snapshot(value: Any) -> Any:
+    """
+    copies builtin mutable containers reachable through tuples, watch expressions
+    like `args,kwargs` evaluate to tuples of the watched values, so a value
+    rebound or resized by the caller after the invocation is still encoded as
+    it was, objects deeper inside are shared
+    """
+    value_type = type(value)
+    if value_type is tuple:
+        return tuple([shallow_snapshot(v) for v in value])
+    if value_type in _SNAPSHOT_TYPES:
+        return value.copy()
+    return value
+
+
+def deep_snapshot(value: Any) -> Any:
+    """
+    deep copy of value, objects which cannot be copied fall back to a shallow snapshot
+    """
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return shallow_snapshot(value)
+
+
+class BackgroundEncoder:
+    """
+    Runs encode tasks on one daemon thread in submission order, so objects are
+    encoded and pickled off the instrumented call. The task queue is bounded,
+    a full queue rejects records instead of growing or blocking the caller.
+    """
+
+    def __init__(self, capacity: int = ENCODER_QUEUE_CAPACITY):
+        self.capacity = capacity
+        self.__tasks: "queue.SimpleQueue[Callable[[], None]]" = queue.SimpleQueue()
+        self.__thread = None
+        self.__lock = threading.Lock()
+
+    def submit(self, task: Callable[[], None], force: bool = False) -> bool:
+        """
+        queues task, returns False when the queue is full, force bypasses the
+        bound for messages which must not be lost, such as end messages
+        """
+        if not force and self.__tasks.qsize() >= self.capacity:
+            return False
+        if self.__thread is None:
+            self.__start()
+        self.__tasks.put(task)
+        return True
+
+    def pending(self) -> int:
+        return self.__tasks.qsize()
+
+    def __start(self) -> None:
+        with self.__lock:
+            if self.__thread is None:
+                thread = threading.Thread(
+                    target=self.__run, name="flight-profiler-encoder", daemon=True
+                )
+                thread.start()
+                self.__thread = thread
+
+    def __run(self) -> None:
+        tasks = self.__tasks
+        while True:
+            task = tasks.get()
+            try:
+                task()
+            except:
+                logger.exception("background encode task failed.")
+
+
+global_background_encoder = BackgroundEncoder()
@@ -2,19 +2,89 @@
 bytecode transformer methods
 """
 
+import dis
 import gc
 import importlib
-import re
-import sys
 import types
-from copy import deepcopy
 from types import CellType, CodeType, FunctionType
 from typing import Any, Dict, List, Optional
 
-import opcode
-
 from flight_profiler.common.code_wrapper_entity import NestedCodeWrapperResult
 
+EXTENDED_ARG = dis.opmap["EXTENDED_ARG"]
+LOAD_CONST = dis.opmap["LOAD_CONST"]
+NOP = dis.opmap["NOP"]
+
+
+# instruction rewritten wrapper code by the code object of the wrapper template,
+# a template is one wrapper kind (watch/trace/tt/torch, sync or async) of this
+# interpreter version, activations only splice wrapper_arg and func into it
+_wrapper_templates: Dict[CodeType, CodeType] = dict()
+# const slots appended to the template consts
+WRAPPER_ARG_SLOT = 0
+FUNC_SLOT = 1
+
+
+def _rewrite_instruction(
+    code: bytearray, instructions: List[dis.Instruction], idx: int, op: int, arg: int
+) -> None:
+    """
+    rewrite instruction idx together with its EXTENDED_ARG prefixes in place,
+    the instruction width is kept so no jump target moves
+    """
+    start = idx
+    while start > 0 and instructions[start - 1].opcode == EXTENDED_ARG:
+        start -= 1
+    prefixes = [instructions[i].offset for i in range(start, idx)]
+    if arg >= 1 << (8 * (len(prefixes) + 1)):
+        raise ValueError(
+            f"arg {arg} of {dis.opname[op]} does not fit at offset {instructions[idx].offset}"
+        )
+    for i, offset in enumerate(prefixes):
+        code[offset] = EXTENDED_ARG
+        code[offset + 1] = (arg >> (8 * (len(prefixes) - i))) & 0xFF
+    code[instructions[idx].offset] = op
+    code[instructions[idx].offset + 1] = arg & 0xFF
+
+
+def _build_wrapper_template(
+    wrap_function: FunctionType, fn: FunctionType, wrapper_arg
+) -> CodeType:
+    """
+    decode the wrapper instructions, LOAD_DEREF of the origin func and the
+    wrapper arg become LOAD_CONST of two slots appended to the consts, so the
+    code has no free variable of its own and can take fn's closure.
+    COPY_FREE_VARS (3.11+) becomes NOP.
+    """
+    wrap_code: CodeType = wrap_function.__code__
+    slots: Dict[str, int] = dict()
+    for name, cell in zip(wrap_code.co_freevars, wrap_function.__closure__ or ()):
+        contents = cell.cell_contents
+        if contents is fn:
+            slots[name] = FUNC_SLOT
+        elif contents is wrapper_arg:
+            slots[name] = WRAPPER_ARG_SLOT
+        else:
+            raise ValueError(f"wrapper {wrap_code.co_name} closes over unsupported variable {name}")
+
+    const_base = len(wrap_code.co_consts)
+    code = bytearray(wrap_code.co_code)
+    instructions = list(dis.get_instructions(wrap_code))
+    for idx, instr in enumerate(instructions):
+        if instr.opname == "COPY_FREE_VARS":
+            _rewrite_instruction(code, instructions, idx, NOP, 0)
+        elif instr.opcode in dis.hasfree and instr.argval in slots:
+            if instr.opname != "LOAD_DEREF":
+                raise ValueError(
+                    f"wrapper {wrap_code.co_name} has unsupported {instr.opname} of {instr.argval}"
+                )
+            _rewrite_instruction(
+                code, instructions, idx, LOAD_CONST, const_base + slots[instr.argval]
+            )
+    return wrap_code.replace(
+        co_code=bytes(code), co_consts=wrap_code.co_consts + (None, None)
+    )
+
 
 def _execute_bytecode_transform_intern(
     fn: FunctionType,
@@ -27,7 +97,8 @@ def _execute_bytecode_transform_intern(
     replace fn.__code__ with wrapper func __code__, where wrapper_generator has single arg
 
     1. replace LOAD_DEREF with LOAD_CONST, for closure num should be same to nfree,
-        so put cell variable to const variable to avoid this rule
+        so put cell variable to const variable to avoid this rule, the rewritten
+        template is cached per wrapper code
     2. copy fn to avoid infinite recursion
     3. add global_module to global space, which module is used byte LOAD_GLOBAL
 
@@ -40,43 +111,10 @@ def _execute_bytecode_transform_intern(
     """
     wrap_function: FunctionType = wrapper_generator(wrapper_arg)(fn)
     wrap_code: CodeType = wrap_function.__code__
-
-    const_var_len = len(wrap_code.co_consts)
-    alt_wrapper_arg = bytes([opcode.opmap["LOAD_CONST"], const_var_len])
-    alt_func = bytes([opcode.opmap["LOAD_CONST"], const_var_len + 1])
-
-    # cell: [func, watch_setting]
-    closure_shift = 0
-    if sys.version_info >= (3, 11):
-        closure_shift = len(wrap_function.__code__.co_varnames)
-    deref_wrapper_arg: bytes = bytes([opcode.opmap["LOAD_DEREF"], closure_shift + 1])
-    deref_func = bytes([opcode.opmap["LOAD_DEREF"], closure_shift])
-    deref_pattern = (
-        bytes([opcode.opmap["LOAD_DEREF"]]) + r"[\s\S]".encode()
-    )  # match space&non-space character
-    matches = [
-        (match.start(), match.group())
-        for match in re.finditer(deref_pattern, wrap_code.co_code)
-    ]
-    alternate_code = deepcopy(wrap_code.co_code)
-    for match in matches:
-        if match[0] % 2 != 0:
-            # if jump to immediate, may coincide with LOAD_DEREF bytecode
-            # first argument must be bytecode type
-            continue
-
-        if match[1] == deref_wrapper_arg:
-            alternate_code = (
-                alternate_code[: match[0]]
-                + alt_wrapper_arg
-                + alternate_code[(match[0] + 2) :]
-            )
-        elif match[1] == deref_func:
-            alternate_code = (
-                alternate_code[: match[0]] + alt_func + alternate_code[(match[0] + 2) :]
-            )
-        else:
-            raise ValueError(f"wrap code has invalid LOAD DEREF bytecode: {match[1]}")
+    template: Optional[CodeType] = _wrapper_templates.get(wrap_code)
+    if template is None:
+        template = _build_wrapper_template(wrap_function, fn, wrapper_arg)
+        _wrapper_templates[wrap_code] = template
 
     global_space: Dict = fn.__globals__
     for module in global_module:
@@ -98,58 +136,10 @@ def _execute_bytecode_transform_intern(
     copy_fn.__dict__.update(fn.__dict__)
     copy_fn.__qualname__ = fn.__qualname__
 
-    if sys.version_info >= (3, 11):
-        # emit COPY_FREE_VARIABLE
-        nop_code = bytes([opcode.opmap["NOP"], opcode.opmap["NOP"]])
-        alternate_code = nop_code + alternate_code[2:]
-        new_codeobj = types.CodeType(
-            wrap_code.co_argcount,
-            wrap_code.co_posonlyargcount,
-            wrap_code.co_kwonlyargcount,
-            wrap_code.co_nlocals,
-            wrap_code.co_stacksize,
-            wrap_code.co_flags,
-            alternate_code,
-            wrap_code.co_consts
-            + (
-                wrapper_arg,
-                copy_fn,
-            ),
-            wrap_code.co_names,
-            wrap_code.co_varnames,
-            wrap_code.co_filename,
-            wrap_code.co_name,
-            wrap_code.co_qualname,
-            wrap_code.co_firstlineno,
-            wrap_code.co_linetable,
-            wrap_code.co_exceptiontable,
-            fn.__code__.co_freevars,
-            wrap_code.co_cellvars,
-        )
-    else:
-        new_codeobj = types.CodeType(
-            wrap_code.co_argcount,
-            wrap_code.co_posonlyargcount,
-            wrap_code.co_kwonlyargcount,
-            wrap_code.co_nlocals,
-            wrap_code.co_stacksize,
-            wrap_code.co_flags,
-            alternate_code,
-            wrap_code.co_consts
-            + (
-                wrapper_arg,
-                copy_fn,
-            ),
-            wrap_code.co_names,
-            wrap_code.co_varnames,
-            wrap_code.co_filename,
-            wrap_code.co_name,
-            wrap_code.co_firstlineno,
-            wrap_code.co_lnotab,
-            fn.__code__.co_freevars,
-            wrap_code.co_cellvars,
-        )
-    return new_codeobj
+    return template.replace(
+        co_consts=template.co_consts[:-2] + (wrapper_arg, copy_fn),
+        co_freevars=fn.__code__.co_freevars,
+    )
 
 def transform_normal_method_by_aop_wrapper(
     fn: FunctionType,
@@ -186,49 +176,7 @@ def _execute_nested_code_const_substitute(
     outer_func_code: CodeType = outer_func.__code__
     list_co_consts = list(outer_func_code.co_consts)
     list_co_consts[nested_code_idx] = wrapped_code_obj
-    refactor_consts = tuple(list_co_consts)
-    if sys.version_info >= (3, 11):
-        new_codeobj = types.CodeType(
-            outer_func_code.co_argcount,
-            outer_func_code.co_posonlyargcount,
-            outer_func_code.co_kwonlyargcount,
-            outer_func_code.co_nlocals,
-            outer_func_code.co_stacksize,
-            outer_func_code.co_flags,
-            outer_func_code.co_code,
-            refactor_consts,
-            outer_func_code.co_names,
-            outer_func_code.co_varnames,
-            outer_func_code.co_filename,
-            outer_func_code.co_name,
-            outer_func_code.co_qualname,
-            outer_func_code.co_firstlineno,
-            outer_func_code.co_linetable,
-            outer_func_code.co_exceptiontable,
-            outer_func_code.co_freevars,
-            outer_func_code.co_cellvars,
-        )
-        return new_codeobj
-    else:
-        new_codeobj = types.CodeType(
-            outer_func_code.co_argcount,
-            outer_func_code.co_posonlyargcount,
-            outer_func_code.co_kwonlyargcount,
-            outer_func_code.co_nlocals,
-            outer_func_code.co_stacksize,
-            outer_func_code.co_flags,
-            outer_func_code.co_code,
-            refactor_consts,
-            outer_func_code.co_names,
-            outer_func_code.co_varnames,
-            outer_func_code.co_filename,
-            outer_func_code.co_name,
-            outer_func_code.co_firstlineno,
-            outer_func_code.co_lnotab,
-            outer_func_code.co_freevars,
-            outer_func_code.co_cellvars,
-        )
-        return new_codeobj
+    return outer_func_code.replace(co_consts=tuple(list_co_consts))
 
 
 def transform_nested_method_by_aop_wrapper(
@@ -0,0 +1,36 @@
+"""
+Clock timing watch, tt and trace invocations.
+
+Costs are differences of a monotonic clock, so a wall clock step by NTP or by
+hand cannot make them negative or huge. Start times shown to users are wall
+clock times, a command converts its monotonic timestamps with an offset taken
+once when it is created. The native trace profiler times frames with its own
+monotonic clock, selected by PYFLIGHT_TRACE_CLOCK, see set_trace_clock.
+"""
+import os
+import time
+
+# monotonic nanoseconds, the highest resolution clock of the platform, wrappers
+# rebound into target modules call time.perf_counter_ns as only modules are
+# added to their globals
+now_ns = time.perf_counter_ns
+
+# clock of the native trace profiler: monotonic, coarse (CLOCK_MONOTONIC_COARSE,
+# cheaper and ticks every few milliseconds) or tsc (calibrated cpu counter,
+# falls back to monotonic without an invariant tsc)
+TRACE_CLOCK = os.getenv("PYFLIGHT_TRACE_CLOCK", "monotonic")
+
+
+class WallClock:
+    """
+    wall clock time of monotonic timestamps
+    """
+
+    def __init__(self):
+        self.offset_ns = time.time_ns() - now_ns()
+
+    def to_ns(self, monotonic_ns: int) -> int:
+        return monotonic_ns + self.offset_ns
+
+    def to_ms(self, monotonic_ns: int) -> int:
+        return (monotonic_ns + self.offset_ns) // 1_000_000
@@ -1,6 +1,6 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from types import CodeType, FunctionType
-from typing import Optional, Union
+from typing import Any, List, Optional, Tuple, Union
 
 
 @dataclass
@@ -18,3 +18,21 @@ class CodeWrapperResult:
     value: Union[Optional[Union[FunctionType, CodeType]], NestedCodeWrapperResult]
     failed: bool = False
     failed_reason: Optional[str] = None
+
+
+@dataclass
+class TrampolineWrapperResult:
+    origin_func: Any
+    wrapper_func: FunctionType
+    # (namespace, name) pointed at wrapper_func instead of origin_func, namespace is
+    # a dict, a closure cell or an object patched by setattr
+    aliases: List[Tuple[Any, Optional[str]]] = field(default_factory=list)
+
+
+@dataclass
+class MonitoredCodeResult:
+    # code object whose events are enabled by the sys.monitoring backend
+    code: CodeType
+    command: Any
+    # nested code objects are monitored directly, nothing is built at runtime
+    need_wrap_nested_inplace: bool = False
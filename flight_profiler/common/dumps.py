@@ -1,193 +1,268 @@
 import datetime
 import decimal
 import enum
+import heapq
+import io
 import json
-from typing import Any, List
+import os
+import reprlib
+from itertools import chain, islice
+from typing import Any, Iterator, List, Optional
 
+from flight_profiler.common.type_summarizers import summarizer_of
 
-def _make_iterencode(obj: Any, max_depth: int, current_indent_level: int, _indent: str = "  ", verbose: bool = False) -> str:
-    """
-    Generator function to recursively encode Python objects to a string representation with indentation.
-    Supports various data types including basic types, collections, custom objects, and special types.
+# encoding stops after this many characters or encoded values, the text is cut
+# there and ends with a truncation note
+ENCODE_MAX_CHARS = max(1, int(os.getenv("PYFLIGHT_ENCODE_MAX_CHARS", 4 * 1024 * 1024)))
+ENCODE_MAX_NODES = max(1, int(os.getenv("PYFLIGHT_ENCODE_MAX_NODES", 200000)))
+
+# unless verbose, collections longer than a threshold show only the first and
+# last half of it with ... in between, the first threshold exceeded applies
+_VERBOSE_THRESHOLDS = (20, 10)
+# stands for the skipped middle of a collection
+_ELLIPSIS = object()
+_END = object()
+
+_dict_getitem = dict.__getitem__
+
+# collections at the depth limit are written by a repr bounded like the items
+# shown, longer ones by their type and length only
+_depth_limit_repr = reprlib.Repr()
+_depth_limit_repr.maxlevel = 1
+_depth_limit_repr.maxlist = _depth_limit_repr.maxtuple = _VERBOSE_THRESHOLDS[-1]
+_depth_limit_repr.maxset = _depth_limit_repr.maxfrozenset = _VERBOSE_THRESHOLDS[-1]
+_depth_limit_repr.maxdict = _VERBOSE_THRESHOLDS[-1]
+_depth_limit_repr.maxstring = _depth_limit_repr.maxother = 256
 
-    Args:
-        obj: The object to encode
-        max_depth: Maximum depth for recursive encoding to prevent infinite recursion
-        current_indent_level: Current indentation level for nested objects
-        _indent: String used for indentation (default is 2 spaces)
-        verbose: Whether to show all elements of collections or limit to first/last 10 with ... in between
 
-    Yields:
-        String fragments representing the encoded object
+def _shown_half(length: int, verbose: bool) -> int:
     """
+    number of items shown at each end of a collection, 0 when all are shown
+    """
+    if not verbose:
+        for threshold in _VERBOSE_THRESHOLDS:
+            if length > threshold:
+                return threshold // 2
+    return 0
 
-    def iterate_dict(d, depth, _current_indent_level, verbose=False):
-        """Helper function to encode dictionary objects with proper indentation."""
-        if not d:
-            yield '{}'
-            return
-        if depth <= 0:
-            yield repr(d)
-            return
-        yield '{'
-        _current_indent_level += 1
-        newline_indent = '\n' + _indent * _current_indent_level + ""
-        item_separator = ", " + newline_indent
-        yield newline_indent
-        first = True
-        items = sorted(d.items())
-
-        # If verbose is False and the dictionary is large, show only first 10 and last 10 items
-        verbose_thresholds: List[int] = [20, 10]
-        for thresh in verbose_thresholds:
-            half: int = thresh // 2
-            if not verbose and len(items) > thresh:  # If more than 20 items, show first 10 + ... + last 10
-                for i, (key, value) in enumerate(items):
-                    if i < half:  # First 10 items
-                        if first:
-                            first = False
-                        else:
-                            yield item_separator
-                        # Handle non-string keys in dictionaries
-                        yield f"\"{str(key)}\": "
-                        yield from _make_iterencode(value, max_depth=depth - 1,
-                                                    current_indent_level=_current_indent_level, verbose=verbose)
-                    elif i == half:  # Add ... after the first 10 items
-                        yield item_separator
-                        yield '...'
-                    elif i >= len(items) - half:  # Last 10 items
-                        yield item_separator
-                        # Handle non-string keys in dictionaries
-                        yield f"\"{str(key)}\": "
-                        yield from _make_iterencode(value, max_depth=depth - 1,
-                                                    current_indent_level=_current_indent_level, verbose=verbose)
-                    else:
-                        continue  # Skip items in the middle
-                break
-        else:
-            for key, value in items:
-                if first:
-                    first = False
-                else:
-                    yield item_separator
-                # Handle non-string keys in dictionaries
-                yield f"\"{str(key)}\": "
-                yield from _make_iterencode(value, max_depth=depth - 1, current_indent_level=_current_indent_level,
-                                            verbose=verbose)
-
-        _current_indent_level -= 1
-        yield '\n' + _indent * _current_indent_level
-        yield '}'
-
-    def _iterencode_listable(lst, depth, _current_indent_level, prefix: str, suffix: str, verbose=False):
-        """Helper function to encode list-like objects (list, tuple, set) with proper indentation."""
-        if not lst:
-            yield f'{prefix}{suffix}'
-            return
-        if depth <= 0:
-            yield repr(lst)
-            return
-        yield prefix
-        _current_indent_level += 1
-        newline_indent = '\n' + _indent * _current_indent_level
-        _item_separator = "," + newline_indent
-        yield newline_indent
-        first = True
-
-        # If verbose is False and the list is large, show only first 10 and last 10 items
-        verbose_thresholds: List[int] = [20, 10]
-        for thresh in verbose_thresholds:
-            half: int = thresh // 2
-            if not verbose and len(lst) > thresh:  # If more than 20 items, show first 10 + ... + last 10
-                for i, value in enumerate(lst):
-                    if i < half:  # First 10 items
-                        if first:
-                            first = False
-                        else:
-                            yield _item_separator
-                        yield from _make_iterencode(value, max_depth=depth - 1, current_indent_level=_current_indent_level, verbose=verbose)
-                    elif i == half:  # Add ... after the first 10 items
-                        yield _item_separator
-                        yield '...'
-                    elif i >= len(lst) - half:  # Last 10 items
-                        yield _item_separator
-                        yield from _make_iterencode(value, max_depth=depth - 1, current_indent_level=_current_indent_level, verbose=verbose)
-                    else:
-                        continue  # Skip items in the middle
-                break
-        else:  # If verbose is True or less than 10 items, show all items
-            for value in lst:
-                if first:
-                    first = False
-                else:
-                    yield _item_separator
-                yield from _make_iterencode(value, max_depth=depth - 1, current_indent_level=_current_indent_level, verbose=verbose)
 
-        _current_indent_level -= 1
-        yield '\n' + _indent * _current_indent_level
-        yield suffix
+def _shown_sequence(seq, half: int) -> Iterator:
+    if half == 0:
+        return iter(seq)
+    return chain(seq[:half], (_ELLIPSIS,), seq[len(seq) - half:])
 
-    # Handle string objects - wrap in single quotes
-    if isinstance(obj, str):
-        if not verbose and len(obj) > 256:
-            yield f'"{obj[:128]}...{obj[-128:]}"'
-        else:
-            yield f'"{obj}"'
-    # Handle dictionary objects
-    elif isinstance(obj, dict):
-        yield from iterate_dict(obj, depth=max_depth, _current_indent_level=current_indent_level, verbose=verbose)
-    # Handle list, tuple, and set objects
-    elif isinstance(obj, list):
-        yield from _iterencode_listable(list(obj), depth=max_depth, _current_indent_level=current_indent_level, prefix="[", suffix="]", verbose=verbose)
-    elif isinstance(obj, tuple):
-        yield from _iterencode_listable(list(obj), depth=max_depth, _current_indent_level=current_indent_level, prefix="(", suffix=")", verbose=verbose)
-    elif isinstance(obj, set):
-        yield from _iterencode_listable(list(obj), depth=max_depth, _current_indent_level=current_indent_level, prefix="set(", suffix=")", verbose=verbose)
-    elif obj is True:
-        yield 'True'
-    elif obj is False:
-        yield 'False'
-    elif obj is None:
-        yield 'None'
+
+def _shown_set(s, half: int) -> Iterator:
+    if half == 0:
+        return iter(s)
+    # sets have no order, the items shown are the first ones iterated
+    items = iter(s)
+    head = list(islice(items, half))
+    return chain(head, (_ELLIPSIS,), list(islice(items, half)))
+
+
+def _shown_keys(d: dict, half: int) -> Iterator:
+    """
+    keys in sorted order, in insertion order when they are not comparable
+    """
+    try:
+        if half == 0:
+            return iter(sorted(d))
+        return chain(heapq.nsmallest(half, d), (_ELLIPSIS,), heapq.nlargest(half, d)[::-1])
+    except Exception:
+        if half == 0:
+            return iter(list(d))
+        tail = list(islice(reversed(d), half))
+        tail.reverse()
+        return chain(list(islice(d, half)), (_ELLIPSIS,), tail)
+
+
+def _leaf_text(obj: Any) -> Optional[str]:
+    """
+    text of a value which is not a string or a collection, None for custom
+    objects which are encoded by their attributes
+    """
+    if obj is True:
+        return 'True'
+    if obj is False:
+        return 'False'
+    if obj is None:
+        return 'None'
     # Handle numeric types (int, float, complex, decimal)
-    elif isinstance(obj, (int, float)):
-        yield str(obj)
-    elif isinstance(obj, complex):
-        yield f"{obj}"
-    elif isinstance(obj, decimal.Decimal):
-        yield f'Decimal("{obj}")'
+    if isinstance(obj, (int, float)):
+        return str(obj)
+    if isinstance(obj, complex):
+        return f"{obj}"
+    if isinstance(obj, decimal.Decimal):
+        return f'Decimal("{obj}")'
     # Handle datetime objects
-    elif isinstance(obj, datetime.datetime):
-        yield f'datetime.datetime.fromisoformat("{obj.isoformat()}")'
-    elif isinstance(obj, datetime.date):
-        yield f'datetime.date.fromisoformat("{obj.isoformat()}")'
-    elif isinstance(obj, datetime.time):
-        yield f'datetime.time.fromisoformat("{obj.isoformat()}")'
+    if isinstance(obj, datetime.datetime):
+        return f'datetime.datetime.fromisoformat("{obj.isoformat()}")'
+    if isinstance(obj, datetime.date):
+        return f'datetime.date.fromisoformat("{obj.isoformat()}")'
+    if isinstance(obj, datetime.time):
+        return f'datetime.time.fromisoformat("{obj.isoformat()}")'
     # Handle enum objects
-    elif isinstance(obj, enum.Enum):
-        yield f"{type(obj).__name__}.{obj.name}"
-    # Handle custom objects with __dict__ attribute
-    elif hasattr(obj, '__dict__'):
-        obj_type = type(obj).__name__
-        yield f"{obj_type}("
-        # Encode the object's attributes as a dictionary
-        obj_dict = {k: v for k, v in obj.__dict__.items()}  # Skip private attributes
-        yield from iterate_dict(obj_dict, depth=max_depth, _current_indent_level=current_indent_level, verbose=verbose)
-        yield ")"
+    if isinstance(obj, enum.Enum):
+        return f"{type(obj).__name__}.{obj.name}"
+    if hasattr(obj, '__dict__'):
+        return None
     # Handle bytes objects
-    elif isinstance(obj, bytes):
-        yield f"b'{obj.decode('utf-8', errors='ignore')}'"
+    if isinstance(obj, bytes):
+        return f"b'{obj.decode('utf-8', errors='ignore')}'"
     # Handle callable objects (functions, methods)
-    elif callable(obj) and hasattr(obj, '__name__'):
-        yield f"<function {obj.__name__}>"
+    if callable(obj) and hasattr(obj, '__name__'):
+        return f"<function {obj.__name__}>"
     # Fallback: try json serialization, then repr
-    else:
-        try:
-            yield json.dumps(obj)
-        except (TypeError, ValueError):
-            yield repr(obj)
+    try:
+        return json.dumps(obj)
+    except (TypeError, ValueError):
+        return repr(obj)
+
+
+def _encode(obj: Any, max_depth: int, indent: str, verbose: bool, max_chars: int, max_nodes: int) -> str:
+    """
+    Encodes obj depth first with an explicit stack of open collections, so deep
+    objects do not recurse, and writes the text to one buffer. Only the items
+    shown are taken from a collection, a list of 1M elements costs as much as
+    one of 21 unless verbose. Values are cut to the characters left, so the
+    text never grows much beyond max_chars before it is truncated.
+
+    A collection met again inside itself is written as its brackets around ...
+    like repr does. Dictionary keys are sorted when they are comparable. Types
+    with a summarizer, arrays, tensors, frames and models, are written by it.
+    """
+    out = io.StringIO()
+    write = out.write
+    size = 0
+    nodes = 0
+    # open collections: [items, mapping or None, separator, closing, depth, level, id, first]
+    stack: List[list] = []
+    on_stack = set()
+    value, depth, level = obj, max_depth, 0
+    while True:
+        nodes += 1
+        if nodes > max_nodes or size > max_chars:
+            break
+
+        value_type = type(value)
+        if value_type is str or isinstance(value, str):
+            if not verbose and len(value) > 256:
+                size += write(f'"{value[:128]}...{value[-128:]}"')
+            elif len(value) > max_chars - size:
+                size += write(f'"{value[:max_chars - size + 1]}')
+            else:
+                size += write(f'"{value}"')
+        elif value_type is int or value_type is float:
+            size += write(str(value))
+        else:
+            prefix = suffix = ""
+            mapping = summary = None
+            summarizer = summarizer_of(value_type)
+            if summarizer is not None:
+                try:
+                    summary = summarizer(value)
+                except Exception as e:
+                    summary = f"{value_type.__name__}(<summary failed: {e!r}>)"
+            if summary is not None:
+                if isinstance(summary, str):
+                    size += write(summary[:max_chars - size + 1])
+                    container = None
+                else:
+                    container = mapping = summary
+                    prefix, suffix = f"{value_type.__name__}(", ")"
+                    opening, closing, separator = "{", "}", ", "
+            elif isinstance(value, dict):
+                container, mapping, opening, closing, separator = value, value, "{", "}", ", "
+            elif isinstance(value, list):
+                container, opening, closing, separator = value, "[", "]", ","
+            elif isinstance(value, tuple):
+                container, opening, closing, separator = value, "(", ")", ","
+            elif isinstance(value, set):
+                container, opening, closing, separator = value, "set(", ")", ","
+            else:
+                text = _leaf_text(value)
+                if text is not None:
+                    size += write(text[:max_chars - size + 1])
+                    container = None
+                else:
+                    # Encode the object's attributes as a dictionary
+                    container = mapping = dict(value.__dict__)
+                    prefix, suffix = f"{value_type.__name__}(", ")"
+                    opening, closing, separator = "{", "}", ", "
 
-def encode_obj_to_transfer(obj: Any, max_depth: int = 3, raw_output: bool = False, indent: str = "  ", verbose: bool = False) -> str:
+            if container is not None:
+                key = id(value)
+                if not container:
+                    size += write(f"{prefix}{opening}{closing}{suffix}")
+                elif key in on_stack:
+                    size += write(f"{prefix}{opening}...{closing}{suffix}")
+                elif depth <= 0:
+                    if len(container) > _VERBOSE_THRESHOLDS[-1]:
+                        text = f"<{type(container).__name__} of {len(container)} items>"
+                    else:
+                        text = _depth_limit_repr.repr(container)
+                    size += write(f"{prefix}{text}{suffix}")
+                else:
+                    half = _shown_half(len(container), verbose)
+                    if mapping is not None:
+                        items = _shown_keys(mapping, half)
+                    elif opening == "set(":
+                        items = _shown_set(container, half)
+                    else:
+                        items = _shown_sequence(container, half)
+                    newline_indent = '\n' + indent * (level + 1)
+                    size += write(f"{prefix}{opening}{newline_indent}")
+                    stack.append([
+                        items, mapping, separator + newline_indent,
+                        '\n' + indent * level + closing + suffix, depth, level, key, True,
+                    ])
+                    on_stack.add(key)
+
+        # continue with the next item of the innermost open collection
+        while stack:
+            frame = stack[-1]
+            item = next(frame[0], _END)
+            if item is _END:
+                stack.pop()
+                on_stack.discard(frame[6])
+                size += write(frame[3])
+                continue
+            if frame[7]:
+                frame[7] = False
+            else:
+                size += write(frame[2])
+            if item is _ELLIPSIS:
+                size += write('...')
+                continue
+            mapping = frame[1]
+            if mapping is not None:
+                # Handle non-string keys in dictionaries
+                size += write(f"\"{str(item)}\": ")
+                value = _dict_getitem(mapping, item)
+            else:
+                value = item
+            depth = frame[4] - 1
+            level = frame[5] + 1
+            break
+        else:
+            if size <= max_chars:
+                return out.getvalue()
+            break
+
+    note = f"more than {max_nodes} values" if nodes > max_nodes else f"more than {max_chars} characters"
+    return f"{out.getvalue()[:max_chars]}\n... (truncated, {note})"
+
+
+def encode_obj_to_transfer(
+    obj: Any,
+    max_depth: int = 3,
+    raw_output: bool = False,
+    indent: str = "  ",
+    verbose: bool = False,
+    max_chars: int = ENCODE_MAX_CHARS,
+    max_nodes: int = ENCODE_MAX_NODES,
+) -> str:
     """
     Encode Python objects to a string representation suitable for transfer between server and client.
     This function is designed to handle small sets of objects for debugging/inspection purposes.
@@ -198,15 +273,15 @@ def encode_obj_to_transfer(obj: Any, max_depth: int = 3, raw_output: bool = Fals
         max_depth: Maximum depth for recursive encoding (default: 3)
         raw_output: Uses repr() to represent obj if True
         indent: String to use for indentation (default: 2 spaces)
+        verbose: Whether to show all elements of collections or limit to first/last 10 with ... in between
+        max_chars: Output longer than this is truncated (default: PYFLIGHT_ENCODE_MAX_CHARS)
+        max_nodes: Encoding stops after this many values (default: PYFLIGHT_ENCODE_MAX_NODES)
 
 
     Returns:
         A string representation of the input object with proper indentation
     """
     if not raw_output:
-        def _iterencode_with_indent(obj: Any, max_depth: int, current_indent_level: int, verbose: bool) -> str:
-            return _make_iterencode(obj, max_depth, current_indent_level, indent, verbose)
-
-        return "".join(_iterencode_with_indent(obj, max_depth, 0, verbose))
+        return _encode(obj, max_depth, indent, verbose, max_chars, max_nodes)
     else:
         return repr(obj)
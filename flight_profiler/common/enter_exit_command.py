@@ -1,61 +1,182 @@
 import importlib
 import sys
-from typing import Optional
+import threading
+from types import CodeType
+from typing import Callable, Dict, List, Optional
 
 from flight_profiler.common import aop_decorator
+from flight_profiler.common.atomic_counter import new_counter
+from flight_profiler.common.clock import WallClock
+from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
+from flight_profiler.common.monitoring_backend import BACKEND_BYTECODE
 from flight_profiler.common.system_logger import logger
 from flight_profiler.plugins.server_plugin import Message, ServerQueue
 
+# self injection check result by code object of the caller of wrapped method
+_self_injected_codes: Dict[CodeType, bool] = dict()
+SELF_INJECTED_CODES_MAX = 4096
+
+# command states, only ACTIVE commands record invocations
+COMMAND_ACTIVE = 0
+# limit is reached and origin code restored, waits for in-flight invocations
+COMMAND_EXHAUSTED = 1
+# end message is sent or command is turned off
+COMMAND_CLOSED = 2
+
+
+def is_self_injected(code: CodeType) -> bool:
+    """
+    invocations from flight_profiler itself are never recorded
+    """
+    injected = _self_injected_codes.get(code)
+    if injected is None:
+        injected = (
+            "flight_profiler" in code.co_filename and "test" not in code.co_filename
+        )
+        if len(_self_injected_codes) >= SELF_INJECTED_CODES_MAX:
+            _self_injected_codes.clear()
+        _self_injected_codes[code] = injected
+    return injected
+
 
 class EnterExitCommand:
 
     def __init__(self, limit: int):
-        self.__count = 0
-        self.__finished = 0
+        # atomic, each invocation gets a unique hit number so the limit is
+        # exact across threads without a lock on the instrumented path
+        self.__count = new_counter()
+        self.__finished = new_counter()
+        # closing is taken once, by the last exit or by turning the command off
+        self.__close_lock = threading.Lock()
         self.limit = limit
+        # wrappers check it before enter(), so an exhausted or closed command
+        # costs one attribute read per invocation
+        self.active = limit > 0
+        self.state = COMMAND_ACTIVE if self.active else COMMAND_EXHAUSTED
         self.out_q: Optional[ServerQueue] = None
         self.origin_code = None
         self.module_name = None
         self.method_name = None
         self.class_name = None
+        # events/sec cap of the output stream, 0 means unlimited
+        self.rate_limit = 0
+        # how invocations are intercepted, bytecode wrapper or sys.monitoring
+        self.backend = BACKEND_BYTECODE
+        # commands of the matched targets when this command names a pattern,
+        # they share this command's limit and output stream
+        self.members: List["EnterExitCommand"] = []
+        self.group: Optional["EnterExitCommand"] = None
+        # invocations are timed by a monotonic clock, start times are shown as
+        # wall clock times converted with the offset taken here
+        self.wall_clock = WallClock()
 
-    def enter(self) -> bool:
+    def enter(self, depth: int = 2) -> bool:
         """
-        only execute method only and avoids self inject
+        only execute method only and avoids self inject, the origin code is
+        restored as soon as the limit is reached, depth is the frame of the
+        target method's caller
         """
-        self_injected: bool = False
+        if self.state != COMMAND_ACTIVE:
+            return False
         try:
-            # f_back must be non-null because enter is called by flight-profiler internal method
-            f = sys._getframe().f_back.f_back
-            if f is None or (
-                "flight_profiler" in f.f_code.co_filename
-                and "test" not in f.f_code.co_filename
-            ):
-                self_injected = True
-        except:
-            self_injected = True
-        if self_injected:
+            # enter is called by flight-profiler wrapper, check the wrapper's caller
+            if is_self_injected(sys._getframe(depth).f_code):
+                return False
+        except ValueError:
             return False
 
-        if self.__count < self.limit:
-            self.__count += 1
-            return True
-        else:
-            return False
+        if self.group is not None:
+            return self.group.acquire()
+        return self.acquire()
+
+    def acquire(self) -> bool:
+        """
+        takes one hit of the limit
+        """
+        count = self.__count.increment()
+        if count >= self.limit:
+            if count > self.limit:
+                # concurrent invocations raced for the last slot
+                return False
+            # only the limit-th invocation gets here, restore happens once
+            self.active = False
+            self.state = COMMAND_EXHAUSTED
+            self.restore_origin_code()
+        return True
 
     def exit(self):
         """
-        calls on target method exit
+        calls on target method exit, the last in-flight invocation after limit
+        is reached closes the command
         """
+        if self.group is not None:
+            self.group.exit()
+            return
         try:
-            self.__finished += 1
-            if self.__finished >= self.limit:
+            # exactly limit invocations are entered, the limit-th enter sets
+            # EXHAUSTED before its own exit so the last exit always sees it
+            if (
+                self.__finished.increment() == self.limit
+                and self.state == COMMAND_EXHAUSTED
+                and self.__take_close()
+            ):
                 self.recover_origin_code()
                 self.child_clear_action()
         except:
             logger.exception("error on exit")
 
-    def recover_origin_code(self):
+    def __take_close(self) -> bool:
+        with self.__close_lock:
+            if self.state == COMMAND_CLOSED:
+                return False
+            self.state = COMMAND_CLOSED
+            return True
+
+    def disable(self) -> bool:
+        """
+        command is turned off by client, wrappers still referenced somewhere
+        stop recording. Returns False if the command was closed already, else
+        the end message is up to the caller, in-flight invocations of an
+        exhausted command no longer send it
+        """
+        self.active = False
+        closing = self.__take_close()
+        for member in self.members:
+            member.disable()
+        return closing
+
+    def apply_members(
+        self,
+        members: List["EnterExitCommand"],
+        wrap: Callable[["EnterExitCommand"], CodeWrapperResult],
+    ) -> Optional[str]:
+        """
+        wraps all members or none of them, returns the failed reason if any
+        target cannot be wrapped, wrapped ones are restored then
+        """
+        for member in members:
+            member.group = self
+            member.out_q = self.out_q
+            # no target records until every target is wrapped
+            member.active = False
+            result = wrap(member)
+            if result.failed:
+                self.restore_origin_code()
+                self.members = []
+                return result.failed_reason
+            member.origin_code = result.value
+            self.members.append(member)
+        for member in self.members:
+            member.active = True
+        return None
+
+    def restore_origin_code(self):
+        if self.members:
+            # all targets stop recording before any code is swapped back
+            for member in self.members:
+                member.disable()
+            for member in self.members:
+                member.restore_origin_code()
         if self.origin_code is not None:
             try:
                 module = importlib.import_module(self.module_name)
@@ -66,6 +187,8 @@ class EnterExitCommand:
                 logger.exception("clear func wrapper failed.")
             self.origin_code = None
 
+    def recover_origin_code(self):
+        self.restore_origin_code()
         if self.out_q is not None:
             self.out_q.output_msg_nowait(Message(is_end=True, msg=None))
 
@@ -1,5 +1,20 @@
-import uuid
-from typing import Any
+from typing import Any, Callable, Optional
+
+
+def compile_expression(expr: Optional[str], params: str) -> Callable:
+    """
+    compile python right value expr once into a function of params, so evaluating
+    it per invocation costs one call. Syntax errors are raised here, before the
+    expression is installed into the target process.
+    """
+    source = f"def expr_func({params}): return {expr}"
+    try:
+        code = compile(source, "<expression>", "exec")
+    except SyntaxError as e:
+        raise SyntaxError(f"invalid expression `{expr}`: {e.msg}") from None
+    namespace = {}
+    exec(code, globals(), namespace)
+    return namespace["expr_func"]
 
 
 class ExpressionResolver:
@@ -36,14 +51,10 @@ class MethodInvocationExprResolver(ExpressionResolver):
         """
 
         self.__expr = expr
-        uid = str(uuid.uuid4())
-        self.__func_name = f"expr_func_{uid.replace('-', '_')}"
-        self.__code = f"def {self.__func_name}(target, return_obj, *args, **kwargs): return {self.__expr}"
+        self.__func = compile_expression(expr, "target, return_obj, *args, **kwargs")
 
     def eval(self, target_obj: Any, return_obj: Any, *args, **kwargs) -> Any:
-        namespace = {}
-        exec(self.__code, globals(), namespace)
-        return namespace[self.__func_name](target_obj, return_obj, *args, **kwargs)
+        return self.__func(target_obj, return_obj, *args, **kwargs)
 
 
 class InstanceExprResolver(ExpressionResolver):
@@ -54,14 +65,10 @@ class InstanceExprResolver(ExpressionResolver):
         """
 
         self.__expr = expr
-        uid = str(uuid.uuid4())
-        self.__func_name = f"expr_func_{uid.replace('-', '_')}"
-        self.__code = f"def {self.__func_name}(target): return {self.__expr}"
+        self.__func = compile_expression(expr, "target")
 
     def eval_target(self, target_obj: Any) -> Any:
-        namespace = {}
-        exec(self.__code, globals(), namespace)
-        return namespace[self.__func_name](target_obj)
+        return self.__func(target_obj)
 
 
 class InstanceListExprResolver(ExpressionResolver):
@@ -72,14 +79,10 @@ class InstanceListExprResolver(ExpressionResolver):
         """
 
         self.__expr = expr
-        uid = str(uuid.uuid4())
-        self.__func_name = f"expr_func_{uid.replace('-', '_')}"
-        self.__code = f"def {self.__func_name}(instances): return {self.__expr}"
+        self.__func = compile_expression(expr, "instances")
 
     def eval_target(self, target_obj: Any) -> Any:
-        namespace = {}
-        exec(self.__code, globals(), namespace)
-        return namespace[self.__func_name](target_obj)
+        return self.__func(target_obj)
 
 
 class FilterExprResolver(ExpressionResolver):
@@ -90,20 +93,18 @@ class FilterExprResolver(ExpressionResolver):
         """
 
         self.__expr = expr
-        uid = str(uuid.uuid4())
-        self.__func_name = f"expr_func_{uid.replace('-', '_')}"
-        self.__code = f"def {self.__func_name}(target, return_obj, cost, *args, **kwargs): return {self.__expr}"
+        self.__func = None
+        if expr is not None:
+            self.__func = compile_expression(
+                expr, "target, return_obj, cost, *args, **kwargs"
+            )
 
     def eval_filter(
         self, target_obj: Any, return_obj: Any, cost: float, *args, **kwargs
     ) -> False:
 
-        if self.__expr is not None:
-            namespace = {}
-            exec(self.__code, globals(), namespace)
-            ok = namespace[self.__func_name](
-                target_obj, return_obj, cost, *args, **kwargs
-            )
+        if self.__func is not None:
+            ok = self.__func(target_obj, return_obj, cost, *args, **kwargs)
             if not ok:
                 return False
         return True
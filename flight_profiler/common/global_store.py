@@ -1,5 +1,7 @@
 GLOBAL_INJECT_SERVER_PID = -1
 GLOBAL_HISTORY_FILE_PATH = ""
+GLOBAL_FLIGHT_SESSION = None
+GLOBAL_STREAM_COMPRESSION = None
 
 FORBIDDEN_COMMANDS_IN_PY314 = {
     "perf"
@@ -32,3 +34,29 @@ def get_inject_server_pid() -> int:
     """
     global GLOBAL_INJECT_SERVER_PID
     return GLOBAL_INJECT_SERVER_PID
+
+
+def set_flight_session(session):
+    """
+    shared connection of current cli session
+    """
+    global GLOBAL_FLIGHT_SESSION
+    GLOBAL_FLIGHT_SESSION = session
+
+
+def get_flight_session():
+    global GLOBAL_FLIGHT_SESSION
+    return GLOBAL_FLIGHT_SESSION
+
+
+def set_stream_compression(compression):
+    """
+    stream compression agreed with agent by the status call, None for raw frames
+    """
+    global GLOBAL_STREAM_COMPRESSION
+    GLOBAL_STREAM_COMPRESSION = compression
+
+
+def get_stream_compression():
+    global GLOBAL_STREAM_COMPRESSION
+    return GLOBAL_STREAM_COMPRESSION
@@ -0,0 +1,246 @@
+"""
+sys.monitoring (PEP 669) instrumentation backend, available on python 3.12+.
+
+The bytecode backend swaps the target's __code__ for a generated wrapper. This
+backend leaves the target untouched: PY_START and PY_RETURN are enabled on the
+target code object only, under a tool id of its own, and PY_UNWIND globally as
+it cannot be enabled per code object. Nested methods are monitored by their
+code object constant, so every closure created from it is covered.
+"""
+import inspect
+import os
+import sys
+import threading
+from types import CodeType, FrameType
+from typing import Any, Dict, Optional, Tuple
+
+from flight_profiler.common.clock import now_ns
+from flight_profiler.common.system_logger import logger
+
+BACKEND_BYTECODE = "bytecode"
+BACKEND_MONITORING = "monitoring"
+BACKENDS = (BACKEND_BYTECODE, BACKEND_MONITORING)
+
+MONITORING_AVAILABLE = hasattr(sys, "monitoring")
+# 0-2 and 5 are the ids of debuggers, coverage tools, profilers and optimizers
+MONITORING_TOOL_ID = int(os.getenv("PYFLIGHT_MONITORING_TOOL_ID", 4))
+MONITORING_TOOL_NAME = "flight_profiler"
+
+# generators run on next(), their PY_START/PY_RETURN do not bound an invocation
+_GENERATOR_FLAGS = inspect.CO_GENERATOR | inspect.CO_ASYNC_GENERATOR
+# reserved in flight while enter() runs, a restore triggered by enter() then
+# keeps the return events of the invocation entering
+_ENTERING = None
+
+
+def argument_layout(code: CodeType) -> Tuple[tuple, tuple, Optional[str], Optional[str]]:
+    """
+    (positional names, keyword only names, *args name, **kwargs name) of code
+    """
+    names = code.co_varnames
+    argcount = code.co_argcount
+    idx = argcount + code.co_kwonlyargcount
+    positional, kwonly = names[:argcount], names[argcount:idx]
+    varargs = varkw = None
+    if code.co_flags & inspect.CO_VARARGS:
+        varargs = names[idx]
+        idx += 1
+    if code.co_flags & inspect.CO_VARKEYWORDS:
+        varkw = names[idx]
+    return positional, kwonly, varargs, varkw
+
+
+def frame_arguments(frame: FrameType, layout: tuple) -> Tuple[tuple, Dict[str, Any]]:
+    """
+    (args, kwargs) of an invocation from its bound parameters at PY_START,
+    keyword only and **kwargs parameters go to kwargs, the others to args
+    """
+    positional, kwonly, varargs, varkw = layout
+    local_vars = frame.f_locals
+    args = tuple([local_vars[name] for name in positional])
+    kwargs = {name: local_vars[name] for name in kwonly} if kwonly else {}
+    if varargs is not None:
+        args += local_vars[varargs]
+    if varkw is not None:
+        kwargs.update(local_vars[varkw])
+    return args, kwargs
+
+
+class MonitorProbe:
+    """
+    one command monitoring one code object, the command implements
+    on_monitored_return and on_monitored_error
+    """
+
+    def __init__(self, command):
+        self.command = command
+        # (start ns, args, kwargs) of entered invocations by id of their frame
+        self.in_flight: Dict[int, Optional[Tuple[float, tuple, dict]]] = dict()
+        # origin code is restored, waits for in-flight invocations to return
+        self.detached = False
+
+
+class MonitoringBackend:
+    """
+    Dispatches sys.monitoring events of monitored code objects to the probes of
+    the commands monitoring them. The tool id is held while any code object is
+    monitored, so profilers and debuggers can use it afterwards.
+    """
+
+    def __init__(self):
+        self.__probes: Dict[CodeType, Tuple[MonitorProbe, ...]] = dict()
+        # computed once per code, arguments are read on every recorded call
+        self.__layouts: Dict[CodeType, tuple] = dict()
+        self.__lock = threading.Lock()
+        self.__tool_acquired = False
+
+    def attach(self, code: CodeType, command) -> Optional[str]:
+        """
+        records invocations of code for command, returns the failed reason if any
+        """
+        if not MONITORING_AVAILABLE:
+            return (
+                f"Backend {BACKEND_MONITORING} needs python 3.12+, "
+                f"current is {sys.version_info.major}.{sys.version_info.minor}!"
+            )
+        if code.co_flags & _GENERATOR_FLAGS:
+            return (
+                f"Generator {code.co_name} is not supported by backend "
+                f"{BACKEND_MONITORING}, use --backend {BACKEND_BYTECODE} instead!"
+            )
+        with self.__lock:
+            failed_reason = self.__acquire_tool()
+            if failed_reason is not None:
+                return failed_reason
+            self.__layouts[code] = argument_layout(code)
+            self.__probes[code] = self.__probes.get(code, ()) + (MonitorProbe(command),)
+            events = sys.monitoring.events
+            sys.monitoring.set_local_events(
+                MONITORING_TOOL_ID, code, events.PY_START | events.PY_RETURN
+            )
+        return None
+
+    def detach(self, code: CodeType, command) -> None:
+        """
+        stops recording invocations of code for command, in-flight invocations
+        still report their return
+        """
+        with self.__lock:
+            for probe in self.__probes.get(code, ()):
+                if probe.command is command:
+                    probe.detached = True
+            self.__sweep(code)
+
+    def monitored_codes(self) -> int:
+        return len(self.__probes)
+
+    def __sweep(self, code: CodeType) -> None:
+        """
+        drops detached probes without in-flight invocations, events of code
+        are turned off with its last probe, holds the lock
+        """
+        probes = tuple(
+            p for p in self.__probes.get(code, ()) if not p.detached or p.in_flight
+        )
+        if probes:
+            self.__probes[code] = probes
+            return
+        if self.__probes.pop(code, None) is not None:
+            self.__layouts.pop(code, None)
+            sys.monitoring.set_local_events(MONITORING_TOOL_ID, code, 0)
+        if not self.__probes:
+            self.__release_tool()
+
+    def __acquire_tool(self) -> Optional[str]:
+        if self.__tool_acquired:
+            return None
+        monitoring = sys.monitoring
+        owner = monitoring.get_tool(MONITORING_TOOL_ID)
+        if owner is not None:
+            return (
+                f"sys.monitoring tool id {MONITORING_TOOL_ID} is used by {owner}, "
+                f"set PYFLIGHT_MONITORING_TOOL_ID to a free id from 0 to 5!"
+            )
+        monitoring.use_tool_id(MONITORING_TOOL_ID, MONITORING_TOOL_NAME)
+        events = monitoring.events
+        monitoring.register_callback(MONITORING_TOOL_ID, events.PY_START, self._on_start)
+        monitoring.register_callback(MONITORING_TOOL_ID, events.PY_RETURN, self._on_return)
+        monitoring.register_callback(MONITORING_TOOL_ID, events.PY_UNWIND, self._on_unwind)
+        monitoring.set_events(MONITORING_TOOL_ID, events.PY_UNWIND)
+        self.__tool_acquired = True
+        return None
+
+    def __release_tool(self) -> None:
+        if not self.__tool_acquired:
+            return
+        monitoring = sys.monitoring
+        events = monitoring.events
+        monitoring.set_events(MONITORING_TOOL_ID, 0)
+        for event in (events.PY_START, events.PY_RETURN, events.PY_UNWIND):
+            monitoring.register_callback(MONITORING_TOOL_ID, event, None)
+        monitoring.free_tool_id(MONITORING_TOOL_ID)
+        self.__tool_acquired = False
+
+    def _on_start(self, code: CodeType, instruction_offset: int):
+        probes = self.__probes.get(code)
+        if probes is None:
+            return sys.monitoring.DISABLE
+        frame = None
+        arguments = None
+        live = False
+        for probe in probes:
+            if probe.detached:
+                continue
+            live = True
+            command = probe.command
+            if not command.active:
+                continue
+            if frame is None:
+                frame = sys._getframe(1)
+            key = id(frame)
+            probe.in_flight[key] = _ENTERING
+            # frames: enter <- this callback <- target <- caller of target
+            if command.enter(3):
+                if arguments is None:
+                    arguments = frame_arguments(frame, self.__layouts[code])
+                probe.in_flight[key] = (now_ns(), arguments[0], arguments[1])
+            else:
+                probe.in_flight.pop(key, None)
+        if not live:
+            # restored while the event fired, attach re-enables the event
+            return sys.monitoring.DISABLE
+
+    def _on_return(self, code: CodeType, instruction_offset: int, retval: Any):
+        self.__finish(code, retval, None)
+
+    def _on_unwind(self, code: CodeType, instruction_offset: int, exception: BaseException):
+        self.__finish(code, None, exception)
+
+    def __finish(self, code: CodeType, retval: Any, exception: Optional[BaseException]):
+        probes = self.__probes.get(code)
+        if probes is None:
+            return
+        key = id(sys._getframe(2))
+        for probe in probes:
+            started = probe.in_flight.pop(key, None)
+            if started is None:
+                continue
+            end = now_ns()
+            command = probe.command
+            start, args, kwargs = started
+            try:
+                if exception is None:
+                    command.on_monitored_return(start, end, retval, args, kwargs)
+                elif isinstance(exception, Exception):
+                    # like the wrappers, BaseException like cancellation only exits
+                    command.on_monitored_error(start, end, exception, args, kwargs)
+            except:
+                logger.exception("record monitored invocation failed.")
+            finally:
+                command.exit()
+                if probe.detached and not probe.in_flight:
+                    with self.__lock:
+                        self.__sweep(code)
+
+
+global_monitoring_backend = MonitoringBackend()
@@ -0,0 +1,198 @@
+"""
+Summaries of objects which are too big or too costly to encode element by
+element: numpy arrays, pandas frames and series, torch tensors, pydantic models
+and dataclasses.
+
+A summarizer is selected by type(obj) in a registry keyed by type. Types are
+registered by "module.qualname" so the packages are never imported by the
+profiler, the first object of a type resolves it through its MRO once and the
+result, a summarizer or None, is cached for the type.
+
+A summarizer returns either the text of the object, or a dict of attributes
+the encoder writes like the __dict__ of custom objects.
+"""
+import dataclasses
+from typing import Any, Callable, Dict, List, Optional, Union
+
+Summarizer = Callable[[Any], Union[str, Dict[str, Any]]]
+
+# values sampled at each end of an array, tensor or series
+SAMPLE_VALUES = 3
+# columns of a dataframe shown with their dtype
+SAMPLE_COLUMNS = 10
+# a sampled value longer than this is cut
+_MAX_VALUE_CHARS = 32
+# resolved types are forgotten past this, classes created on the fly are not kept
+_MAX_RESOLVED_TYPES = 4096
+
+_named_summarizers: Dict[str, Summarizer] = dict()
+_resolved: Dict[type, Optional[Summarizer]] = dict()
+
+
+def _type_name(value_type: type) -> str:
+    return f"{value_type.__module__}.{value_type.__qualname__}"
+
+
+def register_summarizer(target: Union[type, str], summarizer: Summarizer) -> None:
+    """
+    summarizes objects of target and its subclasses, target is a type or the
+    "module.qualname" of one
+    """
+    name = target if isinstance(target, str) else _type_name(target)
+    _named_summarizers[name] = summarizer
+    _resolved.clear()
+
+
+def summarizer_of(value_type: type) -> Optional[Summarizer]:
+    try:
+        return _resolved[value_type]
+    except KeyError:
+        pass
+    summarizer = None
+    for base in value_type.__mro__:
+        summarizer = _named_summarizers.get(_type_name(base))
+        if summarizer is not None:
+            break
+    else:
+        if dataclasses.is_dataclass(value_type):
+            summarizer = dataclass_summarizer(value_type)
+    if len(_resolved) >= _MAX_RESOLVED_TYPES:
+        _resolved.clear()
+    _resolved[value_type] = summarizer
+    return summarizer
+
+
+def _value_text(value: Any) -> str:
+    text = str(value)
+    if len(text) > _MAX_VALUE_CHARS:
+        return f"{text[:_MAX_VALUE_CHARS]}..."
+    return text
+
+
+def _sample(size: int, value_at: Callable[[int], Any]) -> str:
+    """
+    first and last SAMPLE_VALUES values of size ones, fetched one by one
+    """
+    if size <= 2 * SAMPLE_VALUES:
+        indexes = list(range(size))
+    else:
+        indexes = list(range(SAMPLE_VALUES)) + [-1] + list(range(size - SAMPLE_VALUES, size))
+    return "[" + ", ".join("..." if i < 0 else _value_text(value_at(i)) for i in indexes) + "]"
+
+
+def _unravel(index: int, shape: tuple) -> tuple:
+    position: List[int] = []
+    for dim in reversed(shape):
+        index, remainder = divmod(index, dim)
+        position.append(remainder)
+    position.reverse()
+    return tuple(position)
+
+
+def summarize_ndarray(array) -> str:
+    fields = [
+        f"shape={tuple(array.shape)}",
+        f"dtype={array.dtype}",
+        f"strides={tuple(array.strides)}",
+    ]
+    # flat indexing reads single elements of any memory layout
+    flat = array.flat
+    fields.append(f"values={_sample(array.size, lambda i: flat[i])}")
+    return f"{type(array).__name__}({', '.join(fields)})"
+
+
+def summarize_tensor(tensor) -> str:
+    """
+    reads metadata only, values are sampled from strided tensors on cpu, a
+    tensor on an accelerator is never synchronized or copied to the host
+    """
+    device = tensor.device
+    strided = str(tensor.layout) == "torch.strided"
+    fields = [
+        f"shape={tuple(tensor.shape)}",
+        f"dtype={tensor.dtype}",
+        f"device={device}",
+    ]
+    if strided:
+        fields.append(f"strides={tuple(tensor.stride())}")
+    else:
+        fields.append(f"layout={tensor.layout}")
+    if tensor.requires_grad:
+        fields.append("requires_grad=True")
+    if strided and device.type == "cpu":
+        data = tensor.detach()
+        shape = tuple(data.shape)
+        fields.append(f"values={_sample(data.numel(), lambda i: data[_unravel(i, shape)].item())}")
+    return f"{type(tensor).__name__}({', '.join(fields)})"
+
+
+def summarize_dataframe(frame) -> str:
+    columns = frame.columns
+    shown = min(len(columns), SAMPLE_COLUMNS)
+    dtypes = frame.dtypes.tolist()
+    column_types = [f"{_value_text(columns[i])}: {dtypes[i]}" for i in range(shown)]
+    if len(columns) > shown:
+        column_types.append("...")
+    fields = [
+        f"shape={tuple(frame.shape)}",
+        f"columns={{{', '.join(column_types)}}}",
+        f"index={type(frame.index).__name__}",
+    ]
+    if len(frame) > 0 and shown > 0:
+        fields.append(f"first_row={_sample(shown, lambda i: frame.iat[0, i])}")
+    return f"{type(frame).__name__}({', '.join(fields)})"
+
+
+def summarize_series(series) -> str:
+    fields = [
+        f"name={_value_text(series.name)}",
+        f"shape={tuple(series.shape)}",
+        f"dtype={series.dtype}",
+        f"index={type(series.index).__name__}",
+        f"values={_sample(len(series), lambda i: series.iat[i])}",
+    ]
+    return f"{type(series).__name__}({', '.join(fields)})"
+
+
+def summarize_pydantic_model(model) -> Dict[str, Any]:
+    model_type = type(model)
+    # v2 declares model_fields, v1 __fields__
+    fields = getattr(model_type, "model_fields", None)
+    if fields is None:
+        fields = getattr(model_type, "__fields__", {})
+    attrs = {name: getattr(model, name, None) for name in fields}
+    extra = getattr(model, "__pydantic_extra__", None)
+    if extra:
+        attrs.update(extra)
+    return attrs
+
+
+_UNSET = object()
+
+
+def dataclass_summarizer(dataclass_type: type) -> Summarizer:
+    """
+    fields of a dataclass, also of those with __slots__ and no __dict__
+    """
+    names = tuple(f.name for f in dataclasses.fields(dataclass_type))
+
+    def summarize_dataclass(obj) -> Dict[str, Any]:
+        attrs = dict()
+        for name in names:
+            value = getattr(obj, name, _UNSET)
+            if value is not _UNSET:
+                attrs[name] = value
+        return attrs
+
+    return summarize_dataclass
+
+
+register_summarizer("numpy.ndarray", summarize_ndarray)
+register_summarizer("torch.Tensor", summarize_tensor)
+# pandas 3 reports its public classes from the top level module
+for _module in ("pandas.core.frame", "pandas"):
+    register_summarizer(f"{_module}.DataFrame", summarize_dataframe)
+for _module in ("pandas.core.series", "pandas"):
+    register_summarizer(f"{_module}.Series", summarize_series)
+register_summarizer("pydantic.main.BaseModel", summarize_pydantic_model)
+register_summarizer("pydantic.v1.main.BaseModel", summarize_pydantic_model)
@@ -1,9 +1,189 @@
+import os
+import socket
+import struct
+import zlib
 from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+# Stream frames carry a batch of plugin events in one length-prefixed message:
+#   frame header: version(u8) kind(u8) flags(u16) event_count(u32)
+#   every event:  length(u32) payload
+# Clients opt in by sending "frame_version" in the request json, requests
+# without it are answered with one message per event as before.
+STREAM_FRAME_VERSION = 1
+STREAM_FRAME_HEADER = struct.Struct("<BBHI")
+STREAM_EVENT_HEADER = struct.Struct("<I")
+
+FRAME_KIND_EVENTS = 0
+# single json event with agent side queue statistics, e.g. dropped events
+FRAME_KIND_STATS = 1
+# single json event closing the stream with final counts of emitted, sampled out
+# and dropped events
+FRAME_KIND_SUMMARY = 2
+
+# Frames may be compressed as a whole after the frame header, flagged by one of
+# the bits below. The codec is agreed on by the status call: the client offers
+# {"compression": [...]} as param, the agent answers with the first one it
+# supports, and later requests carry "compression" to enable it per stream.
+# Frames smaller than the agent's threshold are always sent raw.
+FRAME_FLAG_ZLIB = 0x1
+FRAME_FLAG_LZMA = 0x2
+STREAM_COMPRESSION_FLAGS = {"zlib": FRAME_FLAG_ZLIB, "lzma": FRAME_FLAG_LZMA}
+STREAM_COMPRESS_THRESHOLD = 4096
+# cheap presets, the agent shares cpu with the profiled application
+STREAM_ZLIB_LEVEL = 1
+STREAM_LZMA_PRESET = 0
+
+try:
+    import lzma
+except ImportError:
+    # python built without liblzma
+    lzma = None
+
+# A session multiplexes all commands of one cli over a single connection. It is
+# opened by the json request {"target": "session", "is_plugin_calling": false}
+# and acked by one message, afterwards every message in both directions starts
+# with channel_id(u32) type(u8):
+#   client -> server: OPEN carries a json request, CANCEL drops the channel
+#   server -> client: DATA carries one response message, END closes the channel
+SESSION_TARGET = "session"
+SESSION_CHANNEL_HEADER = struct.Struct("<IB")
+SESSION_MSG_OPEN = 0
+SESSION_MSG_DATA = 1
+SESSION_MSG_END = 2
+SESSION_MSG_CANCEL = 3
+
+
+# sun_path of sockaddr_un is 108 bytes on linux and 104 on mac
+UNIX_SOCKET_PATH_MAX = 103
+
+
+def get_agent_socket_path(pid) -> Optional[str]:
+    """
+    unix socket path of the agent injected into process pid, so an injected agent
+    is found by one stat() instead of scanning ports. Returns None if unix socket
+    transport is disabled by PYFLIGHT_UNIX_SOCKET=0 or not available.
+    """
+    if os.getenv("PYFLIGHT_UNIX_SOCKET", "1").strip().lower() in ("0", "false"):
+        return None
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    path = os.path.join(str(Path.home()), "pyFlightProfiler", f"agent_{pid}.sock")
+    if len(path.encode("utf-8")) > UNIX_SOCKET_PATH_MAX:
+        return None
+    return path
 
 
 class TargetProcessExitError(Exception):
     pass
 
+
+class StreamFrameError(Exception):
+    pass
+
+
+def get_supported_compressions() -> List[str]:
+    """
+    stream compressions available in this interpreter, in order of preference
+    """
+    if lzma is None:
+        return ["zlib"]
+    return ["zlib", "lzma"]
+
+
+def choose_compression(offered: List[str]) -> Optional[str]:
+    """
+    first codec of the peer's offer supported here, None keeps frames raw
+    """
+    supported = get_supported_compressions()
+    for codec in offered:
+        if codec in supported:
+            return codec
+    return None
+
+
+def encode_stream_frame(
+    events: List[bytes],
+    kind: int = FRAME_KIND_EVENTS,
+    flags: int = 0,
+    compression: Optional[str] = None,
+    threshold: int = STREAM_COMPRESS_THRESHOLD,
+) -> bytes:
+    parts = []
+    body_size = 0
+    for event in events:
+        parts.append(STREAM_EVENT_HEADER.pack(len(event)))
+        parts.append(event)
+        body_size += STREAM_EVENT_HEADER.size + len(event)
+    if compression is not None and body_size >= threshold:
+        if compression == "zlib":
+            body = zlib.compress(b"".join(parts), STREAM_ZLIB_LEVEL)
+        elif compression == "lzma" and lzma is not None:
+            body = lzma.compress(b"".join(parts), preset=STREAM_LZMA_PRESET)
+        else:
+            raise StreamFrameError(f"unsupported stream compression: {compression}")
+        # incompressible payloads stay raw
+        if len(body) < body_size:
+            flags |= STREAM_COMPRESSION_FLAGS[compression]
+            header = STREAM_FRAME_HEADER.pack(
+                STREAM_FRAME_VERSION, kind, flags, len(events)
+            )
+            return header + body
+    parts.insert(
+        0, STREAM_FRAME_HEADER.pack(STREAM_FRAME_VERSION, kind, flags, len(events))
+    )
+    return b"".join(parts)
+
+
+_DECOMPRESS_ERRORS = (zlib.error, EOFError) + (
+    (lzma.LZMAError,) if lzma is not None else ()
+)
+
+
+def _decompress_frame_body(body: Union[bytes, memoryview], flags: int) -> bytes:
+    try:
+        if flags & FRAME_FLAG_ZLIB:
+            return zlib.decompress(body)
+        if lzma is None:
+            raise StreamFrameError("lzma stream frame but lzma is not available")
+        return lzma.decompress(body)
+    except _DECOMPRESS_ERRORS as e:
+        raise StreamFrameError(f"stream frame decompress failed: {e}")
+
+
+def decode_stream_frame(
+    frame: Union[bytes, memoryview]
+) -> Tuple[int, int, List[Union[bytes, memoryview]]]:
+    """
+    decode stream frame into (kind, flags, events), events of a memoryview frame
+    are slices sharing its buffer
+    """
+    if len(frame) < STREAM_FRAME_HEADER.size:
+        raise StreamFrameError(f"stream frame too short: {len(frame)} bytes")
+    version, kind, flags, count = STREAM_FRAME_HEADER.unpack_from(frame, 0)
+    if version > STREAM_FRAME_VERSION:
+        raise StreamFrameError(f"unsupported stream frame version: {version}")
+    offset = STREAM_FRAME_HEADER.size
+    if flags & (FRAME_FLAG_ZLIB | FRAME_FLAG_LZMA):
+        frame = memoryview(_decompress_frame_body(frame[offset:], flags))
+        offset = 0
+    events = []
+    try:
+        for _ in range(count):
+            (length,) = STREAM_EVENT_HEADER.unpack_from(frame, offset)
+            offset += STREAM_EVENT_HEADER.size
+            events.append(frame[offset : offset + length])
+            offset += length
+    except struct.error as e:
+        raise StreamFrameError(f"stream frame truncated: {e}")
+    if offset != len(frame):
+        raise StreamFrameError(
+            f"stream frame length mismatch, expect {len(frame)} got {offset}"
+        )
+    return kind, flags, events
+
+
 class ServerProtocol(ABC):
 
     @abstractmethod
@@ -11,7 +191,7 @@ class ServerProtocol(ABC):
         pass
 
     @abstractmethod
-    async def accept_connections(self) -> None:
+    async def accept_connections(self, server_socket=None) -> None:
         pass
 
 
@@ -1,10 +1,30 @@
+import itertools
 import json
+import os
+import queue
 import socket
 import struct
-from collections.abc import Iterator
-from typing import Any
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
-from flight_profiler.communication.base import ClientProtocol, TargetProcessExitError
+from flight_profiler.common.global_store import (
+    get_flight_session,
+    get_stream_compression,
+)
+from flight_profiler.communication.base import (
+    FRAME_KIND_EVENTS,
+    FRAME_KIND_STATS,
+    FRAME_KIND_SUMMARY,
+    SESSION_CHANNEL_HEADER,
+    SESSION_MSG_CANCEL,
+    SESSION_MSG_END,
+    SESSION_MSG_OPEN,
+    SESSION_TARGET,
+    STREAM_FRAME_VERSION,
+    ClientProtocol,
+    TargetProcessExitError,
+    decode_stream_frame,
+)
 
 
 def is_socket_closed(sock: socket.socket) -> bool:
@@ -23,16 +43,64 @@ def is_socket_closed(sock: socket.socket) -> bool:
         # Handle other potential socket errors
         return True
 
+def encode_stream_request(data: Any) -> Tuple[bytes, bool]:
+    """
+    returns request payload and whether the response stream is framed
+    """
+    if type(data) is bytes:
+        return data, False
+    if isinstance(data, dict):
+        data = dict(data, frame_version=STREAM_FRAME_VERSION)
+        compression = get_stream_compression()
+        if compression is not None:
+            data["compression"] = compression
+        return json.dumps(data).encode("utf-8"), True
+    return json.dumps(data).encode("utf-8"), False
+
+
+def get_compression_offer() -> List[str]:
+    """
+    codecs offered to agent in the status call, configured by PYFLIGHT_COMPRESSION
+    as comma separated list in order of preference, e.g. "zlib,lzma"
+    """
+    offer = os.getenv("PYFLIGHT_COMPRESSION", "")
+    return [codec.strip() for codec in offer.split(",") if codec.strip()]
+
+
+def iter_stream_events(client: Any, frames: Iterator[bytes]) -> Iterator[memoryview]:
+    """
+    unpack events of batched stream frames, stats and summary frames are kept in
+    client.stream_stats.
+    Events are memoryview slices of the received frame, use str(event, "utf-8") for text.
+    """
+    for frame in frames:
+        kind, _, events = decode_stream_frame(memoryview(frame))
+        if kind == FRAME_KIND_EVENTS:
+            yield from events
+        elif kind in (FRAME_KIND_STATS, FRAME_KIND_SUMMARY) and len(events) > 0:
+            client.stream_stats = json.loads(bytes(events[0]))
+
+
 class FlightClient(ClientProtocol):
 
-    def __init__(self, host: str, port: int):
+    def __init__(self, host: str, port: int, unix_path: Optional[str] = None):
         self.host = host
         self.port = port
+        # connect by unix socket of agent instead of tcp port if specified
+        self.unix_path = unix_path
         self.running = True
         self.sock = None
+        # latest agent side statistics of the current stream, e.g. dropped events
+        self.stream_stats: Optional[Dict[str, Any]] = None
         self.connect(self.host, self.port)
 
     def connect(self, address: str, port: int) -> None:
+        if self.unix_path is not None:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            if self.sock.connect_ex(self.unix_path) == 0:
+                return
+            self.sock.close()
+            raise TargetProcessExitError
         for res in socket.getaddrinfo(
             address, port, socket.AF_INET, socket.SOCK_STREAM
         ):
@@ -40,6 +108,7 @@ class FlightClient(ClientProtocol):
             self.sock = socket.socket(af, socktype, proto)
             error_code = self.sock.connect_ex(sa)
             if error_code == 0:
+                self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
                 return
             else:
                 self.sock.close()
@@ -53,16 +122,23 @@ class FlightClient(ClientProtocol):
         return self.recv()
 
     def request_stream(self, data: Any) -> Iterator:
-        if type(data) is bytes:
-            self.send(data)
+        """
+        send request and yield every event of the response stream, dict requests
+        negotiate batched stream frames which are unpacked here transparently
+        """
+        payload, framed = encode_stream_request(data)
+        self.send(payload)
+        if framed:
+            yield from iter_stream_events(self, self._iter_messages())
         else:
-            self.send(json.dumps(data).encode("utf-8"))
+            yield from self._iter_messages()
+
+    def _iter_messages(self) -> Iterator[bytes]:
         while not is_socket_closed(self.sock):
             data = self.recv()
-            if data:
-                yield data
-            else:
+            if not data:
                 break
+            yield data
 
     def send(self, data: bytes):
         header = struct.pack("<L", len(data))
@@ -74,7 +150,7 @@ class FlightClient(ClientProtocol):
             else:
                 raise e
 
-    def recv(self) -> bytes:
+    def recv(self) -> Union[bytes, bytearray]:
         header_data = self._recv_bytes(4)
         if len(header_data) == 4:
             msg_len = struct.unpack("<L", header_data)[0]
@@ -83,14 +159,22 @@ class FlightClient(ClientProtocol):
                 return data
         return b""
 
-    def _recv_bytes(self, n) -> bytes:
-        data = "".encode("utf-8")
-        while len(data) < n:
-            chunk = self.sock.recv(n - len(data))
-            if not chunk:
-                break
-            data += chunk
-        return data
+    def _recv_bytes(self, n) -> bytearray:
+        """
+        receive exactly n bytes into one preallocated buffer, fewer bytes are
+        returned only if the peer closed
+        """
+        buffer = bytearray(n)
+        received = 0
+        with memoryview(buffer) as view:
+            while received < n:
+                size = self.sock.recv_into(view[received:], n - received)
+                if size == 0:
+                    break
+                received += size
+        if received < n:
+            del buffer[received:]
+        return buffer
 
     def close(self):
         try:
@@ -98,3 +182,178 @@ class FlightClient(ClientProtocol):
                 self.sock.close()
         except:
             pass
+
+
+# messages buffered per session channel, messages arriving at a full channel are
+# dropped and counted, so one slow consumer never stalls the other channels
+SESSION_CHANNEL_CAPACITY = max(
+    1, int(os.getenv("PYFLIGHT_SESSION_CHANNEL_CAPACITY", 64))
+)
+
+
+class SessionUnsupportedError(Exception):
+    pass
+
+
+class FlightSession:
+    """
+    One long-lived connection shared by all commands of a cli session. Every
+    request runs on its own channel, responses are demultiplexed by a reader
+    thread, so commands skip the connect and a ctrl-c "off" travels the same
+    connection as the stream it stops. The reader never waits for a consumer,
+    a channel whose queue is full drops what arrives and counts it.
+    """
+
+    def __init__(self, host: str, port: int, unix_path: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.client = FlightClient(host, port, unix_path)
+        self.closed = False
+        self.channels: Dict[int, "FlightChannel"] = {}
+        self.channel_ids = itertools.count(1)
+        self.lock = threading.Lock()
+        try:
+            ack = self.client.request(
+                {"target": SESSION_TARGET, "is_plugin_calling": False}
+            )
+        except OSError:
+            ack = b""
+        if not ack:
+            # agent injected by an older version closes unknown requests
+            self.client.close()
+            raise SessionUnsupportedError
+        self.reader = threading.Thread(
+            target=self._read_loop, name="flight-profiler-session", daemon=True
+        )
+        self.reader.start()
+
+    def open_channel(self) -> "FlightChannel":
+        if self.closed:
+            raise TargetProcessExitError
+        channel = FlightChannel(self, next(self.channel_ids))
+        with self.lock:
+            self.channels[channel.channel_id] = channel
+        return channel
+
+    def send(self, channel_id: int, msg_type: int, data: bytes = b"") -> None:
+        with self.lock:
+            self.client.send(SESSION_CHANNEL_HEADER.pack(channel_id, msg_type) + data)
+
+    def release(self, channel_id: int) -> None:
+        with self.lock:
+            self.channels.pop(channel_id, None)
+
+    def close(self) -> None:
+        self.closed = True
+        self.client.close()
+
+    def _read_loop(self) -> None:
+        try:
+            while True:
+                data = self.client.recv()
+                if len(data) < SESSION_CHANNEL_HEADER.size:
+                    break
+                channel_id, msg_type = SESSION_CHANNEL_HEADER.unpack_from(data, 0)
+                with self.lock:
+                    channel = self.channels.get(channel_id)
+                if channel is not None:
+                    channel.deliver(
+                        msg_type, memoryview(data)[SESSION_CHANNEL_HEADER.size :]
+                    )
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            with self.lock:
+                channels = list(self.channels.values())
+            for channel in channels:
+                channel.deliver(SESSION_MSG_END, b"")
+
+
+class FlightChannel:
+    """
+    One request of a FlightSession, used the same way as FlightClient.
+    """
+
+    def __init__(self, session: FlightSession, channel_id: int):
+        self.session = session
+        self.channel_id = channel_id
+        self.messages: queue.Queue = queue.Queue(maxsize=SESSION_CHANNEL_CAPACITY)
+        self.ended = False
+        self.stream_stats: Optional[Dict[str, Any]] = None
+        # messages dropped because the consumer fell behind
+        self.dropped = 0
+
+    def deliver(self, msg_type: int, data: Union[bytes, memoryview]) -> None:
+        """
+        called by the session reader, never blocks. A full channel drops data
+        messages, the end message takes the place of the oldest one
+        """
+        while True:
+            try:
+                self.messages.put_nowait((msg_type, data))
+                return
+            except queue.Full:
+                if msg_type != SESSION_MSG_END:
+                    self.dropped += 1
+                    return
+            try:
+                self.messages.get_nowait()
+                self.dropped += 1
+            except queue.Empty:
+                pass
+
+    def request(self, data: Any) -> bytes:
+        if type(data) is not bytes:
+            data = json.dumps(data).encode("utf-8")
+        self.session.send(self.channel_id, SESSION_MSG_OPEN, data)
+        for message in self._iter_messages():
+            return bytes(message)
+        return b""
+
+    def request_stream(self, data: Any) -> Iterator:
+        payload, framed = encode_stream_request(data)
+        self.session.send(self.channel_id, SESSION_MSG_OPEN, payload)
+        if framed:
+            yield from iter_stream_events(self, self._iter_messages())
+        else:
+            yield from self._iter_messages()
+
+    def _iter_messages(self) -> Iterator[bytes]:
+        while not self.ended:
+            msg_type, data = self.messages.get()
+            if msg_type == SESSION_MSG_END:
+                self.ended = True
+                if self.dropped > 0:
+                    self.stream_stats = dict(
+                        self.stream_stats or {}, client_dropped=self.dropped
+                    )
+                break
+            yield data
+
+    def close(self):
+        try:
+            if not self.ended and not self.session.closed:
+                # stop the agent from streaming to a channel nobody reads
+                self.session.send(self.channel_id, SESSION_MSG_CANCEL)
+        except:
+            pass
+        finally:
+            self.ended = True
+            self.session.release(self.channel_id)
+
+
+def new_flight_client(host: str, port: int) -> Union[FlightClient, FlightChannel]:
+    """
+    returns a channel of the cli session connected to (host, port) if it exists,
+    otherwise a new FlightClient with its own connection
+    """
+    session: Optional[FlightSession] = get_flight_session()
+    if (
+        session is not None
+        and not session.closed
+        and session.host == host
+        and session.port == port
+    ):
+        return session.open_channel()
+    return FlightClient(host, port)
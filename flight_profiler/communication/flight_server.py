@@ -1,22 +1,67 @@
 import asyncio
 import json
+import os
 import socket
 import struct
 from abc import abstractmethod
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Set, Union
 
 from flight_profiler.common.system_logger import logger
-from flight_profiler.communication.base import ServerProtocol
+from flight_profiler.communication.base import (
+    FRAME_KIND_EVENTS,
+    SESSION_CHANNEL_HEADER,
+    SESSION_MSG_CANCEL,
+    SESSION_MSG_DATA,
+    SESSION_MSG_END,
+    SESSION_MSG_OPEN,
+    SESSION_TARGET,
+    STREAM_COMPRESS_THRESHOLD,
+    ServerProtocol,
+    choose_compression,
+    encode_stream_frame,
+)
+
+
+class SessionChannelWriter:
+    """
+    writes messages of one channel to the shared session connection, every
+    message is tagged by channel id and written in one piece
+    """
+
+    def __init__(
+        self, channel_id: int, writer: asyncio.StreamWriter, write_lock: asyncio.Lock
+    ):
+        self.channel_id = channel_id
+        self.writer = writer
+        self.write_lock = write_lock
+
+    async def send(self, data: bytes, msg_type: int = SESSION_MSG_DATA) -> None:
+        header = struct.pack("<L", SESSION_CHANNEL_HEADER.size + len(data))
+        async with self.write_lock:
+            self.writer.writelines(
+                (header, SESSION_CHANNEL_HEADER.pack(self.channel_id, msg_type), data)
+            )
+            await self.writer.drain()
+
+    def is_closing(self) -> bool:
+        return self.writer.is_closing()
 
 
 class FlightServer(ServerProtocol):
 
     def __init__(self, interactive_commands: Dict[str, Any]):
         self.server_socket = None
+        self.unix_accept_task: Optional[asyncio.Task] = None
         self.loop = None
         self.interactive_commands = interactive_commands
+        # frames below this size are never compressed
+        self.compress_threshold = int(
+            os.getenv("PYFLIGHT_COMPRESS_THRESHOLD", STREAM_COMPRESS_THRESHOLD)
+        )
 
-    async def start_server(self, host: str, port: int):
+    async def start_server(
+        self, host: str, port: int, unix_path: Optional[str] = None
+    ):
         if self.loop is None:
             self.loop = asyncio.get_event_loop()
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -25,39 +70,62 @@ class FlightServer(ServerProtocol):
         self.server_socket.listen(100)  # Larger backlog
         self.server_socket.setblocking(False)  # Key: non-blocking mode
 
+        if unix_path is not None:
+            unix_socket = self.bind_unix_socket(unix_path)
+            if unix_socket is not None:
+                self.unix_accept_task = self.loop.create_task(
+                    self.accept_connections(unix_socket)
+                )
         await self.accept_connections()
 
-    async def accept_connections(self):
-        # Create a thread pool for handling client connections
-        import concurrent.futures
-        executor = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="flight-profiler-recv-", max_workers=200)  # Match socket listen backlog
+    def bind_unix_socket(self, unix_path: str) -> Optional[socket.socket]:
+        """
+        listen on unix socket besides tcp, only the owner of target process may connect
+        """
+        try:
+            os.makedirs(os.path.dirname(unix_path), exist_ok=True)
+            if os.path.exists(unix_path):
+                # left by a dead process with the same pid
+                os.unlink(unix_path)
+            unix_socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            unix_socket.bind(unix_path)
+            os.chmod(unix_path, 0o600)
+            unix_socket.listen(100)
+            unix_socket.setblocking(False)
+            return unix_socket
+        except OSError:
+            logger.exception(f"listen on unix socket {unix_path} failed, use tcp only")
+            return None
 
+    async def accept_connections(self, server_socket: Optional[socket.socket] = None):
+        if server_socket is None:
+            server_socket = self.server_socket
+        # every connection is served as a task on the agent loop, blocking plugin
+        # work is handed to a bounded worker pool by the concrete server
+        connection_tasks: Set[asyncio.Task] = set()
         try:
             while True:
                 try:
-                    client_socket, addr = await self.loop.sock_accept(
-                        self.server_socket
+                    client_socket, addr = await self.loop.sock_accept(server_socket)
+                    if client_socket.family != getattr(socket, "AF_UNIX", None):
+                        # small response messages must not wait for delayed acks
+                        client_socket.setsockopt(
+                            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1
+                        )
+                    task = self.loop.create_task(
+                        self.handle_client(client_socket, addr)
                     )
-                    # Submit the client handling to thread pool while maintaining async behavior
-                    self.loop.run_in_executor(executor, self._sync_handle_client, client_socket, addr)
+                    # hold a strong reference until the connection is served
+                    connection_tasks.add(task)
+                    task.add_done_callback(connection_tasks.discard)
                 except Exception as e:
                     logger.exception(f"Error accepting connection: {e}")
 
         except asyncio.CancelledError:
             logger.exception(f"FlightServer ShutDown exceptionally!")
         finally:
-            executor.shutdown(wait=True)
-
-    def _sync_handle_client(self, client_socket, addr):
-        """Synchronous wrapper for handling client connections"""
-        # Create a new event loop for this thread
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            # Run the async handle_client in this thread's event loop
-            loop.run_until_complete(self.handle_client(client_socket, addr))
-        finally:
-            loop.close()
+            for task in connection_tasks:
+                task.cancel()
 
     async def handle_client(self, client_socket, addr):
         writer: Optional[asyncio.StreamWriter] = None
@@ -65,24 +133,18 @@ class FlightServer(ServerProtocol):
             reader, writer = await asyncio.open_connection(sock=client_socket)
 
             request_bytes = await self.handle_read(reader)
+            if len(request_bytes) == 0:
+                # connection probe, nothing to serve
+                return
             request_json: Dict[str, Any] = json.loads(request_bytes)
 
-            target = request_json["target"]
-            is_plugin_calling = request_json.get("is_plugin_calling", True)
-            param = request_json.get("param", "")
-
-            logger.debug(
-                f"Cmd: {target} Param: {param} is_plugin_calling: {is_plugin_calling}"
-            )
-            if is_plugin_calling:
-                if target in self.interactive_commands:
-                    await self.execute_plugin_interactively(
-                        target, param, reader, writer
-                    )
-                else:
-                    await self.execute_plugin(target, param, writer)
+            if (
+                request_json["target"] == SESSION_TARGET
+                and not request_json.get("is_plugin_calling", True)
+            ):
+                await self.serve_session(reader, writer)
             else:
-                await self.special_calling(target, param, writer)
+                await self.dispatch_request(request_json, reader, writer)
         except:
             logger.exception("error in execute plugin")
         finally:
@@ -90,15 +152,109 @@ class FlightServer(ServerProtocol):
                 writer.close()
                 await writer.wait_closed()
 
+    async def dispatch_request(
+        self,
+        request_json: Dict[str, Any],
+        reader: Optional[asyncio.StreamReader],
+        writer: Union[asyncio.StreamWriter, "SessionChannelWriter"],
+    ) -> None:
+        target = request_json["target"]
+        is_plugin_calling = request_json.get("is_plugin_calling", True)
+        param = request_json.get("param", "")
+        frame_version = int(request_json.get("frame_version", 0))
+        # codecs unknown to this agent fall back to raw frames
+        compression = request_json.get("compression", None)
+        if compression is not None:
+            compression = choose_compression([compression])
+
+        logger.debug(
+            f"Cmd: {target} Param: {param} is_plugin_calling: {is_plugin_calling}"
+        )
+        if is_plugin_calling:
+            if target in self.interactive_commands:
+                if reader is None:
+                    logger.warning(f"interactive {target} is not served in session")
+                    return
+                await self.execute_plugin_interactively(target, param, reader, writer)
+            else:
+                await self.execute_plugin(
+                    target, param, writer, frame_version, compression
+                )
+        else:
+            await self.special_calling(
+                target, param, writer, frame_version, compression
+            )
+
+    async def serve_session(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        """
+        serve one multiplexed cli session until the client disconnects, every
+        channel request is handled by its own task on the agent loop
+        """
+        write_lock = asyncio.Lock()
+        channels: Dict[int, asyncio.Task] = {}
+        await self.send(json.dumps({"session": True}).encode("utf-8"), writer)
+        try:
+            while True:
+                message = await self.handle_read(reader)
+                if len(message) < SESSION_CHANNEL_HEADER.size:
+                    # client closed the session
+                    return
+                channel_id, msg_type = SESSION_CHANNEL_HEADER.unpack_from(message, 0)
+                if msg_type == SESSION_MSG_CANCEL:
+                    task = channels.pop(channel_id, None)
+                    if task is not None:
+                        task.cancel()
+                    continue
+                if msg_type != SESSION_MSG_OPEN:
+                    logger.warning(f"unknown session message type {msg_type}")
+                    continue
+                request_json = json.loads(message[SESSION_CHANNEL_HEADER.size :])
+                channel = SessionChannelWriter(channel_id, writer, write_lock)
+                task = self.loop.create_task(self.serve_channel(request_json, channel))
+                channels[channel_id] = task
+
+                def release_channel(done_task: asyncio.Task, c: int = channel_id):
+                    if channels.get(c) is done_task:
+                        channels.pop(c)
+
+                task.add_done_callback(release_channel)
+        finally:
+            for task in channels.values():
+                task.cancel()
+
+    async def serve_channel(
+        self, request_json: Dict[str, Any], channel: "SessionChannelWriter"
+    ) -> None:
+        try:
+            await self.dispatch_request(request_json, None, channel)
+        except asyncio.CancelledError:
+            raise
+        except:
+            logger.exception("error in execute plugin")
+        if not channel.is_closing():
+            await channel.send(b"", SESSION_MSG_END)
+
     @abstractmethod
     async def execute_plugin(
-        self, cmd: str, param: str, writer: asyncio.StreamWriter
+        self,
+        cmd: str,
+        param: str,
+        writer: asyncio.StreamWriter,
+        frame_version: int = 0,
+        compression: Optional[str] = None,
     ) -> None:
         pass
 
     @abstractmethod
     async def special_calling(
-        self, target: str, param: str, writer: asyncio.StreamWriter
+        self,
+        target: str,
+        param: str,
+        writer: asyncio.StreamWriter,
+        frame_version: int = 0,
+        compression: Optional[str] = None,
     ) -> None:
         pass
 
@@ -124,15 +280,35 @@ class FlightServer(ServerProtocol):
     async def _handle_read_bytes(
         self, reader: asyncio.StreamReader, msg_len: int
     ) -> bytes:
-        data = "".encode("utf-8")
-        while len(data) < msg_len:
-            chunk = await reader.read(msg_len - len(data))
-            if not chunk:
-                break
-            data += chunk
-        return data
-
-    async def send(self, data: bytes, writer: asyncio.StreamWriter) -> None:
-        header = struct.pack("<L", len(data))
-        writer.write(header + data)
+        try:
+            return await reader.readexactly(msg_len)
+        except asyncio.IncompleteReadError as e:
+            # peer closed, caller checks the length
+            return e.partial
+
+    async def send_frame(
+        self,
+        events: List[bytes],
+        writer: asyncio.StreamWriter,
+        kind: int = FRAME_KIND_EVENTS,
+        compression: Optional[str] = None,
+    ) -> None:
+        await self.send(
+            encode_stream_frame(
+                events,
+                kind,
+                compression=compression,
+                threshold=self.compress_threshold,
+            ),
+            writer,
+        )
+
+    async def send(
+        self, data: bytes, writer: Union[asyncio.StreamWriter, "SessionChannelWriter"]
+    ) -> None:
+        if isinstance(writer, SessionChannelWriter):
+            await writer.send(data)
+            return
+        # header and payload are handed over without joining large payloads
+        writer.writelines((struct.pack("<L", len(data)), data))
         await writer.drain()
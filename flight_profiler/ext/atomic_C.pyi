@@ -0,0 +1,6 @@
+class AtomicCounter:
+    def __init__(self, initial: int = 0) -> None: ...
+    def increment(self) -> int: ...
+    def add(self, delta: int) -> int: ...
+    @property
+    def value(self) -> int: ...
@@ -4,10 +4,12 @@ from flight_profiler.plugins.server_plugin import ServerQueue
 from flight_profiler.plugins.trace.trace_profiler import TraceProfiler
 
 def set_trace_profile(
-    target: Callable[[ServerQueue, List[Any]], Any] | None,
+    target: Callable[[ServerQueue, bytes, List[str]], Any] | None,
     out_q: ServerQueue,
     interval: int,
     async_func: bool,
     depth: int
 ) -> TraceProfiler: ...
 def remove_trace_profile(profiler: Optional[TraceProfiler]) -> None: ...
+def set_trace_clock(name: str) -> str: ...
+def trace_clock_ns() -> int: ...
@@ -247,9 +247,18 @@ else:
         ],
     )
 
+STATUS_COMMAND_DESCRIPTION = CommandDescription(
+    usage=["status [-h|--help]"],
+    summary="Display agent status, including plugin preload timings.",
+    examples=["status"],
+    wiki=None,
+    options=[("-h, --help", "show help.")],
+)
+
 TRACE_COMMAND_DESCRIPTION = CommandDescription(
     usage=[
-        "trace module [class] method [-i|--interval <value>] [-nm|--nested-method <value>] [-et|--entrance_time <value>] [-d|--depth <value>] [-n|--limits <value>] [-f|--filter_expr <value>]"
+        "trace module [class] method [-i|--interval <value>] [-nm|--nested-method <value>] [-et|--entrance_time <value>] [-d|--depth <value>] [-n|--limits <value>] [-f|--filter_expr <value>] [--rate <value>]"
+        " [--sample <value>|--reservoir <value>] [--period <value>] [-o|--output <value>] [--format <value>]"
     ],
     summary="Trace the execution time of specified method invocation.",
     examples=[
@@ -257,12 +266,17 @@ TRACE_COMMAND_DESCRIPTION = CommandDescription(
         "trace __main__ func --interval 1",
         "trace __main__ func -et 30 -i 1",
         "trace __main__ classA func",
+        "trace myapp.api.* re:handle_(get|post)",
+        "trace __main__ func --sample 100 -n 1000",
+        "trace __main__ func --reservoir 20 --period 10 -n 100000",
+        "trace __main__ func -n 10000 -o trace.folded",
+        "trace __main__ func -n 10000 -o trace.json",
     ],
     wiki="https://github.com/alibaba/PyFlightProfiler/blob/main/docs/WIKI.md",
     options=[
-        ("<module>", "the module that method locates."),
-        ("<class>", "the class name if method belongs to class."),
-        ("<method>", "target method name."),
+        ("<module>", "the module that method locates, * and ? globs or re:<regex> match many methods."),
+        ("<class>", "the class name if method belongs to class, * and ? globs or re:<regex> match many methods."),
+        ("<method>", "target method name, * and ? globs or re:<regex> match many methods."),
         (
             "-i, --interval <value>",
             "display function invocation cost more than ${value} milliseconds, default is 0.1ms.",
@@ -286,6 +300,30 @@ TRACE_COMMAND_DESCRIPTION = CommandDescription(
             " (target, *args, **kwargs), eg: args[0]=='hello'.",
         ),
         ("-n, --limits <value>", "threshold of trace method times, default is 10."),
+        (
+            "--rate <value>",
+            "max traces per second sent to client, exceeding ones are sampled out, default 0 is unlimited.",
+        ),
+        (
+            "--sample <value>",
+            "sampling mode, trace 1 in ${value} invocations, their call trees are merged in the target process"
+            " and shown as one tree with count, total, mean and p99 cost of each call path. -n counts traced invocations.",
+        ),
+        (
+            "--reservoir <value>",
+            "sampling mode, trace ${value} invocations per period, each invocation of the period is equally likely to be traced.",
+        ),
+        ("--period <value>", "seconds between merged call trees in sampling mode, default is 5."),
+        (
+            "-o, --output <value>",
+            "merge traces by call path instead of showing each, and write them to ${value} as a flame graph"
+            " profile when trace ends or is interrupted.",
+        ),
+        (
+            "--format <value>",
+            "format of --output: folded (flamegraph.pl), speedscope or pprof, inferred from the extension by default:"
+            " .json is speedscope, .pb.gz is pprof, others are folded.",
+        ),
     ],
     option_offset=35,
 )
@@ -293,12 +331,13 @@ TRACE_COMMAND_DESCRIPTION = CommandDescription(
 TIME_TUNNEL_COMMAND_DESCRIPTION = CommandDescription(
     usage=[
         "tt [-t|--time_tunnel module [class] method] [-n|--limits <value>] [-l|--list] [-i|--index <value>] [-d|--delete <value>] [-nm|--nested-method <value>] [-da|--delete_all] [-x|--expand <value>] [-p|--play] [-f|--filter <value>] [-r|--raw] [-v|--verbose]"
-        " [-m|--method <value>]"
+        " [-m|--method <value>] [--rate <value>] [--snapshot] [--backend <value>]"
     ],
     summary="Time tunnel, records contexts of method invocation at different times in execution history.",
     examples=[
         "tt -t __main__ func",
         "tt -t __main__ A func",
+        "tt -t myapp.api.* *Service handle_*",
         "tt -l",
         "tt -i 1000",
         "tt -i 1000 -x 3",
@@ -309,9 +348,9 @@ TIME_TUNNEL_COMMAND_DESCRIPTION = CommandDescription(
     wiki="https://github.com/alibaba/PyFlightProfiler/blob/main/docs/WIKI.md",
     options=[
         ("-t, --time_tunnel", "record the method invocation within time fragments."),
-        ("    module", "the module that method locates."),
-        ("    <class>", "the class name if method belongs to class."),
-        ("    method", "target method name."),
+        ("    module", "the module that method locates, * and ? globs or re:<regex> match many methods."),
+        ("    <class>", "the class name if method belongs to class, * and ? globs or re:<regex> match many methods."),
+        ("    method", "target method name, * and ? globs or re:<regex> match many methods."),
         (
             "-nm, --nested-method",
             "record nested method with depth restrict to 1."
@@ -319,6 +358,18 @@ TIME_TUNNEL_COMMAND_DESCRIPTION = CommandDescription(
         ("-d,  --delete <value>", "delete time fragment specified by index."),
         ("-da, --delete_all", "delete all the time fragments."),
         ("-n,  --limits <value>", "threshold of execution times, default value 50."),
+        (
+            "--rate <value>",
+            "max records per second sent to client, exceeding ones are sampled out, default 0 is unlimited.",
+        ),
+        (
+            "--snapshot",
+            "deep copy args, kwargs and return object when recorded, by default they are referenced.",
+        ),
+        (
+            "--backend <value>",
+            "bytecode(default) wraps the method code, monitoring uses sys.monitoring events(python 3.12+).",
+        ),
         ("-l,  --list", "list all the time fragments."),
         ("-r, --raw", "display raw output without json format."),
         ("-v, --verbose", "display all the nested items in target list or dict."),
@@ -437,7 +488,7 @@ VMTOOL_COMMAND_DESCRIPTION = CommandDescription(
 
 WATCH_COMMAND_DESCRIPTION = CommandDescription(
     usage=[
-        "watch module [class] method [--expr <value>] [-nm|--nested-method <value>] [-e|--exception] [-r|--raw] [-v|--verbose] [-n|--limits <value>] [-x|--expand <value>] [-f|--filter <value>]"
+        "watch module [class] method [--expr <value>] [-nm|--nested-method <value>] [-e|--exception] [-r|--raw] [-v|--verbose] [-n|--limits <value>] [-x|--expand <value>] [-f|--filter <value>] [--rate <value>] [--snapshot] [--backend <value>]"
     ],
     summary="Display the input/output args, return object and cost time of method invocation.",
     examples=[
@@ -446,12 +497,14 @@ WATCH_COMMAND_DESCRIPTION = CommandDescription(
         "watch __main__ func -f return_obj['success']==True",
         "watch __main__ func --expr return_obj,args -f cost>10",
         "watch __main__ classA func",
+        "watch myapp.api.* *Service handle_* -n 20",
+        "watch __main__ func --backend monitoring",
     ],
     wiki="https://github.com/alibaba/PyFlightProfiler/blob/main/docs/WIKI.md",
     options=[
-        ("<module>", "the module that method locates."),
-        ("<class>", "the class name if method belongs to class."),
-        ("<method>", "target method name."),
+        ("<module>", "the module that method locates, * and ? globs or re:<regex> match many methods."),
+        ("<class>", "the class name if method belongs to class, * and ? globs or re:<regex> match many methods."),
+        ("<method>", "target method name, * and ? globs or re:<regex> match many methods."),
         (
             "--expr <value>",
             "contents you want to watch,  write python bool statement like input func args is "
@@ -475,6 +528,18 @@ WATCH_COMMAND_DESCRIPTION = CommandDescription(
             "-n, --limits <value>",
             "limit the the upperbound of display watched result, default is 10.",
         ),
+        (
+            "--rate <value>",
+            "max watched results per second sent to client, exceeding ones are sampled out, default 0 is unlimited.",
+        ),
+        (
+            "--snapshot",
+            "encode watched values before the method returns, by default they are encoded in background.",
+        ),
+        (
+            "--backend <value>",
+            "bytecode(default) wraps the method code, monitoring uses sys.monitoring events(python 3.12+).",
+        ),
         (
             "-f, --filter <value>",
             "filter method params&args&return_obj&cost&target, expressions according to --expr"
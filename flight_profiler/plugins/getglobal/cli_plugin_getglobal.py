@@ -3,6 +3,7 @@ from flight_profiler.plugins.cli_plugin import BaseCliPlugin
 from flight_profiler.plugins.getglobal.getglobal_parser import GetGlobalParser
 from flight_profiler.utils.cli_util import (
     common_plugin_execute_routine,
+    show_error_info,
     show_normal_info,
 )
 
@@ -17,6 +18,9 @@ class GetGlobalCliPlugin(BaseCliPlugin):
     def do_action(self, cmd):
         try:
             GetGlobalParser().parse_getglobal_params(cmd)
+        except SyntaxError as e:
+            show_error_info(f" getglobal command parsed failed, {e.msg}")
+            return
         except:
             show_normal_info(self.get_help())
             return
@@ -68,6 +68,11 @@ class GilStatServerPlugin(ServerPlugin):
         except:
             await self.out_q.output_msg(Message(True, traceback.format_exc()))
 
+    def cancel(self, param):
+        params = split_regex(param)
+        if valid(params) and params[0] == "on":
+            self.disable_gil_stat()
+
 
 def get_instance(cmd: str, out_q: ServerQueue):
     return GilStatServerPlugin(cmd, out_q)
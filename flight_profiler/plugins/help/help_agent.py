@@ -12,6 +12,7 @@ from flight_profiler.help_descriptions import (
     PERF_COMMAND_DESCRIPTION,
     RELOAD_COMMAND_DESCRIPTION,
     STACK_COMMAND_DESCRIPTION,
+    STATUS_COMMAND_DESCRIPTION,
     TIME_TUNNEL_COMMAND_DESCRIPTION,
     TORCH_COMMAND_DESCRIPTION,
     TRACE_COMMAND_DESCRIPTION,
@@ -45,6 +46,7 @@ HELP_COMMANDS_DESCRIPTIONS: List[CommandDescription] = [
     PERF_COMMAND_DESCRIPTION,
     RELOAD_COMMAND_DESCRIPTION,
     STACK_COMMAND_DESCRIPTION,
+    STATUS_COMMAND_DESCRIPTION,
     TRACE_COMMAND_DESCRIPTION,
     TORCH_COMMAND_DESCRIPTION,
     TIME_TUNNEL_COMMAND_DESCRIPTION,
@@ -63,6 +65,7 @@ HELP_COMMANDS_NAMES: List[str] = [
     "perf",
     "reload",
     "stack",
+    "status",
     "trace",
     "torch",
     "tt",
@@ -16,6 +16,9 @@ from flight_profiler.plugins.mem.mem_parser import (
 from flight_profiler.plugins.server_plugin import Message, ServerPlugin, ServerQueue
 from flight_profiler.utils.args_util import split_regex
 
+# imported lazily by the actions, loaded ahead by plugin preload
+PRELOAD_MODULES = ["pympler.muppy", "pympler.summary"]
+
 
 class MemServerPlugin(ServerPlugin):
     def __init__(self, cmd: str, out_q: ServerQueue):
@@ -59,6 +62,10 @@ class MemServerPlugin(ServerPlugin):
             contents = contents + line + "\n"
         return contents
 
+    def is_long_running(self, param) -> bool:
+        # mem diff sleeps through its interval
+        return MemCmd(split_regex(param)).is_diff_cmd
+
     async def do_action(self, param):
         try:
             params = split_regex(param)
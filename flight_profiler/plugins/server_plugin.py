@@ -1,7 +1,14 @@
 import asyncio
+import os
 import queue
+import threading
+import time
 from asyncio import Queue
-from typing import Optional, Union
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Union
+
+from flight_profiler.common.atomic_counter import new_counter
+from flight_profiler.common.background_encoder import global_background_encoder
 
 
 class Message:
@@ -16,24 +23,198 @@ class Message:
         self.is_newline = is_newline
 
 
+# ring buffer sizing of ServerQueue, configurable in the target process
+QUEUE_CAPACITY = max(1, int(os.getenv("PYFLIGHT_QUEUE_CAPACITY", 4096)))
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+QUEUE_DROP_POLICY = os.getenv("PYFLIGHT_QUEUE_POLICY", DROP_NEWEST)
+# bound of message bytes pending in the ring, large dumps hit it before capacity
+QUEUE_MAX_BYTES = max(1, int(os.getenv("PYFLIGHT_QUEUE_MAX_BYTES", 64 * 1024 * 1024)))
+# default events/sec cap of one stream, 0 means unlimited
+STREAM_RATE_LIMIT = max(0, int(os.getenv("PYFLIGHT_STREAM_RATE", 0)))
+# retry interval (seconds) of moving messages when out_q is full
+DRAIN_RETRY_INTERVAL = 0.001
+
+
 class ServerQueue:
-    def __init__(self, out_q: Queue, loop: Optional[asyncio.AbstractEventLoop] = None):
+    """
+    Output queue handed to plugins, producers may run on any thread.
+
+    Messages are appended to a deque bounded by capacity, used as the ring
+    (deque append/popleft are atomic, so it needs no preallocated slots), and
+    the event loop is woken once per batch to move them into out_q, so the
+    instrumented call never schedules a coroutine. When the ring is full by count
+    or pending bytes, the drop policy discards the incoming message or evicts the
+    oldest one and the drop is counted, end messages are never discarded.
+
+    With a rate limit, messages beyond the events/sec budget (token bucket with
+    one second of burst) are sampled out before they reach the ring.
+
+    Deferred messages are encoded by the background encoder, once a stream
+    defers a message the other messages follow through the encoder, so the end
+    message never overtakes the records before it. Those messages are dropped
+    like deferred ones when the encoder queue is full, except the end message.
+    """
+
+    def __init__(
+        self,
+        out_q: Queue,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        capacity: int = QUEUE_CAPACITY,
+        policy: str = QUEUE_DROP_POLICY,
+        max_bytes: int = QUEUE_MAX_BYTES,
+        rate_limit: int = STREAM_RATE_LIMIT,
+    ):
         self.out_q = out_q
         self.loop = loop
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.policy = DROP_OLDEST if policy == DROP_OLDEST else DROP_NEWEST
+        # messages moved to the stream, sampled out by rate limit, dropped on
+        # overflow, producers of any thread count them
+        self._emitted = new_counter()
+        self._sampled = new_counter()
+        self._dropped = new_counter()
+        self._ring = deque()
+        # producers and the drain on the event loop update it from any thread
+        self._pending_bytes = new_counter()
+        self._wake_pending = False
+        self.rate_limit = 0
+        self._token_lock = threading.Lock()
+        self._tokens = 0.0
+        self._token_time = 0.0
+        self.set_rate_limit(rate_limit)
+        # set by the first message handed to the background encoder, checked
+        # for every message so it is a plain flag
+        self._deferring = False
+
+    def set_rate_limit(self, rate_limit: Optional[int]) -> None:
+        """
+        cap stream to rate_limit events per second, 0 or None means unlimited
+        """
+        with self._token_lock:
+            self.rate_limit = max(0, rate_limit or 0)
+            self._tokens = float(self.rate_limit)
+            self._token_time = time.monotonic()
+
+    @property
+    def emitted(self) -> int:
+        return self._emitted.value
+
+    @property
+    def sampled(self) -> int:
+        return self._sampled.value
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped.value
 
     # for c extension
     def output_msgstr_nowait(self, is_end: int, msg: str):
-        # self.out_q.put_nowait(Message(is_end=(True if is_end != 0 else False), msg=msg))
-        asyncio.run_coroutine_threadsafe(
-            self.out_q.put(Message(is_end=(True if is_end != 0 else False), msg=msg)),
-            self.loop,
-        )
+        self._append(Message(is_end=(True if is_end != 0 else False), msg=msg))
 
     def output_msg_nowait(self, msg: Message):
-        asyncio.run_coroutine_threadsafe(self.out_q.put(msg), self.loop)
+        if self._deferring:
+            # only the end message may exceed the bound of the encoder queue
+            if not self._defer(lambda: self._append(msg), force=msg.is_end):
+                self._dropped.increment()
+            return
+        self._append(msg)
 
     async def output_msg(self, msg: Message):
-        asyncio.run_coroutine_threadsafe(self.out_q.put(msg), self.loop)
+        self.output_msg_nowait(msg)
+
+    def output_deferred(self, encode: Callable[[], Union[str, bytes]], force: bool = False) -> None:
+        """
+        sends the message encode() returns, encode runs on the background
+        encoder instead of the calling thread, dropped if the encoder is full
+        unless force
+        """
+        if not self._defer(lambda: self._append(Message(False, encode())), force):
+            self._dropped.increment()
+
+    def _defer(self, task: Callable[[], None], force: bool = False) -> bool:
+        # set before submit, later messages of this thread queue behind task
+        self._deferring = True
+        return global_background_encoder.submit(task, force)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "emitted": self.emitted,
+            "sampled": self.sampled,
+            "dropped": self.dropped,
+            "capacity": self.capacity,
+            "policy": self.policy,
+            "rate_limit": self.rate_limit,
+        }
+
+    def _take_token(self) -> bool:
+        with self._token_lock:
+            now = time.monotonic()
+            tokens = self._tokens + (now - self._token_time) * self.rate_limit
+            self._token_time = now
+            if tokens > self.rate_limit:
+                tokens = self.rate_limit
+            if tokens < 1:
+                self._tokens = tokens
+                return False
+            self._tokens = tokens - 1
+            return True
+
+    def _append(self, msg: Message) -> None:
+        if self.rate_limit > 0 and not msg.is_end and not self._take_token():
+            self._sampled.increment()
+            return
+        ring = self._ring
+        size = _message_size(msg)
+        while len(ring) > 0 and (
+            len(ring) >= self.capacity or self._pending_bytes.value + size > self.max_bytes
+        ):
+            if self.policy == DROP_OLDEST:
+                try:
+                    evicted = ring.popleft()
+                except IndexError:
+                    # drained by event loop meanwhile
+                    break
+                self._pending_bytes.add(-_message_size(evicted))
+                self._dropped.increment()
+            elif not msg.is_end:
+                self._dropped.increment()
+                return
+            else:
+                break
+        self._pending_bytes.add(size)
+        ring.append(msg)
+        if not self._wake_pending:
+            self._wake_pending = True
+            try:
+                self.loop.call_soon_threadsafe(self._drain)
+            except RuntimeError:
+                # event loop is closed, nobody is consuming anymore
+                self._wake_pending = False
+
+    def _drain(self) -> None:
+        """
+        runs on event loop, moves pending messages into out_q
+        """
+        self._wake_pending = False
+        ring = self._ring
+        out_q = self.out_q
+        while len(ring) > 0:
+            if out_q.full():
+                # consumer is behind, leave the rest in the ring and retry later
+                self._wake_pending = True
+                self.loop.call_later(DRAIN_RETRY_INTERVAL, self._drain)
+                return
+            msg = ring.popleft()
+            self._pending_bytes.add(-_message_size(msg))
+            if msg.msg is not None:
+                self._emitted.increment()
+            out_q.put_nowait(msg)
+
+
+def _message_size(msg: Message) -> int:
+    return 0 if msg.msg is None else len(msg.msg)
 
 
 class ServerPlugin:
@@ -46,6 +227,20 @@ class ServerPlugin:
     async def do_action(self, param):
         pass
 
+    def cancel(self, param) -> None:
+        """
+        client cancelled the request of do_action(param) before its end, tears
+        down what the action set up the way the "off" request does
+        """
+        pass
+
+    def is_long_running(self, param) -> bool:
+        """
+        whether do_action(param) holds its thread for long, e.g. sleeps through
+        an interval, such actions run on a thread of their own
+        """
+        return False
+
 
 class InteractiveServerPlugin(ServerPlugin):
 
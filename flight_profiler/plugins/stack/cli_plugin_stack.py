@@ -1,7 +1,7 @@
 import sys
 from typing import List
 
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.flight_client import new_flight_client
 from flight_profiler.help_descriptions import STACK_COMMAND_DESCRIPTION
 from flight_profiler.plugins.cli_plugin import BaseCliPlugin
 from flight_profiler.plugins.stack.stack_parser import StackParams, global_stack_parser
@@ -62,7 +62,7 @@ class StackCliPlugin(BaseCliPlugin):
         """
         body = {"target": "stack", "param": "async"}
         try:
-            client = FlightClient(host="localhost", port=self.port)
+            client = new_flight_client(host="localhost", port=self.port)
         except:
             show_error_info("Target process exited!")
             return
@@ -70,7 +70,7 @@ class StackCliPlugin(BaseCliPlugin):
             coro_lines: List[str] = []
             for line in client.request_stream(body):
                 if line:
-                    line = line.decode("utf-8")
+                    line = str(line, "utf-8")
                     if params.filepath is not None:
                         coro_lines.append(line)
                     else:
@@ -109,7 +109,7 @@ class StackCliPlugin(BaseCliPlugin):
         else:
             body = {"target": "stack", "param": ""}
             try:
-                client = FlightClient(host="localhost", port=self.port)
+                client = new_flight_client(host="localhost", port=self.port)
             except:
                 show_error_info("Target process exited!")
                 return
@@ -119,7 +119,7 @@ class StackCliPlugin(BaseCliPlugin):
                     with open(file_name, "w") as f:
                         for line in client.request_stream(body):
                             if line:
-                                line = line.decode("utf-8")
+                                line = str(line, "utf-8")
                                 f.write(line + "\n")
                     show_success_info(
                         f"Write stack to {file_name} successfully!"
@@ -127,7 +127,7 @@ class StackCliPlugin(BaseCliPlugin):
                 else:
                     for line in client.request_stream(body):
                         if line:
-                            line = line.decode("utf-8")
+                            line = str(line, "utf-8")
                             print(line)
             finally:
                 client.close()
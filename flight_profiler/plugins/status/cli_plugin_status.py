@@ -0,0 +1,68 @@
+import json
+from typing import Any, Dict
+
+from flight_profiler.communication.flight_client import new_flight_client
+from flight_profiler.help_descriptions import STATUS_COMMAND_DESCRIPTION
+from flight_profiler.plugins.cli_plugin import BaseCliPlugin
+from flight_profiler.utils.cli_util import show_error_info, show_normal_info
+
+
+def format_preload_timings(preload: Dict[str, Any]) -> str:
+    """
+    one line per preloaded plugin, cost in milliseconds, pending or the error
+    """
+    if not preload:
+        return "  no plugin preloaded"
+    lines = []
+    for cmd in sorted(preload):
+        timing = preload[cmd]
+        if timing is None:
+            timing = "pending"
+        elif isinstance(timing, (int, float)):
+            timing = f"{timing:.3f} ms"
+        else:
+            timing = f"failed, {timing}"
+        lines.append(f"  {cmd:<12}{timing}")
+    return "\n".join(lines)
+
+
+def format_status(status: Dict[str, Any]) -> str:
+    return (
+        f"pid: {status.get('pid')}\n"
+        f"port: {status.get('port')}\n"
+        f"compression: {', '.join(status.get('compression_supported', [])) or 'none'}\n"
+        f"preload:\n{format_preload_timings(status.get('preload', {}))}"
+    )
+
+
+class StatusCliPlugin(BaseCliPlugin):
+
+    def __init__(self, port, server_pid):
+        super().__init__(port, server_pid)
+
+    def get_help(self):
+        return STATUS_COMMAND_DESCRIPTION.help_hint()
+
+    def do_action(self, cmd):
+        if cmd is not None and len(cmd.strip()) > 0:
+            show_normal_info(self.get_help())
+            return
+        try:
+            client = new_flight_client(host="localhost", port=self.port)
+        except:
+            show_error_info("Target process exited!")
+            return
+        try:
+            status = json.loads(
+                client.request({"target": "status", "is_plugin_calling": False})
+            )
+        finally:
+            client.close()
+        show_normal_info(format_status(status))
+
+    def on_interrupted(self):
+        pass
+
+
+def get_instance(port: str, server_pid: int):
+    return StatusCliPlugin(port, server_pid)
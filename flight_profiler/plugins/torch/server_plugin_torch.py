@@ -42,6 +42,12 @@ class TorchServerPlugin(ServerPlugin):
         except:
             await self.out_q.output_msg(Message(True, traceback.format_exc()))
 
+    def cancel(self, param):
+        splits = split_regex(param)
+        current = global_torch_agent.cmd
+        if splits[0] == "on" and current is not None and current.out_q is self.out_q:
+            global_torch_agent.clear_spy(current)
+
 
 def get_instance(cmd: str, out_q: ServerQueue):
     return TorchServerPlugin(cmd, out_q)
@@ -1,22 +1,29 @@
 import argparse
 import pickle
 import sys
-from typing import Union
+from typing import Optional, Union
 
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.flight_client import new_flight_client
 from flight_profiler.help_descriptions import TRACE_COMMAND_DESCRIPTION
 from flight_profiler.plugins.cli_plugin import BaseCliPlugin
 from flight_profiler.plugins.trace.trace_agent import TracePoint
+from flight_profiler.plugins.trace.trace_export import TraceExporter
 from flight_profiler.plugins.trace.trace_frame import (
+    AggregatedTrace,
     WrapTraceFrame,
     deserialize_string_frames,
 )
 from flight_profiler.plugins.trace.trace_parser import TraceArgumentParser
-from flight_profiler.plugins.trace.trace_render import TraceRender
+from flight_profiler.plugins.trace.trace_render import (
+    AggregatedTraceRender,
+    TraceRender,
+)
 from flight_profiler.utils.cli_util import (
     common_plugin_execute_routine,
     show_error_info,
     show_normal_info,
+    show_stream_summary,
+    show_success_info,
 )
 from flight_profiler.utils.frame_util import global_filepath_operator
 
@@ -34,6 +41,9 @@ class TraceCliPlugin(BaseCliPlugin):
         except argparse.ArgumentError as e:
             show_error_info(f" Trace command parsed failed, {e}")
             return
+        except SyntaxError as e:
+            show_error_info(f" Trace command parsed failed, {e.msg}")
+            return
         except:
             show_normal_info(self.get_help())
             return
@@ -41,10 +51,17 @@ class TraceCliPlugin(BaseCliPlugin):
         self.last_cmd = cmd
         body = {"target": "trace", "param": "on " + cmd}
         try:
-            client = FlightClient(host="localhost", port=self.port)
+            client = new_flight_client(host="localhost", port=self.port)
         except:
             show_error_info("Target process exited!")
             raise
+        exporter: Optional[TraceExporter] = None
+        if trace_point.output is not None:
+            exporter = TraceExporter(trace_point.output, trace_point.output_format)
+            show_normal_info(
+                f"Merging traces into {exporter.export_format} profile {trace_point.output}, "
+                f"press Ctrl+C to stop and write it."
+            )
         try:
             first_chunk = True
             for content in client.request_stream(body):
@@ -53,33 +70,44 @@ class TraceCliPlugin(BaseCliPlugin):
                     global_filepath_operator.set_sys_path(pickle.loads(content))
                     first_chunk = False
                 else:
-                    wrap: Union[WrapTraceFrame, str] = pickle.loads(content)
+                    wrap: Union[WrapTraceFrame, AggregatedTrace, str] = pickle.loads(content)
                     if type(wrap) == str:
                         # String message (e.g., spy command hint)
                         print(wrap)
                         continue
-                    if (
-                        len(wrap.frames) > 0
-                        and wrap.frames[0] is None
-                        or len(wrap.frames) == 0
-                    ):
+                    if exporter is not None:
+                        if isinstance(wrap, AggregatedTrace):
+                            exporter.add_aggregated(wrap)
+                        else:
+                            exporter.add(wrap, int(trace_point.entrance_time * 1_000_000))
+                        continue
+                    if isinstance(wrap, AggregatedTrace):
+                        show_normal_info(AggregatedTraceRender().display(wrap))
+                        continue
+                    if not wrap.has_root():
                         # frames[0] is root frame
                         show_normal_info(
                             f"Trace method cost is below {trace_point.interval}ms, skip display."
                         )
                         continue
-                    wrap = deserialize_string_frames(wrap)
-                    if (
-                        wrap.frames[0].cost_ns
-                        < trace_point.entrance_time * 1_000_000
-                    ):
+                    if wrap.root_cost_ns() < trace_point.entrance_time * 1_000_000:
                         continue
+                    wrap = deserialize_string_frames(wrap)
                     show_msg: str = TraceRender(wrap.frames[0].cost_ns).display(
                         wrap
                     )
                     show_normal_info(show_msg)
         finally:
             client.close()
+            show_stream_summary(client.stream_stats)
+            if exporter is not None:
+                try:
+                    exporter.close()
+                    show_success_info(
+                        f"Write {exporter.traces} merged traces to {exporter.filepath} successfully!"
+                    )
+                except Exception as e:
+                    show_error_info(f"Write trace profile to {exporter.filepath} failed, {e}")
 
     def on_interrupted(self):
         common_plugin_execute_routine(
@@ -22,6 +22,7 @@ class TraceServerPlugin(ServerPlugin):
             try:
                 point: TracePoint = TraceArgumentParser().parse_trace_point(new_param)
                 point.out_q = self.out_q
+                self.out_q.set_rate_limit(point.rate_limit)
                 global_trace_agent.set_point(point)
                 # will not return end message, server request will block
             except:
@@ -38,6 +39,16 @@ class TraceServerPlugin(ServerPlugin):
         else:
             await self.out_q.output_msg(Message(True, pickle.dumps(build_error_message("trace param is illegal."))))
 
+    def cancel(self, param):
+        splits = split_regex(param)
+        if splits[0] != "on":
+            return
+        point: TracePoint = TraceArgumentParser().parse_trace_point(param[len(splits[0]) :])
+        current = global_trace_agent.aop_points.get(point.unique_key(), None)
+        # the target may be traced again by a later request meanwhile
+        if current is not None and current.out_q is self.out_q:
+            global_trace_agent.clear_point(point)
+
 
 def get_instance(cmd: str, out_q: ServerQueue):
     return TraceServerPlugin(cmd, out_q)
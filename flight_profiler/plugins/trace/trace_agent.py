@@ -10,18 +10,30 @@ from types import CodeType
 from typing import Any, Callable, Dict, List, Optional, Union
 
 from flight_profiler.common import aop_decorator
+from flight_profiler.common.aop_targets import (
+    AopTarget,
+    apply_to_targets,
+    is_target_pattern,
+)
+from flight_profiler.common.clock import TRACE_CLOCK
 from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
 from flight_profiler.common.enter_exit_command import EnterExitCommand
 from flight_profiler.common.expression_resolver import FilterExprResolver
 from flight_profiler.common.system_logger import logger
-from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.ext.trace_profile_C import (
+    remove_trace_profile,
+    set_trace_clock,
+    set_trace_profile,
+)
 from flight_profiler.plugins.server_plugin import Message, ServerQueue
 from flight_profiler.plugins.trace.trace_frame import WrapTraceFrame
+from flight_profiler.plugins.trace.trace_sampler import TraceSampler
 from flight_profiler.utils.render_util import (
     COLOR_END,
     COLOR_ORANGE,
     COLOR_RED,
     build_long_spy_command_hint,
+    build_multi_spy_command_hint,
 )
 
 # from flight_profiler.plugins.trace.trace_profiler import (
@@ -29,6 +41,12 @@ from flight_profiler.utils.render_util import (
 #     set_trace_profile,
 # )
 
+try:
+    # once per process, traced frames of every trace command share the clock
+    set_trace_clock(TRACE_CLOCK)
+except ValueError:
+    logger.exception(f"PYFLIGHT_TRACE_CLOCK={TRACE_CLOCK} is not supported, using monotonic.")
+
 
 class TracePoint(EnterExitCommand):
 
@@ -62,19 +80,57 @@ class TracePoint(EnterExitCommand):
         self.nested_method = nested_method
         self.need_wrap_nested_inplace = need_wrap_nested_inplace
         self.nested_code_obj = nested_code_obj
+        # sampling mode, traces some invocations and sends their merged tree
+        self.sampler: Optional[TraceSampler] = None
+        # client side only, traces are merged and exported to this file
+        self.output: Optional[str] = None
+        self.output_format: Optional[str] = None
+
+    def enter(self, depth: int = 2) -> bool:
+        if self.sampler is not None and not self.sampler.should_trace():
+            return False
+        return super().enter(depth + 1)
 
+    def recover_origin_code(self):
+        if self.sampler is not None:
+            # merged tree goes before the end message
+            self.sampler.close()
+        super().recover_origin_code()
 
     def child_clear_action(self):
         global_trace_agent.clear_auto_close(self.unique_key())
 
+    def for_target(self, target: AopTarget) -> "TracePoint":
+        """
+        point of one method matched by this point's name patterns
+        """
+        point = TracePoint(
+            module_name=target.module_name,
+            class_name=target.class_name,
+            method_name=target.method_name,
+            interval=self.interval,
+            entrance_time=self.entrance_time,
+            limits=self.limits,
+            depth=self.depth,
+        )
+        point.filter_expr = self.filter_expr
+        point.filter = self.filter
+        point.sampler = self.sampler
+        return point
+
 
-def c_bind_output_trace_frames(out_q: ServerQueue, sending_frames: List[str]) -> None:
+def c_bind_output_trace_frames(
+    out_q: ServerQueue,
+    sending_frames: Union[bytes, List[str]],
+    descriptions: Optional[List[str]] = None,
+) -> None:
     """
-    response trace frames to client side
+    response trace frames to client side, frame records are sent as they are
+    and decoded by the client
     """
     out_q.output_msg_nowait(
         Message(
-            False, msg=pickle.dumps(WrapTraceFrame(sending_frames))
+            False, msg=pickle.dumps(WrapTraceFrame(sending_frames, descriptions))
         )
     )
 
@@ -91,7 +147,7 @@ def generate_trace_wrapper(func_args: List[Union[Callable, Any]]) -> Callable:
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
                 trace_point: TracePoint = func_args[2]
-                if trace_point.enter():
+                if trace_point.active and trace_point.enter():
                     trace_profiler = None
                     try:
                         is_class_method: bool = func_args[5]
@@ -139,7 +195,7 @@ def generate_trace_wrapper(func_args: List[Union[Callable, Any]]) -> Callable:
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
                 trace_point: TracePoint = func_args[2]
-                if trace_point.enter():
+                if trace_point.active and trace_point.enter():
                     trace_profiler = None
                     try:
                         is_class_method: bool = func_args[5]
@@ -203,6 +259,10 @@ class TraceAgent:
             Message(is_end=False, msg=pickle.dumps(sys.path))
         )
 
+        if is_target_pattern(point.module_name, point.class_name, point.method_name):
+            self.set_group_point(point)
+            return
+
         try:
             module = importlib.import_module(point.module_name)
         except Exception as e:
@@ -217,24 +277,7 @@ class TraceAgent:
             )
             return
 
-        wrapper_result: CodeWrapperResult = aop_decorator.add_func_wrapper(
-            module,
-            point.class_name,
-            point.method_name,
-            generate_trace_wrapper,
-            [
-                set_trace_profile,
-                c_bind_output_trace_frames,
-                point,
-                int(point.interval * 1000000),
-                point.filter,
-                point.class_name is not None,
-                remove_trace_profile,
-            ],
-            ["sys", "traceback", "inspect", "types"],
-            nested_method=point.nested_method,
-            module_name=point.module_name
-        )
+        wrapper_result: CodeWrapperResult = self.wrap_method(module, point)
         if wrapper_result.failed:
             point.out_q.output_msg_nowait(
                 Message(
@@ -260,21 +303,80 @@ class TraceAgent:
                 )
             )
             self.aop_points[key] = point
+            if point.sampler is not None:
+                point.sampler.start(point.out_q)
+
+    def wrap_method(self, module, point: TracePoint) -> CodeWrapperResult:
+        return aop_decorator.add_func_wrapper(
+            module,
+            point.class_name,
+            point.method_name,
+            generate_trace_wrapper,
+            [
+                set_trace_profile,
+                c_bind_output_trace_frames if point.sampler is None else point.sampler.collect,
+                point,
+                int(point.interval * 1000000),
+                point.filter,
+                point.class_name is not None,
+                remove_trace_profile,
+            ],
+            ["sys", "traceback", "inspect", "types"],
+            nested_method=point.nested_method,
+            module_name=point.module_name
+        )
+
+    def set_group_point(self, point: TracePoint) -> None:
+        """
+        trace every method matched by the name patterns with one shared limit
+        and output stream, each trace tree is rooted at its traced method
+        """
+        failed_reason = apply_to_targets(
+            point,
+            point.for_target,
+            lambda member: self.wrap_method(
+                importlib.import_module(member.module_name), member
+            ),
+        )
+        if failed_reason is not None:
+            point.out_q.output_msg_nowait(
+                Message(True, pickle.dumps(f"{COLOR_RED}{failed_reason}{COLOR_END}"))
+            )
+            return
+        point.out_q.output_msg_nowait(
+            Message(
+                False,
+                pickle.dumps(
+                    build_multi_spy_command_hint(
+                        [(m.module_name, m.class_name, m.method_name) for m in point.members]
+                    )
+                ),
+            )
+        )
+        self.aop_points[point.unique_key()] = point
+        if point.sampler is not None:
+            point.sampler.start(point.out_q)
 
     def clear_point(self, point: TracePoint) -> None:
         """
         clear point replace
         """
-        old_point: TracePoint = self.aop_points.get(point.unique_key(), None)
+        # popped at once, an "off" may race with the cancel of the stream
+        old_point: TracePoint = self.aop_points.pop(point.unique_key(), None)
         if old_point is None:
             logger.warning(
                 f"class function {point.unique_key()} "
                 f"not watched, will skip clear"
             )
             return None
-        self.aop_points.pop(point.unique_key())
+        closing = old_point.disable()
+        if old_point.sampler is not None:
+            old_point.sampler.close()
 
-        if old_point.origin_code is not None:
+        if old_point.members:
+            old_point.restore_origin_code()
+            old_point.out_q.output_msg_nowait(Message(is_end=True, msg=""))
+        elif old_point.origin_code is not None:
             module = importlib.import_module(old_point.module_name)
             aop_decorator.clear_func_wrapper(
                 module,
@@ -284,6 +386,9 @@ class TraceAgent:
             )
             old_point.origin_code = None
             old_point.out_q.output_msg_nowait(Message(is_end=True, msg=""))
+        elif closing:
+            # limit reached and origin code restored, calls still in flight
+            old_point.out_q.output_msg_nowait(Message(is_end=True, msg=""))
 
     def clear_auto_close(self, unique_key: str):
         self.aop_points.pop(unique_key, None)
@@ -0,0 +1,331 @@
+"""
+Export of trace results as a flame graph profile.
+
+Every trace received by the client is merged by call path into one tree, see
+TraceAggregator, so thousands of invocations become one profile instead of
+thousands of printed trees. The tree is written when the trace ends, in one of:
+
+- folded: Brendan Gregg's folded stacks, one "a;b;c value" line per call path,
+  the input of flamegraph.pl and inferno
+- speedscope: speedscope.app file format, a sampled profile weighted by time
+- pprof: gzipped profile.proto, read by go tool pprof and most profile viewers
+
+Values are self time in nanoseconds, the cost of a path minus its children.
+Writers stream each call path to the file as the tree is walked, nothing but
+the tree is held in memory.
+"""
+import gzip
+import json
+import time
+from typing import IO, Dict, Iterator, List, Optional, Tuple
+
+from flight_profiler.plugins.trace.trace_frame import (
+    AggregatedTrace,
+    AggregatedTraceFrame,
+    WrapTraceFrame,
+)
+from flight_profiler.plugins.trace.trace_sampler import TraceAggregator, _PathNode
+from flight_profiler.utils.frame_util import global_filepath_operator
+
+EXPORT_FORMATS = ["folded", "speedscope", "pprof"]
+
+SPEEDSCOPE_SCHEMA = "https://www.speedscope.app/file-format-schema.json"
+
+
+def export_format_of(filepath: str) -> str:
+    """
+    format implied by the file extension, folded stacks by default
+    """
+    if filepath.endswith(".json"):
+        return "speedscope"
+    if filepath.endswith((".pb.gz", ".pprof", ".pb")):
+        return "pprof"
+    return "folded"
+
+
+class CallPath:
+    """
+    one merged call path, descriptions from the traced method down to the frame
+    """
+
+    __slots__ = ("descriptions", "count", "total_ns", "self_ns")
+
+    def __init__(self, descriptions: List[str], count: int, total_ns: int, self_ns: int):
+        self.descriptions = descriptions
+        self.count = count
+        self.total_ns = total_ns
+        self.self_ns = self_ns
+
+
+def _node_children(node: _PathNode) -> Iterator[Tuple[str, _PathNode, int, int]]:
+    for description, child in node.children.items():
+        yield description, child, child.count, child.total_ns
+
+
+def _frame_children(
+    frame: AggregatedTraceFrame,
+) -> Iterator[Tuple[str, AggregatedTraceFrame, int, int]]:
+    for child in frame.sub_frames:
+        description = f"{child.method_name}\x00{child.filename}\x00{child.line_no}"
+        yield description, child, child.count, child.total_ns
+
+
+def walk_call_paths(root, children) -> Iterator[CallPath]:
+    """
+    call paths of a merged tree depth first, parents before their children,
+    the list of descriptions yielded is reused and only valid until the next
+    """
+    descriptions: List[str] = []
+    stack = [(0, iter(children(root)))]
+    while stack:
+        depth, it = stack[-1]
+        entry = next(it, None)
+        if entry is None:
+            stack.pop()
+            continue
+        description, node, count, total_ns = entry
+        del descriptions[depth:]
+        descriptions.append(description)
+        child_ns = sum(c[3] for c in children(node))
+        yield CallPath(descriptions, count, total_ns, max(total_ns - child_ns, 0))
+        stack.append((depth + 1, iter(children(node))))
+
+
+class FrameNames:
+    """
+    display name, file and line of descriptions, cached as the same frames
+    show up in many paths
+    """
+
+    def __init__(self):
+        self.cache: Dict[str, Tuple[str, str, int]] = dict()
+
+    def get(self, description: str) -> Tuple[str, str, int]:
+        info = self.cache.get(description)
+        if info is None:
+            method_name, filename, line_no = description.split("\x00")
+            try:
+                line = int(line_no)
+            except ValueError:
+                line = 0
+            if filename != "<built-in>":
+                filename = global_filepath_operator.shorten_filepath(filename)
+            info = (method_name, filename, line)
+            self.cache[description] = info
+        return info
+
+
+class FoldedWriter:
+
+    def __init__(self, f: IO[bytes]):
+        self.f = f
+        self.names = FrameNames()
+        self.labels: Dict[str, str] = dict()
+
+    def label(self, description: str) -> str:
+        label = self.labels.get(description)
+        if label is None:
+            method_name, filename, line = self.names.get(description)
+            if filename == "<built-in>":
+                label = method_name
+            else:
+                label = f"{method_name} ({filename}:{line})"
+            # ; separates frames and the last space the value
+            label = label.replace(";", ":").replace("\n", " ")
+            self.labels[description] = label
+        return label
+
+    def write(self, paths: Iterator[CallPath], name: str) -> None:
+        for path in paths:
+            if path.self_ns <= 0:
+                continue
+            stack = ";".join(self.label(d) for d in path.descriptions)
+            self.f.write(f"{stack} {path.self_ns}\n".encode("utf-8"))
+
+
+class SpeedscopeWriter:
+
+    def __init__(self, f: IO[bytes]):
+        self.f = f
+        self.names = FrameNames()
+        self.frames: Dict[str, int] = dict()
+
+    def frame_index(self, description: str) -> int:
+        index = self.frames.get(description)
+        if index is None:
+            index = len(self.frames)
+            self.frames[description] = index
+        return index
+
+    def write(self, paths: Iterator[CallPath], name: str) -> None:
+        weights: List[int] = []
+        write = self.f.write
+        # keys of a json object are unordered, frames go last when all are known
+        write(
+            f'{{"$schema":{json.dumps(SPEEDSCOPE_SCHEMA)},"exporter":"flight_profiler",'
+            f'"name":{json.dumps(name)},"activeProfileIndex":0,"profiles":[{{'
+            f'"type":"sampled","name":{json.dumps(name)},"unit":"nanoseconds",'
+            f'"startValue":0,"samples":['.encode("utf-8")
+        )
+        for path in paths:
+            if path.self_ns <= 0:
+                continue
+            stack = ",".join(str(self.frame_index(d)) for d in path.descriptions)
+            write(f'{"," if weights else ""}[{stack}]'.encode("utf-8"))
+            weights.append(path.self_ns)
+        write(f'],"endValue":{sum(weights)},"weights":['.encode("utf-8"))
+        for i in range(0, len(weights), 4096):
+            chunk = ",".join(str(w) for w in weights[i : i + 4096])
+            write(f'{"," if i else ""}{chunk}'.encode("utf-8"))
+        write(b']}],"shared":{"frames":[')
+        for i, description in enumerate(self.frames):
+            method_name, filename, line = self.names.get(description)
+            frame = {"name": method_name, "file": filename}
+            if line > 0:
+                frame["line"] = line
+            write(f'{"," if i else ""}{json.dumps(frame)}'.encode("utf-8"))
+        write(b"]}}")
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field_varint(field: int, value: int) -> bytes:
+    return _varint(field << 3) + _varint(value)
+
+
+def _field_bytes(field: int, data: bytes) -> bytes:
+    return _varint((field << 3) | 2) + _varint(len(data)) + data
+
+
+def _field_packed(field: int, values: List[int]) -> bytes:
+    return _field_bytes(field, b"".join(_varint(v) for v in values))
+
+
+class PprofWriter:
+    """
+    profile.proto written by hand: samples are written as the paths are
+    walked, locations, functions and the string table follow as fields of a
+    message may come in any order
+    """
+
+    # Profile fields
+    SAMPLE_TYPE, SAMPLE, LOCATION, FUNCTION, STRING_TABLE = 1, 2, 4, 5, 6
+    TIME_NANOS, DURATION_NANOS, PERIOD_TYPE, PERIOD = 9, 10, 11, 12
+
+    def __init__(self, f: IO[bytes], duration_ns: int = 0):
+        self.f = f
+        self.duration_ns = duration_ns
+        self.names = FrameNames()
+        self.strings: Dict[str, int] = {"": 0}
+        # description to location id, one function per location
+        self.locations: Dict[str, int] = dict()
+
+    def string(self, value: str) -> int:
+        index = self.strings.get(value)
+        if index is None:
+            index = len(self.strings)
+            self.strings[value] = index
+        return index
+
+    def location(self, description: str) -> int:
+        location_id = self.locations.get(description)
+        if location_id is None:
+            location_id = len(self.locations) + 1
+            self.locations[description] = location_id
+        return location_id
+
+    def value_type(self, type_name: str, unit: str) -> bytes:
+        return _field_varint(1, self.string(type_name)) + _field_varint(2, self.string(unit))
+
+    def write(self, paths: Iterator[CallPath], name: str) -> None:
+        write = self.f.write
+        write(_field_bytes(self.SAMPLE_TYPE, self.value_type("calls", "count")))
+        write(_field_bytes(self.SAMPLE_TYPE, self.value_type("wall", "nanoseconds")))
+        for path in paths:
+            if path.self_ns <= 0 and path.count <= 0:
+                continue
+            # leaf first
+            location_ids = [self.location(d) for d in reversed(path.descriptions)]
+            sample = _field_packed(1, location_ids) + _field_packed(2, [path.count, path.self_ns])
+            write(_field_bytes(self.SAMPLE, sample))
+        for description, location_id in self.locations.items():
+            method_name, filename, line = self.names.get(description)
+            line_msg = _field_varint(1, location_id) + _field_varint(2, line)
+            write(
+                _field_bytes(
+                    self.LOCATION,
+                    _field_varint(1, location_id) + _field_bytes(4, line_msg),
+                )
+            )
+            write(
+                _field_bytes(
+                    self.FUNCTION,
+                    _field_varint(1, location_id)
+                    + _field_varint(2, self.string(method_name))
+                    + _field_varint(3, self.string(method_name))
+                    + _field_varint(4, self.string(filename))
+                    + _field_varint(5, line),
+                )
+            )
+        write(_field_varint(self.TIME_NANOS, time.time_ns()))
+        write(_field_varint(self.DURATION_NANOS, self.duration_ns))
+        write(_field_bytes(self.PERIOD_TYPE, self.value_type("wall", "nanoseconds")))
+        write(_field_varint(self.PERIOD, 1))
+        # dict keeps insertion order, which is the index order
+        for value in self.strings:
+            write(_field_bytes(self.STRING_TABLE, value.encode("utf-8")))
+
+
+class TraceExporter:
+    """
+    merges the traces received by the client and writes them as a profile
+    when closed
+    """
+
+    def __init__(self, filepath: str, export_format: Optional[str] = None):
+        self.filepath = filepath
+        self.export_format = export_format or export_format_of(filepath)
+        if self.export_format not in EXPORT_FORMATS:
+            raise ValueError(f"unknown export format {self.export_format}")
+        self.aggregator = TraceAggregator(quantiles=False)
+        # sampling mode sends merged trees, the last one covers all before it
+        self.aggregated: Optional[AggregatedTrace] = None
+        self.start_ns = time.time_ns()
+
+    @property
+    def traces(self) -> int:
+        if self.aggregated is not None:
+            return self.aggregated.traces
+        return self.aggregator.traces
+
+    def add(self, wrap: WrapTraceFrame, min_root_cost_ns: int = 0) -> bool:
+        return self.aggregator.merge(wrap.frames, wrap.descriptions, min_root_cost_ns)
+
+    def add_aggregated(self, trace: AggregatedTrace) -> None:
+        self.aggregated = trace
+
+    def call_paths(self) -> Iterator[CallPath]:
+        if self.aggregated is not None:
+            root = AggregatedTraceFrame("\x00\x000", 0, 0, 0)
+            root.sub_frames = self.aggregated.frames
+            return walk_call_paths(root, _frame_children)
+        return walk_call_paths(self.aggregator.root, _node_children)
+
+    def close(self) -> None:
+        name = f"trace {self.traces} invocations"
+        if self.export_format == "pprof":
+            with gzip.open(self.filepath, "wb") as f:
+                PprofWriter(f, time.time_ns() - self.start_ns).write(self.call_paths(), name)
+        else:
+            with open(self.filepath, "wb") as f:
+                if self.export_format == "speedscope":
+                    SpeedscopeWriter(f).write(self.call_paths(), name)
+                else:
+                    FoldedWriter(f).write(self.call_paths(), name)
@@ -1,5 +1,10 @@
+import struct
 import threading
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
+
+# a frame kept by the native profiler: start_ns, cost_ns, description index and
+# parent offset, packed back to back, see FrameRecord in trace_profile.c
+FRAME_RECORD = struct.Struct("=qqii")
 
 
 class TraceFrame:
@@ -17,11 +22,19 @@ class TraceFrame:
 
 class WrapTraceFrame:
     """
-    server sent frame list, contains frame level infos
+    server sent frame list, contains frame level infos. The native profiler
+    sends frames as packed FRAME_RECORDs referring to descriptions by index,
+    the debug python profiler as strings, both are turned into TraceFrames by
+    deserialize_string_frames.
     """
 
-    def __init__(self, frames: List[Union[str, TraceFrame]]):
+    def __init__(
+        self,
+        frames: Union[bytes, List[Union[str, TraceFrame]]],
+        descriptions: Optional[List[str]] = None,
+    ):
         self.frames = frames
+        self.descriptions = descriptions
         self.thread_id = threading.get_ident()
         self.thread_name = None
         self.is_daemon = None
@@ -30,6 +43,28 @@ class WrapTraceFrame:
                 self.thread_name = thread.name
                 self.is_daemon = thread.daemon
 
+    def has_root(self) -> bool:
+        """
+        whether the root frame, the traced method, is kept
+        """
+        if isinstance(self.frames, bytes):
+            return (
+                len(self.frames) >= FRAME_RECORD.size
+                and FRAME_RECORD.unpack_from(self.frames)[2] >= 0
+            )
+        return len(self.frames) > 0 and self.frames[0] is not None
+
+    def root_cost_ns(self) -> int:
+        """
+        cost of the root frame without decoding the others
+        """
+        if isinstance(self.frames, bytes):
+            return FRAME_RECORD.unpack_from(self.frames)[1]
+        root = self.frames[0]
+        if isinstance(root, str):
+            return int(root.split("\x01")[2])
+        return root.cost_ns
+
 
 class FlattenTreeTraceFrame:
 
@@ -38,8 +73,13 @@ class FlattenTreeTraceFrame:
         description: str,
         start_ns: int,
         cost_ns: int,
+        infos: Optional[List[Any]] = None,
     ):
-        infos: List[Any] = description.split("\x00")
+        """
+        :param infos: description already split, frames of one method share it
+        """
+        if infos is None:
+            infos = description.split("\x00")
         self.method_name = infos[0]
         self.filename = infos[1]
         self.line_no = str(infos[2])
@@ -58,11 +98,16 @@ def build_frame_stack(frames: List[TraceFrame]) -> FlattenTreeTraceFrame:
     build frame tree by server frame pid list
     """
     frame_map: Dict[int, FlattenTreeTraceFrame] = dict()
+    split_descriptions: Dict[str, List[str]] = dict()
     for idx, frame in enumerate(frames):
         if frame is None:
             continue
+        infos = split_descriptions.get(frame.description)
+        if infos is None:
+            infos = frame.description.split("\x00")
+            split_descriptions[frame.description] = infos
         tree_frame = FlattenTreeTraceFrame(
-            frame.description, frame.start_ns, frame.cost_ns
+            frame.description, frame.start_ns, frame.cost_ns, infos
         )
         frame_map[idx] = tree_frame
         if frame.pid in frame_map:
@@ -74,7 +119,12 @@ def deserialize_string_frames(wrap: WrapTraceFrame) -> WrapTraceFrame:
     """
     server frame info is 'method_name\x00file_name\x00lineno\x01start_ns\x01cost_ns\x01parent_id'
     parent_id is the offset of parent frame in wrap.frames, starts with 0.
+    frames sent as records carry the same fields, the description is looked up.
     """
+    if isinstance(wrap.frames, bytes):
+        wrap.frames = _decode_records(wrap.frames, wrap.descriptions)
+        wrap.descriptions = None
+        return wrap
     deserialized_frames = []
     for frame in wrap.frames:
         if frame is not None:
@@ -87,3 +137,67 @@ def deserialize_string_frames(wrap: WrapTraceFrame) -> WrapTraceFrame:
         deserialized_frames.append(t)
     wrap.frames = deserialized_frames
     return wrap
+
+
+def _decode_records(records: bytes, descriptions: List[str]) -> List[Optional[TraceFrame]]:
+    frames: List[Optional[TraceFrame]] = []
+    append = frames.append
+    for start_ns, cost_ns, desc, pid in FRAME_RECORD.iter_unpack(records):
+        if desc < 0:
+            append(None)
+            continue
+        t = TraceFrame(descriptions[desc], start_ns)
+        t.cost_ns = cost_ns
+        t.pid = pid
+        append(t)
+    return frames
+
+
+class AggregatedTraceFrame:
+    """
+    one call path of sampled traces merged by the agent, costs are of all the
+    calls of the path across the merged traces
+    """
+
+    def __init__(self, description: str, count: int, total_ns: int, p99_ns: int):
+        """
+        :param description: method_name\x00file_name\x00lineno
+        """
+        infos: List[Any] = description.split("\x00")
+        self.method_name = infos[0]
+        self.filename = infos[1]
+        self.line_no = str(infos[2])
+        self.c_frame = self.filename == "<built-in>"
+        self.await_frame = self.method_name == "[await]"
+        self.count = count
+        self.total_ns = total_ns
+        self.p99_ns = p99_ns
+        self.sub_frames: List[AggregatedTraceFrame] = []
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.count if self.count > 0 else 0
+
+
+class AggregatedTrace:
+    """
+    merged call trees of the sampled invocations so far, sent periodically by
+    trace in sampling mode, frames are the traced methods
+    """
+
+    def __init__(
+        self,
+        frames: List[AggregatedTraceFrame],
+        invocations: int,
+        traces: int,
+        dropped: int,
+        start_ns: int,
+        end_ns: int,
+    ):
+        self.frames = frames
+        # invocations seen by the sampler, traced ones and those lost
+        self.invocations = invocations
+        self.traces = traces
+        self.dropped = dropped
+        self.start_ns = start_ns
+        self.end_ns = end_ns
@@ -3,6 +3,8 @@ from argparse import RawTextHelpFormatter
 
 from flight_profiler.help_descriptions import TRACE_COMMAND_DESCRIPTION
 from flight_profiler.plugins.trace.trace_agent import TracePoint
+from flight_profiler.plugins.trace.trace_export import EXPORT_FORMATS
+from flight_profiler.plugins.trace.trace_sampler import TraceSampler
 from flight_profiler.utils.args_util import rewrite_args
 
 
@@ -24,6 +26,23 @@ def check_depth(value):
         raise argparse.ArgumentTypeError(f"{value} is not a integer above 1 or -1")
 
 
+def check_positive(value):
+    try:
+        i_value = int(value)
+    except:
+        raise argparse.ArgumentTypeError(f"{value} is not a integer.")
+    if i_value < 1:
+        raise argparse.ArgumentTypeError(f"{value} should be above 0.")
+    return i_value
+
+
+def check_period(value):
+    f_value = check_interval(value)
+    if f_value <= 0:
+        raise argparse.ArgumentTypeError(f"period: {value} should be above 0.")
+    return f_value
+
+
 class TraceArgumentParser(argparse.ArgumentParser):
 
     def __init__(self):
@@ -77,6 +96,50 @@ class TraceArgumentParser(argparse.ArgumentParser):
             default=None,
             help="filter expression",
         )
+        self.add_argument(
+            "--rate",
+            required=False,
+            type=int,
+            default=0,
+            help="max events per second sent to client, exceeding events are sampled out, 0 means unlimited.",
+        )
+        sampling = self.add_mutually_exclusive_group()
+        sampling.add_argument(
+            "--sample",
+            type=check_positive,
+            required=False,
+            default=0,
+            help="trace 1 in #sample invocations and show their merged call tree.",
+        )
+        sampling.add_argument(
+            "--reservoir",
+            type=check_positive,
+            required=False,
+            default=0,
+            help="trace #reservoir invocations per period chosen by reservoir sampling and show their merged call tree.",
+        )
+        self.add_argument(
+            "--period",
+            type=check_period,
+            required=False,
+            default=5,
+            help="seconds between merged call trees sent in sampling mode, default is 5.",
+        )
+
+        self.add_argument(
+            "-o",
+            "--output",
+            required=False,
+            default=None,
+            help="merge traces by call path and export them to filepath as a flame graph profile.",
+        )
+        self.add_argument(
+            "--format",
+            choices=EXPORT_FORMATS,
+            required=False,
+            default=None,
+            help="format of --output, inferred from its extension by default: .json is speedscope, .pb.gz is pprof, others are folded stacks.",
+        )
 
     def error(self, message):
         raise Exception(message)
@@ -97,4 +160,14 @@ class TraceArgumentParser(argparse.ArgumentParser):
             limits=getattr(args, "limits"),
             filter_expr=getattr(args, "filter_expr"),
         )
+        point.rate_limit = getattr(args, "rate")
+        point.output = args.output
+        point.output_format = args.format
+        if args.sample > 0 or args.reservoir > 0:
+            point.sampler = TraceSampler(
+                every=args.sample,
+                reservoir=args.reservoir,
+                period_s=args.period,
+                min_root_cost_ns=int(point.entrance_time * 1_000_000),
+            )
         return point
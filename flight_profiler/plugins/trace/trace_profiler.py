@@ -7,6 +7,7 @@ import time
 from types import FrameType
 from typing import Any, Callable, List
 
+from flight_profiler.common.clock import WallClock, now_ns
 from flight_profiler.plugins.server_plugin import ServerQueue
 
 
@@ -46,6 +47,7 @@ class TraceProfiler:
         self.interval = interval
         self.first = True
         self.is_async = is_async
+        self.wall_clock = WallClock()
 
     def push_frame(self, start_ns: int, f_info: str):
         nd = FrameNode()
@@ -306,7 +308,7 @@ class TraceProfiler:
                 getattr(arg, "__qualname__", arg.__name__),
                 "<built-in>",
                 0,
-                start_ns,
+                self.wall_clock.to_ns(start_ns),
                 cost_ns,
                 pid,
             )
@@ -315,7 +317,7 @@ class TraceProfiler:
                 frame.f_code.co_name,
                 frame.f_code.co_filename,
                 frame.f_code.co_firstlineno,
-                start_ns,
+                self.wall_clock.to_ns(start_ns),
                 cost_ns,
                 pid,
             )
@@ -325,7 +327,7 @@ class TraceProfiler:
             "[await]",
             "",
             0,
-            start_ns,
+            self.wall_clock.to_ns(start_ns),
             cost_ns,
             pid,
         )
@@ -333,7 +335,9 @@ class TraceProfiler:
     def build_last_async_frame(
         self, frame_desp: str, start_ns: int, cost_ns: int, pid: int
     ) -> str:
-        return "%s\x01%i\x01%i\x01%i" % (frame_desp, start_ns, cost_ns, pid)
+        return "%s\x01%i\x01%i\x01%i" % (
+            frame_desp, self.wall_clock.to_ns(start_ns), cost_ns, pid
+        )
 
     def get_header(self, frame, c_frame, arg):
         if c_frame != 0:
@@ -423,7 +427,7 @@ class TraceProfiler:
                 f" frame: {self.get_frame_info(frame, 0, 0, 0, arg, 1 if 'c_' in event else 0)}"
             )
 
-            c_time = time.time_ns()
+            c_time = now_ns()
             if event == "call" or event == "c_call":
                 if event == "c_call":
                     c_frame = 1
@@ -476,7 +480,7 @@ class TraceProfiler:
                 and event != "c_return"
                 and event != "c_exception"
             )
-            c_time = time.time_ns()
+            c_time = now_ns()
             if event == "call" or event == "c_call":
                 if event == "c_call":
                     c_frame = 1
@@ -527,7 +531,7 @@ class TraceProfiler:
                 f" frame: {self.get_frame_info(frame, 0, 0, 0, arg, 1 if 'c_' in event else 0)}"
             )
 
-            c_time = time.time_ns()
+            c_time = now_ns()
             if event == "call" or event == "c_call":
                 if event == "c_call":
                     c_frame = 1
@@ -580,7 +584,7 @@ class TraceProfiler:
                 and event != "c_return"
                 and event != "c_exception"
             )
-            c_time = time.time_ns()
+            c_time = now_ns()
             if event == "call" or event == "c_call":
                 if event == "c_call":
                     c_frame = 1
@@ -2,6 +2,8 @@ import traceback
 from typing import List, Optional
 
 from flight_profiler.plugins.trace.trace_frame import (
+    AggregatedTrace,
+    AggregatedTraceFrame,
     FlattenTreeTraceFrame,
     WrapTraceFrame,
     build_frame_stack,
@@ -148,3 +150,65 @@ class TraceRender(SkipStrategy):
                 cc_indent = child_indent + INDENT[3]
             show_msg = show_msg + self.render_frame(sub_frame, c_indent, cc_indent)
         return show_msg
+
+
+class AggregatedTraceRender(TraceRender):
+    """
+    merged call tree of sampled invocations, each call path shows the number of
+    calls and their total, mean and p99 cost, colored by weight in the total
+    cost of the traced methods
+    """
+
+    def __init__(self):
+        super().__init__(0)
+
+    def display(self, trace: AggregatedTrace) -> str:
+        try:
+            self.total_cost_ns = sum(frame.total_ns for frame in trace.frames)
+            title: str = (
+                f"{COLOR_FAINT}{BOX_HORIZONTAL * 60}{COLOR_END}\n"
+                f"{CMD_ICON_TRACE} {COLOR_WHITE_255}{time_ns_to_formatted_string(trace.start_ns)}{COLOR_END} ~ "
+                f"{COLOR_WHITE_255}{time_ns_to_formatted_string(trace.end_ns)}{COLOR_END} "
+                f"{COLOR_FAINT}invocations={COLOR_END}{trace.invocations} "
+                f"{COLOR_FAINT}traced={COLOR_END}{trace.traces} "
+                f"{COLOR_FAINT}dropped={COLOR_END}{trace.dropped}\n"
+            )
+            if not trace.frames:
+                return title + "No sampled invocation is traced yet.\n"
+            return title + "".join(
+                self.render_frame(self.preprocess_frame(frame)) for frame in trace.frames
+            )
+        except:
+            return traceback.format_exc()
+
+    def render_frame(
+        self, frame: AggregatedTraceFrame, indent: str = "", child_indent: str = ""
+    ) -> str:
+        time_color: str = self.get_color_by_time(frame.total_ns)
+        stats = (
+            f"[{time_color}{frame.total_ns / 1000000:.3f}ms{COLOR_END} "
+            f"{COLOR_FAINT}count={COLOR_END}{frame.count} "
+            f"{COLOR_FAINT}mean={COLOR_END}{frame.mean_ns / 1000000:.3f}ms "
+            f"{COLOR_FAINT}p99={COLOR_END}{frame.p99_ns / 1000000:.3f}ms]"
+        )
+        if frame.await_frame:
+            show_msg = f"{indent}{stats}  {COLOR_AWAIT}{frame.method_name}{COLOR_END}\n"
+        elif frame.c_frame:
+            show_msg = (
+                f"{indent}{stats}  {COLOR_FUNCTION}{frame.method_name}{COLOR_END}    "
+                f"{COLOR_FAINT}{frame.filename}{COLOR_END}\n"
+            )
+        else:
+            show_msg = (
+                f"{indent}{stats} {COLOR_FUNCTION}{frame.method_name}{COLOR_END}    "
+                f"{COLOR_FAINT}{frame.filename}:{frame.line_no}{COLOR_END}\n"
+            )
+        for i, sub_frame in enumerate(frame.sub_frames):
+            if i < len(frame.sub_frames) - 1:
+                c_indent = child_indent + INDENT[0]
+                cc_indent = child_indent + INDENT[1]
+            else:
+                c_indent = child_indent + INDENT[2]
+                cc_indent = child_indent + INDENT[3]
+            show_msg = show_msg + self.render_frame(sub_frame, c_indent, cc_indent)
+        return show_msg
@@ -0,0 +1,333 @@
+"""
+Sampling mode of trace: only some invocations of the traced method are traced
+and their call trees are merged in the agent, so a method called thousands of
+times a second is profiled without tracing every call and only the merged tree
+is sent to the client.
+
+Invocations are chosen 1 in N, or by reservoir sampling: in each period every
+invocation has the same chance to be among the K traced ones. Merging runs on
+the background encoder, the traced thread only hands the frames over.
+"""
+import os
+import pickle
+import random
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from flight_profiler.common.atomic_counter import new_counter
+from flight_profiler.common.background_encoder import global_background_encoder
+from flight_profiler.common.clock import WallClock, now_ns
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.trace.trace_frame import (
+    FRAME_RECORD,
+    AggregatedTrace,
+    AggregatedTraceFrame,
+    WrapTraceFrame,
+    deserialize_string_frames,
+)
+
+# call paths kept by one aggregated tree, frames of new paths beyond are not merged
+TRACE_AGGREGATE_MAX_NODES = max(1, int(os.getenv("PYFLIGHT_TRACE_AGGREGATE_MAX_NODES", 100000)))
+
+# histogram buckets split each power of two in 1 << _SUB_BITS, a bucket's
+# bound is within 12.5% of the values in it
+_SUB_BITS = 3
+_EXACT_BELOW = 1 << (_SUB_BITS + 1)
+
+
+def _bucket(value: int) -> int:
+    if value < _EXACT_BELOW:
+        return max(value, 0)
+    shift = value.bit_length() - _SUB_BITS - 1
+    return (shift << _SUB_BITS) + (value >> shift)
+
+
+def _bucket_bound(bucket: int) -> int:
+    """
+    largest value of bucket
+    """
+    if bucket < _EXACT_BELOW:
+        return bucket
+    shift = (bucket >> _SUB_BITS) - 1
+    mantissa = (bucket & ((1 << _SUB_BITS) - 1)) + (1 << _SUB_BITS)
+    return ((mantissa + 1) << shift) - 1
+
+
+class LogHistogram:
+    """
+    counts of values by logarithmic bucket, quantiles are bucket bounds
+    """
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = dict()
+        self.count = 0
+        self.max = 0
+
+    def add(self, value: int) -> None:
+        bucket = _bucket(value)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> int:
+        if self.count == 0:
+            return 0
+        rank = max(1, int(q * self.count + 0.999999))
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= rank:
+                return min(_bucket_bound(bucket), self.max)
+        return self.max
+
+
+class _PathNode:
+
+    __slots__ = ("children", "count", "total_ns", "histogram")
+
+    def __init__(self, histogram: bool = True):
+        self.children: Dict[str, "_PathNode"] = dict()
+        self.count = 0
+        self.total_ns = 0
+        self.histogram = LogHistogram() if histogram else None
+
+
+class TraceAggregator:
+    """
+    call trees merged by call path, a path is the descriptions from the traced
+    method down to the frame, quantiles=False keeps no histogram per path
+    """
+
+    def __init__(self, max_nodes: int = TRACE_AGGREGATE_MAX_NODES, quantiles: bool = True):
+        self.root = _PathNode(False)
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.quantiles = quantiles
+        self.traces = 0
+
+    def merge(
+        self,
+        frames: Union[bytes, List[str]],
+        descriptions: Optional[List[str]],
+        min_root_cost_ns: int = 0,
+    ) -> bool:
+        """
+        merges one trace, returns False when its root frame is not kept or
+        costs less than min_root_cost_ns
+        """
+        rows = self._rows(frames, descriptions, min_root_cost_ns)
+        if rows is None:
+            return False
+        records, descriptions = rows
+        self.traces += 1
+        quantiles = self.quantiles
+        paths: Dict[int, _PathNode] = {-1: self.root}
+        for offset, (_, cost_ns, desc, pid) in enumerate(records):
+            if desc < 0:
+                continue
+            parent = paths.get(pid)
+            if parent is None:
+                # under a frame that was not kept or not merged
+                continue
+            description = descriptions[desc]
+            node = parent.children.get(description)
+            if node is None:
+                if self.nodes >= self.max_nodes:
+                    continue
+                node = _PathNode(quantiles)
+                parent.children[description] = node
+                self.nodes += 1
+            node.count += 1
+            node.total_ns += cost_ns
+            if quantiles:
+                node.histogram.add(cost_ns)
+            paths[offset] = node
+        return True
+
+    @staticmethod
+    def _rows(
+        frames: Union[bytes, List[str]],
+        descriptions: Optional[List[str]],
+        min_root_cost_ns: int,
+    ) -> Optional[Tuple[Iterable[Tuple[int, int, int, int]], List[str]]]:
+        """
+        records of the frames by offset as FRAME_RECORD fields and the
+        descriptions they index, None when the root frame is not kept or too
+        short
+        """
+        if isinstance(frames, bytes):
+            if len(frames) < FRAME_RECORD.size:
+                return None
+            _, root_cost_ns, root_desc, _ = FRAME_RECORD.unpack_from(frames)
+            if root_desc < 0 or root_cost_ns < min_root_cost_ns:
+                return None
+            return FRAME_RECORD.iter_unpack(frames), descriptions
+        # string frames of the debug python profiler
+        decoded = deserialize_string_frames(WrapTraceFrame(frames)).frames
+        if not decoded or decoded[0] is None or decoded[0].cost_ns < min_root_cost_ns:
+            return None
+        records = [
+            (0, 0, -1, 0) if f is None else (f.start_ns, f.cost_ns, offset, f.pid)
+            for offset, f in enumerate(decoded)
+        ]
+        return records, [None if f is None else f.description for f in decoded]
+
+    def snapshot(self) -> List[AggregatedTraceFrame]:
+        """
+        merged trees of the traced methods, children by total cost descending
+        """
+        return self._snapshot_children(self.root)
+
+    def _snapshot_children(self, node: _PathNode) -> List[AggregatedTraceFrame]:
+        frames = []
+        for description, child in node.children.items():
+            frame = AggregatedTraceFrame(
+                description,
+                child.count,
+                child.total_ns,
+                child.histogram.quantile(0.99) if child.histogram is not None else 0,
+            )
+            frame.sub_frames = self._snapshot_children(child)
+            frames.append(frame)
+        frames.sort(key=lambda f: f.total_ns, reverse=True)
+        return frames
+
+
+class TraceSampler:
+    """
+    Chooses the invocations a trace point traces and aggregates their frames,
+    the merged tree is sent every period by a timer on the loop of the output
+    queue, skipped if nothing was traced since the last one, and when the trace
+    point closes.
+    """
+
+    def __init__(
+        self,
+        every: int = 0,
+        reservoir: int = 0,
+        period_s: float = 5,
+        min_root_cost_ns: int = 0,
+    ):
+        self.every = every
+        self.reservoir = reservoir
+        self.period_ns = int(period_s * 1_000_000_000)
+        self.min_root_cost_ns = min_root_cost_ns
+        self.aggregator = TraceAggregator()
+        self.wall_clock = WallClock()
+        self.start_ns = now_ns()
+        self.out_q: Optional[ServerQueue] = None
+        self.__seen = new_counter()
+        self.__dropped = new_counter()
+        # reservoir of the current period, (frames, descriptions) of traces
+        self.__window_seen = new_counter()
+        self.__kept: List[Tuple] = []
+        self.__lock = threading.Lock()
+        # traces collected, and collected when the last tree was sent
+        self.__collected = new_counter()
+        self.__emitted = 0
+        # a periodic emit never follows the last one of close()
+        self.__emit_lock = threading.Lock()
+        self.__closed = False
+
+    def should_trace(self) -> bool:
+        """
+        called before an invocation enters, whether it is traced
+        """
+        seen = self.__seen.increment()
+        if self.reservoir > 0:
+            # the i-th invocation of a period is kept with probability K / i
+            i = self.__window_seen.increment()
+            return i <= self.reservoir or random.randrange(i) < self.reservoir
+        return seen % self.every == 0
+
+    def start(self, out_q: ServerQueue) -> None:
+        """
+        called once the trace point is set, emits every period until closed
+        """
+        self.out_q = out_q
+        if out_q.loop is not None:
+            out_q.loop.call_soon_threadsafe(self.__schedule)
+
+    def close(self) -> None:
+        """
+        stops the periodic emit and sends the final tree, later calls do nothing
+        """
+        with self.__emit_lock:
+            if self.__closed:
+                return
+            # a pending tick sees it and stops
+            self.__closed = True
+            self.emit(force=True)
+
+    def __schedule(self) -> None:
+        if not self.__closed:
+            self.out_q.loop.call_later(self.period_ns / 1e9, self.__tick)
+
+    def __tick(self) -> None:
+        with self.__emit_lock:
+            if self.__closed:
+                return
+            self.emit()
+        self.__schedule()
+
+    def collect(
+        self,
+        out_q: ServerQueue,
+        frames: Union[bytes, List[str]],
+        descriptions: Optional[List[str]] = None,
+    ) -> None:
+        """
+        output function of the trace profiler of a sampled invocation, runs on
+        the traced thread when the invocation returns
+        """
+        self.out_q = out_q
+        if self.reservoir > 0:
+            with self.__lock:
+                if len(self.__kept) < self.reservoir:
+                    self.__kept.append((frames, descriptions))
+                else:
+                    self.__kept[random.randrange(self.reservoir)] = (frames, descriptions)
+        elif not global_background_encoder.submit(lambda: self.__merge([(frames, descriptions)])):
+            self.__dropped.increment()
+        self.__collected.increment()
+
+    def emit(self, force: bool = False) -> None:
+        """
+        merges the traces kept in this period and sends the merged tree unless
+        no trace was collected since the last one, force sends it anyway and
+        even if the background encoder is full
+        """
+        if self.out_q is None:
+            return
+        collected = self.__collected.value
+        if not force and collected == self.__emitted:
+            return
+        self.__emitted = collected
+        traces = self.__take_window()
+        if traces and not global_background_encoder.submit(lambda: self.__merge(traces), force=True):
+            self.__dropped.increment()
+        self.out_q.output_deferred(self.__encode, force)
+
+    def __take_window(self) -> List[Tuple]:
+        with self.__lock:
+            traces, self.__kept = self.__kept, []
+            self.__window_seen = new_counter()
+        return traces
+
+    def __merge(self, traces: List[Tuple]) -> None:
+        for frames, descriptions in traces:
+            self.aggregator.merge(frames, descriptions, self.min_root_cost_ns)
+
+    def __encode(self) -> bytes:
+        return pickle.dumps(
+            AggregatedTrace(
+                self.aggregator.snapshot(),
+                invocations=self.__seen.value,
+                traces=self.aggregator.traces,
+                dropped=self.__dropped.value,
+                start_ns=self.wall_clock.to_ns(self.start_ns),
+                end_ns=time.time_ns(),
+            )
+        )
@@ -3,7 +3,7 @@ import pickle
 import sys
 from typing import Union
 
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.flight_client import new_flight_client
 from flight_profiler.help_descriptions import TIME_TUNNEL_COMMAND_DESCRIPTION
 from flight_profiler.plugins.cli_plugin import BaseCliPlugin
 from flight_profiler.plugins.tt.time_tunnel_parser import (
@@ -19,6 +19,7 @@ from flight_profiler.utils.cli_util import (
     common_plugin_execute_routine,
     show_error_info,
     show_normal_info,
+    show_stream_summary,
 )
 from flight_profiler.utils.render_util import COLOR_END, COLOR_RED
 
@@ -39,6 +40,9 @@ class TimeTunnelCliPlugin(BaseCliPlugin):
         except argparse.ArgumentTypeError as e:
             show_error_info(f" Trace command parsed failed, {e}")
             return
+        except SyntaxError as e:
+            show_error_info(f" Time tunnel command parsed failed, {e.msg}")
+            return
         except:
             show_normal_info(self.get_help())
             return
@@ -46,7 +50,7 @@ class TimeTunnelCliPlugin(BaseCliPlugin):
         self.last_cmd = cmd
         body = {"target": "tt", "param": "on " + cmd}
         try:
-            client = FlightClient(host="localhost", port=self.port)
+            client = new_flight_client(host="localhost", port=self.port)
         except:
             show_error_info("Target process exited!")
             return
@@ -96,11 +100,12 @@ class TimeTunnelCliPlugin(BaseCliPlugin):
             else:
                 for line in client.request_stream(body):
                     if line:
-                        line = line.decode("utf-8")
+                        line = str(line, "utf-8")
                         print(line)
                     sys.stdout.flush()
         finally:
             client.close()
+            show_stream_summary(client.stream_stats)
 
     def on_interrupted(self):
         common_plugin_execute_routine(
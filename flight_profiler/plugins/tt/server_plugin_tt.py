@@ -25,6 +25,7 @@ class TimeTunnelServerPlugin(ServerPlugin):
                     TimeTunnelArgumentParser().parse_time_tunnel_cmd(new_param)
                 )
                 time_tunnel_cmd.out_q = self.out_q
+                self.out_q.set_rate_limit(time_tunnel_cmd.rate_limit)
                 global_tt_agent.on_action(time_tunnel_cmd)
             except:
                 await self.out_q.output_msg(Message(True, traceback.format_exc()))
@@ -42,6 +43,18 @@ class TimeTunnelServerPlugin(ServerPlugin):
         else:
             await self.out_q.output_msg(Message(True, "tt param is illegal"))
 
+    def cancel(self, param):
+        splits = split_regex(param)
+        if splits[0] != "on":
+            return
+        time_tunnel_cmd: TimeTunnelCmd = TimeTunnelArgumentParser().parse_time_tunnel_cmd(
+            param[len(splits[0]) :]
+        )
+        current = global_tt_agent.aop_points.get(time_tunnel_cmd.unique_key(), None)
+        # the target may be recorded again by a later request meanwhile
+        if current is not None and current.out_q is self.out_q:
+            global_tt_agent.off_action(time_tunnel_cmd)
+
 
 def get_instance(cmd: str, out_q: ServerQueue):
     return TimeTunnelServerPlugin(cmd, out_q)
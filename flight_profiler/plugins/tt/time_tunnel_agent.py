@@ -9,7 +9,9 @@ import types
 from typing import Dict
 
 from flight_profiler.common import aop_decorator
+from flight_profiler.common.aop_targets import apply_to_targets, is_target_pattern
 from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
+from flight_profiler.common.monitoring_backend import BACKEND_MONITORING
 from flight_profiler.common.system_logger import logger
 from flight_profiler.plugins.server_plugin import Message
 from flight_profiler.plugins.tt.time_tunnel_recorder import (
@@ -22,6 +24,7 @@ from flight_profiler.utils.render_util import (
     COLOR_ORANGE,
     COLOR_RED,
     build_long_spy_command_hint,
+    build_multi_spy_command_hint,
 )
 
 
@@ -31,8 +34,8 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
 
             @functools.wraps(func)
             async def async_wrapper(*args, **kwargs):
-                if tt_cmd.enter():
-                    s = time.time()
+                if tt_cmd.active and tt_cmd.enter():
+                    s = time.perf_counter_ns()
                     try:
                         if tt_cmd.need_wrap_nested_inplace:
                             current_frame = inspect.currentframe().f_back
@@ -46,11 +49,11 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
                         else:
                             return_obj = await func(*args, **kwargs)
 
-                        e = time.time()
+                        e = time.perf_counter_ns()
                         try:
                             tt_cmd.dump_invocation(
-                                int(s * 1000),
-                                (e - s) * 1000,
+                                tt_cmd.wall_clock.to_ms(s),
+                                (e - s) / 1_000_000,
                                 return_obj,
                                 *args,
                                 **kwargs,
@@ -61,10 +64,10 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
                         return return_obj
                     except Exception as ex:
                         try:
-                            e = time.time()
+                            e = time.perf_counter_ns()
                             msg = traceback.format_exc()
                             tt_cmd.dump_error(
-                                int(s * 1000), (e - s) * 1000, msg, *args, **kwargs
+                                tt_cmd.wall_clock.to_ms(s), (e - s) / 1_000_000, msg, *args, **kwargs
                             )
                         except:
                             msg = traceback.format_exc()
@@ -80,8 +83,8 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
 
             @functools.wraps(func)
             def wrapper(*args, **kwargs):
-                if tt_cmd.enter():
-                    s = time.time()
+                if tt_cmd.active and tt_cmd.enter():
+                    s = time.perf_counter_ns()
                     try:
                         if tt_cmd.need_wrap_nested_inplace:
                             current_frame = inspect.currentframe().f_back
@@ -94,11 +97,11 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
                             return_obj = new_func(*args, **kwargs)
                         else:
                             return_obj = func(*args, **kwargs)
-                        e = time.time()
+                        e = time.perf_counter_ns()
                         try:
                             tt_cmd.dump_invocation(
-                                int(s * 1000),
-                                (e - s) * 1000,
+                                tt_cmd.wall_clock.to_ms(s),
+                                (e - s) / 1_000_000,
                                 return_obj,
                                 *args,
                                 **kwargs,
@@ -109,10 +112,10 @@ def generate_time_tunnel_wrapper(tt_cmd: TimeTunnelCmd):
                         return return_obj
                     except Exception as ex:
                         try:
-                            e = time.time()
+                            e = time.perf_counter_ns()
                             msg = traceback.format_exc()
                             tt_cmd.dump_error(
-                                int(s * 1000), (e - s) * 1000, msg, *args, **kwargs
+                                tt_cmd.wall_clock.to_ms(s), (e - s) / 1_000_000, msg, *args, **kwargs
                             )
                         except:
                             msg = traceback.format_exc()
@@ -143,6 +146,9 @@ class TimeTunnelAgent:
                 self.clear_tt_point(tt_cmd)
 
             tt_cmd.global_instance = global_tt_agent
+            if is_target_pattern(tt_cmd.module_name, tt_cmd.class_name, tt_cmd.method_name):
+                self.on_group_action(tt_cmd)
+                return
             try:
                 module = importlib.import_module(tt_cmd.module_name)
             except Exception as e:
@@ -157,16 +163,7 @@ class TimeTunnelAgent:
                 )
                 return
 
-            wrapper_result: CodeWrapperResult = aop_decorator.add_func_wrapper(
-                module,
-                tt_cmd.class_name,
-                tt_cmd.method_name,
-                generate_time_tunnel_wrapper,
-                tt_cmd,
-                ["sys", "time", "traceback", "logging", "inspect", "types"],
-                module_name=tt_cmd.module_name,
-                nested_method=tt_cmd.nested_method,
-            )
+            wrapper_result: CodeWrapperResult = self.wrap_method(module, tt_cmd)
             if wrapper_result.failed:
                 tt_cmd.out_q.output_msg_nowait(
                     Message(
@@ -228,13 +225,67 @@ class TimeTunnelAgent:
                 )
             )
 
+    def wrap_method(self, module, tt_cmd: TimeTunnelCmd) -> CodeWrapperResult:
+        if tt_cmd.backend == BACKEND_MONITORING:
+            return aop_decorator.add_func_monitor(
+                module,
+                tt_cmd.class_name,
+                tt_cmd.method_name,
+                tt_cmd,
+                nested_method=tt_cmd.nested_method,
+                module_name=tt_cmd.module_name,
+            )
+        return aop_decorator.add_func_wrapper(
+            module,
+            tt_cmd.class_name,
+            tt_cmd.method_name,
+            generate_time_tunnel_wrapper,
+            tt_cmd,
+            ["sys", "time", "traceback", "logging", "inspect", "types"],
+            module_name=tt_cmd.module_name,
+            nested_method=tt_cmd.nested_method,
+        )
+
+    def on_group_action(self, tt_cmd: TimeTunnelCmd):
+        """
+        records every method matched by the name patterns with one shared limit
+        and output stream, records carry their own method location
+        """
+        failed_reason = apply_to_targets(
+            tt_cmd,
+            tt_cmd.for_target,
+            lambda member: self.wrap_method(
+                importlib.import_module(member.module_name), member
+            ),
+        )
+        if failed_reason is not None:
+            tt_cmd.out_q.output_msg_nowait(
+                Message(True, pickle.dumps(f"{COLOR_RED}{failed_reason}{COLOR_END}"))
+            )
+            return
+        tt_cmd.out_q.output_msg_nowait(
+            Message(
+                False,
+                pickle.dumps(
+                    build_multi_spy_command_hint(
+                        [(m.module_name, m.class_name, m.method_name) for m in tt_cmd.members]
+                    )
+                ),
+            )
+        )
+        self.aop_points[tt_cmd.unique_key()] = tt_cmd
+
     def clear_tt_point(self, cmd: TimeTunnelCmd):
         if cmd.time_tunnel is None:
             raise ValueError("Trying to remove not existing tt point!")
 
-        origin_tt_cmd = self.aop_points.pop(cmd.unique_key())
+        # an "off" may race with the cancel of the stream
+        origin_tt_cmd = self.aop_points.pop(cmd.unique_key(), None)
         if origin_tt_cmd is not None:
-            if origin_tt_cmd.origin_code is not None:
+            closing = origin_tt_cmd.disable()
+            if origin_tt_cmd.members:
+                origin_tt_cmd.restore_origin_code()
+            elif origin_tt_cmd.origin_code is not None:
                 module = importlib.import_module(origin_tt_cmd.module_name)
                 aop_decorator.clear_func_wrapper(
                     module,
@@ -242,7 +293,8 @@ class TimeTunnelAgent:
                     origin_tt_cmd.method_name,
                     origin_tt_cmd.origin_code,
                 )
-            origin_tt_cmd.out_q.output_msg_nowait(Message(is_end=True, msg=""))
+            if closing:
+                origin_tt_cmd.out_q.output_msg_nowait(Message(is_end=True, msg=""))
 
     def off_action(self, tt_cmd: TimeTunnelCmd):
         """
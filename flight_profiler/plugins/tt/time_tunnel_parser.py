@@ -1,6 +1,7 @@
 import argparse
 from argparse import RawTextHelpFormatter
 
+from flight_profiler.common.monitoring_backend import BACKEND_BYTECODE, BACKENDS
 from flight_profiler.help_descriptions import TIME_TUNNEL_COMMAND_DESCRIPTION
 from flight_profiler.plugins.tt.time_tunnel_recorder import TimeTunnelCmd
 from flight_profiler.utils.args_util import rewrite_args
@@ -123,6 +124,26 @@ class TimeTunnelArgumentParser(argparse.ArgumentParser):
             default=None,
             help="method filter expression",
         )
+        self.add_argument(
+            "--rate",
+            required=False,
+            type=int,
+            default=0,
+            help="max events per second sent to client, exceeding events are sampled out, 0 means unlimited.",
+        )
+        self.add_argument(
+            "--snapshot",
+            action="store_true",
+            default=False,
+            help="deep copy args, kwargs and return object when recorded, for objects mutated after the call.",
+        )
+        self.add_argument(
+            "--backend",
+            required=False,
+            choices=BACKENDS,
+            default=BACKEND_BYTECODE,
+            help="intercept invocations by bytecode wrapper or by sys.monitoring(python 3.12+).",
+        )
 
     def error(self, message):
         raise Exception(message)
@@ -150,5 +171,8 @@ class TimeTunnelArgumentParser(argparse.ArgumentParser):
             filter_expr=getattr(args, "filter"),
             method_filter=getattr(args, "method"),
             nested_method=getattr(args, "nested_method"),
+            snapshot=getattr(args, "snapshot"),
         )
+        cmd.rate_limit = getattr(args, "rate")
+        cmd.backend = getattr(args, "backend")
         return cmd
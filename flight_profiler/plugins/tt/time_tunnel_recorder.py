@@ -1,7 +1,6 @@
 import asyncio
 import importlib
 import pickle
-import time
 import traceback
 from argparse import ArgumentTypeError
 from concurrent.futures import ThreadPoolExecutor
@@ -12,6 +11,9 @@ from flight_profiler.common.aop_decorator import (
     find_class_function,
     find_module_function,
 )
+from flight_profiler.common.aop_targets import AopTarget
+from flight_profiler.common.background_encoder import deep_snapshot
+from flight_profiler.common.clock import WallClock, now_ns
 from flight_profiler.common.dumps import encode_obj_to_transfer
 from flight_profiler.common.enter_exit_command import EnterExitCommand
 from flight_profiler.common.expression_resolver import FilterExprResolver
@@ -38,7 +40,8 @@ class TimeTunnelCmd(EnterExitCommand):
         verbose: bool = False,
         nested_method: str = None,
         need_wrap_nested_inplace: bool = False,
-        nested_code_obj: CodeType = None
+        nested_code_obj: CodeType = None,
+        snapshot: bool = False,
     ):
         super().__init__(limit=limits)
         self.time_tunnel = time_tunnel
@@ -62,6 +65,8 @@ class TimeTunnelCmd(EnterExitCommand):
         self.nested_method = nested_method
         self.need_wrap_nested_inplace = need_wrap_nested_inplace
         self.nested_code_obj = nested_code_obj
+        # deep copy the invocation when recorded, later mutations are not seen
+        self.snapshot = snapshot
 
         if self.time_tunnel is not None:
             func_location = split_regex(self.time_tunnel)
@@ -89,6 +94,15 @@ class TimeTunnelCmd(EnterExitCommand):
                 "Invalid tt command format, you can only specify -t/-l/-i/-d/-da option!"
             )
 
+    def output_record(self, record: "FullInvocationRecord") -> None:
+        """
+        the record is kept by reference, its summary is pickled by the
+        background encoder
+        """
+        if self.out_q is not None:
+            base_record = record.base_record
+            self.out_q.output_deferred(lambda: pickle.dumps(base_record))
+
     def dump_invocation(
         self,
         start_timestamp: int,
@@ -106,6 +120,8 @@ class TimeTunnelCmd(EnterExitCommand):
         if self.tt_filter.eval_filter(
             target_obj, return_obj, cost_ms, *filter_args, **kwargs
         ):
+            if self.snapshot:
+                args, kwargs, return_obj = deep_snapshot((args, kwargs, return_obj))
             index = global_tt_indexer.get_index()
             record: FullInvocationRecord = global_time_tunnel_recorder.records(
                 index,
@@ -121,12 +137,7 @@ class TimeTunnelCmd(EnterExitCommand):
                 return_obj,
                 None,
             )
-            if self.out_q is not None:
-                self.out_q.output_msg_nowait(
-                    Message(
-                        False, msg=pickle.dumps(record.base_record)
-                    )
-                )
+            self.output_record(record)
 
     def dump_error(
         self,
@@ -145,6 +156,8 @@ class TimeTunnelCmd(EnterExitCommand):
         if self.tt_filter.eval_filter(
             target_obj, None, cost_ms, *filter_args, **kwargs
         ):
+            if self.snapshot:
+                args, kwargs = deep_snapshot((args, kwargs))
             index = global_tt_indexer.get_index()
             record: FullInvocationRecord = global_time_tunnel_recorder.records(
                 index,
@@ -160,12 +173,44 @@ class TimeTunnelCmd(EnterExitCommand):
                 None,
                 exp_obj,
             )
-            if self.out_q is not None:
-                self.out_q.output_msg_nowait(
-                    Message(
-                        False, msg=pickle.dumps(record.base_record)
-                    )
-                )
+            self.output_record(record)
+
+    def for_target(self, target: AopTarget) -> "TimeTunnelCmd":
+        """
+        command of one method matched by this command's name patterns
+        """
+        cmd = TimeTunnelCmd(
+            time_tunnel=" ".join(n for n in target if n is not None),
+            limits=self.limits,
+            show_list=False,
+            index=None,
+            expand_level=-1 if self.expand_level is None else self.expand_level,
+            play=False,
+            delete=None,
+            delete_all=False,
+            filter_expr=None,
+            method_filter=self.method_filter,
+            raw_output=self.raw_output,
+            verbose=self.verbose,
+            snapshot=self.snapshot,
+        )
+        cmd.filter_expr = self.filter_expr
+        cmd.tt_filter = self.tt_filter
+        cmd.backend = self.backend
+        return cmd
+
+    def on_monitored_return(self, start, end, return_obj, args, kwargs):
+        """
+        invocation recorded by the sys.monitoring backend returned
+        """
+        self.dump_invocation(self.wall_clock.to_ms(start), (end - start) / 1_000_000, return_obj, *args, **kwargs)
+
+    def on_monitored_error(self, start, end, error, args, kwargs):
+        """
+        invocation recorded by the sys.monitoring backend raised
+        """
+        msg = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        self.dump_error(self.wall_clock.to_ms(start), (end - start) / 1_000_000, msg, *args, **kwargs)
 
     def child_clear_action(self):
         if self.global_instance is not None:
@@ -243,18 +288,19 @@ class TimeTuneReplayExecutor:
 
     def __inner_execute(self, method, *args, **kwargs):
         asyncio.set_event_loop(asyncio.new_event_loop())
-        s = time.time()
+        wall_clock = WallClock()
+        s = now_ns()
         try:
             if asyncio.iscoroutinefunction(method):
                 return_obj = asyncio.run(method(*args, **kwargs))
             else:
                 return_obj = method(*args, **kwargs)
-            e = time.time()
-            return False, int(s * 1000), (e - s) * 1000, return_obj
+            e = now_ns()
+            return False, wall_clock.to_ms(s), (e - s) / 1_000_000, return_obj
         except Exception as ex:
-            e = time.time()
+            e = now_ns()
             msg = traceback.format_exc()
-            return True, int(s * 1000), (e - s) * 1000, msg
+            return True, wall_clock.to_ms(s), (e - s) / 1_000_000, msg
 
 
 global_replay_executor = TimeTuneReplayExecutor()
@@ -26,6 +26,9 @@ class VmtoolCliPlugin(BaseCliPlugin):
         except argparse.ArgumentError as e:
             show_error_info(f" vmtool command parsed failed, {e}")
             return
+        except SyntaxError as e:
+            show_error_info(f" vmtool command parsed failed, {e.msg}")
+            return
         except:
             show_normal_info(self.get_help())
             return
@@ -2,7 +2,7 @@ import argparse
 import pickle
 from typing import Union
 
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.flight_client import new_flight_client
 from flight_profiler.help_descriptions import WATCH_COMMAND_DESCRIPTION
 from flight_profiler.plugins.cli_plugin import BaseCliPlugin
 from flight_profiler.plugins.watch.watch_agent import WatchSetting
@@ -13,6 +13,7 @@ from flight_profiler.utils.cli_util import (
     common_plugin_execute_routine,
     show_error_info,
     show_normal_info,
+    show_stream_summary,
 )
 
 
@@ -31,6 +32,9 @@ class WatchCliPlugin(BaseCliPlugin):
         except argparse.ArgumentError as e:
             show_error_info(f" Watch command parsed failed, {e}")
             return
+        except SyntaxError as e:
+            show_error_info(f" Watch command parsed failed, {e.msg}")
+            return
         except Exception as e:
             show_normal_info(self.get_help())
             return
@@ -38,7 +42,7 @@ class WatchCliPlugin(BaseCliPlugin):
         self.last_cmd = cmd
         body = {"target": "watch", "param": "on " + cmd}
         try:
-            client = FlightClient(host="localhost", port=self.port)
+            client = new_flight_client(host="localhost", port=self.port)
         except:
             show_error_info("Target process exited!")
             return
@@ -54,6 +58,7 @@ class WatchCliPlugin(BaseCliPlugin):
                     )
         finally:
             client.close()
+            show_stream_summary(client.stream_stats)
 
     def on_interrupted(self):
         common_plugin_execute_routine(
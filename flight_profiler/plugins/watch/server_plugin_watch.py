@@ -21,6 +21,7 @@ class WatchServerPlugin(ServerPlugin):
                     WatchArgumentParser().parse_watch_setting(new_param)
                 )
                 watch_setting.out_q = self.out_q
+                self.out_q.set_rate_limit(watch_setting.rate_limit)
                 global_watch_agent.add_watch(watch_setting)
                 # will not return end message, server request will block
             except:
@@ -39,6 +40,18 @@ class WatchServerPlugin(ServerPlugin):
         else:
             await self.out_q.output_msg(Message(True, pickle.dumps("watch param is illegal")))
 
+    def cancel(self, param):
+        splits = split_regex(param)
+        if splits[0] != "on":
+            return
+        watch_setting: watch_agent.WatchSetting = (
+            WatchArgumentParser().parse_watch_setting(param[len(splits[0]) :])
+        )
+        current = global_watch_agent.aop_points.get(watch_setting.unique_key(), None)
+        # the target may be watched again by a later request meanwhile
+        if current is not None and current.out_q is self.out_q:
+            global_watch_agent.clear_watch(watch_setting)
+
 
 def get_instance(cmd: str, out_q: ServerQueue):
     return WatchServerPlugin(cmd, out_q)
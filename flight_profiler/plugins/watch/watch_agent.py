@@ -10,9 +10,16 @@ import types
 from types import CodeType
 
 from flight_profiler.common import aop_decorator
+from flight_profiler.common.aop_targets import (
+    AopTarget,
+    apply_to_targets,
+    is_target_pattern,
+)
+from flight_profiler.common.background_encoder import shallow_snapshot
 from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
 from flight_profiler.common.enter_exit_command import EnterExitCommand
 from flight_profiler.common.expression_resolver import FilterExprResolver
+from flight_profiler.common.monitoring_backend import BACKEND_MONITORING
 from flight_profiler.common.system_logger import logger
 from flight_profiler.plugins.server_plugin import Message, ServerQueue
 from flight_profiler.plugins.watch.watch_displayer import WatchDisplayer, WatchResult
@@ -21,6 +28,7 @@ from flight_profiler.utils.render_util import (
     COLOR_ORANGE,
     COLOR_RED,
     build_long_spy_command_hint,
+    build_multi_spy_command_hint,
 )
 
 
@@ -41,7 +49,8 @@ class WatchSetting(EnterExitCommand):
         max_count: int = 10,
         out_q: ServerQueue = None,
         need_wrap_nested_inplace: bool = False,
-        nested_code_obj: CodeType = None
+        nested_code_obj: CodeType = None,
+        snapshot: bool = False,
     ):
         super().__init__(limit=max_count)
         self.module_name = module_name
@@ -78,6 +87,8 @@ class WatchSetting(EnterExitCommand):
             self.expand_level = None  # infinite
         self.out_q = out_q
         self.enable = True
+        # encode on the invocation instead of the background encoder
+        self.snapshot = snapshot
 
     def import_module(self):
         if self.module_name is not None:
@@ -93,28 +104,64 @@ class WatchSetting(EnterExitCommand):
     def child_clear_action(self):
         global_watch_agent.clear_auto_close(self.unique_key())
 
+    def for_target(self, target: AopTarget) -> "WatchSetting":
+        """
+        setting of one method matched by this setting's name patterns
+        """
+        setting = WatchSetting(
+            method_name=target.method_name,
+            watch_expr=self.watch_expr,
+            module_name=target.module_name,
+            class_name=target.class_name,
+            record_on_exception=self.record_on_exception,
+            raw_output=self.raw_output,
+            expand_level=-1 if self.expand_level is None else self.expand_level,
+            verbose=self.verbose,
+            max_count=self.max_count,
+            snapshot=self.snapshot,
+        )
+        setting.filter_expr = self.filter_expr
+        setting.watch_filter = self.watch_filter
+        setting.backend = self.backend
+        return setting
+
     def __str__(self):
         state = self.__dict__.copy()
         del state["watch_displayer"]
         del state["watch_filter"]
         del state["out_q"]
         del state["origin_code"]
+        del state["members"]
+        del state["group"]
         return str(json.dumps(state))
 
+    def output_result(self, watch_result: WatchResult):
+        """
+        the watched value is encoded to json by the background encoder, only
+        mutable containers on top are copied here, with snapshot it is encoded
+        before the watched method returns
+        """
+        if self.out_q is None:
+            return
+        if self.snapshot:
+            self.out_q.output_msg_nowait(
+                Message(False, self.watch_displayer.encode(watch_result))
+            )
+            return
+        watch_result.value = shallow_snapshot(watch_result.value)
+        self.out_q.output_deferred(lambda: self.watch_displayer.encode(watch_result))
+
     def dump_result(self, start_ms, target_obj, time_cost, return_obj, *args, **kwargs):
         # filter params or return obj
         try:
             if self.watch_filter.eval_filter(
                 target_obj, return_obj, time_cost, *args, **kwargs
             ):
-                # dump watch params/return obj to json
-                json_str = self.watch_displayer.dump(
-                    start_ms, target_obj, time_cost, return_obj, *args, **kwargs
-                )
-                if self.out_q is not None:
-                    self.out_q.output_msg_nowait(
-                        Message(False, json_str)
+                self.output_result(
+                    self.watch_displayer.capture(
+                        start_ms, target_obj, time_cost, return_obj, None, *args, **kwargs
                     )
+                )
         except:
             if self.out_q is not None:
                 watch_result = WatchResult(
@@ -132,20 +179,43 @@ class WatchSetting(EnterExitCommand):
                     )
                 )
 
+    def split_target(self, args):
+        # filter class method self
+        if self.class_name is not None and self.nested_method is None:
+            return args[0], args[1:]
+        return None, args
+
+    def on_monitored_return(self, start, end, return_obj, args, kwargs):
+        """
+        invocation recorded by the sys.monitoring backend returned
+        """
+        if not self.record_on_exception:
+            target_obj, new_args = self.split_target(args)
+            self.dump_result(
+                self.wall_clock.to_ms(start), target_obj, (end - start) / 1_000_000, return_obj, *new_args, **kwargs
+            )
+
+    def on_monitored_error(self, start, end, error, args, kwargs):
+        """
+        invocation recorded by the sys.monitoring backend raised
+        """
+        target_obj, new_args = self.split_target(args)
+        msg = "".join(traceback.format_exception(type(error), error, error.__traceback__))
+        self.dump_error(
+            self.wall_clock.to_ms(start), target_obj, (end - start) / 1_000_000, msg, *new_args, **kwargs
+        )
+
     def dump_error(self, start_ms, target_obj, time_cost, err_text, *args, **kwargs):
         # filter params or return obj
         try:
             if self.watch_filter.eval_filter(
                 target_obj, None, time_cost, *args, **kwargs
             ):
-                # dump watch params/return obj to json
-                json_str = self.watch_displayer.dump_error(
-                    start_ms, target_obj, time_cost, err_text, *args, **kwargs
-                )
-                if self.out_q is not None:
-                    self.out_q.output_msg_nowait(
-                        Message(False, json_str)
+                self.output_result(
+                    self.watch_displayer.capture(
+                        start_ms, target_obj, time_cost, None, err_text, *args, **kwargs
                     )
+                )
         except:
             if self.out_q is not None:
                 watch_result = WatchResult(
@@ -171,14 +241,14 @@ def wrapper_generator(watch_setting: WatchSetting):
 
             @functools.wraps(func)
             async def wrapped(*args, **kwargs):
-                if watch_setting.enter():
+                if watch_setting.active and watch_setting.enter():
                     new_args = args
                     # filter class method self
                     target_obj = None
                     if watch_setting.class_name is not None and watch_setting.nested_method is None:
                         target_obj = args[0]
                         new_args = args[1:]
-                    s = time.time()
+                    s = time.perf_counter_ns()
                     try:
                         if watch_setting.need_wrap_nested_inplace:
                             current_frame = inspect.currentframe().f_back
@@ -191,13 +261,13 @@ def wrapper_generator(watch_setting: WatchSetting):
                             return_obj = await new_func(*args, **kwargs)
                         else:
                             return_obj = await func(*args, **kwargs)
-                        e = time.time()
+                        e = time.perf_counter_ns()
                         try:
                             if not watch_setting.record_on_exception:
                                 watch_setting.dump_result(
-                                    int(s * 1000),
+                                    watch_setting.wall_clock.to_ms(s),
                                     target_obj,
-                                    (e - s) * 1000,
+                                    (e - s) / 1_000_000,
                                     return_obj,
                                     *new_args,
                                     **kwargs,
@@ -208,12 +278,12 @@ def wrapper_generator(watch_setting: WatchSetting):
                         return return_obj
                     except Exception as ex:
                         try:
-                            e = time.time()
+                            e = time.perf_counter_ns()
                             msg = traceback.format_exc()
                             watch_setting.dump_error(
-                                int(s * 1000),
+                                watch_setting.wall_clock.to_ms(s),
                                 target_obj,
-                                (e - s) * 1000,
+                                (e - s) / 1_000_000,
                                 msg,
                                 *new_args,
                                 **kwargs,
@@ -231,14 +301,14 @@ def wrapper_generator(watch_setting: WatchSetting):
 
             @functools.wraps(func)
             def wrapped(*args, **kwargs):
-                if watch_setting.enter():
+                if watch_setting.active and watch_setting.enter():
                     new_args = args
                     # filter class method self
                     target_obj = None
                     if watch_setting.class_name is not None and watch_setting.nested_method is None:
                         target_obj = args[0]
                         new_args = args[1:]
-                    s = time.time()
+                    s = time.perf_counter_ns()
                     try:
                         if watch_setting.need_wrap_nested_inplace:
                             current_frame = inspect.currentframe().f_back
@@ -251,13 +321,13 @@ def wrapper_generator(watch_setting: WatchSetting):
                             return_obj = new_func(*args, **kwargs)
                         else:
                             return_obj = func(*args, **kwargs)
-                        e = time.time()
+                        e = time.perf_counter_ns()
                         try:
                             if not watch_setting.record_on_exception:
                                 watch_setting.dump_result(
-                                    int(s * 1000),
+                                    watch_setting.wall_clock.to_ms(s),
                                     target_obj,
-                                    (e - s) * 1000,
+                                    (e - s) / 1_000_000,
                                     return_obj,
                                     *new_args,
                                     **kwargs,
@@ -268,12 +338,12 @@ def wrapper_generator(watch_setting: WatchSetting):
                         return return_obj
                     except Exception as ex:
                         try:
-                            e = time.time()
+                            e = time.perf_counter_ns()
                             msg = traceback.format_exc()
                             watch_setting.dump_error(
-                                int(s * 1000),
+                                watch_setting.wall_clock.to_ms(s),
                                 target_obj,
-                                (e - s) * 1000,
+                                (e - s) / 1_000_000,
                                 msg,
                                 *new_args,
                                 **kwargs,
@@ -304,6 +374,12 @@ class WatchAgent(object):
         if old_setting is not None:
             self.clear_watch(old_setting)
 
+        if is_target_pattern(
+            watch_setting.module_name, watch_setting.class_name, watch_setting.method_name
+        ):
+            self.add_watch_group(watch_setting)
+            return
+
         try:
             module = watch_setting.import_module()
         except Exception as e:
@@ -318,16 +394,7 @@ class WatchAgent(object):
             )
             return
 
-        wrapper_result: CodeWrapperResult = aop_decorator.add_func_wrapper(
-            module,
-            watch_setting.class_name,
-            watch_setting.method_name,
-            wrapper_generator,
-            watch_setting,
-            ["time", "traceback", "logging", "inspect", "types"],
-            nested_method=watch_setting.nested_method,
-            module_name=watch_setting.module_name
-        )
+        wrapper_result: CodeWrapperResult = self.wrap_method(module, watch_setting)
 
         if wrapper_result.failed:
             watch_setting.out_q.output_msg_nowait(
@@ -358,17 +425,72 @@ class WatchAgent(object):
             )
             self.aop_points[key] = watch_setting
 
+    def wrap_method(self, module, watch_setting: WatchSetting) -> CodeWrapperResult:
+        if watch_setting.backend == BACKEND_MONITORING:
+            return aop_decorator.add_func_monitor(
+                module,
+                watch_setting.class_name,
+                watch_setting.method_name,
+                watch_setting,
+                nested_method=watch_setting.nested_method,
+                module_name=watch_setting.module_name,
+            )
+        return aop_decorator.add_func_wrapper(
+            module,
+            watch_setting.class_name,
+            watch_setting.method_name,
+            wrapper_generator,
+            watch_setting,
+            ["time", "traceback", "logging", "inspect", "types"],
+            nested_method=watch_setting.nested_method,
+            module_name=watch_setting.module_name
+        )
+
+    def add_watch_group(self, watch_setting: WatchSetting):
+        """
+        watch every method matched by the name patterns with one shared limit
+        and output stream, records are tagged by their method identifier
+        """
+        failed_reason = apply_to_targets(
+            watch_setting,
+            watch_setting.for_target,
+            lambda member: self.wrap_method(member.import_module(), member),
+        )
+        if failed_reason is not None:
+            watch_setting.out_q.output_msg_nowait(
+                Message(True, pickle.dumps(f"{COLOR_RED}{failed_reason}{COLOR_END}"))
+            )
+            return
+        watch_setting.out_q.output_msg_nowait(
+            Message(
+                False,
+                pickle.dumps(
+                    build_multi_spy_command_hint(
+                        [
+                            (m.module_name, m.class_name, m.method_name)
+                            for m in watch_setting.members
+                        ]
+                    )
+                ),
+            )
+        )
+        self.aop_points[watch_setting.unique_key()] = watch_setting
+
     def clear_watch(self, watch_setting: WatchSetting):
         watch_setting.valid()
-        old_setting: WatchSetting = self.aop_points.get(watch_setting.unique_key(), None)
+        # popped at once, an "off" may race with the cancel of the stream
+        old_setting: WatchSetting = self.aop_points.pop(watch_setting.unique_key(), None)
         if old_setting is None:
             logger.warning(
                 f"class function {watch_setting.unique_key()} "
                 f"not watched, will skip clear"
             )
             return None
-        self.aop_points.pop(old_setting.unique_key())
-        if old_setting.origin_code is not None:
+        closing = old_setting.disable()
+        if old_setting.members:
+            old_setting.restore_origin_code()
+            old_setting.out_q.output_msg_nowait(Message(True, None))
+        elif old_setting.origin_code is not None:
             module = old_setting.import_module()
             aop_decorator.clear_func_wrapper(
                 module,
@@ -377,6 +499,9 @@ class WatchAgent(object):
                 old_setting.origin_code,
             )
             old_setting.out_q.output_msg_nowait(Message(True, None))
+        elif closing:
+            # limit reached and origin code restored, calls still in flight
+            old_setting.out_q.output_msg_nowait(Message(True, None))
         else:
             logger.warning(
                 f"old watch setting {old_setting.unique_key()} exists, but no origin function is stored"
@@ -48,7 +48,13 @@ class WatchDisplayer(object):
         self.raw_output = raw_output
         self.method_identifier: str = method_identifier
 
-    def dump(self, start_time, target_obj, time_cost, return_obj, *args, **kwargs):
+    def capture(
+        self, start_time, target_obj, time_cost, return_obj, err_text, *args, **kwargs
+    ) -> WatchResult:
+        """
+        evaluates the expression on the invocation, the value is kept as is
+        until encode
+        """
         value = None
         failed_info = None
         try:
@@ -56,37 +62,35 @@ class WatchDisplayer(object):
         except Exception as e:
             failed_info = traceback.format_exc()
             logger.exception("[WatchDisplayer] parse expression failed.")
-        watch_result = WatchResult(
+        return WatchResult(
             method_identifier=self.method_identifier,
             cost_ms=time_cost,
-            is_exp=False,
+            is_exp=err_text is not None,
+            exception=err_text,
             start_ms=start_time,
             expr=self.expr,
             watch_fail_info=failed_info,
             type=str(type(value)),
-            value=encode_obj_to_transfer(value, self.expand_level, self.raw_output,
-                                         verbose=self.verbose),
+            value=value,
         )
+
+    def encode(self, watch_result: WatchResult) -> bytes:
+        try:
+            watch_result.value = encode_obj_to_transfer(
+                watch_result.value, self.expand_level, self.raw_output, verbose=self.verbose
+            )
+        except Exception:
+            watch_result.value = None
+            watch_result.watch_fail_info = traceback.format_exc()
+            logger.exception("[WatchDisplayer] encode watched value failed.")
         return pickle.dumps(watch_result)
 
+    def dump(self, start_time, target_obj, time_cost, return_obj, *args, **kwargs):
+        return self.encode(
+            self.capture(start_time, target_obj, time_cost, return_obj, None, *args, **kwargs)
+        )
+
     def dump_error(self, start_time, target_obj, time_cost, err_text, *args, **kwargs):
-        value = None
-        failed_info = None
-        try:
-            value = self.expr_resolver.eval(target_obj, None, *args, **kwargs)
-        except Exception as e:
-            failed_info = traceback.format_exc()
-            logger.exception("[WatchDisplayer] parse expression failed.")
-        watch_result = WatchResult(
-            method_identifier=self.method_identifier,
-            cost_ms=time_cost,
-            is_exp=True,
-            exception=err_text,
-            start_ms=start_time,
-            expr=self.expr,
-            watch_fail_info=failed_info,
-            type=str(type(value)),
-            value=encode_obj_to_transfer(value, self.expand_level, self.raw_output,
-                                         verbose=self.verbose),
+        return self.encode(
+            self.capture(start_time, target_obj, time_cost, None, err_text, *args, **kwargs)
         )
-        return pickle.dumps(watch_result)
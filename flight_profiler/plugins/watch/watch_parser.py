@@ -1,6 +1,7 @@
 import argparse
 from argparse import RawTextHelpFormatter
 
+from flight_profiler.common.monitoring_backend import BACKEND_BYTECODE, BACKENDS
 from flight_profiler.help_descriptions import WATCH_COMMAND_DESCRIPTION
 from flight_profiler.plugins.watch import watch_agent
 from flight_profiler.utils.args_util import rewrite_args
@@ -75,6 +76,26 @@ class WatchArgumentParser(argparse.ArgumentParser):
             default=10,
             help="max display count",
         )
+        self.add_argument(
+            "--rate",
+            required=False,
+            type=int,
+            default=0,
+            help="max events per second sent to client, exceeding events are sampled out, 0 means unlimited.",
+        )
+        self.add_argument(
+            "--snapshot",
+            action="store_true",
+            default=False,
+            help="encode watched values before method returns, for objects mutated after the call.",
+        )
+        self.add_argument(
+            "--backend",
+            required=False,
+            choices=BACKENDS,
+            default=BACKEND_BYTECODE,
+            help="intercept invocations by bytecode wrapper or by sys.monitoring(python 3.12+).",
+        )
 
     def error(self, message):
         raise Exception(message)
@@ -96,5 +117,8 @@ class WatchArgumentParser(argparse.ArgumentParser):
             expand_level=getattr(args, "expand"),
             verbose=getattr(args, "verbose"),
             max_count=getattr(args, "limits"),
+            snapshot=getattr(args, "snapshot"),
         )
+        watch_setting.rate_limit = getattr(args, "rate")
+        watch_setting.backend = getattr(args, "backend")
         return watch_setting
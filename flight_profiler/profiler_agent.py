@@ -16,6 +16,7 @@ else:
     current_file_abspath = os.path.abspath(__file__)
 
 sys.path.append(os.path.dirname(current_file_abspath))
+from flight_profiler.communication.base import get_agent_socket_path
 from flight_profiler.server_flight_profiler import FlightProfilerServer
 
 
@@ -39,7 +40,9 @@ logger.debug(f"Agent listening on port {listen_port}")
 
 
 def run_app():
-    profiler = FlightProfilerServer("localhost", listen_port)
+    profiler = FlightProfilerServer(
+        "localhost", listen_port, get_agent_socket_path(os.getpid())
+    )
     loop = asyncio.new_event_loop()
     asyncio.set_event_loop(loop)
     tasks = [loop.create_task(profiler.run())]
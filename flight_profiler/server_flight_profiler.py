@@ -2,13 +2,22 @@ import asyncio
 import importlib
 import json
 import os
+import threading
+import time
 import traceback
 from asyncio import Queue
 from asyncio.exceptions import CancelledError
 from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Optional
+from types import ModuleType
+from typing import Any, Callable, Dict, List, Optional
 
 from flight_profiler.common.system_logger import logger
+from flight_profiler.communication.base import (
+    FRAME_KIND_STATS,
+    FRAME_KIND_SUMMARY,
+    choose_compression,
+    get_supported_compressions,
+)
 from flight_profiler.communication.flight_server import FlightServer
 from flight_profiler.plugins.server_plugin import (
     InteractiveServerPlugin,
@@ -17,49 +26,233 @@ from flight_profiler.plugins.server_plugin import (
     ServerQueue,
 )
 
-_global_task_executor = ThreadPoolExecutor(max_workers=200, thread_name_prefix="flight-profiler-worker-")
+# short plugin actions may block (aop patching, memory walks), so they run on a
+# small bounded pool instead of the agent loop serving the connections. At most
+# PYFLIGHT_AGENT_WORKERS actions start at once, later ones wait for a free worker.
+# Actions holding a thread for long, interactive sessions, mem diff and preload,
+# get a daemon thread of their own and never occupy the pool.
+_agent_worker_count = max(1, int(os.getenv("PYFLIGHT_AGENT_WORKERS", 4)))
+_global_task_executor = ThreadPoolExecutor(
+    max_workers=_agent_worker_count, thread_name_prefix="flight-profiler-worker-"
+)
+_worker_local = threading.local()
+
+# budgets of one batched stream frame
+STREAM_FLUSH_INTERVAL = 0.002
+STREAM_BATCH_MAX_EVENTS = 1024
+STREAM_BATCH_MAX_BYTES = 256 * 1024
+
+# plugins warmed up in background once agent starts, comma separated commands or
+# "all", the cli may request more by the status call after attach
+PRELOAD_PLUGINS = os.getenv("PYFLIGHT_PRELOAD_PLUGINS", "")
+# pause between two preload imports so application threads get the GIL
+PRELOAD_STEP_INTERVAL = 0.005
+
+
+def _run_in_worker_loop(coro) -> None:
+    """
+    run coroutine on the event loop owned by current worker thread, the loop is
+    created once per worker and reused by later actions
+    """
+    loop: Optional[asyncio.AbstractEventLoop] = getattr(_worker_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        _worker_local.loop = loop
+    loop.run_until_complete(coro)
+
+
+def _run_in_own_thread(target: Callable[..., None], *args) -> threading.Thread:
+    """
+    run target on a new daemon thread, the worker loop it may create is closed
+    when target returns
+    """
+
+    def run():
+        try:
+            target(*args)
+        finally:
+            loop: Optional[asyncio.AbstractEventLoop] = getattr(
+                _worker_local, "loop", None
+            )
+            if loop is not None and not loop.is_closed():
+                loop.close()
+
+    thread = threading.Thread(target=run, name="flight-profiler-action", daemon=True)
+    thread.start()
+    return thread
+
 
 def do_action_background(current_plugin: ServerPlugin, param: str):
-    async def async_run():
-        await current_plugin.do_action(param)
+    try:
+        _run_in_worker_loop(current_plugin.do_action(param))
+    except:
+        logger.exception(f"plugin {current_plugin.cmd} do action failed")
 
-    asyncio.run(async_run())
 
+def cancel_action_background(current_plugin: ServerPlugin, param: str):
+    try:
+        current_plugin.cancel(param)
+    except:
+        logger.exception(f"plugin {current_plugin.cmd} cancel failed")
 
-def do_action_background_no_params(current_plugin: InteractiveServerPlugin):
-    async def async_run():
-        await current_plugin.do_action_no_args()
 
-    asyncio.run(async_run())
+def do_action_background_no_params(current_plugin: InteractiveServerPlugin):
+    try:
+        _run_in_worker_loop(current_plugin.do_action_no_args())
+    except:
+        logger.exception(f"interactive plugin {current_plugin.cmd} do action failed")
 
 
-def status(ignored: str) -> Dict[str, str]:
-    return {"pid": str(os.getpid()), "app_type": "py_flight_profiler"}
+def list_server_plugins() -> List[str]:
+    plugins_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "plugins")
+    return sorted(
+        cmd
+        for cmd in os.listdir(plugins_dir)
+        if cmd != "test"
+        and os.path.exists(os.path.join(plugins_dir, cmd, f"server_plugin_{cmd}.py"))
+    )
 
 
 class FlightProfilerServer(FlightServer):
 
-    def __init__(self, host: str, port: int) -> None:
+    def __init__(self, host: str, port: int, unix_path: Optional[str] = None) -> None:
         super().__init__({"console": True})
-        self.special_method_dispatcher = {"status": status}
+        self.special_method_dispatcher = {"status": self.status}
         self.host = host
         self.port = port
+        self.unix_path = unix_path
+        # server plugin modules by command, filled on first use or by preload
+        self.plugin_modules: Dict[str, ModuleType] = dict()
+        # preload cost in milliseconds by command, or the error message
+        self.preload_timings: Dict[str, Any] = dict()
 
     async def run(self):
-        await super().start_server(self.host, self.port)
+        if PRELOAD_PLUGINS:
+            self.start_preload(PRELOAD_PLUGINS.split(","))
+        await super().start_server(self.host, self.port, self.unix_path)
+
+    def load_plugin_module(self, cmd: str) -> ModuleType:
+        module = self.plugin_modules.get(cmd, None)
+        if module is None:
+            module = importlib.import_module(
+                "flight_profiler.plugins." + cmd + ".server_plugin_" + cmd
+            )
+            self.plugin_modules[cmd] = module
+        return module
+
+    async def load_plugin_module_async(
+        self, cmd: str, loop: asyncio.AbstractEventLoop
+    ) -> ModuleType:
+        """
+        a cold import runs on the default executor, streams served by the agent
+        loop go on meanwhile
+        """
+        module = self.plugin_modules.get(cmd, None)
+        if module is None:
+            module = await loop.run_in_executor(None, self.load_plugin_module, cmd)
+        return module
+
+    def start_preload(self, cmds: List[str]) -> List[str]:
+        """
+        warm up server plugins on a thread of their own, returns commands scheduled
+        """
+        if "all" in cmds:
+            cmds = list_server_plugins()
+        cmds = [
+            cmd.strip()
+            for cmd in cmds
+            if cmd.strip() and cmd.strip() not in self.preload_timings
+        ]
+        for cmd in cmds:
+            self.preload_timings[cmd] = None
+        if len(cmds) > 0:
+            _run_in_own_thread(self.preload_plugins, cmds)
+        return cmds
+
+    def preload_plugins(self, cmds: List[str]) -> None:
+        """
+        import plugin modules one by one, together with the heavy modules a plugin
+        imports lazily (PRELOAD_MODULES of the plugin module)
+        """
+        for cmd in cmds:
+            start = time.perf_counter()
+            try:
+                module = self.load_plugin_module(cmd)
+                for name in getattr(module, "PRELOAD_MODULES", []):
+                    time.sleep(PRELOAD_STEP_INTERVAL)
+                    importlib.import_module(name)
+                cost = round((time.perf_counter() - start) * 1000, 3)
+                self.preload_timings[cmd] = cost
+                logger.info(f"preload plugin {cmd} cost {cost} ms")
+            except Exception as e:
+                self.preload_timings[cmd] = f"{type(e).__name__}: {e}"
+                logger.warning(f"preload plugin {cmd} failed: {e}")
+            time.sleep(PRELOAD_STEP_INTERVAL)
+
+    def status(self, param: str) -> Dict[str, Any]:
+        """
+        param is empty or a json capability offer of the client, e.g.
+        {"compression": ["zlib", "lzma"], "preload": ["trace"]}, answered by the
+        agreed codec. Requested plugins are preloaded in background, the reply
+        carries preload timings known so far.
+        """
+        result = {
+            "pid": str(os.getpid()),
+            "app_type": "py_flight_profiler",
+            "port": self.port,
+            "compression_supported": get_supported_compressions(),
+            "compression_threshold": self.compress_threshold,
+        }
+        if param:
+            try:
+                offer = json.loads(param)
+            except ValueError:
+                logger.warning(f"invalid status param: {param}")
+                offer = {}
+            result["compression"] = choose_compression(offer.get("compression", []))
+            self.start_preload(offer.get("preload", []))
+        result["preload"] = dict(self.preload_timings)
+        return result
 
     async def execute_plugin(
-        self, cmd: str, param: str, writer: asyncio.StreamWriter
+        self,
+        cmd: str,
+        param: str,
+        writer: asyncio.StreamWriter,
+        frame_version: int = 0,
+        compression: Optional[str] = None,
     ) -> None:
-        module_name = "flight_profiler.plugins." + cmd + ".server_plugin_" + cmd
-        module = importlib.import_module(module_name)
-        out_q = Queue(maxsize=200)
         loop = asyncio.get_event_loop()
-        current_plugin: ServerPlugin = module.get_instance(
-            cmd, ServerQueue(out_q, loop)
-        )
+        module = await self.load_plugin_module_async(cmd, loop)
+        out_q = Queue(maxsize=200)
+        server_queue = ServerQueue(out_q, loop)
+        current_plugin: ServerPlugin = module.get_instance(cmd, server_queue)
         # do action in background
-        _global_task_executor.submit(do_action_background, current_plugin, param)
+        if current_plugin.is_long_running(param):
+            _run_in_own_thread(do_action_background, current_plugin, param)
+        else:
+            _global_task_executor.submit(do_action_background, current_plugin, param)
+        try:
+            await self.stream_plugin_output(
+                out_q, writer, server_queue, frame_version, compression
+            )
+        except CancelledError:
+            # channel cancelled by the client, no "off" will follow
+            _global_task_executor.submit(cancel_action_background, current_plugin, param)
+            raise
+
+    async def stream_plugin_output(
+        self,
+        out_q: Queue,
+        writer: asyncio.StreamWriter,
+        server_queue: ServerQueue,
+        frame_version: int = 0,
+        compression: Optional[str] = None,
+    ) -> None:
+        if frame_version >= 1:
+            await self.stream_in_frames(out_q, writer, server_queue, compression)
+            return
 
         async def iter_data():
             while True:
@@ -73,7 +266,7 @@ class FlightProfilerServer(FlightServer):
                     if msg.is_end:
                         return
                 except CancelledError:
-                    pass
+                    raise
                 except:
                     logger.error(traceback.format_exc())
                     continue
@@ -84,6 +277,71 @@ class FlightProfilerServer(FlightServer):
             else:
                 await super().send(content.encode("utf-8"), writer)
 
+    async def stream_in_frames(
+        self,
+        out_q: Queue,
+        writer: asyncio.StreamWriter,
+        server_queue: Optional[ServerQueue] = None,
+        compression: Optional[str] = None,
+    ):
+        """
+        coalesce plugin messages into batched stream frames, a frame is flushed when
+        the size budget is reached or no more message arrives in a flush interval.
+        Drops and samples of server_queue are reported by a stats frame whenever
+        they grow and by a summary frame at the end of stream.
+        Frames above the compress threshold are compressed by the agreed codec.
+        """
+        reported_losses = 0
+        finished = False
+        while not finished:
+            events: List[bytes] = []
+            batch_bytes = 0
+            waited = False
+            msg: Optional[Message] = await out_q.get()
+            while True:
+                if msg is not None:
+                    if msg.msg is not None:
+                        content = msg.msg
+                        if type(content) is not bytes:
+                            content = content.encode("utf-8")
+                        events.append(content)
+                        batch_bytes += len(content)
+                    if msg.is_end:
+                        finished = True
+                        break
+                if (
+                    len(events) >= STREAM_BATCH_MAX_EVENTS
+                    or batch_bytes >= STREAM_BATCH_MAX_BYTES
+                ):
+                    break
+                if out_q.empty():
+                    if waited:
+                        break
+                    # give producers one flush interval to fill the frame
+                    waited = True
+                    await asyncio.sleep(STREAM_FLUSH_INTERVAL)
+                    if out_q.empty():
+                        break
+                msg = out_q.get_nowait()
+            if len(events) > 0:
+                await self.send_frame(events, writer, compression=compression)
+            if server_queue is None:
+                continue
+            losses = server_queue.dropped + server_queue.sampled
+            if finished:
+                await self.send_frame(
+                    [json.dumps(server_queue.stats()).encode("utf-8")],
+                    writer,
+                    FRAME_KIND_SUMMARY,
+                )
+            elif losses != reported_losses:
+                reported_losses = losses
+                await self.send_frame(
+                    [json.dumps(server_queue.stats()).encode("utf-8")],
+                    writer,
+                    FRAME_KIND_STATS,
+                )
+
     async def execute_plugin_interactively(
         self,
         cmd: str,
@@ -91,16 +349,15 @@ class FlightProfilerServer(FlightServer):
         reader: asyncio.StreamReader,
         writer: asyncio.StreamWriter,
     ) -> None:
-        module_name = "flight_profiler.plugins." + cmd + ".server_plugin_" + cmd
-        module = importlib.import_module(module_name)
+        loop = asyncio.get_event_loop()
+        module = await self.load_plugin_module_async(cmd, loop)
         out_q = Queue(maxsize=200)
         in_q = Queue(maxsize=200)
-        loop = asyncio.get_event_loop()
         current_plugin: InteractiveServerPlugin = module.get_instance(
             cmd, in_q, ServerQueue(out_q, loop)
         )
-        # do action in background
-        _global_task_executor.submit(do_action_background_no_params, current_plugin)
+        # session lasts as long as the user stays, not on the worker pool
+        _run_in_own_thread(do_action_background_no_params, current_plugin)
 
         try:
             while True:
@@ -118,7 +375,17 @@ class FlightProfilerServer(FlightServer):
             logger.exception(f"interactive {cmd} exit exceptionally: ")
 
     async def special_calling(
-        self, target: str, param: str, writer: asyncio.StreamWriter
+        self,
+        target: str,
+        param: str,
+        writer: asyncio.StreamWriter,
+        frame_version: int = 0,
+        compression: Optional[str] = None,
     ) -> None:
-        result = self.special_method_dispatcher[target](param)
-        await super().send(json.dumps(result).encode("utf-8"), writer)
+        result = json.dumps(self.special_method_dispatcher[target](param)).encode(
+            "utf-8"
+        )
+        if frame_version >= 1:
+            await self.send_frame([result], writer, compression=compression)
+        else:
+            await super().send(result, writer)
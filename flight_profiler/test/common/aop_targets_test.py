@@ -0,0 +1,144 @@
+import sys
+import types
+import unittest
+
+from flight_profiler.common import aop_targets
+from flight_profiler.common.aop_targets import (
+    AopTarget,
+    ModuleIndex,
+    apply_to_targets,
+    is_target_pattern,
+)
+from flight_profiler.common.code_wrapper_entity import CodeWrapperResult
+from flight_profiler.common.enter_exit_command import EnterExitCommand
+
+SOURCE = """
+import json
+from os.path import join
+
+def handle_get():
+    pass
+
+def helper():
+    pass
+
+class UserService:
+    def handle_get(self):
+        pass
+
+    @classmethod
+    def handle_put(cls):
+        pass
+
+    @staticmethod
+    def handle_static():
+        pass
+
+    name = "user"
+"""
+
+
+def _add_module(name: str) -> types.ModuleType:
+    module = types.ModuleType(name)
+    exec(SOURCE, module.__dict__)
+    sys.modules[name] = module
+    return module
+
+
+class AopTargetsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.modules = ["aop_pattern_app.api.users", "aop_pattern_app.api.orders", "aop_pattern_app.jobs"]
+        for name in self.modules:
+            _add_module(name)
+
+    def tearDown(self):
+        for name in self.modules:
+            sys.modules.pop(name, None)
+
+    def test_is_pattern(self):
+        self.assertTrue(is_target_pattern("app.*", None, "f"))
+        self.assertTrue(is_target_pattern("app", "re:.*Service", "f"))
+        self.assertFalse(is_target_pattern("app", None, "handle"))
+
+    def test_glob(self):
+        index = ModuleIndex()
+        self.assertEqual(
+            index.resolve("aop_pattern_app.api.*", None, "*"),
+            [
+                AopTarget("aop_pattern_app.api.orders", None, "handle_get"),
+                AopTarget("aop_pattern_app.api.orders", None, "helper"),
+                AopTarget("aop_pattern_app.api.users", None, "handle_get"),
+                AopTarget("aop_pattern_app.api.users", None, "helper"),
+            ],
+        )
+        self.assertEqual(
+            index.resolve("aop_pattern_app.jobs", "*Service", "handle_*"),
+            [
+                AopTarget("aop_pattern_app.jobs", "UserService", "handle_get"),
+                AopTarget("aop_pattern_app.jobs", "UserService", "handle_put"),
+            ],
+        )
+
+    def test_regex(self):
+        index = ModuleIndex()
+        self.assertEqual(
+            index.resolve("re:aop_pattern_app\\.(jobs|api\\.users)", "re:User.*", "re:handle_(get|post)"),
+            [
+                AopTarget("aop_pattern_app.api.users", "UserService", "handle_get"),
+                AopTarget("aop_pattern_app.jobs", "UserService", "handle_get"),
+            ],
+        )
+
+    def test_index_refresh(self):
+        index = ModuleIndex()
+        self.assertEqual(len(index.resolve("aop_pattern_app.*", None, "helper")), 3)
+        module = sys.modules["aop_pattern_app.jobs"]
+        exec("def helper_added():\n    pass\n", module.__dict__)
+        self.modules.append("aop_pattern_app.extra")
+        _add_module("aop_pattern_app.extra")
+        self.assertEqual(len(index.resolve("aop_pattern_app.*", None, "helper*")), 5)
+
+    def test_apply_all_or_nothing(self):
+        command = EnterExitCommand(limit=10)
+        command.module_name, command.class_name, command.method_name = (
+            "aop_pattern_app.*", None, "handle_get"
+        )
+        wrapped = []
+
+        def wrap(member: EnterExitCommand) -> CodeWrapperResult:
+            if member.module_name == "aop_pattern_app.api.users":
+                return CodeWrapperResult(None, True, "failed")
+            wrapped.append(member)
+            return CodeWrapperResult(None)
+
+        def for_target(target: AopTarget) -> EnterExitCommand:
+            member = EnterExitCommand(limit=10)
+            member.module_name, member.class_name, member.method_name = target
+            return member
+
+        self.assertEqual(apply_to_targets(command, for_target, wrap), "failed")
+        self.assertEqual(command.members, [])
+        self.assertTrue(all(not m.active for m in wrapped))
+
+        wrapped.clear()
+        command.module_name = "aop_pattern_app.jobs"
+        self.assertIsNone(apply_to_targets(command, for_target, wrap))
+        self.assertEqual(command.members, wrapped)
+        self.assertTrue(wrapped[0].active)
+        self.assertIs(wrapped[0].group, command)
+
+    def test_too_many_targets(self):
+        origin = aop_targets.MAX_AOP_TARGETS
+        aop_targets.MAX_AOP_TARGETS = 2
+        try:
+            with self.assertRaises(ValueError):
+                aop_targets.resolve_aop_targets("aop_pattern_app.*", None, "*")
+        finally:
+            aop_targets.MAX_AOP_TARGETS = origin
+        with self.assertRaises(ValueError):
+            aop_targets.resolve_aop_targets("aop_pattern_app.*", None, "missing_*")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import threading
+import unittest
+
+from flight_profiler.common import atomic_counter
+from flight_profiler.common.atomic_counter import new_counter
+
+
+class AtomicCounterTest(unittest.TestCase):
+
+    def _assert_unique(self, counter_factory):
+        counter = counter_factory(5)
+        values = []
+
+        def increment():
+            for _ in range(1000):
+                values.append(counter.increment())
+
+        threads = [threading.Thread(target=increment) for _ in range(16)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(values), list(range(6, 16006)))
+        self.assertEqual(counter.value, 16005)
+
+    def test_new_counter(self):
+        self._assert_unique(new_counter)
+
+    def test_fallback(self):
+        self._assert_unique(atomic_counter._LockCounter)
+        self.assertEqual(atomic_counter._LockCounter(5).add(-3), 2)
+
+    @unittest.skipIf(atomic_counter.AtomicCounter is None, "atomic_C not built")
+    def test_extension(self):
+        self._assert_unique(atomic_counter.AtomicCounter)
+        self.assertEqual(atomic_counter.AtomicCounter().add(3), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
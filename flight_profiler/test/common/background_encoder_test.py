@@ -0,0 +1,109 @@
+import asyncio
+import threading
+import unittest
+from asyncio import Queue
+from unittest import mock
+
+from flight_profiler.common.background_encoder import (
+    BackgroundEncoder,
+    deep_snapshot,
+    shallow_snapshot,
+)
+from flight_profiler.plugins.server_plugin import Message, ServerQueue
+
+
+class BackgroundEncoderTest(unittest.TestCase):
+
+    def test_shallow_snapshot(self):
+        inner = {"k": 1}
+        args = ([inner], {"a": 1})
+        snapshot = shallow_snapshot((args, {"x": 2}))
+        args[0].append(2)
+        inner["k"] = 3
+        self.assertEqual(snapshot, (([{"k": 3}], {"a": 1}), {"x": 2}))
+        obj = object()
+        self.assertIs(shallow_snapshot(obj), obj)
+
+    def test_deep_snapshot(self):
+        inner = {"k": 1}
+        snapshot = deep_snapshot([inner])
+        inner["k"] = 3
+        self.assertEqual(snapshot, [{"k": 1}])
+        # locks cannot be copied, the list is copied shallowly
+        lock = threading.Lock()
+        self.assertIs(deep_snapshot([lock])[0], lock)
+
+    def test_bounded(self):
+        encoder = BackgroundEncoder(capacity=1)
+        gate = threading.Event()
+        done = threading.Event()
+        self.assertTrue(encoder.submit(gate.wait))
+        # the first task may still be queued or already running
+        accepted = [encoder.submit(lambda: None) for _ in range(3)]
+        self.assertIn(False, accepted)
+        self.assertTrue(encoder.submit(done.set, force=True))
+        gate.set()
+        self.assertTrue(done.wait(5))
+
+    def test_end_after_deferred(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        server_queue = ServerQueue(out_q, loop)
+        gate = threading.Event()
+
+        def encode(i):
+            gate.wait(5)
+            return f"record {i}"
+
+        for i in range(3):
+            server_queue.output_deferred(lambda i=i: encode(i))
+        server_queue.output_msg_nowait(Message(True, None))
+        gate.set()
+
+        async def drain():
+            messages = []
+            while True:
+                message = await out_q.get()
+                messages.append(message)
+                if message.is_end:
+                    return messages
+
+        messages = loop.run_until_complete(asyncio.wait_for(drain(), 5))
+        loop.close()
+        self.assertEqual(
+            [m.msg for m in messages], ["record 0", "record 1", "record 2", None]
+        )
+
+    def test_direct_until_deferred(self):
+        loop = asyncio.new_event_loop()
+        server_queue = ServerQueue(Queue(), loop)
+        # streams that never defer skip the encoder
+        server_queue.output_msg_nowait(Message(False, "direct"))
+        self.assertEqual(1, len(server_queue._ring))
+        self.assertFalse(server_queue._deferring)
+        server_queue.output_deferred(lambda: "deferred")
+        self.assertTrue(server_queue._deferring)
+        loop.close()
+
+    def test_deferred_stream_bounded(self):
+        loop = asyncio.new_event_loop()
+        server_queue = ServerQueue(Queue(), loop)
+        encoder = BackgroundEncoder(capacity=2)
+        gate = threading.Event()
+        with mock.patch(
+            "flight_profiler.plugins.server_plugin.global_background_encoder", encoder
+        ):
+            server_queue.output_deferred(lambda: gate.wait(5) and "deferred")
+            for i in range(10):
+                server_queue.output_msg_nowait(Message(False, f"record {i}"))
+            self.assertLessEqual(encoder.pending(), 2)
+            self.assertGreaterEqual(server_queue.dropped, 8)
+            # the end message is queued even on a full encoder
+            server_queue.output_msg_nowait(Message(True, None))
+            self.assertGreaterEqual(encoder.pending(), 1)
+        gate.set()
+        loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import time
+import unittest
+
+from flight_profiler.common.clock import TRACE_CLOCK, WallClock, now_ns
+from flight_profiler.ext.trace_profile_C import (
+    remove_trace_profile,
+    set_trace_clock,
+    set_trace_profile,
+    trace_clock_ns,
+)
+from flight_profiler.plugins.trace.trace_frame import (
+    WrapTraceFrame,
+    deserialize_string_frames,
+)
+
+
+def traced():
+    return sum(range(10))
+
+
+class WallClockTest(unittest.TestCase):
+
+    def test_to_wall_clock(self):
+        wall_clock = WallClock()
+        start = now_ns()
+        self.assertLess(abs(wall_clock.to_ns(start) - time.time_ns()), 50_000_000)
+        self.assertEqual(wall_clock.to_ns(start) // 1_000_000, wall_clock.to_ms(start))
+
+
+class TraceClockTest(unittest.TestCase):
+
+    def tearDown(self):
+        set_trace_clock(TRACE_CLOCK)
+
+    def test_clocks(self):
+        for name in ("monotonic", "coarse", "tsc"):
+            used = set_trace_clock(name)
+            # coarse and tsc fall back to monotonic where they are missing
+            self.assertIn(used, (name, "monotonic"))
+            times = [trace_clock_ns() for _ in range(1000)]
+            self.assertEqual(times, sorted(times))
+        with self.assertRaises(ValueError):
+            set_trace_clock("realtime")
+
+    def test_frames_start_at_wall_clock(self):
+        sent = []
+        for name in ("monotonic", "coarse", "tsc"):
+            set_trace_clock(name)
+            sent.clear()
+            before = time.time_ns()
+            profiler = set_trace_profile(
+                lambda out_q, *payload: sent.append(WrapTraceFrame(*payload)), None, 0, False, 0
+            )
+            traced()
+            remove_trace_profile(profiler)
+            frames = deserialize_string_frames(sent[0]).frames
+            self.assertTrue("traced" in frames[0].description)
+            # coarse ticks every few milliseconds
+            self.assertLess(abs(frames[0].start_ns - before), 50_000_000)
+            self.assertTrue(all(f.cost_ns >= 0 for f in frames if f is not None))
+
+
+if __name__ == "__main__":
+    unittest.main()
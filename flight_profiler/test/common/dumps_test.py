@@ -0,0 +1,80 @@
+import unittest
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from flight_profiler.common.dumps import encode_obj_to_transfer
+
+
+@dataclass
+class Link:
+    value: int
+    next: Optional["Link"] = None
+    tags: List[str] = field(default_factory=list)
+
+
+class EncodeObjTest(unittest.TestCase):
+
+    def test_format(self):
+        self.assertEqual(
+            encode_obj_to_transfer({"b": [1, (2,)], "a": None}),
+            '{\n  "a": None, \n  "b": [\n    1,\n    (\n      2\n    )\n  ]\n}',
+        )
+        self.assertEqual(encode_obj_to_transfer(Link(1)), 'Link({\n  "next": None, \n  "tags": [], \n  "value": 1\n})')
+        # small collections beyond max_depth are written by repr
+        self.assertEqual(encode_obj_to_transfer([(1, 2), {3}], max_depth=1), "[\n  (1, 2),\n  {3}\n]")
+
+    def test_large_collections(self):
+        text = encode_obj_to_transfer(list(range(1000000)), indent="")
+        self.assertEqual(text, "[\n" + ",\n".join([str(i) for i in range(10)] + ["..."] + [
+            str(i) for i in range(1000000 - 10, 1000000)
+        ]) + "\n]")
+        text = encode_obj_to_transfer({i: i for i in range(15)}, indent="")
+        self.assertEqual(text.count("\n"), 12)
+        self.assertIn('"4": 4, \n..., \n"10": 10', text)
+        self.assertEqual(len(encode_obj_to_transfer(list(range(100)), verbose=True).split("\n")), 102)
+
+    def test_unsortable_keys(self):
+        text = encode_obj_to_transfer({"b": 1, 2: 2, None: 3})
+        self.assertEqual(text, '{\n  "b": 1, \n  "2": 2, \n  "None": 3\n}')
+        wide = {f"k{i}": i for i in range(30)}
+        wide[0] = 0
+        text = encode_obj_to_transfer(wide)
+        self.assertIn('"k0": 0', text)
+        self.assertIn('"0": 0', text)
+        self.assertNotIn('"k15"', text)
+
+    def test_cycles(self):
+        lst = [1]
+        lst.append(lst)
+        self.assertEqual(encode_obj_to_transfer(lst, max_depth=10), "[\n  1,\n  [...]\n]")
+        link = Link(1)
+        link.next = link
+        self.assertIn('"next": Link({...})', encode_obj_to_transfer(link, max_depth=10))
+        # the same object twice is not a cycle
+        shared = [1]
+        self.assertEqual(encode_obj_to_transfer([shared, shared]).count("1"), 2)
+
+    def test_deep(self):
+        head = None
+        for i in range(5000):
+            head = Link(i, head)
+        text = encode_obj_to_transfer(head, max_depth=10000, indent="")
+        self.assertIn('"value": 0', text)
+
+    def test_budget(self):
+        text = encode_obj_to_transfer(list(range(1000)), verbose=True, max_chars=100)
+        self.assertTrue(text.endswith("... (truncated, more than 100 characters)"))
+        self.assertLess(len(text), 200)
+        text = encode_obj_to_transfer(list(range(1000)), verbose=True, max_nodes=11)
+        self.assertTrue(text.endswith("... (truncated, more than 11 values)"))
+        self.assertIn("9", text)
+        self.assertNotIn("10", text)
+        # the last value and collections at the depth limit are bounded too
+        text = encode_obj_to_transfer("x" * 10000, verbose=True, max_chars=100)
+        self.assertTrue(text.endswith("... (truncated, more than 100 characters)"))
+        self.assertLess(len(text), 200)
+        self.assertEqual(encode_obj_to_transfer([list(range(1000))], max_depth=1), "[\n  <list of 1000 items>\n]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import sys
+import threading
+import unittest
+
+from flight_profiler.common import enter_exit_command
+from flight_profiler.common.enter_exit_command import (
+    COMMAND_ACTIVE,
+    COMMAND_CLOSED,
+    COMMAND_EXHAUSTED,
+    EnterExitCommand,
+)
+from flight_profiler.plugins.server_plugin import ServerQueue
+
+
+def target_func():
+    return "origin"
+
+
+def wrapped_code():
+    return "wrapped"
+
+
+class EnterExitCommandTest(unittest.TestCase):
+
+    def setUp(self):
+        self.origin_code = target_func.__code__
+        target_func.__code__ = wrapped_code.__code__
+        self.loop = asyncio.new_event_loop()
+        self.out_q = asyncio.Queue()
+        self.command = EnterExitCommand(limit=2)
+        self.command.module_name = __name__
+        self.command.method_name = "target_func"
+        self.command.origin_code = self.origin_code
+        self.command.out_q = ServerQueue(self.out_q, self.loop)
+
+    def tearDown(self):
+        target_func.__code__ = self.origin_code
+        self.loop.close()
+
+    def enter(self) -> bool:
+        # enter checks the caller of the wrapper
+        return self.command.enter()
+
+    def test_restore_on_limit(self):
+        self.assertTrue(self.enter())
+        self.assertEqual(self.command.state, COMMAND_ACTIVE)
+        self.assertTrue(self.enter())
+        # origin code is restored before the in-flight invocations exit
+        self.assertEqual(target_func(), "origin")
+        self.assertFalse(self.command.active)
+        self.assertEqual(self.command.state, COMMAND_EXHAUSTED)
+        self.assertFalse(self.enter())
+
+        self.command.exit()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertTrue(self.out_q.empty())
+        self.command.exit()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(self.command.state, COMMAND_CLOSED)
+        self.assertTrue(self.out_q.get_nowait().is_end)
+
+    def test_disable(self):
+        self.command.disable()
+        self.assertFalse(self.command.active)
+        self.assertFalse(self.enter())
+
+    def test_disable_exhausted(self):
+        self.assertTrue(self.enter())
+        self.assertTrue(self.enter())
+        self.assertEqual(self.command.state, COMMAND_EXHAUSTED)
+        # turned off with invocations in flight, the end message is up to the caller
+        self.assertTrue(self.command.disable())
+        self.command.exit()
+        self.command.exit()
+        self.loop.run_until_complete(asyncio.sleep(0))
+        self.assertTrue(self.out_q.empty())
+        self.assertFalse(self.command.disable())
+
+    def test_self_injection_cached(self):
+        enter_exit_command._self_injected_codes.clear()
+        self.assertTrue(self.enter())
+        self.assertIn(
+            EnterExitCommandTest.test_self_injection_cached.__code__,
+            enter_exit_command._self_injected_codes,
+        )
+        self.assertTrue(enter_exit_command.is_self_injected(enter_exit_command.is_self_injected.__code__))
+
+
+class CountingCommand(EnterExitCommand):
+
+    def __init__(self, limit: int):
+        super().__init__(limit)
+        self.restored = 0
+        self.ended = 0
+
+    def restore_origin_code(self):
+        self.restored += 1
+
+    def recover_origin_code(self):
+        self.ended += 1
+
+
+class EnterExitCommandStressTest(unittest.TestCase):
+
+    THREADS = 64
+    CALLS = 500
+
+    def setUp(self):
+        self.switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(1e-6)
+
+    def tearDown(self):
+        sys.setswitchinterval(self.switch_interval)
+
+    def test_exact_limit(self):
+        for limit in (1, 7, 1000):
+            command = CountingCommand(limit)
+            hits = []
+            barrier = threading.Barrier(self.THREADS)
+
+            def invoke():
+                barrier.wait()
+                for _ in range(self.CALLS):
+                    # mirrors the wrappers, enter() inspects the caller frame
+                    if command.active and command.enter():
+                        hits.append(1)
+                        command.exit()
+
+            threads = [threading.Thread(target=invoke) for _ in range(self.THREADS)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(len(hits), limit)
+            self.assertEqual(command.restored, 1)
+            self.assertEqual(command.ended, 1)
+            self.assertEqual(command.state, COMMAND_CLOSED)
+
+
+if __name__ == "__main__":
+    unittest.main()
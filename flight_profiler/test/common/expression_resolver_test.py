@@ -0,0 +1,40 @@
+import unittest
+
+from flight_profiler.common.expression_resolver import (
+    FilterExprResolver,
+    InstanceExprResolver,
+    InstanceListExprResolver,
+    MethodInvocationExprResolver,
+)
+
+
+class ExpressionResolverTest(unittest.TestCase):
+
+    def test_method_invocation(self):
+        resolver = MethodInvocationExprResolver("return_obj, args[0], kwargs['k']")
+        self.assertEqual(resolver.eval(None, 3, 1, k=2), (3, 1, 2))
+
+    def test_filter(self):
+        resolver = FilterExprResolver("cost > 10 and args[0] == 'hello'")
+        self.assertTrue(resolver.eval_filter(None, None, 11, "hello"))
+        self.assertFalse(resolver.eval_filter(None, None, 9, "hello"))
+        self.assertTrue(FilterExprResolver(None).eval_filter(None, None, 0))
+
+    def test_instance(self):
+        self.assertEqual(InstanceExprResolver("target + 1").eval_target(1), 2)
+        self.assertEqual(InstanceListExprResolver("len(instances)").eval_target([1, 2]), 2)
+
+    def test_syntax_error_on_construction(self):
+        for resolver_cls in (
+            MethodInvocationExprResolver,
+            FilterExprResolver,
+            InstanceExprResolver,
+            InstanceListExprResolver,
+        ):
+            with self.assertRaises(SyntaxError) as ctx:
+                resolver_cls("args[0] ==")
+            self.assertIn("args[0] ==", ctx.exception.msg)
+
+
+if __name__ == "__main__":
+    unittest.main()
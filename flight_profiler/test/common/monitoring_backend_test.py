@@ -0,0 +1,185 @@
+import asyncio
+import pickle
+import sys
+import unittest
+from asyncio import Queue
+
+from flight_profiler.common.monitoring_backend import (
+    MONITORING_AVAILABLE,
+    MONITORING_TOOL_ID,
+    argument_layout,
+    frame_arguments,
+    global_monitoring_backend,
+)
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.tt.time_tunnel_agent import global_tt_agent
+from flight_profiler.plugins.tt.time_tunnel_parser import TimeTunnelArgumentParser
+from flight_profiler.plugins.watch.watch_agent import global_watch_agent
+from flight_profiler.plugins.watch.watch_displayer import WatchResult
+from flight_profiler.plugins.watch.watch_parser import WatchArgumentParser
+
+MODULE = "flight_profiler.test.common.monitoring_backend_test"
+
+
+def bound_arguments(a, b=2, *rest, c, **extra):
+    frame = sys._getframe()
+    return frame_arguments(frame, argument_layout(frame.f_code))
+
+
+def add(a, b):
+    return a + b
+
+
+def fail(a):
+    raise ValueError(a)
+
+
+async def async_add(a, b):
+    await asyncio.sleep(0)
+    return a + b
+
+
+def outer(a):
+    def inner(b):
+        return a + b
+
+    return inner(1)
+
+
+def numbers():
+    yield 1
+
+
+class Counter:
+    def incr(self, step):
+        return step + 1
+
+
+def _drain(loop, out_q):
+    async def drain():
+        messages = []
+        while True:
+            message = await out_q.get()
+            messages.append(message)
+            if message.is_end:
+                return messages
+
+    return loop.run_until_complete(drain())
+
+
+class FrameArgumentsTest(unittest.TestCase):
+
+    def test_frame_arguments(self):
+        self.assertEqual(
+            bound_arguments(1, 3, 4, c=5, d=6), ((1, 3, 4), {"c": 5, "d": 6})
+        )
+        self.assertEqual(bound_arguments(1, c=5), ((1, 2), {"c": 5}))
+
+
+@unittest.skipIf(MONITORING_AVAILABLE, "sys.monitoring is available")
+class MonitoringUnavailableTest(unittest.TestCase):
+
+    def test_refused(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        setting = WatchArgumentParser().parse_watch_setting(
+            f"{MODULE} add --backend monitoring"
+        )
+        setting.out_q = ServerQueue(out_q, loop)
+        global_watch_agent.add_watch(setting)
+        messages = _drain(loop, out_q)
+        loop.close()
+        self.assertIn("needs python 3.12+", pickle.loads(messages[0].msg))
+
+
+@unittest.skipUnless(MONITORING_AVAILABLE, "sys.monitoring needs python 3.12+")
+class MonitoringBackendTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        self.out_q = Queue()
+
+    def tearDown(self):
+        self.loop.close()
+        self.assertEqual(global_monitoring_backend.monitored_codes(), 0)
+        # tool id is given back once nothing is monitored
+        self.assertIsNone(sys.monitoring.get_tool(MONITORING_TOOL_ID))
+
+    def watch(self, param: str):
+        setting = WatchArgumentParser().parse_watch_setting(
+            f"{MODULE} {param} --backend monitoring"
+        )
+        setting.out_q = ServerQueue(self.out_q, self.loop)
+        global_watch_agent.add_watch(setting)
+        return setting
+
+    def results(self):
+        messages = _drain(self.loop, self.out_q)
+        return messages[0], [pickle.loads(m.msg) for m in messages[1:-1]]
+
+    def test_watch_until_limit(self):
+        origin_code = add.__code__
+        self.watch("add --expr return_obj,args -n 2")
+        self.assertIs(add.__code__, origin_code)
+        for i in range(3):
+            self.assertEqual(add(i, 1), i + 1)
+        _, results = self.results()
+        self.assertEqual(len(results), 2)
+        self.assertTrue(isinstance(results[0], WatchResult))
+        self.assertEqual(results[1].value.replace("\n", "").replace(" ", ""), "(2,(1,1))")
+        self.assertNotIn(f"{MODULE}&None&add&None", global_watch_agent.aop_points)
+
+    def test_watch_exception(self):
+        self.watch("fail -n 1 -e")
+        with self.assertRaises(ValueError):
+            fail(3)
+        _, results = self.results()
+        self.assertTrue(results[0].is_exp)
+        self.assertIn("ValueError: 3", results[0].exception)
+
+    def test_watch_async(self):
+        self.watch("async_add --expr return_obj -n 1")
+        self.assertEqual(self.loop.run_until_complete(async_add(1, 2)), 3)
+        _, results = self.results()
+        self.assertEqual(results[0].value, "3")
+
+    def test_watch_class_and_nested(self):
+        self.watch("Counter incr --expr target,return_obj -n 1")
+        Counter().incr(1)
+        _, results = self.results()
+        self.assertIn("Counter", results[0].value)
+
+        self.watch("outer -nm inner --expr return_obj -n 1")
+        outer(2)
+        _, results = self.results()
+        self.assertEqual(results[0].value, "3")
+
+    def test_watch_off(self):
+        param = "add -n 5"
+        self.watch(param)
+        global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(
+            f"{MODULE} {param}"
+        ))
+        add(1, 2)
+        messages = _drain(self.loop, self.out_q)
+        self.assertEqual(len(messages), 2)
+
+    def test_generator_refused(self):
+        self.watch("numbers")
+        message, _ = self.results()
+        self.assertIn("Generator numbers", pickle.loads(message.msg))
+
+    def test_time_tunnel(self):
+        tt_cmd = TimeTunnelArgumentParser().parse_time_tunnel_cmd(
+            f"-t {MODULE} Counter incr -n 1 --backend monitoring"
+        )
+        tt_cmd.out_q = ServerQueue(self.out_q, self.loop)
+        global_tt_agent.on_action(tt_cmd)
+        Counter().incr(4)
+        _, records = self.results()
+        self.assertEqual(records[0].method_name, "incr")
+        self.assertFalse(records[0].is_exp)
+
+
+if __name__ == "__main__":
+    unittest.main()
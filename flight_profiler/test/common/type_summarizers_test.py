@@ -0,0 +1,119 @@
+import importlib.util
+import unittest
+from dataclasses import dataclass
+
+from flight_profiler.common.dumps import encode_obj_to_transfer
+from flight_profiler.common.type_summarizers import register_summarizer, summarizer_of
+
+NUMPY_INSTALLED = importlib.util.find_spec("numpy") is not None
+PANDAS_INSTALLED = importlib.util.find_spec("pandas") is not None
+TORCH_INSTALLED = importlib.util.find_spec("torch") is not None
+
+
+class FakeDevice:
+    def __init__(self, device_type):
+        self.type = device_type
+
+    def __str__(self):
+        return f"{self.type}:0"
+
+
+class FakeTensor:
+    """
+    metadata of a tensor on an accelerator, reading its data fails
+    """
+
+    shape = (2, 3)
+    dtype = "torch.float16"
+    layout = "torch.strided"
+    requires_grad = True
+    device = FakeDevice("cuda")
+
+    def stride(self):
+        return 3, 1
+
+    def __getattr__(self, name):
+        raise AssertionError(f"{name} must not be touched")
+
+    def __repr__(self):
+        raise AssertionError("repr synchronizes the device")
+
+
+FakeTensor.__module__ = "torch"
+FakeTensor.__qualname__ = "Tensor"
+
+
+class Parameter(FakeTensor):
+    pass
+
+
+@dataclass
+class Point:
+    __slots__ = ("x", "y")
+    x: int
+    y: int
+
+
+class Opaque:
+    pass
+
+
+class TypeSummarizersTest(unittest.TestCase):
+
+    def test_accelerator_tensor(self):
+        self.assertEqual(
+            encode_obj_to_transfer({"weight": Parameter()}),
+            '{\n  "weight": Parameter(shape=(2, 3), dtype=torch.float16, device=cuda:0, '
+            'strides=(3, 1), requires_grad=True)\n}',
+        )
+
+    def test_slots_dataclass(self):
+        self.assertEqual(encode_obj_to_transfer(Point(1, 2)), 'Point({\n  "x": 1, \n  "y": 2\n})')
+
+    def test_register(self):
+        self.assertIsNone(summarizer_of(Opaque))
+        register_summarizer(Opaque, lambda obj: "Opaque(1)")
+        self.assertEqual(encode_obj_to_transfer([Opaque()]), "[\n  Opaque(1)\n]")
+
+        def fail(obj):
+            raise ValueError("broken")
+
+        register_summarizer(Opaque, fail)
+        self.assertEqual(
+            encode_obj_to_transfer(Opaque()), "Opaque(<summary failed: ValueError('broken')>)"
+        )
+
+    @unittest.skipUnless(NUMPY_INSTALLED, "numpy is not installed")
+    def test_ndarray(self):
+        import numpy
+
+        array = numpy.arange(12, dtype=numpy.int32).reshape(3, 4)
+        self.assertEqual(
+            encode_obj_to_transfer(array.T),
+            "ndarray(shape=(4, 3), dtype=int32, strides=(4, 16), values=[0, 4, 8, ..., 3, 7, 11])",
+        )
+
+    @unittest.skipUnless(PANDAS_INSTALLED, "pandas is not installed")
+    def test_dataframe(self):
+        import pandas
+
+        frame = pandas.DataFrame({"a": [1, 2], "b": ["x", "y"]})
+        text = encode_obj_to_transfer(frame)
+        self.assertIn("shape=(2, 2), columns={a: int64, b: ", text)
+        self.assertIn("first_row=[1, x]", text)
+        self.assertIn("values=[1, 2]", encode_obj_to_transfer(frame["a"]))
+
+    @unittest.skipUnless(TORCH_INSTALLED, "torch is not installed")
+    def test_tensor(self):
+        import torch
+
+        tensor = torch.arange(10, dtype=torch.float32)
+        self.assertEqual(
+            encode_obj_to_transfer(tensor),
+            "Tensor(shape=(10,), dtype=torch.float32, device=cpu, strides=(1,), "
+            "values=[0.0, 1.0, 2.0, ..., 7.0, 8.0, 9.0])",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,168 @@
+import asyncio
+import json
+import os
+import pickle
+import socket
+import threading
+import time
+import unittest
+
+from flight_profiler.communication.base import SESSION_MSG_DATA, SESSION_MSG_END
+from flight_profiler.communication.flight_client import (
+    SESSION_CHANNEL_CAPACITY,
+    FlightClient,
+    FlightSession,
+)
+from flight_profiler.plugins.watch.watch_displayer import WatchResult
+from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+
+def session_test_func(x):
+    return x + 1
+
+
+def start_server() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("localhost", 0))
+        port = s.getsockname()[1]
+
+    def run_app():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(FlightProfilerServer("localhost", port).run())
+
+    threading.Thread(target=run_app, daemon=True).start()
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        try:
+            FlightClient("localhost", port).close()
+            return port
+        except Exception:
+            time.sleep(0.05)
+    raise RuntimeError("server not started")
+
+
+class FlightSessionTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.port = start_server()
+
+    def setUp(self):
+        self.session = FlightSession("localhost", self.port)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_status_channels(self):
+        for _ in range(3):
+            channel = self.session.open_channel()
+            resp = json.loads(
+                channel.request({"target": "status", "is_plugin_calling": False})
+            )
+            channel.close()
+            self.assertEqual(resp["pid"], str(os.getpid()))
+        self.assertEqual(len(self.session.channels), 0)
+
+    def test_stream_off_in_same_session(self):
+        module = "flight_profiler.test.communication.flight_session_test"
+        stream = self.session.open_channel()
+        events = stream.request_stream(
+            {"target": "watch", "param": f"on {module} session_test_func -n 100"}
+        )
+        # first event is the watch hint
+        self.assertTrue(type(pickle.loads(next(events))) is str)
+        session_test_func(1)
+        session_test_func(2)
+        results = [pickle.loads(next(events)) for _ in range(2)]
+        self.assertTrue(all(isinstance(r, WatchResult) for r in results))
+
+        off = self.session.open_channel()
+        for _ in off.request_stream(
+            {"target": "watch", "param": f"off {module} session_test_func"}
+        ):
+            pass
+        off.close()
+        # off ends the watch stream of the other channel
+        self.assertEqual(list(events), [])
+        stream.close()
+
+    def test_cancel_channel(self):
+        module = "flight_profiler.test.communication.flight_session_test"
+        stream = self.session.open_channel()
+        events = stream.request_stream(
+            {"target": "watch", "param": f"on {module} session_test_func -n 100"}
+        )
+        next(events)
+        stream.close()
+        session_test_func(1)
+        off = self.session.open_channel()
+        for _ in off.request_stream(
+            {"target": "watch", "param": f"off {module} session_test_func"}
+        ):
+            pass
+        off.close()
+        channel = self.session.open_channel()
+        resp = json.loads(
+            channel.request({"target": "status", "is_plugin_calling": False})
+        )
+        channel.close()
+        self.assertEqual(resp["pid"], str(os.getpid()))
+
+    def status_pid(self) -> str:
+        channel = self.session.open_channel()
+        resp = json.loads(
+            channel.request({"target": "status", "is_plugin_calling": False})
+        )
+        channel.close()
+        return resp["pid"]
+
+    def test_cancel_restores_target(self):
+        module = "flight_profiler.test.communication.flight_session_test"
+        origin_code = session_test_func.__code__
+        stream = self.session.open_channel()
+        events = stream.request_stream(
+            {"target": "watch", "param": f"on {module} session_test_func -n 100"}
+        )
+        next(events)
+        self.assertIsNot(session_test_func.__code__, origin_code)
+        # no "off" is sent, cancel alone removes the watch
+        stream.close()
+        deadline = time.time() + 5
+        while session_test_func.__code__ is not origin_code and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertIs(session_test_func.__code__, origin_code)
+
+    def test_channel_bounded(self):
+        module = "flight_profiler.test.communication.flight_session_test"
+        stream = self.session.open_channel()
+        # unframed, every event is a message of its own
+        request = {"target": "watch", "param": f"on {module} session_test_func -n 100000"}
+        events = stream.request_stream(json.dumps(request).encode("utf-8"))
+        next(events)
+        # nobody reads the stream while it is flooded
+        for i in range(20000):
+            session_test_func(i)
+            if i % 1000 == 0:
+                time.sleep(0.005)
+        self.assertEqual(stream.messages.qsize(), SESSION_CHANNEL_CAPACITY)
+        # the full channel does not hold back the others
+        self.assertEqual(self.status_pid(), str(os.getpid()))
+        self.assertGreater(stream.dropped, 0)
+        stream.close()
+
+    def test_end_on_full_channel(self):
+        channel = self.session.open_channel()
+        for i in range(SESSION_CHANNEL_CAPACITY + 5):
+            channel.deliver(SESSION_MSG_DATA, b"%d" % i)
+        channel.deliver(SESSION_MSG_END, b"")
+        messages = [bytes(m) for m in channel._iter_messages()]
+        # the end message replaced the oldest one
+        self.assertEqual(SESSION_CHANNEL_CAPACITY - 1, len(messages))
+        self.assertEqual(b"%d" % (SESSION_CHANNEL_CAPACITY - 1), messages[-1])
+        self.assertEqual(6, channel.stream_stats["client_dropped"])
+        channel.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import unittest
+
+from flight_profiler.communication.base import (
+    FRAME_FLAG_LZMA,
+    FRAME_FLAG_ZLIB,
+    FRAME_KIND_EVENTS,
+    FRAME_KIND_SUMMARY,
+    StreamFrameError,
+    decode_stream_frame,
+    encode_stream_frame,
+    get_supported_compressions,
+)
+from flight_profiler.plugins.server_plugin import Message, ServerQueue
+from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+
+class StreamFrameTest(unittest.TestCase):
+
+    def test_encode_decode(self):
+        events = [b"first", b"", "second".encode("utf-8"), bytes(range(256))]
+        kind, flags, decoded = decode_stream_frame(encode_stream_frame(events))
+        self.assertEqual(kind, FRAME_KIND_EVENTS)
+        self.assertEqual(flags, 0)
+        self.assertEqual(decoded, events)
+
+    def test_decode_truncated(self):
+        frame = encode_stream_frame([b"first", b"second"])
+        with self.assertRaises(StreamFrameError):
+            decode_stream_frame(frame[:-1])
+        with self.assertRaises(StreamFrameError):
+            decode_stream_frame(frame[:3])
+
+    def test_compressed_frame(self):
+        events = [f"line {i % 10} of a trace tree".encode("utf-8") for i in range(1000)]
+        for codec, flag in (("zlib", FRAME_FLAG_ZLIB), ("lzma", FRAME_FLAG_LZMA)):
+            if codec not in get_supported_compressions():
+                continue
+            frame = encode_stream_frame(events, compression=codec, threshold=1024)
+            self.assertLess(len(frame), len(encode_stream_frame(events)))
+            kind, flags, decoded = decode_stream_frame(memoryview(frame))
+            self.assertEqual(flags, flag)
+            self.assertEqual([bytes(event) for event in decoded], events)
+
+    def test_small_frame_stays_raw(self):
+        events = [b"short"]
+        frame = encode_stream_frame(events, compression="zlib", threshold=1024)
+        self.assertEqual(frame, encode_stream_frame(events))
+
+    def test_decode_corrupted_compressed(self):
+        events = [b"x" * 4096]
+        frame = encode_stream_frame(events, compression="zlib", threshold=1024)
+        with self.assertRaises(StreamFrameError):
+            decode_stream_frame(frame[:-4])
+
+    def test_status_negotiation(self):
+        server = FlightProfilerServer("localhost", 0)
+        self.assertNotIn("compression", server.status(""))
+        offer = json.dumps({"compression": ["brotli", "zlib"]})
+        self.assertEqual(server.status(offer)["compression"], "zlib")
+        offer = json.dumps({"compression": ["brotli"]})
+        self.assertIsNone(server.status(offer)["compression"])
+
+    def test_stream_in_frames_summary(self):
+        server = FlightProfilerServer("localhost", 0)
+        frames = []
+
+        async def capture_frame(events, writer, kind=FRAME_KIND_EVENTS, compression=None):
+            frames.append((kind, list(events)))
+
+        server.send_frame = capture_frame
+
+        async def run():
+            out_q = asyncio.Queue()
+            server_queue = ServerQueue(out_q, asyncio.get_running_loop(), rate_limit=2)
+            for i in range(10):
+                server_queue.output_msg_nowait(Message(False, f"message-{i}"))
+            server_queue.output_msg_nowait(Message(True, None))
+            await server.stream_in_frames(out_q, None, server_queue)
+
+        asyncio.run(run())
+        self.assertEqual(frames[0], (FRAME_KIND_EVENTS, [b"message-0", b"message-1"]))
+        kind, events = frames[-1]
+        self.assertEqual(kind, FRAME_KIND_SUMMARY)
+        summary = json.loads(events[0])
+        self.assertEqual(summary["emitted"], 2)
+        self.assertEqual(summary["sampled"], 8)
+
+    def test_stream_in_frames_coalesce(self):
+        server = FlightProfilerServer("localhost", 0)
+        frames = []
+
+        async def capture_frame(events, writer, kind=FRAME_KIND_EVENTS, compression=None):
+            frames.append(list(events))
+
+        server.send_frame = capture_frame
+
+        async def run():
+            out_q = asyncio.Queue()
+            for i in range(100):
+                out_q.put_nowait(Message(False, f"message-{i}"))
+            out_q.put_nowait(Message(True, None))
+            await server.stream_in_frames(out_q, None)
+
+        asyncio.run(run())
+        self.assertEqual(len(frames), 1)
+        self.assertEqual(frames[0], [f"message-{i}".encode("utf-8") for i in range(100)])
+
+
+if __name__ == "__main__":
+    unittest.main()
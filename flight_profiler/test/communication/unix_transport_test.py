@@ -0,0 +1,78 @@
+import asyncio
+import json
+import os
+import shutil
+import socket
+import stat
+import tempfile
+import threading
+import time
+import unittest
+
+from flight_profiler.communication.base import get_agent_socket_path
+from flight_profiler.communication.flight_client import FlightClient, FlightSession
+from flight_profiler.server_flight_profiler import FlightProfilerServer
+
+
+@unittest.skipIf(not hasattr(socket, "AF_UNIX"), "unix socket not supported")
+class UnixTransportTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        cls.unix_path = os.path.join(cls.tmp_dir, "agent.sock")
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind(("localhost", 0))
+            cls.port = s.getsockname()[1]
+
+        def run_app():
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(
+                FlightProfilerServer("localhost", cls.port, cls.unix_path).run()
+            )
+
+        threading.Thread(target=run_app, daemon=True).start()
+        deadline = time.time() + 5
+        while not os.path.exists(cls.unix_path) and time.time() < deadline:
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    def test_status_over_unix_socket(self):
+        self.assertEqual(stat.S_IMODE(os.stat(self.unix_path).st_mode), 0o600)
+        client = FlightClient("localhost", -1, self.unix_path)
+        try:
+            resp = json.loads(
+                client.request({"target": "status", "is_plugin_calling": False})
+            )
+        finally:
+            client.close()
+        self.assertEqual(resp["pid"], str(os.getpid()))
+        self.assertEqual(resp["port"], self.port)
+
+    def test_session_over_unix_socket(self):
+        session = FlightSession("localhost", self.port, self.unix_path)
+        try:
+            channel = session.open_channel()
+            events = list(channel.request_stream({"target": "module", "param": "json"}))
+            channel.close()
+        finally:
+            session.close()
+        self.assertEqual(len(events), 1)
+
+    def test_agent_socket_path(self):
+        path = get_agent_socket_path(12345)
+        if path is not None:
+            self.assertTrue(path.endswith(os.path.join("pyFlightProfiler", "agent_12345.sock")))
+        os.environ["PYFLIGHT_UNIX_SOCKET"] = "0"
+        try:
+            self.assertIsNone(get_agent_socket_path(12345))
+        finally:
+            del os.environ["PYFLIGHT_UNIX_SOCKET"]
+
+
+if __name__ == "__main__":
+    unittest.main()
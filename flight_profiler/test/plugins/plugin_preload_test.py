@@ -0,0 +1,77 @@
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from flight_profiler.plugins.server_plugin import ServerPlugin, ServerQueue
+from flight_profiler.server_flight_profiler import (
+    FlightProfilerServer,
+    _agent_worker_count,
+    _global_task_executor,
+    list_server_plugins,
+)
+
+
+class PluginPreloadTest(unittest.TestCase):
+
+    def wait_preload(self, server: FlightProfilerServer, cmds):
+        deadline = time.time() + 10
+        while time.time() < deadline:
+            if all(server.preload_timings.get(cmd) is not None for cmd in cmds):
+                return
+            time.sleep(0.01)
+        self.fail(f"preload not finished: {server.preload_timings}")
+
+    def test_list_server_plugins(self):
+        plugins = list_server_plugins()
+        self.assertIn("watch", plugins)
+        self.assertIn("trace", plugins)
+        self.assertNotIn("test", plugins)
+
+    def test_preload_by_status(self):
+        server = FlightProfilerServer("localhost", 0)
+        resp = server.status(json.dumps({"preload": ["stack", "not_a_plugin"]}))
+        self.assertIn("stack", resp["preload"])
+        self.wait_preload(server, ["stack", "not_a_plugin"])
+        self.assertIsInstance(server.preload_timings["stack"], float)
+        self.assertIsInstance(server.preload_timings["not_a_plugin"], str)
+        self.assertIn("stack", server.plugin_modules)
+        # preloaded module is reused by later commands
+        self.assertIs(server.load_plugin_module("stack"), server.plugin_modules["stack"])
+        # already requested plugins are not scheduled again
+        self.assertEqual(server.start_preload(["stack"]), [])
+
+    def test_preload_with_busy_workers(self):
+        release = threading.Event()
+        busy = [_global_task_executor.submit(release.wait) for _ in range(_agent_worker_count)]
+        try:
+            server = FlightProfilerServer("localhost", 0)
+            server.start_preload(["stack"])
+            # preload does not wait for a free worker
+            self.wait_preload(server, ["stack"])
+        finally:
+            release.set()
+            for future in busy:
+                future.result()
+
+    def test_load_plugin_module_async(self):
+        server = FlightProfilerServer("localhost", 0)
+        loop = asyncio.new_event_loop()
+        try:
+            module = loop.run_until_complete(server.load_plugin_module_async("stack", loop))
+        finally:
+            loop.close()
+        self.assertIs(module, server.plugin_modules["stack"])
+
+    def test_long_running_actions(self):
+        out_q = ServerQueue(asyncio.Queue())
+        self.assertFalse(ServerPlugin("stack", out_q).is_long_running(""))
+        mem = FlightProfilerServer("localhost", 0).load_plugin_module("mem")
+        plugin = mem.get_instance("mem", out_q)
+        self.assertTrue(plugin.is_long_running("diff --interval 10"))
+        self.assertFalse(plugin.is_long_running("summary"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from flight_profiler.plugins.server_plugin import (
+    DROP_NEWEST,
+    DROP_OLDEST,
+    Message,
+    ServerQueue,
+)
+
+
+class ServerQueueTest(unittest.TestCase):
+
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def collect(self, out_q: asyncio.Queue):
+        async def get_all():
+            msgs = []
+            while True:
+                msg = await out_q.get()
+                msgs.append(msg)
+                if msg.is_end:
+                    return msgs
+
+        return self.loop.run_until_complete(get_all())
+
+    def test_multi_thread_producers(self):
+        out_q = self._new_queue(maxsize=200)
+        server_queue = ServerQueue(out_q, self.loop, capacity=100000)
+
+        def produce(idx):
+            for i in range(1000):
+                server_queue.output_msg_nowait(Message(False, f"{idx}-{i}"))
+
+        threads = [threading.Thread(target=produce, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        self.assertEqual(len(msgs), 8001)
+        self.assertEqual(server_queue.dropped, 0)
+        # order of every producer is kept
+        for idx in range(8):
+            own = [m.msg for m in msgs if m.msg is not None and m.msg.startswith(f"{idx}-")]
+            self.assertEqual(own, [f"{idx}-{i}" for i in range(1000)])
+        # updated by producers and the drain concurrently, nothing is lost
+        self.assertEqual(server_queue._pending_bytes.value, 0)
+
+    def test_drop_newest(self):
+        out_q = self._new_queue(maxsize=200)
+        server_queue = ServerQueue(out_q, self.loop, capacity=10, policy=DROP_NEWEST)
+        for i in range(25):
+            server_queue.output_msg_nowait(Message(False, str(i)))
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        self.assertEqual([m.msg for m in msgs[:-1]], [str(i) for i in range(10)])
+        self.assertTrue(msgs[-1].is_end)
+        self.assertEqual(server_queue.dropped, 15)
+        self.assertEqual(server_queue.stats()["policy"], DROP_NEWEST)
+
+    def test_drop_oldest(self):
+        out_q = self._new_queue(maxsize=200)
+        server_queue = ServerQueue(out_q, self.loop, capacity=10, policy=DROP_OLDEST)
+        for i in range(25):
+            server_queue.output_msg_nowait(Message(False, str(i)))
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        self.assertEqual([m.msg for m in msgs[:-1]], [str(i) for i in range(16, 25)])
+        self.assertTrue(msgs[-1].is_end)
+        self.assertEqual(server_queue.dropped, 16)
+
+    def test_full_out_queue(self):
+        out_q = self._new_queue(maxsize=2)
+        server_queue = ServerQueue(out_q, self.loop, capacity=100)
+        for i in range(50):
+            server_queue.output_msg_nowait(Message(False, str(i)))
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        self.assertEqual([m.msg for m in msgs[:-1]], [str(i) for i in range(50)])
+        self.assertEqual(server_queue.dropped, 0)
+
+    def test_max_bytes(self):
+        out_q = self._new_queue(maxsize=200)
+        server_queue = ServerQueue(out_q, self.loop, capacity=100, max_bytes=1000)
+        for i in range(10):
+            server_queue.output_msg_nowait(Message(False, "x" * 300))
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        self.assertEqual(len(msgs), 4)
+        self.assertEqual(server_queue.dropped, 7)
+        self.assertEqual(server_queue.emitted, 3)
+
+    def test_rate_limit(self):
+        out_q = self._new_queue(maxsize=200)
+        server_queue = ServerQueue(out_q, self.loop, capacity=1000, rate_limit=5)
+        for i in range(100):
+            server_queue.output_msg_nowait(Message(False, str(i)))
+        server_queue.output_msg_nowait(Message(True, "end"))
+        msgs = self.collect(out_q)
+        # one second of burst passes, the rest is sampled out, end is kept
+        self.assertEqual([m.msg for m in msgs], ["0", "1", "2", "3", "4", "end"])
+        stats = server_queue.stats()
+        self.assertEqual(stats["sampled"], 95)
+        self.assertEqual(stats["emitted"], 6)
+        self.assertEqual(stats["dropped"], 0)
+        self.assertEqual(stats["rate_limit"], 5)
+
+    def test_counters_multi_thread(self):
+        out_q = self._new_queue(maxsize=20000)
+        server_queue = ServerQueue(out_q, self.loop, capacity=100, rate_limit=1000)
+
+        def produce():
+            for i in range(2000):
+                server_queue.output_msg_nowait(Message(False, str(i)))
+
+        threads = [threading.Thread(target=produce) for _ in range(8)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+        server_queue.output_msg_nowait(Message(True, None))
+        msgs = self.collect(out_q)
+        # no increment and no token is lost between producers
+        self.assertEqual(len(msgs) - 1 + server_queue.sampled + server_queue.dropped, 16000)
+        # one second of burst plus the refill while producing
+        self.assertLessEqual(len(msgs) - 1, 1000 + int(elapsed * 1000) + 1)
+
+    def _new_queue(self, maxsize: int) -> asyncio.Queue:
+        async def create():
+            return asyncio.Queue(maxsize=maxsize)
+
+        return self.loop.run_until_complete(create())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+import unittest
+
+from flight_profiler.plugins.status.cli_plugin_status import (
+    StatusCliPlugin,
+    format_preload_timings,
+)
+from flight_profiler.test.communication.flight_session_test import start_server
+
+
+class StatusCliTest(unittest.TestCase):
+
+    def test_format_preload_timings(self):
+        lines = format_preload_timings(
+            {"trace": 12.5, "stack": None, "torch": "ModuleNotFoundError: torch"}
+        ).splitlines()
+        self.assertEqual(3, len(lines))
+        # sorted by command
+        self.assertIn("pending", lines[0])
+        self.assertIn("failed, ModuleNotFoundError", lines[1])
+        self.assertIn("12.500 ms", lines[2])
+        self.assertIn("no plugin preloaded", format_preload_timings({}))
+
+    def test_status_command(self):
+        port = start_server()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            StatusCliPlugin(port, os.getpid()).do_action("")
+        self.assertIn(f"pid: {os.getpid()}", out.getvalue())
+        self.assertIn("preload:", out.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,6 +3,7 @@ import pickle
 import unittest
 from asyncio import Queue
 
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
 from flight_profiler.plugins.server_plugin import Message, ServerQueue
 from flight_profiler.plugins.trace.trace_agent import global_trace_agent
 from flight_profiler.plugins.trace.trace_frame import (
@@ -28,8 +29,80 @@ async def async_test_func():
     print("hello")
 
 
+def repeated_calls(n):
+    values = []
+    for i in range(n):
+        values.append(abs(-i))
+    return values
+
+
+async def async_abs(i):
+    return abs(i)
+
+
+async def async_repeated_calls(n):
+    for i in range(n):
+        await async_abs(i)
+    await asyncio.sleep(0.002)
+
+
 class TraceAgentTest(unittest.TestCase):
 
+    def test_frame_records(self):
+        sent = []
+
+        def target(out_q, records, descriptions):
+            sent.append(WrapTraceFrame(records, list(descriptions)))
+
+        profiler = set_trace_profile(target, None, 0, False, 0)
+        repeated_calls(100)
+        remove_trace_profile(profiler)
+        wrap = sent[0]
+        self.assertTrue(isinstance(wrap.frames, bytes))
+        # one description per function however often it is called
+        self.assertEqual(1, sum("abs" in d for d in wrap.descriptions))
+        frames = deserialize_string_frames(wrap).frames
+        self.assertTrue("repeated_calls" in frames[0].description)
+        abs_frames = [f for f in frames if f is not None and "abs" in f.description]
+        self.assertEqual(100, len(abs_frames))
+        self.assertTrue(all(f.pid == 0 for f in abs_frames))
+
+        sent.clear()
+        profiler = set_trace_profile(target, None, 0, False, 1)
+        repeated_calls(100)
+        remove_trace_profile(profiler)
+        frames = deserialize_string_frames(sent[0]).frames
+        self.assertEqual(1, len([f for f in frames if f is not None]))
+        self.assertTrue("repeated_calls" in frames[0].description)
+
+    def test_pruned_frames_compact(self):
+        sent = []
+
+        def target(out_q, records, descriptions):
+            sent.append(WrapTraceFrame(records, list(descriptions)))
+
+        async def trace():
+            profiler = set_trace_profile(target, None, 1000000, True, 0)
+            await async_repeated_calls(100)
+            remove_trace_profile(profiler)
+
+        asyncio.run(trace())
+        # pruned async frames leave no empty records before the kept ones
+        frames = deserialize_string_frames(sent[0]).frames
+        self.assertTrue(all(f is not None for f in frames))
+        self.assertTrue("async_repeated_calls" in frames[0].description)
+        self.assertTrue(any("sleep" in f.description for f in frames))
+        self.assertFalse(any("async_abs" in f.description for f in frames))
+
+        sent.clear()
+        profiler = set_trace_profile(target, None, 0, False, 2)
+        repeated_calls(100)
+        remove_trace_profile(profiler)
+        frames = deserialize_string_frames(sent[0]).frames
+        self.assertTrue(all(f is not None for f in frames))
+        self.assertEqual(201, len(frames))
+        self.assertTrue(all(f.pid == 0 for f in frames[1:]))
+
     def test_trace_module_func(self):
         out_q = Queue(maxsize=200)
 
@@ -0,0 +1,183 @@
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from typing import Dict, List, Tuple
+
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.plugins.trace.trace_export import TraceExporter, export_format_of
+from flight_profiler.plugins.trace.trace_frame import AggregatedTrace, WrapTraceFrame
+from flight_profiler.plugins.trace.trace_sampler import TraceAggregator
+from flight_profiler.test.plugins.trace import SENDING_FRAMES
+
+
+def leaf(i):
+    return abs(i)
+
+
+def middle(n):
+    for i in range(n):
+        leaf(i)
+
+
+def exported_func(n):
+    middle(n)
+    leaf(n)
+
+
+def traced_wrap(n) -> WrapTraceFrame:
+    sent = []
+    profiler = set_trace_profile(lambda out_q, *payload: sent.append(payload), None, 0, False, 0)
+    exported_func(n)
+    remove_trace_profile(profiler)
+    return WrapTraceFrame(*sent[0])
+
+
+def traced_payload(n):
+    wrap = traced_wrap(n)
+    return wrap.frames, wrap.descriptions
+
+
+def read_fields(data: bytes) -> List[Tuple[int, object]]:
+    """
+    (field, value) of a protobuf message, value is int or bytes
+    """
+    fields = []
+    pos = 0
+
+    def varint():
+        nonlocal pos
+        value, shift = 0, 0
+        while True:
+            b = data[pos]
+            pos += 1
+            value |= (b & 0x7F) << shift
+            shift += 7
+            if b < 0x80:
+                return value
+
+    while pos < len(data):
+        key = varint()
+        if key & 7 == 0:
+            fields.append((key >> 3, varint()))
+        else:
+            length = varint()
+            fields.append((key >> 3, data[pos : pos + length]))
+            pos += length
+    return fields
+
+
+def read_packed(data: bytes) -> List[int]:
+    values, value, shift = [], 0, 0
+    for b in data:
+        value |= (b & 0x7F) << shift
+        shift += 7
+        if b < 0x80:
+            values.append(value)
+            value, shift = 0, 0
+    return values
+
+
+class TraceExportTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def export(self, filepath: str, traces: int = 3) -> TraceExporter:
+        exporter = TraceExporter(os.path.join(self.dir.name, filepath))
+        for _ in range(traces):
+            self.assertTrue(exporter.add(traced_wrap(5)))
+        exporter.close()
+        return exporter
+
+    def test_export_format_of(self):
+        self.assertEqual("folded", export_format_of("trace.folded"))
+        self.assertEqual("speedscope", export_format_of("trace.json"))
+        self.assertEqual("pprof", export_format_of("trace.pb.gz"))
+        with self.assertRaises(ValueError):
+            TraceExporter("trace.svg", "svg")
+
+    def test_folded(self):
+        exporter = self.export("trace.folded")
+        with open(exporter.filepath) as f:
+            lines = f.read().splitlines()
+        stacks: Dict[str, int] = dict()
+        for line in lines:
+            stack, value = line.rsplit(" ", 1)
+            self.assertGreater(int(value), 0)
+            stacks[stack] = int(value)
+        names = [[frame.split(" ")[0] for frame in stack.split(";")] for stack in stacks]
+        self.assertTrue(all(n[0] == "exported_func" for n in names))
+        self.assertTrue(["exported_func", "middle", "leaf", "abs"] in names)
+        self.assertTrue(["exported_func", "leaf", "abs"] in names)
+        # self times add up to the cost of the traced method
+        root = exporter.aggregator.snapshot()[0]
+        self.assertEqual(root.total_ns, sum(stacks.values()))
+
+    def test_speedscope(self):
+        exporter = self.export("trace.json")
+        with open(exporter.filepath) as f:
+            profile = json.load(f)
+        frames = profile["shared"]["frames"]
+        sampled = profile["profiles"][0]
+        self.assertEqual("sampled", sampled["type"])
+        self.assertEqual(len(sampled["samples"]), len(sampled["weights"]))
+        self.assertEqual(sum(sampled["weights"]), sampled["endValue"])
+        stacks = [[frames[i]["name"] for i in sample] for sample in sampled["samples"]]
+        self.assertTrue(["exported_func", "middle", "leaf", "abs"] in stacks)
+
+    def test_pprof(self):
+        exporter = self.export("trace.pb.gz")
+        with gzip.open(exporter.filepath, "rb") as f:
+            fields = read_fields(f.read())
+        strings = [v.decode() for k, v in fields if k == 6]
+        self.assertEqual("", strings[0])
+        functions = dict()
+        for k, v in fields:
+            if k == 5:
+                function = dict(read_fields(v))
+                functions[function[1]] = strings[function[2]]
+        locations = dict()
+        for k, v in fields:
+            if k == 4:
+                location = read_fields(v)
+                line = dict(read_fields(location[1][1]))
+                locations[location[0][1]] = functions[line[1]]
+        samples = []
+        for k, v in fields:
+            if k == 2:
+                sample = dict(read_fields(v))
+                names = [locations[i] for i in read_packed(sample[1])]
+                samples.append((names, read_packed(sample[2])))
+        self.assertEqual(2, len([v for k, v in fields if k == 1]))
+        # leaf first, values are calls and self nanoseconds
+        abs_in_middle = [s for s in samples if s[0] == ["abs", "leaf", "middle", "exported_func"]]
+        self.assertEqual(15, abs_in_middle[0][1][0])
+
+    def test_string_frames(self):
+        exporter = TraceExporter(os.path.join(self.dir.name, "trace.folded"))
+        self.assertTrue(exporter.add(WrapTraceFrame(SENDING_FRAMES)))
+        exporter.close()
+        with open(exporter.filepath) as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any(line.startswith("hello") for line in lines))
+
+    def test_aggregated_trace(self):
+        aggregator = TraceAggregator()
+        for _ in range(4):
+            aggregator.merge(*traced_payload(5))
+        exporter = TraceExporter(os.path.join(self.dir.name, "trace.folded"))
+        exporter.add_aggregated(AggregatedTrace(aggregator.snapshot(), 4, 4, 0, 0, 0))
+        exporter.close()
+        self.assertEqual(4, exporter.traces)
+        with open(exporter.filepath) as f:
+            total = sum(int(line.rsplit(" ", 1)[1]) for line in f.read().splitlines())
+        self.assertEqual(aggregator.snapshot()[0].total_ns, total)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 
 from flight_profiler.plugins.trace.trace_frame import (
+    FRAME_RECORD,
     FlattenTreeTraceFrame,
     TraceFrame,
     WrapTraceFrame,
@@ -55,3 +56,32 @@ class TraceFrameTest(unittest.TestCase):
         self.assertEqual(20000, cc_frame.cost_ns)
         self.assertEqual(1729678259755912000, cc_frame.start_ns)
         self.assertTrue(cc_frame.c_frame)
+
+    def test_deserialize_records(self):
+        descriptions = ["[await]\x00\x000", "hello\x00main.py\x0011", "print\x00<built-in>\x000"]
+        records = b"".join([
+            FRAME_RECORD.pack(1729678259710756000, 45188000, 1, -1),
+            # dropped frame below interval
+            FRAME_RECORD.pack(0, 0, -1, 0),
+            FRAME_RECORD.pack(1729678259710761000, 20000, 2, 0),
+            FRAME_RECORD.pack(1729678259710781000, 10000, 2, 0),
+        ])
+        wrap_frame: WrapTraceFrame = WrapTraceFrame(records, descriptions)
+        self.assertTrue(wrap_frame.has_root())
+        self.assertEqual(45188000, wrap_frame.root_cost_ns())
+
+        wrap_frame = deserialize_string_frames(wrap_frame)
+        self.assertEqual(4, len(wrap_frame.frames))
+        self.assertIsNone(wrap_frame.frames[1])
+
+        tree_frame: FlattenTreeTraceFrame = build_frame_stack(wrap_frame.frames)
+        self.assertEqual("hello", tree_frame.method_name)
+        self.assertEqual(2, len(tree_frame.sub_frames))
+        self.assertTrue(all(f.c_frame for f in tree_frame.sub_frames))
+        self.assertEqual(1729678259710781000, tree_frame.sub_frames[1].start_ns)
+
+    def test_root_not_kept(self):
+        self.assertFalse(WrapTraceFrame(b"", ["[await]\x00\x000"]).has_root())
+        self.assertFalse(WrapTraceFrame(FRAME_RECORD.pack(0, 0, -1, -1), []).has_root())
+        self.assertFalse(WrapTraceFrame([None, SENDING_FRAMES[1]]).has_root())
+        self.assertEqual(45188000, WrapTraceFrame(SENDING_FRAMES).root_cost_ns())
@@ -42,3 +42,35 @@ class TraceParserTest(unittest.TestCase):
         self.assertEqual("test_func", params.method_name)
         self.assertEqual("A", params.class_name)
         self.assertEqual(10, params.interval)
+
+    def test_parse_sampling_args(self):
+        parser = TraceArgumentParser()
+
+        params = parser.parse_trace_point("__main__ test_func")
+        self.assertIsNone(params.sampler)
+
+        params = parser.parse_trace_point("__main__ test_func --sample 100 -et 2")
+        self.assertEqual(100, params.sampler.every)
+        self.assertEqual(2_000_000, params.sampler.min_root_cost_ns)
+
+        params = parser.parse_trace_point("__main__ test_func --reservoir 20 --period 10")
+        self.assertEqual(20, params.sampler.reservoir)
+        self.assertEqual(10_000_000_000, params.sampler.period_ns)
+
+        with self.assertRaises(Exception):
+            parser.parse_trace_point("__main__ test_func --sample 10 --reservoir 10")
+        with self.assertRaises(Exception):
+            parser.parse_trace_point("__main__ test_func --sample 0")
+
+    def test_parse_output_args(self):
+        parser = TraceArgumentParser()
+
+        params = parser.parse_trace_point("__main__ test_func -o /tmp/trace.json")
+        self.assertEqual("/tmp/trace.json", params.output)
+        self.assertIsNone(params.output_format)
+
+        params = parser.parse_trace_point("__main__ test_func -o trace.out --format pprof")
+        self.assertEqual("pprof", params.output_format)
+
+        with self.assertRaises(Exception):
+            parser.parse_trace_point("__main__ test_func -o trace.svg --format svg")
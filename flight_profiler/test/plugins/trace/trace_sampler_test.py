@@ -0,0 +1,172 @@
+import asyncio
+import pickle
+import unittest
+from asyncio import Queue
+
+from flight_profiler.ext.trace_profile_C import remove_trace_profile, set_trace_profile
+from flight_profiler.plugins.server_plugin import ServerQueue
+from flight_profiler.plugins.trace.trace_agent import global_trace_agent
+from flight_profiler.plugins.trace.trace_frame import AggregatedTrace
+from flight_profiler.plugins.trace.trace_parser import TraceArgumentParser
+from flight_profiler.plugins.trace.trace_render import AggregatedTraceRender
+from flight_profiler.plugins.trace.trace_sampler import (
+    LogHistogram,
+    TraceAggregator,
+    TraceSampler,
+    _bucket,
+    _bucket_bound,
+)
+
+
+def leaf(i):
+    return abs(i)
+
+
+def sampled_func(n):
+    for i in range(n):
+        leaf(i)
+
+
+def traced_payload(n):
+    sent = []
+    profiler = set_trace_profile(lambda out_q, *payload: sent.append(payload), None, 0, False, 0)
+    sampled_func(n)
+    remove_trace_profile(profiler)
+    return sent[0]
+
+
+class TraceSamplerTest(unittest.TestCase):
+
+    def test_bucket_bound(self):
+        for value in [0, 1, 15, 16, 17, 100, 1000, 123456, 10**9, 10**12]:
+            bound = _bucket_bound(_bucket(value))
+            self.assertGreaterEqual(bound, value)
+            self.assertLessEqual(bound, value * 1.125 + 1)
+
+    def test_histogram_quantile(self):
+        histogram = LogHistogram()
+        self.assertEqual(0, histogram.quantile(0.99))
+        for value in range(1, 1001):
+            histogram.add(value * 1000)
+        p99 = histogram.quantile(0.99)
+        self.assertGreaterEqual(p99, 990000)
+        self.assertLessEqual(p99, 990000 * 1.125)
+        self.assertEqual(1000000, histogram.quantile(1))
+
+    def test_merge_records(self):
+        aggregator = TraceAggregator()
+        for _ in range(3):
+            self.assertTrue(aggregator.merge(*traced_payload(10)))
+        self.assertEqual(3, aggregator.traces)
+
+        roots = aggregator.snapshot()
+        self.assertEqual(1, len(roots))
+        root = roots[0]
+        self.assertEqual("sampled_func", root.method_name)
+        self.assertEqual(3, root.count)
+        leaf_frame = [f for f in root.sub_frames if f.method_name == "leaf"][0]
+        self.assertEqual(30, leaf_frame.count)
+        self.assertEqual("abs", leaf_frame.sub_frames[0].method_name)
+        self.assertEqual(30, leaf_frame.sub_frames[0].count)
+        self.assertLessEqual(leaf_frame.total_ns, root.total_ns)
+        self.assertGreaterEqual(leaf_frame.p99_ns, 0)
+
+        self.assertFalse(aggregator.merge(*traced_payload(10), min_root_cost_ns=10**12))
+        self.assertEqual(3, aggregator.traces)
+
+    def test_merge_max_nodes(self):
+        aggregator = TraceAggregator(max_nodes=2)
+        aggregator.merge(*traced_payload(10))
+        root = aggregator.snapshot()[0]
+        self.assertEqual(2, aggregator.nodes)
+        # paths beyond the limit are not merged, neither are their children
+        self.assertEqual(1, len(root.sub_frames))
+        self.assertEqual([], root.sub_frames[0].sub_frames)
+
+    def test_should_trace(self):
+        sampler = TraceSampler(every=10)
+        self.assertEqual(10, sum(sampler.should_trace() for _ in range(100)))
+
+        sampler = TraceSampler(reservoir=5)
+        decisions = [sampler.should_trace() for _ in range(1000)]
+        self.assertTrue(all(decisions[:5]))
+        self.assertLess(sum(decisions), 200)
+
+    def test_render(self):
+        aggregator = TraceAggregator()
+        aggregator.merge(*traced_payload(10))
+        trace = AggregatedTrace(aggregator.snapshot(), 100, 1, 0, 0, 0)
+        lines = AggregatedTraceRender().display(trace).split("\n")
+        self.assertTrue("invocations=" in lines[1])
+        self.assertTrue("sampled_func" in lines[2] and "count=" in lines[2])
+        self.assertTrue("leaf" in lines[3])
+        self.assertTrue("abs" in lines[4])
+
+    def test_trace_sampled_func(self):
+        out_q = Queue(maxsize=200)
+        try:
+            loop = asyncio.get_event_loop()
+        except:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+        point = TraceArgumentParser().parse_trace_point(
+            "flight_profiler.test.plugins.trace.trace_sampler_test sampled_func "
+            "--sample 4 -n 100 -i 0"
+        )
+        point.out_q = ServerQueue(out_q, loop)
+        global_trace_agent.set_point(point)
+        for _ in range(20):
+            sampled_func(3)
+        global_trace_agent.clear_point(point)
+
+        async def get_msgs():
+            msgs = []
+            while True:
+                msg = await asyncio.wait_for(out_q.get(), 5)
+                msgs.append(msg)
+                if msg.is_end:
+                    return msgs
+
+        msgs = loop.run_until_complete(get_msgs())
+        traces = [
+            pickle.loads(msg.msg)
+            for msg in msgs
+            if isinstance(msg.msg, bytes) and msg.msg.startswith(b"\x80")
+        ]
+        trace = traces[-1]
+        self.assertTrue(isinstance(trace, AggregatedTrace))
+        self.assertEqual(20, trace.invocations)
+        self.assertEqual(5, trace.traces)
+        self.assertEqual(5, trace.frames[0].count)
+        self.assertEqual("sampled_func", trace.frames[0].method_name)
+
+    def test_periodic_emit(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        sampler = TraceSampler(every=1, period_s=0.02)
+        sampler.start(ServerQueue(out_q, loop))
+
+        def trees():
+            return [
+                pickle.loads(msg.msg)
+                for msg in [out_q.get_nowait() for _ in range(out_q.qsize())]
+            ]
+
+        # nothing traced, nothing sent
+        loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertEqual([], trees())
+        # sent by the timer without another invocation
+        sampler.collect(sampler.out_q, *traced_payload(3))
+        loop.run_until_complete(asyncio.sleep(0.1))
+        sent = trees()
+        self.assertEqual(1, len(sent))
+        self.assertEqual(1, sent[0].traces)
+        sampler.close()
+        sampler.close()
+        loop.run_until_complete(asyncio.sleep(0.1))
+        self.assertEqual(1, len(trees()))
+        loop.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -29,8 +29,45 @@ async def async_func():
     print("hello")
 
 
+def handle_a():
+    return "a"
+
+
+def handle_b():
+    return "b"
+
+
 class TimeTunnelAgentTest(unittest.TestCase):
 
+    def test_time_tunnel_pattern(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        origin_code = handle_a.__code__
+        tt_cmd = TimeTunnelArgumentParser().parse_time_tunnel_cmd(
+            "-t flight_profiler.test.plugins.tt.time_tunnel_agent_test handle_? -n 2"
+        )
+        tt_cmd.out_q = ServerQueue(out_q, loop)
+        global_tt_agent.on_action(tt_cmd)
+        self.assertNotEqual(handle_a.__code__, origin_code)
+        handle_b()
+        handle_a()
+        handle_a()
+        self.assertEqual(handle_a.__code__, origin_code)
+
+        async def drain():
+            messages = []
+            while True:
+                message = await out_q.get()
+                messages.append(message)
+                if message.is_end:
+                    return messages
+
+        messages = loop.run_until_complete(drain())
+        loop.close()
+        records = [pickle.loads(m.msg) for m in messages[1:-1]]
+        self.assertEqual([r.method_name for r in records], ["handle_b", "handle_a"])
+        self.assertNotIn(tt_cmd.unique_key(), global_tt_agent.aop_points)
+
     def test_time_tunnel_module_method(self):
         global_tt_indexer.refresh()
         out_q = Queue(maxsize=200)
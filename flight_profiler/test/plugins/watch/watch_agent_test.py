@@ -1,5 +1,6 @@
 import asyncio
 import pickle
+import threading
 import unittest
 from asyncio import Queue
 
@@ -22,6 +23,38 @@ def test_func():
     return "hello"
 
 
+class UserService:
+    def handle_get(self):
+        return "user"
+
+    def close(self):
+        return "closed"
+
+
+class OrderService:
+    @classmethod
+    def handle_put(cls):
+        return "order"
+
+    @staticmethod
+    def handle_static():
+        return "static"
+
+
+def mutated_func(payload):
+    return len(payload)
+
+
+blocked_entered = threading.Event()
+blocked_release = threading.Event()
+
+
+def blocked_func():
+    blocked_entered.set()
+    blocked_release.wait(10)
+    return "blocked"
+
+
 def test_builtin_func():
     serialize_msg = pickle.dumps("hello")
     return pickle.loads(serialize_msg)
@@ -64,6 +97,91 @@ class WatchAgentTest(unittest.TestCase):
             not in global_watch_agent.aop_points
         )
 
+    def test_watch_pattern(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        origin_codes = [UserService.handle_get.__code__, OrderService.handle_put.__func__.__code__]
+        watch_setting = WatchArgumentParser().parse_watch_setting(
+            "flight_profiler.test.plugins.watch.watch_agent_test *Service handle_* "
+            "--expr return_obj -n 3"
+        )
+        watch_setting.out_q = ServerQueue(out_q, loop)
+        global_watch_agent.add_watch(watch_setting)
+        self.assertNotEqual(UserService.handle_get.__code__, origin_codes[0])
+        self.assertEqual(UserService().close(), "closed")
+        for _ in range(3):
+            UserService().handle_get()
+            OrderService.handle_put()
+        # limit is shared, all methods are restored once it is reached
+        self.assertEqual(
+            [UserService.handle_get.__code__, OrderService.handle_put.__func__.__code__],
+            origin_codes,
+        )
+
+        async def drain():
+            messages = []
+            while True:
+                message = await out_q.get()
+                messages.append(message)
+                if message.is_end:
+                    return messages
+
+        messages = loop.run_until_complete(drain())
+        loop.close()
+        self.assertIn("2 methods", pickle.loads(messages[0].msg))
+        results = [pickle.loads(m.msg) for m in messages[1:-1]]
+        self.assertEqual(
+            [r.method_identifier.rsplit(".", 2)[-2] for r in results],
+            ["UserService", "OrderService", "UserService"],
+        )
+        self.assertTrue(
+            "flight_profiler.test.plugins.watch.watch_agent_test&*Service&handle_*"
+            not in global_watch_agent.aop_points
+        )
+
+    def test_watch_pattern_off(self):
+        loop = asyncio.new_event_loop()
+        param = "flight_profiler.test.plugins.watch.watch_agent_test UserService re:handle_.*"
+        origin_code = UserService.handle_get.__code__
+        watch_setting = WatchArgumentParser().parse_watch_setting(param)
+        watch_setting.out_q = ServerQueue(Queue(), loop)
+        global_watch_agent.add_watch(watch_setting)
+        self.assertNotEqual(UserService.handle_get.__code__, origin_code)
+        global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(param))
+        self.assertEqual(UserService.handle_get.__code__, origin_code)
+        self.assertFalse(watch_setting.members[0].active)
+        loop.close()
+
+    def test_watch_off_with_call_in_flight(self):
+        loop = asyncio.new_event_loop()
+        out_q = Queue()
+        param = "flight_profiler.test.plugins.watch.watch_agent_test blocked_func -n 1"
+        watch_setting = WatchArgumentParser().parse_watch_setting(param)
+        watch_setting.out_q = ServerQueue(out_q, loop)
+        global_watch_agent.add_watch(watch_setting)
+        caller = threading.Thread(target=blocked_func)
+        caller.start()
+        try:
+            self.assertTrue(blocked_entered.wait(10))
+            # the limit-th call restored the origin code and is still running
+            global_watch_agent.clear_watch(WatchArgumentParser().parse_watch_setting(param))
+        finally:
+            blocked_release.set()
+            caller.join()
+
+        async def drain():
+            messages = []
+            while True:
+                message = await asyncio.wait_for(out_q.get(), 5)
+                messages.append(message)
+                if message.is_end:
+                    await asyncio.sleep(0.05)
+                    return messages + [out_q.get_nowait() for _ in range(out_q.qsize())]
+
+        messages = loop.run_until_complete(drain())
+        loop.close()
+        self.assertEqual(1, len([m for m in messages if m.is_end]))
+
     def test_watch_module_async_func(self):
         out_q = Queue(maxsize=200)
         watch_setting = WatchArgumentParser().parse_watch_setting(
@@ -134,6 +252,33 @@ class WatchAgentTest(unittest.TestCase):
             not in global_watch_agent.aop_points
         )
 
+    def test_watch_snapshot(self):
+        for flag, expected in (("", ["1", "2"]), ("--snapshot", ["1"])):
+            loop = asyncio.new_event_loop()
+            out_q = Queue()
+            watch_setting = WatchArgumentParser().parse_watch_setting(
+                f"flight_profiler.test.plugins.watch.watch_agent_test mutated_func "
+                f"--expr args -n 1 -x 2 {flag}"
+            )
+            watch_setting.out_q = ServerQueue(out_q, loop)
+            global_watch_agent.add_watch(watch_setting)
+            items = ["1"]
+            payload = {"items": items}
+            mutated_func(payload)
+            # mutated after the call, only the top level container is copied by default
+            payload["extra"] = True
+            items.append("2")
+
+            async def get_msg():
+                await out_q.get()
+                return await out_q.get()
+
+            watch_result: WatchResult = pickle.loads(loop.run_until_complete(get_msg()).msg)
+            loop.close()
+            self.assertNotIn("extra", watch_result.value)
+            for item in ("1", "2"):
+                self.assertEqual(f'"{item}"' in watch_result.value, item in expected)
+
     def test_watch_builtin_func(self):
         out_q = Queue(maxsize=200)
         watch_setting = WatchArgumentParser().parse_watch_setting(
@@ -166,6 +166,65 @@ class AopDecoratorTest(unittest.TestCase):
         )
         self.assertEqual(test_aop.cls_func_to_wrap(), 5)
 
+    def test_wrap_builtin_aliases(self):
+        import math
+
+        from flight_profiler.test.util.test_aop import test_aop_builtin_module
+
+        def watch_func(watch_setting):
+            def wrapper(func):
+                @functools.wraps(func)
+                def wrapped_func(*args, **kwargs):
+                    return func(*args, **kwargs) + 1
+
+                return wrapped_func
+
+            return wrapper
+
+        origin = math.hypot
+        # references taken before patching
+        call = test_aop_builtin_module.make_caller()
+        holder = test_aop_builtin_module.Holder()
+        wrapper_result = aop_decorator.add_func_wrapper(
+            math, None, "hypot", watch_func, None, ["time"]
+        )
+        self.assertFalse(wrapper_result.failed)
+        try:
+            self.assertEqual(math.hypot(3, 4), 6)
+            self.assertEqual(test_aop_builtin_module.hypot(3, 4), 6)
+            self.assertEqual(test_aop_builtin_module.REGISTRY["hypot"](3, 4), 6)
+            self.assertEqual(call(3, 4), 6)
+            self.assertEqual(holder.fn(3, 4), 6)
+            self.assertEqual(holder.fn_attr(3, 4), 6)
+            self.assertIs(math.hypot.__wrapped__, origin)
+        finally:
+            aop_decorator.clear_func_wrapper(math, None, "hypot", wrapper_result.value)
+        self.assertIs(math.hypot, origin)
+        self.assertIs(test_aop_builtin_module.hypot, origin)
+        self.assertIs(test_aop_builtin_module.REGISTRY["hypot"], origin)
+        self.assertIs(test_aop_builtin_module.Holder.__dict__["fn"], origin)
+        self.assertIs(holder.fn_attr, origin)
+        self.assertEqual(call(3, 4), 5)
+
+    def test_find_function_by_mro(self):
+        from flight_profiler.test.util.test_aop.test_aop_class_module import (
+            TestAopClass,
+        )
+
+        class Child(TestAopClass):
+            @classmethod
+            def create(cls):
+                return cls(1)
+
+        self.assertEqual(
+            aop_decorator.find_class_function(Child, "cls_func_to_wrap")[1],
+            TestAopClass.cls_func_to_wrap,
+        )
+        self.assertTrue(aop_decorator.find_class_function(Child, "create")[2])
+        self.assertIsNone(aop_decorator.find_class_function(Child, "missing")[1])
+        self.assertEqual(aop_decorator.find_module_function(inspect, "isfunction"), (inspect.isfunction, False))
+        self.assertEqual(aop_decorator.find_module_function(inspect, "missing"), (None, False))
+
 
 if __name__ == "__main__":
     unittest.main()
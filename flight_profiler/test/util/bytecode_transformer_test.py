@@ -1,13 +1,45 @@
+import dis
 import unittest
 from types import CodeType, FunctionType
 
 import opcode
 
+from flight_profiler.common import bytecode_transformer
 from flight_profiler.common.bytecode_transformer import (
     transform_normal_method_by_aop_wrapper,
 )
 
 
+def watch_wrap(watch_settings) -> FunctionType:
+    def wrapper(func: FunctionType):
+        def wrap_func(*args, **kwargs):
+            return watch_settings, func(*args, **kwargs)
+
+        return wrap_func
+
+    return wrapper
+
+
+def _many_locals_wrap():
+    """
+    wrapper with 300 locals, LOAD_DEREF needs EXTENDED_ARG on 3.11+ where
+    free variables are indexed after locals
+    """
+    assigns = "".join(f"            v{i} = args\n" for i in range(300))
+    source = (
+        "def watch_wrap(watch_settings):\n"
+        "    def wrapper(func):\n"
+        "        def wrap_func(*args, **kwargs):\n"
+        f"{assigns}"
+        "            return watch_settings, func(*v299, **kwargs)\n"
+        "        return wrap_func\n"
+        "    return wrapper\n"
+    )
+    namespace = {}
+    exec(source, namespace)
+    return namespace["watch_wrap"]
+
+
 class BytecodeTransformerTest(unittest.TestCase):
 
     def test_transform_watch_func(self):
@@ -40,6 +72,63 @@ class BytecodeTransformerTest(unittest.TestCase):
             transformed_code.co_consts[len(transformed_code.co_consts) - 2],
         )
 
+    def test_template_cached(self):
+        def first(x):
+            return x + 1
+
+        def second(x):
+            return x + 2
+
+        transform_normal_method_by_aop_wrapper(first, watch_wrap, "first", ["time"])
+        template_count = len(bytecode_transformer._wrapper_templates)
+        transform_normal_method_by_aop_wrapper(second, watch_wrap, "second", ["time"])
+        self.assertEqual(len(bytecode_transformer._wrapper_templates), template_count)
+        self.assertEqual(first.__code__.co_code, second.__code__.co_code)
+        self.assertEqual(first(1), ("first", 2))
+        self.assertEqual(second(1), ("second", 3))
+
+    def test_closure_function(self):
+        offset = 10
+
+        def closure_func(x):
+            return x + offset
+
+        transform_normal_method_by_aop_wrapper(closure_func, watch_wrap, "closure", ["time"])
+        self.assertEqual(closure_func.__code__.co_freevars, ("offset",))
+        self.assertEqual(closure_func(1), ("closure", 11))
+
+    def test_extended_arg(self):
+        def test_func(x):
+            return x * 2
+
+        transform_normal_method_by_aop_wrapper(test_func, _many_locals_wrap(), "many", ["time"])
+        self.assertEqual(test_func(3), ("many", 6))
+        instructions = list(dis.get_instructions(test_func.__code__))
+        self.assertFalse(any(i.opname == "LOAD_DEREF" for i in instructions))
+        self.assertEqual(
+            [i.argval for i in instructions if i.opname == "LOAD_CONST"][-2:],
+            ["many", test_func.__code__.co_consts[-1]],
+        )
+
+    def test_unsupported_closure(self):
+        extra = "extra"
+
+        def bad_wrap(watch_settings):
+            def wrapper(func):
+                def wrap_func(*args, **kwargs):
+                    return extra, watch_settings, func(*args, **kwargs)
+
+                return wrap_func
+
+            return wrapper
+
+        def test_func():
+            return 1
+
+        with self.assertRaises(ValueError):
+            transform_normal_method_by_aop_wrapper(test_func, bad_wrap, "bad", ["time"])
+        self.assertEqual(test_func(), 1)
+
 
 if __name__ == "__main__":
     unittest.main()
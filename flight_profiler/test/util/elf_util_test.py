@@ -0,0 +1,85 @@
+import ctypes
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+from flight_profiler.utils import elf_util
+from flight_profiler.utils.elf_util import (
+    ElfFormatError,
+    locate_base_addr,
+    resolve_elf_symbols,
+)
+
+# public C API, exported in .dynsym of every supported version
+SYMBOL = "PyList_New"
+
+
+def _python_binary(cache_dir: str) -> str:
+    """
+    binary of current process which defines SYMBOL, the executable or libpython
+    """
+    candidates = [os.readlink("/proc/self/exe")]
+    with open("/proc/self/maps") as f:
+        for line in f:
+            path = line.split(None, 5)[-1].strip()
+            if "libpython" in path and path not in candidates:
+                candidates.append(path)
+    for path in candidates:
+        if resolve_elf_symbols(path, [SYMBOL], cache_dir)[SYMBOL]:
+            return path
+    raise unittest.SkipTest("python symbols not found")
+
+
+@unittest.skipUnless(sys.platform.startswith("linux"), "ELF only")
+class ElfUtilTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        elf_util._symbol_cache.clear()
+
+    def test_symbol_matches_loaded_address(self):
+        path = _python_binary(self.cache_dir)
+        value = resolve_elf_symbols(path, [SYMBOL], self.cache_dir)[SYMBOL]
+        try:
+            loaded = ctypes.cast(getattr(ctypes.pythonapi, SYMBOL), ctypes.c_void_p).value
+        except AttributeError:
+            self.skipTest(f"{SYMBOL} not exported by the loaded python")
+        self.assertEqual(locate_base_addr(os.getpid(), path) + value, loaded)
+
+    def test_disk_cache(self):
+        path = _python_binary(tempfile.mkdtemp())
+        elf_util._symbol_cache.clear()
+        expected = resolve_elf_symbols(path, [SYMBOL, "not_a_symbol"], self.cache_dir)
+        self.assertIsNone(expected["not_a_symbol"])
+        cache_files = os.listdir(self.cache_dir)
+        self.assertEqual(len(cache_files), 1)
+        with open(os.path.join(self.cache_dir, cache_files[0])) as f:
+            cached = json.load(f)
+        self.assertEqual(cached["path"], path)
+        self.assertEqual(cached["symbols"][SYMBOL], expected[SYMBOL])
+
+        # a new process only reads the cache file
+        elf_util._symbol_cache.clear()
+        scanned = []
+        origin = elf_util._ElfFile.find_symbols
+        elf_util._ElfFile.find_symbols = lambda elf, symbols: scanned.append(symbols)
+        try:
+            self.assertEqual(
+                resolve_elf_symbols(path, [SYMBOL], self.cache_dir), {SYMBOL: expected[SYMBOL]}
+            )
+        finally:
+            elf_util._ElfFile.find_symbols = origin
+        self.assertEqual(scanned, [])
+
+    def test_not_elf(self):
+        with tempfile.NamedTemporaryFile(suffix=".py") as f:
+            f.write(b"print('hello')\n")
+            f.flush()
+            with self.assertRaises(ElfFormatError):
+                resolve_elf_symbols(f.name, [SYMBOL], self.cache_dir)
+
+
+if __name__ == "__main__":
+    unittest.main()
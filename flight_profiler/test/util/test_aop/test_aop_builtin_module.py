@@ -0,0 +1,19 @@
+from math import hypot
+
+REGISTRY = {"hypot": hypot}
+
+
+def make_caller():
+    f = hypot
+
+    def call(x, y):
+        return f(x, y)
+
+    return call
+
+
+class Holder:
+    fn = hypot
+
+    def __init__(self):
+        self.fn_attr = hypot
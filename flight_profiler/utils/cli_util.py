@@ -1,9 +1,9 @@
 import pickle
 import sys
-from typing import Union
+from typing import Any, Dict, Optional, Union
 
 from flight_profiler.common.expression_result import ExpressionResult
-from flight_profiler.communication.flight_client import FlightClient
+from flight_profiler.communication.flight_client import new_flight_client
 from flight_profiler.utils.render_util import (
     COLOR_BRIGHT_GREEN,
     COLOR_END,
@@ -72,6 +72,38 @@ def show_info_with_icon(msg: str) -> None:
     print(f"{COLOR_WHITE_255}{ICON_INFO} {msg}{COLOR_END}")
 
 
+def show_stream_summary(stream_stats: Optional[Dict[str, Any]]) -> None:
+    """
+    Display a warning when agent sampled out or dropped stream events, either by the
+    events/sec cap of the command or because its output queue is full.
+
+    Args:
+        stream_stats (Optional[Dict[str, Any]]): Latest stream statistics or final summary reported by agent
+    """
+    if stream_stats is None:
+        return
+    sampled = stream_stats.get("sampled", 0)
+    dropped = stream_stats.get("dropped", 0)
+    client_dropped = stream_stats.get("client_dropped", 0)
+    if sampled <= 0 and dropped <= 0 and client_dropped <= 0:
+        return
+    details = []
+    if "emitted" in stream_stats:
+        details.append(f"{stream_stats['emitted']} events emitted")
+    if sampled > 0:
+        details.append(
+            f"{sampled} sampled out by rate limit {stream_stats.get('rate_limit')}/s"
+        )
+    if dropped > 0:
+        details.append(
+            f"{dropped} dropped by full output queue "
+            f"(capacity: {stream_stats.get('capacity')}, policy: {stream_stats.get('policy')})"
+        )
+    if client_dropped > 0:
+        details.append(f"{client_dropped} messages dropped by the cli falling behind")
+    show_warning_info("stream summary: " + ", ".join(details) + ".")
+
+
 def show_command_header(cmd_name: str) -> None:
     """
     Display a command header with icon.
@@ -121,7 +153,7 @@ def common_plugin_execute_routine(
         "param": param
     }
     try:
-        client = FlightClient(host="localhost", port=port)
+        client = new_flight_client(host="localhost", port=port)
     except:
         show_error_info("Target process exited!")
         return
@@ -130,7 +162,7 @@ def common_plugin_execute_routine(
             if not expression_result:
                 if line:
                     if raw_text:
-                        line = line.decode("utf-8")
+                        line = str(line, "utf-8")
                     else:
                         line = pickle.loads(line)
                     # Handle newline messages
@@ -150,3 +182,4 @@ def common_plugin_execute_routine(
             sys.stdout.flush()
     finally:
         client.close()
+        show_stream_summary(client.stream_stats)
@@ -0,0 +1,246 @@
+import hashlib
+import json
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+ELF_MAGIC = b"\x7fELF"
+SHT_SYMTAB = 2
+SHT_NOTE = 7
+SHT_DYNSYM = 11
+SHN_UNDEF = 0
+NT_GNU_BUILD_ID = 3
+
+# resolved symbols of every binary are kept here across processes, a file per
+# binary path validated by build-id and mtime
+SYMBOL_CACHE_DIR = os.path.join(str(Path.home()), "pyFlightProfiler", "symbol_cache")
+
+# (path, mtime_ns, size) -> symbol -> value, None for missing symbols
+_symbol_cache: Dict[Tuple[str, int, int], Dict[str, Optional[int]]] = dict()
+
+
+class ElfFormatError(Exception):
+    pass
+
+
+class _ElfFile:
+    """
+    minimal ELF reader of section headers, symbol tables and the build-id note
+    """
+
+    def __init__(self, f: BinaryIO):
+        self.f = f
+        ident = f.read(16)
+        if len(ident) < 16 or ident[:4] != ELF_MAGIC:
+            raise ElfFormatError("not an ELF file")
+        self.is_64 = ident[4] == 2
+        self.endian = "<" if ident[5] == 1 else ">"
+        if self.is_64:
+            header = struct.unpack(self.endian + "HHIQQQIHHHHHH", f.read(48))
+        else:
+            header = struct.unpack(self.endian + "HHIIIIIHHHHHH", f.read(36))
+        shoff, shentsize, shnum = header[5], header[10], header[11]
+        if shoff == 0 or shnum == 0:
+            raise ElfFormatError("ELF file without section headers")
+        f.seek(shoff)
+        raw = f.read(shentsize * shnum)
+        fmt = self.endian + ("IIQQQQIIQQ" if self.is_64 else "IIIIIIIIII")
+        size = struct.calcsize(fmt)
+        # (type, offset, size, link, entsize) of every section
+        self.sections: List[Tuple[int, int, int, int, int]] = []
+        if shentsize < size or len(raw) < shentsize * shnum:
+            raise ElfFormatError("ELF section headers truncated")
+        for i in range(shnum):
+            sh = struct.unpack_from(fmt, raw, i * shentsize)
+            self.sections.append((sh[1], sh[4], sh[5], sh[6], sh[9]))
+
+    def read_section(self, index: int) -> bytes:
+        _, offset, size, _, _ = self.sections[index]
+        self.f.seek(offset)
+        return self.f.read(size)
+
+    def build_id(self) -> Optional[str]:
+        for i, section in enumerate(self.sections):
+            if section[0] != SHT_NOTE:
+                continue
+            data = self.read_section(i)
+            pos = 0
+            while pos + 12 <= len(data):
+                namesz, descsz, note_type = struct.unpack_from(
+                    self.endian + "III", data, pos
+                )
+                pos += 12
+                name = data[pos : pos + namesz]
+                pos += (namesz + 3) & ~3
+                desc = data[pos : pos + descsz]
+                pos += (descsz + 3) & ~3
+                if note_type == NT_GNU_BUILD_ID and name == b"GNU\x00":
+                    return desc.hex()
+        return None
+
+    def find_symbols(self, symbols: List[str]) -> Dict[str, Optional[int]]:
+        """
+        value of every symbol like nm reports it, .symtab is preferred over .dynsym.
+        A symbol matches exactly or by compiler clone suffixes such as
+        take_gil.lto_priv.0, exact names win and clones are ordered by name.
+        """
+        found: Dict[str, Optional[int]] = {symbol: None for symbol in symbols}
+        for section_type in (SHT_SYMTAB, SHT_DYNSYM):
+            pending = [symbol for symbol in symbols if found[symbol] is None]
+            if len(pending) == 0:
+                break
+            for i, section in enumerate(self.sections):
+                if section[0] == section_type:
+                    self._scan_symbol_table(i, pending, found)
+        return found
+
+    def _scan_symbol_table(
+        self, index: int, symbols: List[str], found: Dict[str, Optional[int]]
+    ) -> None:
+        if self.is_64:
+            sym_struct = struct.Struct(self.endian + "IBBHQQ")
+            name_at, shndx_at, value_at = 0, 3, 4
+        else:
+            sym_struct = struct.Struct(self.endian + "IIIBBH")
+            name_at, shndx_at, value_at = 0, 5, 1
+        _, _, _, link, entsize = self.sections[index]
+        if entsize != sym_struct.size or link >= len(self.sections):
+            return
+        table = self.read_section(index)
+        table = table[: len(table) - len(table) % entsize]
+        strtab = self.read_section(link)
+        wanted = [(symbol, symbol.encode("utf-8")) for symbol in symbols]
+        # best candidate name of every symbol, exact match is final
+        candidates: Dict[str, Tuple[bytes, int]] = dict()
+        for entry in sym_struct.iter_unpack(table):
+            value = entry[value_at]
+            if entry[shndx_at] == SHN_UNDEF or value == 0:
+                continue
+            name_offset = entry[name_at]
+            for symbol, prefix in wanted:
+                if not strtab.startswith(prefix, name_offset):
+                    continue
+                end = strtab.find(b"\x00", name_offset)
+                name = strtab[name_offset:end]
+                if name == prefix:
+                    best = candidates.get(symbol)
+                    if best is None or best[0] != b"":
+                        candidates[symbol] = (b"", value)
+                elif name[len(prefix) : len(prefix) + 1] == b".":
+                    best = candidates.get(symbol)
+                    if best is None or (best[0] != b"" and name < best[0]):
+                        candidates[symbol] = (name, value)
+        for symbol, (_, value) in candidates.items():
+            found[symbol] = value
+
+
+def _cache_file(path: str, cache_dir: str) -> str:
+    digest = hashlib.sha1(path.encode("utf-8")).hexdigest()
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def _load_disk_cache(
+    path: str, mtime_ns: int, build_id: Optional[str], cache_dir: str
+) -> Dict[str, Optional[int]]:
+    try:
+        with open(_cache_file(path, cache_dir), "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    if (
+        cached.get("path") != path
+        or cached.get("mtime_ns") != mtime_ns
+        or cached.get("build_id") != build_id
+    ):
+        return dict()
+    return cached.get("symbols", dict())
+
+
+def _store_disk_cache(
+    path: str,
+    mtime_ns: int,
+    build_id: Optional[str],
+    symbols: Dict[str, Optional[int]],
+    cache_dir: str,
+) -> None:
+    cache_file = _cache_file(path, cache_dir)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, "w") as f:
+            json.dump(
+                {
+                    "path": path,
+                    "mtime_ns": mtime_ns,
+                    "build_id": build_id,
+                    "symbols": symbols,
+                },
+                f,
+            )
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        # cache is best effort, e.g. read only home directory
+        try:
+            os.remove(tmp_file)
+        except OSError:
+            pass
+
+
+def resolve_elf_symbols(
+    path: str, symbols: List[str], cache_dir: str = SYMBOL_CACHE_DIR
+) -> Dict[str, Optional[int]]:
+    """
+    Resolve symbol values of an ELF binary, same as the first column of nm.
+
+    Results are cached in memory by path, mtime and size, and on disk by path,
+    build-id and mtime, so only the first lookup of a binary parses its tables.
+
+    Args:
+        path (str): ELF binary path
+        symbols (List[str]): Symbols to resolve
+        cache_dir (str): Directory of the on disk cache
+
+    Returns:
+        Dict[str, Optional[int]]: Symbol value by name, None if not found
+
+    Raises:
+        ElfFormatError: If path is not a readable ELF file
+        OSError: If path can not be opened
+    """
+    st = os.stat(path)
+    key = (path, st.st_mtime_ns, st.st_size)
+    resolved = _symbol_cache.get(key)
+    if resolved is not None and all(symbol in resolved for symbol in symbols):
+        return {symbol: resolved[symbol] for symbol in symbols}
+    with open(path, "rb") as f:
+        elf = _ElfFile(f)
+        build_id = elf.build_id()
+        if resolved is None:
+            resolved = _load_disk_cache(path, st.st_mtime_ns, build_id, cache_dir)
+        missing = [symbol for symbol in symbols if symbol not in resolved]
+        if len(missing) > 0:
+            resolved = dict(resolved, **elf.find_symbols(missing))
+            _store_disk_cache(path, st.st_mtime_ns, build_id, resolved, cache_dir)
+    _symbol_cache[key] = resolved
+    return {symbol: resolved[symbol] for symbol in symbols}
+
+
+def locate_base_addr(pid: int, bin_path: str) -> Optional[int]:
+    """
+    Start address of the first mapping of bin_path in process pid.
+
+    Args:
+        pid (int): Process ID
+        bin_path (str): Mapped binary path
+
+    Returns:
+        Optional[int]: Base address or None if bin_path is not mapped
+    """
+    with open(f"/proc/{pid}/maps", "r") as f:
+        for line in f:
+            # address perms offset dev inode pathname
+            parts = line.split(None, 5)
+            if len(parts) == 6 and parts[5].rstrip("\n") == bin_path:
+                return int(parts[0].split("-", 1)[0], 16)
+    return None
@@ -314,6 +314,33 @@ def build_long_spy_command_hint(
         )
 
 
+def build_multi_spy_command_hint(
+    targets: List[Tuple[str, Optional[str], str]]
+) -> str:
+    """
+    Build a spy command hint message for a command matching many methods.
+
+    Args:
+        targets (List[Tuple[str, Optional[str], str]]): Module, class and method
+            name of every method being spied on
+
+    Returns:
+        str: Formatted spy command hint message, one line per method
+    """
+    lines = [
+        f"{COLOR_GREEN}{ICON_SUCCESS}{COLOR_END} "
+        f"{COLOR_WHITE_255}Spy was successfully added on {len(targets)} methods, "
+        f"{COLOR_FAINT}press Ctrl-C to stop.{COLOR_END}"
+    ]
+    for module_name, class_name, method_name in targets:
+        method_id = method_name if class_name is None else f"{class_name}.{method_name}"
+        lines.append(
+            f"  {COLOR_FAINT}[MODULE]{COLOR_END} {module_name} "
+            f"{COLOR_FAINT}[METHOD]{COLOR_END} {method_id}"
+        )
+    return "\n".join(lines)
+
+
 def build_error_message(error_text: str) -> str:
     """
     Build a formatted error message with error icon.
@@ -3,6 +3,8 @@ import subprocess
 from subprocess import CalledProcessError
 from typing import List, Optional, Union
 
+from flight_profiler.utils.elf_util import ElfFormatError, resolve_elf_symbols
+
 
 def execute_process(cmds: List[str]):
     """
@@ -83,6 +85,9 @@ def resolve_symbol_address(symbol: str, pid: int) -> Optional[int]:
     """
     Resolve symbol address for the given symbol and process ID.
 
+    ELF binaries are read in process through the symbol cache of elf_util, other
+    platforms fall back to nm.
+
     Args:
         symbol (str): Symbol to resolve
         pid (int): Process ID
@@ -90,6 +95,11 @@ def resolve_symbol_address(symbol: str, pid: int) -> Optional[int]:
     Returns:
         Optional[int]: Symbol address or None if not found
     """
+    try:
+        bin_path = os.readlink(f"/proc/{pid}/exe")
+        return resolve_elf_symbols(bin_path, [symbol])[symbol]
+    except (OSError, ElfFormatError):
+        pass
     current_directory = os.path.dirname(os.path.abspath(__file__))
     shell_path = os.path.join(current_directory, "../shell/resolve_symbol.sh")
     # get symbol address like: 0000000100181050